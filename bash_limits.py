@@ -0,0 +1,185 @@
+# bash_limits.py — Resource-limited Bash commands for subagents
+"""
+repo_analyzer clones repositories into ``./.temp/`` and runs whatever it
+decides to in them: a large clone, a runaway ``find``, a test suite. Without
+limits, only the global watchdog stops such a command, and only after
+minutes. With ``L7_BASH_LIMITS=1``, the orchestrator's PreToolUse hook
+rewrites a limited agent's Bash command to run through this module::
+
+    python bash_limits.py run --wall 120 --cpu 60 --mem-mb 4096 --file-mb 1024 \\
+        --output-kb 1024 --usage session_data/bash_usage/<tool_use_id>.json -- '<command>'
+
+The runner starts ``bash -c '<command>'`` in its own process group with
+``setrlimit`` limits, the same ones ``prlimit`` sets:
+
+- CPU seconds (``RLIMIT_CPU``)
+- address space (``RLIMIT_AS``): allocations past it fail inside the command
+- the size of any one file written (``RLIMIT_FSIZE``), so a clone can't fill the disk
+
+A wall-clock timer and an output cap kill the whole group. stdout and stderr
+are merged and passed through. The exit status is kept, with 124 for a
+wall-clock kill, as ``timeout`` does. When a limit is hit, the output ends
+with a ``[bash_limits]`` line saying which one, so the agent knows why. The
+command's resource usage goes to the ``--usage`` JSON file: wall, CPU, peak
+RSS, output size, blocks written, and the limit that killed it. The
+PostToolUse hook moves it into the audit log.
+
+Commands run in a child shell. The runner writes the directory the command
+ended in to ``--cwd-file``, and the wrapped command ``cd``s there, so a
+``cd .temp/repo`` carries over to the next call as it does unwrapped.
+``wrap`` returns None on platforms without ``resource`` (Windows), and there
+commands run unwrapped.
+"""
+import argparse
+import json
+import math
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_LIMITS = {"wall_s": 120, "cpu_s": 60, "mem_mb": 4096, "file_mb": 1024, "output_kb": 1024}
+USAGE_DIR = "session_data/bash_usage"
+CHUNK = 65536
+
+
+def wrap(command: str, limits: dict, usage_path: str) -> str | None:
+    """The shell command that runs ``command`` under ``limits``; None where limits are unsupported.
+
+    The wall clock takes fractions of a second. The other limits are whole
+    units, rounded up, so a fractional value never turns into 0 (no limit).
+    The wrapped command ``cd``s to the directory ``command`` ended in and
+    keeps its exit status, so the calling shell's directory carries over as
+    it would unwrapped.
+    """
+    if resource is None or not hasattr(os, "setsid"):
+        return None
+    cwd_path = os.path.abspath(os.path.splitext(usage_path)[0] + ".cwd")
+    args = [sys.executable, os.path.abspath(__file__), "run",
+            "--wall", f"{limits['wall_s']:g}", "--cpu", str(math.ceil(limits["cpu_s"])),
+            "--mem-mb", str(math.ceil(limits["mem_mb"])), "--file-mb", str(math.ceil(limits["file_mb"])),
+            "--output-kb", str(math.ceil(limits["output_kb"])), "--usage", os.path.abspath(usage_path),
+            "--cwd-file", cwd_path, "--", command]
+    cwd = shlex.quote(cwd_path)
+    return (" ".join(shlex.quote(arg) for arg in args)
+            + f'; l7_status=$?; [ -s {cwd} ] && cd "$(cat {cwd})"; rm -f {cwd}; (exit $l7_status)')
+
+
+def read_usage(usage_path: str) -> dict | None:
+    """Load and remove a command's usage record; None if the runner didn't write one."""
+    try:
+        with open(usage_path, encoding="utf-8") as f:
+            usage = json.load(f)
+        os.remove(usage_path)
+        return usage
+    except (OSError, ValueError):
+        return None
+
+
+# ── Runner ───────────────────────────────────────────────
+
+def _set_limits(cpu_s: int, mem_mb: int, file_mb: int) -> None:
+    os.setsid()  # own process group: a kill reaches everything the command started
+    if cpu_s:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_s, cpu_s + 5))  # SIGXCPU, then SIGKILL
+    if mem_mb:
+        resource.setrlimit(resource.RLIMIT_AS, (mem_mb << 20, mem_mb << 20))
+    if file_mb:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_mb << 20, file_mb << 20))
+    signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+
+
+def run(args) -> int:
+    start = time.monotonic()
+    script = args.command
+    if args.cwd_file:  # the directory the command ends in, for wrap() to cd to
+        script = f"trap {shlex.quote('pwd -P > ' + shlex.quote(args.cwd_file))} EXIT\n{script}"
+    proc = subprocess.Popen(["bash", "-c", script], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            stdin=subprocess.DEVNULL,
+                            preexec_fn=lambda: _set_limits(args.cpu, args.mem_mb, args.file_mb))
+    killed: list[str] = []
+
+    def kill(reason: str) -> None:
+        if not killed:
+            killed.append(reason)
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    timer = threading.Timer(args.wall, kill, ("wall",)) if args.wall else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+    out = sys.stdout.buffer
+    written, limit = 0, args.output_kb * 1024
+    while chunk := proc.stdout.read1(CHUNK):
+        if limit and written + len(chunk) > limit:
+            out.write(chunk[:limit - written])
+            written = limit
+            kill("output")
+            break
+        out.write(chunk)
+        written += len(chunk)
+    out.flush()
+    status = proc.wait()
+    if timer:
+        timer.cancel()
+    wall = time.monotonic() - start
+
+    rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = rusage.ru_utime + rusage.ru_stime
+    # Killed by a signal: negative status, or 128 + signal when bash forked the command
+    signum = -status if status < 0 else status - 128 if status > 128 else 0
+    # SIGXCPU only comes from the soft limit; rusage can read a little under it
+    if not killed and args.cpu and (signum == signal.SIGXCPU or signum == signal.SIGKILL and cpu >= args.cpu):
+        killed.append("cpu")
+    elif not killed and signum == signal.SIGXFSZ:
+        killed.append("file")
+    peak_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    usage = {
+        "wall_s": round(wall, 3), "cpu_s": round(cpu, 3), "max_rss_mb": round(peak_kb / 1024, 1),
+        "output_kb": round(written / 1024, 1), "written_kb": rusage.ru_oublock // 2,
+        "status": status, "killed": killed[0] if killed else None,
+    }
+    if killed:
+        limits = {"wall": f"{args.wall:g}s wall-clock", "cpu": f"{args.cpu}s CPU", "file": f"{args.file_mb} MB per file",
+                  "output": f"{args.output_kb} KB of output"}
+        print(f"\n[bash_limits] killed: {limits[killed[0]]} limit reached "
+              f"(ran {wall:.1f}s, {cpu:.1f}s CPU). Narrow the command, e.g. a shallow clone or a smaller path.",
+              flush=True)
+    if args.usage:
+        os.makedirs(os.path.dirname(args.usage), exist_ok=True)
+        with open(args.usage, "w", encoding="utf-8") as f:
+            json.dump(usage, f)
+    if killed and killed[0] == "wall":
+        return 124
+    return status if status >= 0 else 128 - status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a shell command under CPU, memory, file, output and time limits")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("run")
+    p.add_argument("--wall", type=float, default=DEFAULT_LIMITS["wall_s"], help="Wall-clock seconds (0: none)")
+    p.add_argument("--cpu", type=int, default=DEFAULT_LIMITS["cpu_s"], help="CPU seconds (0: none)")
+    p.add_argument("--mem-mb", type=int, default=DEFAULT_LIMITS["mem_mb"], help="Address space MB (0: none)")
+    p.add_argument("--file-mb", type=int, default=DEFAULT_LIMITS["file_mb"], help="Largest file written, MB (0: none)")
+    p.add_argument("--output-kb", type=int, default=DEFAULT_LIMITS["output_kb"], help="Output KB (0: none)")
+    p.add_argument("--usage", help="Write the command's resource usage to this JSON file")
+    p.add_argument("--cwd-file", help="Write the directory the command ends in to this file")
+    p.add_argument("command", help="Shell command (after --)")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Offline benchmark scripts for the L7 orchestrator.
+
+Run from the repository root, e.g. ``python -m benchmarks.startup``. None of
+these are wired into CI; they print a report and optionally write JSON.
+"""
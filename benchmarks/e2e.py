@@ -0,0 +1,158 @@
+"""End-to-end pipeline benchmark against the local mock backend.
+
+Runs the real Claude Code CLI, ``orchestrator.main`` and the hooks against
+``benchmarks/mock_backend.py``, so the whole pipeline can be timed on a laptop
+with no network and no API spend:
+
+  python -m benchmarks.e2e --scenario fanout --runs 3
+  python -m benchmarks.e2e --scenario blog --ttft-ms 600 --tokens-per-s 50 --json blog.json
+  python -m benchmarks.e2e --scenario fanout --stream-stats   # client-side TTFT / ITL / tokens/s
+
+Each run uses a fresh scratch directory with a copy of ``prompts/``. Reported
+wall-clock covers query to exit, and the model-side numbers (requests by
+role, output tokens, tokens/s) come from the mock server. With a fixed
+scenario, latency model and seed, runs differ only by local CPU/IO noise.
+``--stream-stats`` turns on partial messages. Each run then also reports
+client-side streaming latency per agent and model, as seen through the CLI.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.mock_backend import DEFAULT_LATENCY, SCENARIOS, start_in_thread
+from stream_stats import format_summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+
+def mock_env(base_url: str) -> dict:
+    """Environment that points the CLI at the mock and keeps it off the network."""
+    return {
+        "ANTHROPIC_BASE_URL": base_url,
+        "ANTHROPIC_API_KEY": "mock-key",
+        "CLAUDE_CODE_DISABLE_NONESSENTIAL_TRAFFIC": "1",
+        "DISABLE_AUTOUPDATER": "1",
+        # Run Task subagents in the foreground: scripted orchestrator turns
+        # cannot react to background-agent completion notifications
+        "CLAUDE_CODE_DISABLE_BACKGROUND_TASKS": "1",
+    }
+
+
+@contextlib.contextmanager
+def scratch_workspace(env: dict):
+    """chdir into a scratch copy of prompts/ with ``env`` applied; restore after."""
+    scratch = tempfile.mkdtemp(prefix="l7-e2e-")
+    shutil.copytree(os.path.join(ROOT, "prompts"), os.path.join(scratch, "prompts"))
+    os.makedirs(os.path.join(scratch, "research_output"))
+    saved_env = {k: os.environ.get(k) for k in env}
+    cwd = os.getcwd()
+    os.environ.update(env)
+    os.chdir(scratch)
+    try:
+        yield scratch
+    finally:
+        os.chdir(cwd)
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+async def run_once(query: str, base_url: str, show_output: bool,
+                   stream_stats: bool = False) -> tuple[float, dict | None]:
+    """Run one query through orchestrator.main against the mock.
+
+    Returns wall seconds and, with ``stream_stats``, the session's streaming summary.
+    """
+    import orchestrator
+    from benchmarks.fake_sdk import ScriptedReader
+
+    orchestrator.STREAM_STATS_MODE = stream_stats
+    with scratch_workspace(mock_env(base_url)):
+        sink = None if show_output else open(os.devnull, "w")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sink) if sink else contextlib.nullcontext():
+            await orchestrator.main(reader=ScriptedReader([query, "exit"]))
+        wall = time.perf_counter() - start
+        if sink:
+            sink.close()
+    stream = orchestrator.stream_stats.summary(whole_session=True) if stream_stats else None
+    return wall, stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against the mock backend")
+    parser.add_argument("--scenario", default="fanout", choices=sorted(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--ttft-ms", type=float, default=DEFAULT_LATENCY["ttft_ms"])
+    parser.add_argument("--tokens-per-s", type=float, default=DEFAULT_LATENCY["tokens_per_s"])
+    parser.add_argument("--jitter", type=float, default=DEFAULT_LATENCY["jitter"])
+    parser.add_argument("--show-output", action="store_true")
+    parser.add_argument("--stream-stats", action="store_true",
+                        help="Measure TTFT, inter-token latency and tokens/s from partial messages")
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args()
+
+    scenario = SCENARIOS[args.scenario]
+    latency = {"ttft_ms": args.ttft_ms, "tokens_per_s": args.tokens_per_s, "jitter": args.jitter}
+    runs = []
+    for _ in range(args.runs):
+        server, base_url = start_in_thread(scenario, latency)
+        try:
+            wall, stream = asyncio.run(run_once(scenario["query"], base_url, args.show_output,
+                                                args.stream_stats))
+        finally:
+            server.shutdown()
+            server.server_close()
+        stats = server.state.stats
+        runs.append({
+            "wall_s": round(wall, 3),
+            "requests": stats["requests"],
+            "by_role": stats["by_role"],
+            "output_tokens": stats["output_tokens"],
+            "tokens_per_s": round(stats["output_tokens"] / wall, 1) if wall else 0.0,
+            "model_stream_s": round(stats["stream_seconds"], 3),
+        })
+        if stream:
+            runs[-1]["stream"] = stream
+
+    walls = [r["wall_s"] for r in runs]
+    report = {
+        "scenario": args.scenario,
+        "latency": latency,
+        "runs": runs,
+        "wall_s": {"median": round(statistics.median(walls), 3),
+                   "min": min(walls), "max": max(walls),
+                   "stdev": round(statistics.stdev(walls), 3) if len(walls) > 1 else 0.0},
+        "tokens_per_s_median": statistics.median(r["tokens_per_s"] for r in runs),
+    }
+
+    print(f"{BOLD}E2E benchmark — {args.scenario}{RESET} {DIM}{latency}{RESET}")
+    for i, run in enumerate(runs, 1):
+        print(f"  run {i}: {run['wall_s']:.2f}s | {run['requests']} requests "
+              f"{run['by_role']} | {run['output_tokens']} tokens | {run['tokens_per_s']} tok/s")
+        if run.get("stream"):
+            print(f"{DIM}         stream: {format_summary(run['stream'])}{RESET}")
+    print(f"  wall median {report['wall_s']['median']:.2f}s "
+          f"(min {report['wall_s']['min']:.2f}, max {report['wall_s']['max']:.2f}, "
+          f"stdev {report['wall_s']['stdev']:.3f})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"{DIM}Report: {args.json}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Fake ``ClaudeSDKClient`` that synthesizes message streams without the CLI.
+
+Each query produces one orchestrator turn that spawns N parallel subagent
+Tasks. Each subagent makes M tool calls and finishes with a large TextBlock.
+The configured PreToolUse/PostToolUse hooks are invoked the way the CLI
+would, including ``agent_id``/``agent_type`` attribution, and their latency is
+measured. Use ``functools.partial(FakeClaudeSDKClient, config=..., stats=...)``
+wherever a client class is expected (``orchestrator.main(client_cls=...)``).
+"""
+import asyncio
+import dataclasses
+import re
+import time
+from array import array
+from collections import deque
+
+from claude_agent_sdk import (
+    AssistantMessage, ResultMessage, TextBlock, ToolResultBlock, ToolUseBlock, UserMessage,
+)
+
+DEFAULT_CONFIG = {
+    "subagents": 3,          # parallel Task invocations per round
+    "tool_calls": 5,         # tool calls per subagent
+    "text_bytes": 4000,      # size of each subagent's final TextBlock
+    "tool_latency": 0.0,     # seconds each synthetic tool takes
+    "model_latency": 0.0,    # seconds per synthetic model turn
+    "connect_latency": 0.0,  # seconds for connect()
+    "cost_per_turn": 0.002,  # USD added to total_cost_usd per model turn
+    "tools": ["WebSearch", "WebFetch"],
+}
+
+_DONE = object()
+
+
+def _make(cls, **fields):
+    """Construct an SDK dataclass, dropping fields this SDK version lacks."""
+    known = {f.name for f in dataclasses.fields(cls)}
+    return cls(**{k: v for k, v in fields.items() if k in known})
+
+
+def new_stats() -> dict:
+    """Counters shared by every fake client built for one benchmark."""
+    return {
+        "messages": 0,
+        "tool_calls": 0,
+        "hook_calls": 0,
+        "hook_latency_s": array("d"),  # compact: no per-sample object growth
+        "round_ends": [],              # perf_counter at each ResultMessage
+        "on_round_end": None,          # optional callback(stats)
+    }
+
+
+class FakeClaudeSDKClient:
+    """Drop-in stand-in for ClaudeSDKClient driven by a synthetic scenario."""
+
+    def __init__(self, options=None, config: dict | None = None, stats: dict | None = None):
+        self.options = options
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.stats = stats if stats is not None else new_stats()
+        self._pending: deque[str] = deque()
+        self._interrupted = asyncio.Event()
+        self._ids = 0
+        self._turns = 0
+        self._cost = 0.0
+        self.session_id = f"fake-{id(self):x}"
+
+    # ── Client API ───────────────────────────────────────
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.disconnect()
+        return False
+
+    async def connect(self, prompt=None) -> None:
+        if self.config["connect_latency"]:
+            await asyncio.sleep(self.config["connect_latency"])
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def query(self, prompt: str, session_id: str = "default") -> None:
+        self._pending.append(prompt)
+
+    async def interrupt(self) -> None:
+        self._interrupted.set()
+
+    async def set_model(self, model: str | None = None) -> None:
+        self.options.model = model  # profile switches and governor downgrades
+
+    async def receive_response(self):
+        """Yield one synthetic round's messages, ending with a ResultMessage."""
+        self._pending.popleft() if self._pending else None
+        self._interrupted.clear()
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(self._run_round(queue))
+        try:
+            while True:
+                message = await queue.get()
+                if message is _DONE:
+                    break
+                self.stats["messages"] += 1
+                yield message
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    # ── Synthesis ────────────────────────────────────────
+
+    def _next_id(self, prefix: str = "toolu") -> str:
+        self._ids += 1
+        return f"{prefix}_{self._ids:06d}"
+
+    def _usage(self, output_chars: int) -> dict:
+        return {
+            "input_tokens": 1200,
+            "output_tokens": max(1, output_chars // 4),
+            "cache_read_input_tokens": 8000,
+            "cache_creation_input_tokens": 0,
+        }
+
+    async def _model_turn(self) -> None:
+        self._turns += 1
+        self._cost += self.config["cost_per_turn"]
+        if self.config["model_latency"]:
+            await asyncio.sleep(self.config["model_latency"])
+
+    async def _run_hooks(self, event: str, tool_name: str, tool_input: dict,
+                         tool_use_id: str, agent: tuple[str, str] | None, **extra) -> dict:
+        """Invoke matching hooks like the CLI; returns the merged hook output."""
+        hooks = (getattr(self.options, "hooks", None) or {}).get(event, [])
+        input_data = {
+            "hook_event_name": event,
+            "session_id": self.session_id,
+            "tool_name": tool_name,
+            "tool_input": tool_input,
+            "tool_use_id": tool_use_id,
+            **extra,
+        }
+        if agent:
+            input_data["agent_id"], input_data["agent_type"] = agent
+        merged: dict = {}
+        for matcher in hooks:
+            pattern = matcher.matcher
+            if pattern not in (None, "*", "") and not re.fullmatch(pattern, tool_name):
+                continue
+            for hook in matcher.hooks:
+                start = time.perf_counter()
+                result = await hook(input_data, tool_use_id, None)
+                self.stats["hook_latency_s"].append(time.perf_counter() - start)
+                self.stats["hook_calls"] += 1
+                if result:
+                    merged.update(result)
+        return merged
+
+    async def _tool_call(self, queue, tool_name: str, tool_input: dict,
+                         parent_id: str | None, agent: tuple[str, str] | None, model: str):
+        tool_use_id = self._next_id()
+        await self._model_turn()
+        await queue.put(_make(
+            AssistantMessage, content=[ToolUseBlock(id=tool_use_id, name=tool_name, input=tool_input)],
+            model=model, parent_tool_use_id=parent_id, usage=self._usage(80),
+            message_id=self._next_id("msg"), session_id=self.session_id,
+        ))
+        decision = await self._run_hooks("PreToolUse", tool_name, tool_input, tool_use_id, agent)
+        denied = decision.get("hookSpecificOutput", {}).get("permissionDecision") == "deny"
+        if not denied:
+            self.stats["tool_calls"] += 1
+            if self.config["tool_latency"]:
+                await asyncio.sleep(self.config["tool_latency"])
+            await self._run_hooks("PostToolUse", tool_name, tool_input, tool_use_id, agent,
+                                  tool_response="ok")
+        await queue.put(_make(
+            UserMessage, content=[ToolResultBlock(tool_use_id=tool_use_id, content="ok",
+                                                  is_error=denied)],
+            parent_tool_use_id=parent_id,
+        ))
+        return tool_use_id
+
+    async def _subagent(self, queue, task_id: str, agent_type: str, index: int) -> None:
+        agent = (f"agent-{task_id[-6:]}", agent_type)
+        tools = self.config["tools"]
+        for j in range(self.config["tool_calls"]):
+            if self._interrupted.is_set():
+                return
+            tool = tools[j % len(tools)]
+            tool_input = ({"query": f"synthetic query {index}.{j}"} if tool == "WebSearch"
+                          else {"url": f"https://example{index}-{j}.com/page", "prompt": "summarize"})
+            await self._tool_call(queue, tool, tool_input, task_id, agent, "haiku")
+        await self._model_turn()
+        text = f"{agent_type} findings. " + "x" * self.config["text_bytes"]
+        await queue.put(_make(
+            AssistantMessage, content=[TextBlock(text=text)], model="haiku",
+            parent_tool_use_id=task_id, usage=self._usage(len(text)),
+            message_id=self._next_id("msg"), session_id=self.session_id,
+        ))
+
+    async def _run_round(self, queue) -> None:
+        started = time.perf_counter()
+        agent_types = [name for name in (getattr(self.options, "agents", None) or {})
+                       if name != "blog_writer"] or ["web_researcher"]
+        try:
+            await self._model_turn()
+            task_ids = [self._next_id() for _ in range(self.config["subagents"])]
+            blocks = [TextBlock(text="Starting parallel research.")] + [
+                ToolUseBlock(id=tid, name="Task", input={
+                    "subagent_type": agent_types[i % len(agent_types)],
+                    "description": f"Synthetic research task {i}",
+                    "prompt": "Research the topic.",
+                }) for i, tid in enumerate(task_ids)
+            ]
+            await queue.put(_make(
+                AssistantMessage, content=blocks, model="sonnet", usage=self._usage(400),
+                message_id=self._next_id("msg"), session_id=self.session_id,
+            ))
+            for tid, block in zip(task_ids, blocks[1:]):
+                await self._run_hooks("PreToolUse", "Task", block.input, tid, None)
+            await asyncio.gather(*(
+                self._subagent(queue, tid, agent_types[i % len(agent_types)], i)
+                for i, tid in enumerate(task_ids)
+            ))
+            for tid, block in zip(task_ids, blocks[1:]):
+                await self._run_hooks("PostToolUse", "Task", block.input, tid, None,
+                                      tool_response="done")
+            await self._model_turn()
+            summary = "Synthesis. " + "y" * self.config["text_bytes"]
+            await queue.put(_make(
+                AssistantMessage, content=[TextBlock(text=summary)], model="sonnet",
+                usage=self._usage(len(summary)), message_id=self._next_id("msg"),
+                session_id=self.session_id,
+            ))
+        finally:
+            interrupted = self._interrupted.is_set()
+            await queue.put(_make(
+                ResultMessage,
+                subtype="error_during_execution" if interrupted else "success",
+                duration_ms=int((time.perf_counter() - started) * 1000),
+                duration_api_ms=0, is_error=interrupted, num_turns=self._turns,
+                session_id=self.session_id, total_cost_usd=round(self._cost, 6),
+            ))
+            self.stats["round_ends"].append(time.perf_counter())
+            if self.stats["on_round_end"]:
+                self.stats["on_round_end"](self.stats)
+            await queue.put(_DONE)
+
+
+class ScriptedReader:
+    """Line source for ``orchestrator.main(reader=...)`` that replays fixed input."""
+
+    def __init__(self, lines):
+        self.queued = deque(lines)
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.queued.clear()
+
+    async def ask(self, prompt: str):
+        return self.queued.popleft() if self.queued else None
+
+    async def next_query(self, prompt: str):
+        return await self.ask(prompt)
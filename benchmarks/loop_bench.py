@@ -0,0 +1,157 @@
+"""Orchestrator loop benchmark — drives the real ``orchestrator.main`` with a fake SDK.
+
+Usage:
+  python -m benchmarks.loop_bench                          # 20 rounds, 3x5 tool calls
+  python -m benchmarks.loop_bench --rounds 200 --subagents 3 --tool-calls 20 --text-kb 16
+  python -m benchmarks.loop_bench --tool-latency 0.05 --model-latency 0.2 --json loop.json
+
+Reports messages/sec, per-message overhead, hook latency, traced memory growth
+per round and event-loop lag, measured by a 10ms ticker's oversleep.
+tracemalloc slows the loop several-fold; use ``--no-memory`` for speed numbers.
+
+Runs in a scratch directory holding a copy of ``prompts/``, so session state,
+stream logs and audit logs never touch the real tree. Orchestrator output goes
+to /dev/null unless ``--show-output``.
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAG_TICK = 0.01
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sequence."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+async def measure_loop_lag(samples: list[float], stop: asyncio.Event) -> None:
+    """Record how late a fixed-interval sleep wakes up (event-loop lag)."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_TICK)
+        samples.append(time.perf_counter() - start - LAG_TICK)
+
+
+async def run_bench(args) -> dict:
+    import orchestrator
+    from benchmarks.fake_sdk import FakeClaudeSDKClient, ScriptedReader, new_stats
+
+    config = {
+        "subagents": args.subagents,
+        "tool_calls": args.tool_calls,
+        "text_bytes": args.text_kb * 1024,
+        "tool_latency": args.tool_latency,
+        "model_latency": args.model_latency,
+    }
+    stats = new_stats()
+    memory: list[int] = []
+    if args.memory:
+        stats["on_round_end"] = lambda _: memory.append(tracemalloc.get_traced_memory()[0])
+
+    client_cls = functools.partial(FakeClaudeSDKClient, config=config, stats=stats)
+    reader = ScriptedReader([f"synthetic query {i}" for i in range(args.rounds)] + ["exit"])
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(lag, stop))
+    start = time.perf_counter()
+    await orchestrator.main(client_cls=client_cls, reader=reader)
+    wall = time.perf_counter() - start
+    stop.set()
+    await lag_task
+
+    messages = stats["messages"]
+    hook_us = [s * 1e6 for s in stats["hook_latency_s"]]
+    rounds = stats["round_ends"]
+    round_walls = [b - a for a, b in zip([start] + rounds[:-1], rounds)]
+    report = {
+        "config": {**config, "rounds": args.rounds},
+        "wall_s": round(wall, 3),
+        "messages": messages,
+        "messages_per_s": round(messages / wall, 1),
+        "overhead_per_message_us": round(wall / messages * 1e6, 1) if messages else 0.0,
+        "tool_calls": stats["tool_calls"],
+        "round_wall_ms": {"p50": round(percentile(round_walls, 50) * 1e3, 2),
+                          "p99": round(percentile(round_walls, 99) * 1e3, 2)},
+        "hook_calls": stats["hook_calls"],
+        "hook_latency_us": {"p50": round(percentile(hook_us, 50), 1),
+                            "p99": round(percentile(hook_us, 99), 1),
+                            "max": round(max(hook_us, default=0.0), 1)},
+        "loop_lag_ms": {"p50": round(percentile(lag, 50) * 1e3, 3),
+                        "p99": round(percentile(lag, 99) * 1e3, 3),
+                        "max": round(max(lag, default=0.0) * 1e3, 3)},
+    }
+    if memory:
+        half = max(1, len(memory) // 2)
+        growth = (statistics.mean(memory[half:]) - statistics.mean(memory[:half])) / half \
+            if len(memory) > 1 else 0.0
+        report["memory"] = {
+            "first_round_kb": round(memory[0] / 1024, 1),
+            "last_round_kb": round(memory[-1] / 1024, 1),
+            "growth_per_round_kb": round(growth / 1024, 2),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the orchestrator loop offline")
+    parser.add_argument("--rounds", type=int, default=20, help="Synthetic queries to run")
+    parser.add_argument("--subagents", type=int, default=3)
+    parser.add_argument("--tool-calls", type=int, default=5, help="Tool calls per subagent")
+    parser.add_argument("--text-kb", type=int, default=4, help="KB per large TextBlock")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="Seconds per tool")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Seconds per turn")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip tracemalloc (it slows the loop down)")
+    parser.add_argument("--show-output", action="store_true", help="Print orchestrator output")
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    scratch = tempfile.mkdtemp(prefix="l7-loop-")
+    shutil.copytree(os.path.join(ROOT, "prompts"), os.path.join(scratch, "prompts"))
+    cwd = os.getcwd()
+    os.chdir(scratch)
+    if args.memory:
+        tracemalloc.start()
+    try:
+        sink = None if args.show_output else open(os.devnull, "w")
+        with contextlib.redirect_stdout(sink) if sink else contextlib.nullcontext():
+            report = asyncio.run(run_bench(args))
+        if sink:
+            sink.close()
+    finally:
+        tracemalloc.stop()
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{BOLD}Orchestrator loop benchmark{RESET} {DIM}{report['config']}{RESET}")
+    for key, value in report.items():
+        if key != "config":
+            print(f"  {key:<26} {value}")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"{DIM}Report: {json_path}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Metrics update overhead benchmark.
+
+Usage:
+  python -m benchmarks.metrics_overhead                     # 1M updates per case
+  python -m benchmarks.metrics_overhead --updates 5000000 --json metrics.json
+
+Times each hot-path update the orchestrator makes, plus rendering a scrape
+of a populated registry. Each case uses fresh metrics in a private registry.
+Reports ns per update as the best of ``--repeat`` runs, which is the least
+noisy figure. Exits non-zero if any update is over the budget (1 µs by
+default).
+"""
+import argparse
+import json
+import time
+import timeit
+
+from metrics import Counter, Gauge, Histogram, Registry, TOOL_DURATION
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+GREEN = "\033[32m"
+RED = "\033[31m"
+RESET = "\033[0m"
+
+TOOLS = ("WebFetch", "WebSearch", "Read", "Write", "Bash", "Agent")
+AGENTS = ("Main", "docs_researcher", "repo_analyzer", "web_researcher")
+
+
+def build_cases(registry: Registry) -> dict:
+    hist = Histogram("bench_tool_seconds", "bench", ("tool", "agent"), TOOL_DURATION.buckets, registry)
+    plain = Histogram("bench_round_seconds", "bench", buckets=(5, 10, 30, 60, 300), registry=registry)
+    counter = Counter("bench_total", "bench", registry=registry)
+    gauge = Gauge("bench_in_flight", "bench", registry=registry)
+    for tool in TOOLS:
+        for agent in AGENTS:
+            hist.observe(1.0, tool, agent)
+    return {
+        "histogram.observe (tool, agent)": lambda: hist.observe(3.2, "WebFetch", "web_researcher"),
+        "histogram.observe (no labels)": lambda: plain.observe(42.0),
+        "counter.inc": lambda: counter.inc(amount=0.01),
+        "gauge.set": lambda: gauge.set(3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metrics update overhead")
+    parser.add_argument("--updates", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ns", type=float, default=1000.0)
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args()
+
+    registry = Registry()
+    cases = build_cases(registry)
+    # Subtract the cost of calling an empty lambda: the hook pays the update, not the wrapper
+    noop = lambda: None  # noqa: E731
+    baseline = min(timeit.repeat(noop, number=args.updates, repeat=args.repeat)) / args.updates * 1e9
+
+    report = {"updates": args.updates, "budget_ns": args.budget_ns, "cases": {}}
+    print(f"{BOLD}Metrics update overhead{RESET} {DIM}({args.updates:,} updates, best of {args.repeat}){RESET}")
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=args.updates, repeat=args.repeat)) / args.updates * 1e9
+        ns = max(0.0, best - baseline)
+        ok = ns < args.budget_ns
+        report["cases"][name] = {"ns_per_update": round(ns, 1), "ok": ok}
+        colour = GREEN if ok else RED
+        print(f"  {name:<34} {colour}{ns:7.1f} ns{RESET}")
+
+    start = time.perf_counter()
+    text = registry.render()
+    render_ms = (time.perf_counter() - start) * 1000
+    report["render_ms"] = round(render_ms, 3)
+    report["render_lines"] = text.count("\n")
+    print(f"  {'render (' + str(report['render_lines']) + ' lines)':<34} {render_ms:7.2f} ms")
+    print(f"{DIM}  call overhead {baseline:.1f} ns subtracted{RESET}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"{DIM}Report: {args.json}{RESET}")
+    if not all(case["ok"] for case in report["cases"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Local Anthropic-compatible mock backend that plays scripted model behavior.
+
+Speaks enough of the Messages API for the Claude Code CLI: ``POST /v1/messages``
+(streaming SSE and plain JSON, text and ``tool_use`` blocks) and
+``POST /v1/messages/count_tokens``. Point the CLI at it the same way
+``res_lite.ps1`` points it at LiteLLM::
+
+    python -m benchmarks.mock_backend --scenario fanout --port 8787
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8787 ANTHROPIC_API_KEY=mock uv run python agent.py
+
+A scenario maps *roles* to scripted turns. The role of a request is chosen by
+a substring of its system prompt, so the orchestrator and each subagent get
+their own script. The turn is the number of assistant messages already in the
+conversation. Latency is a time-to-first-token plus a fixed token rate. Jitter
+is seeded from the role and turn, so runs are reproducible.
+
+Subagent scripts avoid WebSearch/WebFetch, which would need the network.
+They use Bash, Read, Glob and Write against the scratch working directory.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LATENCY = {"ttft_ms": 400, "tokens_per_s": 80, "jitter": 0.1}
+CHARS_PER_TOKEN = 4
+FRAME_S = 0.02  # group token deltas into ~50 writes/s, like a real stream
+
+ROLE_MARKERS = {
+    "orchestrator": "You are a research orchestrator",
+    "docs_researcher": "# Documentation Researcher",
+    "repo_analyzer": "# Repository Analyzer",
+    "web_researcher": "# Web Researcher",
+    "blog_writer": "# Blog Writer",
+}
+
+
+def _findings(agent: str, topic: str, paragraphs: int) -> str:
+    body = (f"{agent} notes on {topic}: the core abstraction is small, the docs are "
+            f"thorough, and most real-world examples follow the same three patterns. ")
+    return "\n\n".join(f"## Finding {i + 1}\n\n" + body * 4 for i in range(paragraphs))
+
+
+def _chapter(n: int) -> str:
+    return (f"---\ntitle: \"Part {n}\"\npart: {n}\n---\n\n# Part {n}\n\n"
+            + "This chapter walks through the material step by step. " * 120)
+
+
+SCENARIOS = {
+    "fanout": {
+        "query": "Learn mocktool from scratch",
+        "roles": {
+            "orchestrator": [
+                {"text": "I'll delegate to all three researchers in parallel.",
+                 "tool_uses": [
+                     {"name": "Task", "input": {"subagent_type": name, "description": f"{name} pass",
+                                                "prompt": "Research mocktool."}}
+                     for name in ("docs_researcher", "repo_analyzer", "web_researcher")]},
+                {"text": "Writing the learning path.",
+                 "tool_uses": [{"name": "Write", "input": {
+                     "file_path": "research_output/learning-mocktool/README.md",
+                     "content": _findings("orchestrator", "mocktool", 6)}}]},
+                {"text": "Done. " + _findings("orchestrator", "mocktool", 2)},
+            ],
+            "docs_researcher": [{"text": _findings("docs_researcher", "mocktool", 8)}],
+            "repo_analyzer": [
+                {"text": "Listing the workspace.",
+                 "tool_uses": [{"name": "Bash", "input": {"command": "ls prompts",
+                                                          "description": "List prompts"}}]},
+                {"text": _findings("repo_analyzer", "mocktool", 8)},
+            ],
+            "web_researcher": [{"text": _findings("web_researcher", "mocktool", 8)}],
+        },
+    },
+    "blog": {
+        "query": "Turn my mocktool research into a blog series",
+        "roles": {
+            "orchestrator": [
+                {"text": "Handing off to blog_writer.",
+                 "tool_uses": [{"name": "Task", "input": {
+                     "subagent_type": "blog_writer", "description": "Blog series",
+                     "prompt": "Write a 5-part series from research_output/learning-mocktool."}}]},
+                {"text": "The blog series is ready."},
+            ],
+            "blog_writer": [
+                {"text": "Finding the research.",
+                 "tool_uses": [{"name": "Glob", "input": {"pattern": "prompts/*.md"}}]},
+                {"text": "Reading the source notes.",
+                 "tool_uses": [{"name": "Read", "input": {"file_path": "prompts/blog_writer.md"}}]},
+            ] + [
+                {"text": f"Writing part {n}.",
+                 "tool_uses": [{"name": "Write", "input": {
+                     "file_path": f"research_output/mocktool-blog/0{n}-part.md",
+                     "content": _chapter(n)}}]}
+                for n in range(1, 6)
+            ] + [{"text": "Series complete. " + _findings("blog_writer", "the series", 3)}],
+        },
+    },
+}
+FALLBACK_TURN = {"text": "OK."}  # titles, summaries and other auxiliary CLI calls
+
+
+class MockState:
+    """Scenario, latency model and counters shared by request handler threads."""
+
+    def __init__(self, scenario: dict, latency: dict):
+        self.scenario = scenario
+        self.latency = {**DEFAULT_LATENCY, **latency}
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "by_role": {}, "output_tokens": 0,
+                      "stream_seconds": 0.0, "ttft_s": []}
+        self._ids = 0
+
+    def next_id(self, prefix: str) -> str:
+        with self.lock:
+            self._ids += 1
+            return f"{prefix}_mock_{self._ids:06d}"
+
+    def record(self, role: str, output_tokens: int, seconds: float, ttft: float) -> None:
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_role"][role] = self.stats["by_role"].get(role, 0) + 1
+            self.stats["output_tokens"] += output_tokens
+            self.stats["stream_seconds"] += seconds
+            self.stats["ttft_s"].append(ttft)
+
+
+def _system_text(body: dict) -> str:
+    system = body.get("system") or ""
+    if isinstance(system, list):
+        return "\n".join(b.get("text", "") for b in system if isinstance(b, dict))
+    return system
+
+
+def pick_turn(scenario: dict, body: dict) -> tuple[str, int, dict]:
+    """Return (role, turn index, turn spec) for a Messages API request body."""
+    system = _system_text(body)
+    role = next((r for r, marker in ROLE_MARKERS.items() if marker in system), "fallback")
+    turn = sum(1 for m in body.get("messages", []) if m.get("role") == "assistant")
+    script = scenario["roles"].get(role)
+    if not script:
+        return role, turn, FALLBACK_TURN
+    if turn < len(script):
+        return role, turn, script[turn]
+    return role, turn, {"text": script[-1].get("text") or "Done."}  # script ran out: finish
+
+
+def build_blocks(state: MockState, spec: dict) -> list[dict]:
+    blocks = []
+    if spec.get("text"):
+        blocks.append({"type": "text", "text": spec["text"]})
+    for use in spec.get("tool_uses", []):
+        blocks.append({"type": "tool_use", "id": state.next_id("toolu"),
+                       "name": use["name"], "input": use["input"]})
+    return blocks
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "L7MockAnthropic/1.0"
+    state: MockState  # set on the subclass by make_server()
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def _json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self._json(404, {"type": "error", "error": {"type": "not_found_error",
+                                                   "message": self.path}})
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/count_tokens"):
+            self._json(200, {"input_tokens": len(json.dumps(body)) // CHARS_PER_TOKEN})
+        elif path.endswith("/v1/messages"):
+            try:
+                self._messages(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the CLI dropped the stream (interrupt or exit)
+        else:
+            self.do_GET()
+
+    def _messages(self, body: dict) -> None:
+        state = self.state
+        role, turn, spec = pick_turn(state.scenario, body)
+        blocks = build_blocks(state, spec)
+        seed = int(hashlib.sha256(f"{role}:{turn}".encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        jitter = 1 + rng.uniform(-state.latency["jitter"], state.latency["jitter"])
+        ttft = state.latency["ttft_ms"] / 1000 * jitter
+        token_s = 1 / max(1e-6, state.latency["tokens_per_s"] * jitter)
+        input_tokens = len(json.dumps(body)) // CHARS_PER_TOKEN
+        stop_reason = "tool_use" if any(b["type"] == "tool_use" for b in blocks) else "end_turn"
+        message = {
+            "id": state.next_id("msg"), "type": "message", "role": "assistant",
+            "model": body.get("model", "mock"), "content": [], "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 1,
+                      "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0},
+        }
+        start = time.perf_counter()
+
+        if not body.get("stream"):
+            time.sleep(ttft)
+            text_len = sum(len(b.get("text", "")) + len(json.dumps(b.get("input", {})))
+                           for b in blocks)
+            output_tokens = max(1, text_len // CHARS_PER_TOKEN)
+            time.sleep(output_tokens * token_s)
+            message.update(content=blocks, stop_reason=stop_reason)
+            message["usage"]["output_tokens"] = output_tokens
+            self._json(200, message)
+            state.record(role, output_tokens, time.perf_counter() - start, ttft)
+            return
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(event: dict) -> None:
+            self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+
+        send({"type": "message_start", "message": message})
+        time.sleep(ttft)
+        output_tokens = 0
+        for index, block in enumerate(blocks):
+            if block["type"] == "text":
+                send({"type": "content_block_start", "index": index,
+                      "content_block": {"type": "text", "text": ""}})
+                payload, delta_key, delta_type = block["text"], "text", "text_delta"
+            else:
+                send({"type": "content_block_start", "index": index, "content_block": {
+                    "type": "tool_use", "id": block["id"], "name": block["name"], "input": {}}})
+                payload, delta_key, delta_type = json.dumps(block["input"]), "partial_json", \
+                    "input_json_delta"
+            chunk = max(CHARS_PER_TOKEN, int(FRAME_S / token_s) * CHARS_PER_TOKEN)
+            for i in range(0, len(payload), chunk):
+                piece = payload[i:i + chunk]
+                send({"type": "content_block_delta", "index": index,
+                      "delta": {"type": delta_type, delta_key: piece}})
+                tokens = max(1, len(piece) // CHARS_PER_TOKEN)
+                output_tokens += tokens
+                time.sleep(tokens * token_s)
+            send({"type": "content_block_stop", "index": index})
+        send({"type": "message_delta", "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+              "usage": {"output_tokens": output_tokens}})
+        send({"type": "message_stop"})
+        state.record(role, output_tokens, time.perf_counter() - start, ttft)
+
+
+def make_server(scenario: dict, latency: dict, host: str = "127.0.0.1", port: int = 0):
+    """Build a ThreadingHTTPServer for ``scenario``; port 0 picks a free port."""
+    state = MockState(scenario, latency)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_in_thread(scenario: dict, latency: dict, port: int = 0):
+    """Start a mock server on a daemon thread. Returns (server, base_url)."""
+    server = make_server(scenario, latency, port=port)
+    threading.Thread(target=server.serve_forever, name="mock-backend", daemon=True).start()
+    host, bound_port = server.server_address[:2]
+    return server, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock Anthropic Messages API")
+    parser.add_argument("--scenario", default="fanout", choices=sorted(SCENARIOS))
+    parser.add_argument("--scenario-file", help="JSON scenario to use instead of a built-in")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--ttft-ms", type=float, default=DEFAULT_LATENCY["ttft_ms"])
+    parser.add_argument("--tokens-per-s", type=float, default=DEFAULT_LATENCY["tokens_per_s"])
+    parser.add_argument("--jitter", type=float, default=DEFAULT_LATENCY["jitter"])
+    args = parser.parse_args()
+
+    if args.scenario_file:
+        with open(args.scenario_file, encoding="utf-8") as f:
+            scenario = json.load(f)
+    else:
+        scenario = SCENARIOS[args.scenario]
+    latency = {"ttft_ms": args.ttft_ms, "tokens_per_s": args.tokens_per_s, "jitter": args.jitter}
+    server = make_server(scenario, latency, port=args.port)
+    print(f"Mock Anthropic backend on http://127.0.0.1:{args.port} "
+          f"(scenario: {args.scenario_file or args.scenario}, {latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps({k: v for k, v in server.state.stats.items() if k != "ttft_s"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
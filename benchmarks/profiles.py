@@ -0,0 +1,131 @@
+"""Compare execution profiles (profiles.py) on the per-skill suite.
+
+Runs every skill of ``benchmarks/skills.py`` against the mock backend once per
+profile and reports what each profile buys: wall-clock, turns, tool calls,
+cost, breadth denials and a quality score.
+
+  python -m benchmarks.profiles                                  # all profiles, all skills
+  python -m benchmarks.profiles --profiles fast,standard --skills learning-a-tool,research-compare
+  python -m benchmarks.profiles --runs 3 --json profiles.json
+
+Quality is the completeness score the router uses (routing.py), summed over
+the subagents that ran and divided by the number the skill asked for, so a
+subagent denied by a breadth limit counts as 0. The mock answers every model
+at the same speed and with the same scripted text. So the model choice shows
+in cost but not in wall-clock or completeness, and breadth limits and turn
+counts show in all three. For real quality differences, compare the profiles'
+live rounds in the warehouse (``subagent-models``).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+
+from benchmarks.skills import SKILLS, SUITE_LATENCY, run_mock_skill
+from profiles import PROFILES
+from utils import SUBAGENT_TOOLS
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+COLUMNS = ["wall_s", "turns", "tool_calls", "cost_usd", "quality", "denied"]
+
+
+def round_quality(entries: list[dict]) -> tuple[float, int]:
+    """(quality, denied calls) of the last round from the orchestrator's audit log."""
+    denied = {e["tool_use_id"] for e in entries if e.get("event") == "breadth_denied"}
+    tasks = [e for e in entries if e.get("tool") in SUBAGENT_TOOLS and "event" not in e]
+    score = sum(e.get("completeness") or 0.0 for e in tasks if e["tool_use_id"] not in denied)
+    return (round(score / len(tasks), 3) if tasks else 1.0), len(denied)
+
+
+async def run_profile_skill(profile: str, skill: str, latency: dict, show_output: bool) -> dict:
+    """One skill under one profile; the skill suite's metrics plus quality and denials."""
+    import orchestrator
+
+    saved = orchestrator.PROFILE
+    orchestrator.PROFILE = profile
+    try:
+        metrics = await run_mock_skill(skill, latency, None, show_output)
+        metrics["quality"], metrics["denied"] = round_quality(orchestrator.audit_log)
+    finally:
+        orchestrator.PROFILE = saved
+        orchestrator.apply_profile(saved)
+    return metrics
+
+
+def summarize(results: dict[str, dict[str, dict]]) -> dict[str, dict]:
+    """Per profile: suite totals of wall, turns, tools, cost and denials; mean quality."""
+    summary = {}
+    for profile, skills in results.items():
+        rows = list(skills.values())
+        summary[profile] = {
+            **{key: round(sum(r[key] for r in rows), 6) for key in ("wall_s", "turns", "tool_calls",
+                                                                   "cost_usd", "denied")},
+            "quality": round(statistics.mean(r["quality"] for r in rows), 3),
+        }
+    return summary
+
+
+def print_report(results: dict, summary: dict, baseline: str) -> None:
+    print(f"\n{BOLD}Profiles — {len(next(iter(results.values())))} skills{RESET}")
+    print(f"{DIM}  {'profile':<10} {'wall s':>8} {'turns':>6} {'tools':>6} {'cost $':>8} "
+          f"{'quality':>8} {'denied':>7}   vs {baseline}{RESET}")
+    base = summary.get(baseline)
+    for profile, s in summary.items():
+        versus = ""
+        if base and profile != baseline:
+            def rel(key):
+                return f"{(s[key] - base[key]) / base[key]:+.0%}" if base[key] else "n/a"
+            versus = f"wall {rel('wall_s')}, cost {rel('cost_usd')}, quality {s['quality'] - base['quality']:+.2f}"
+        print(f"  {profile:<10} {s['wall_s']:>8.2f} {s['turns']:>6} {s['tool_calls']:>6} {s['cost_usd']:>8.4f} "
+              f"{s['quality']:>8.2f} {s['denied']:>7}   {DIM}{versus}{RESET}")
+    print(f"\n{DIM}  per skill: wall s / cost $ / quality{RESET}")
+    skills = list(next(iter(results.values())))
+    print(f"{DIM}  {'skill':<22}" + "".join(f" {p:>24}" for p in results) + RESET)
+    for skill in skills:
+        cells = "".join(f" {results[p][skill]['wall_s']:>8.2f} {results[p][skill]['cost_usd']:>8.4f} "
+                        f"{results[p][skill]['quality']:>5.2f}" for p in results)
+        print(f"  {skill:<22}{cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare execution profiles on the skill suite (mock backend)")
+    parser.add_argument("--profiles", help="Comma-separated subset of: " + ", ".join(PROFILES))
+    parser.add_argument("--skills", help="Comma-separated subset of: " + ", ".join(SKILLS))
+    parser.add_argument("--runs", type=int, default=1, help="Runs per profile and skill; medians are kept")
+    parser.add_argument("--baseline", default="standard", help="Profile the others are compared to")
+    parser.add_argument("--ttft-ms", type=float, default=SUITE_LATENCY["ttft_ms"])
+    parser.add_argument("--tokens-per-s", type=float, default=SUITE_LATENCY["tokens_per_s"])
+    parser.add_argument("--show-output", action="store_true")
+    parser.add_argument("--json", help="Write the per-skill results and summary to this path")
+    args = parser.parse_args()
+
+    names = [p.strip() for p in args.profiles.split(",")] if args.profiles else list(PROFILES)
+    skills = [s.strip() for s in args.skills.split(",")] if args.skills else list(SKILLS)
+    unknown = [p for p in names if p not in PROFILES] + [s for s in skills if s not in SKILLS]
+    if unknown:
+        parser.error(f"unknown profiles or skills: {', '.join(unknown)}")
+    latency = {**SUITE_LATENCY, "ttft_ms": args.ttft_ms, "tokens_per_s": args.tokens_per_s}
+
+    results: dict[str, dict[str, dict]] = {}
+    for profile in names:
+        for skill in skills:
+            samples = [asyncio.run(run_profile_skill(profile, skill, latency, args.show_output))
+                       for _ in range(args.runs)]
+            metrics = {key: round(statistics.median(s[key] for s in samples), 6) for key in COLUMNS}
+            results.setdefault(profile, {})[skill] = metrics
+            print(f"{DIM}  {profile}/{skill}: {metrics['wall_s']:.2f}s, ${metrics['cost_usd']:.4f}, "
+                  f"quality {metrics['quality']:.2f}{RESET}")
+
+    summary = summarize(results)
+    print_report(results, summary, args.baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"latency": latency, "runs": args.runs, "summary": summary, "skills": results}, f, indent=2)
+        print(f"{DIM}Report: {args.json}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
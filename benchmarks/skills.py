@@ -0,0 +1,376 @@
+"""Per-skill benchmark suite with versioned baselines.
+
+Runs one fixed query per skill type (the table in ``prompts/main_agent.md``)
+and compares wall-clock, turns, tool calls, tokens and cost against the
+latest stored baseline. Two sources:
+
+  mock    the real CLI + ``orchestrator.main`` against ``benchmarks/mock_backend.py``
+          with a scripted scenario per skill. Prompt growth shows up as input
+          tokens and a model swap in ``build_agents()`` as cost.
+  replay  one ``.l7rec`` per skill in ``--recordings DIR`` (``<skill>.l7rec``),
+          fed through ``replay.py`` and measured from the recording.
+
+  python -m benchmarks.skills                                  # mock, compare to latest baseline
+  python -m benchmarks.skills --save-baseline                  # store a new baseline version
+  python -m benchmarks.skills --skills learning-a-tool,research-compare --runs 3
+  python -m benchmarks.skills --save-recordings recs/          # keep recordings for replay
+  python -m benchmarks.skills --source replay --recordings recs/
+
+Baselines live in ``benchmarks/baselines/skills-<source>-vNNN.json`` together
+with the git revision, a hash of ``prompts/`` and the agent models they were
+taken with. A metric regresses when it grows by more than ``--threshold``
+(``--wall-threshold`` for wall-clock, which is noisier); any regression exits 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from datetime import datetime
+
+from benchmarks.e2e import ROOT, mock_env, scratch_workspace
+from benchmarks.mock_backend import DEFAULT_LATENCY, SCENARIOS, _findings, start_in_thread
+
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_WALL_THRESHOLD = 0.25
+# Faster than the mock's interactive default so the nine skills finish in minutes
+SUITE_LATENCY = {**DEFAULT_LATENCY, "ttft_ms": 200, "tokens_per_s": 400}
+METRICS = ["wall_s", "turns", "tool_calls", "input_tokens", "output_tokens", "cost_usd"]
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+GREEN = "\033[32m"
+RED = "\033[31m"
+RESET = "\033[0m"
+
+RESEARCHERS = ("docs_researcher", "repo_analyzer", "web_researcher")
+
+# Fixed query and the subagents each skill's research phase spawns
+SKILLS = {
+    "learning-a-tool": {"query": "Learn the tool jq", "agents": RESEARCHERS},
+    "learning-a-concept": {"query": "Learn the concept of Zettelkasten",
+                           "agents": ("docs_researcher", "web_researcher")},
+    "learning-a-framework": {"query": "Learn the Claude Agent SDK framework", "agents": RESEARCHERS},
+    "research-arxiv": {"query": "What's new in RAG on arxiv?", "agents": ("web_researcher",)},
+    "research-general": {"query": "What's out there on AI code review?",
+                         "agents": ("web_researcher", "docs_researcher")},
+    "research-compare": {"query": "Compare FastAPI vs Django vs Flask", "agents": RESEARCHERS},
+    "research-paper": {"query": "Explain the Attention Is All You Need paper",
+                       "agents": ("docs_researcher", "web_researcher")},
+    "research-from-notes": {"query": "Enhance my draft notes on mocktool",
+                            "agents": ("docs_researcher", "web_researcher"), "notes": True},
+    "create-blog-series": {"query": SCENARIOS["blog"]["query"], "scenario": "blog"},
+}
+
+
+def skill_scenario(skill: str) -> dict:
+    """Mock scenario for a skill: invoke the skill, fan out, write, summarize."""
+    spec = SKILLS[skill]
+    if spec.get("scenario"):
+        return SCENARIOS[spec["scenario"]]
+    orchestrator = [{"text": f"Using the {skill} skill.",
+                     "tool_uses": [{"name": "Skill", "input": {"skill": skill}}]}]
+    if spec.get("notes"):
+        orchestrator.append({"text": "Reading your draft notes.",
+                             "tool_uses": [{"name": "Glob", "input": {"pattern": "research_input/**/*.md"}}]})
+    orchestrator += [
+        {"text": "Delegating the research phase.",
+         "tool_uses": [{"name": "Task", "input": {"subagent_type": name, "description": f"{name} pass",
+                                                   "prompt": f"Research for: {spec['query']}"}}
+                       for name in spec["agents"]]},
+        {"text": "Writing the output.",
+         "tool_uses": [{"name": "Write", "input": {
+             "file_path": f"research_output/{skill}-bench/README.md",
+             "content": _findings("orchestrator", skill, 6)}}]},
+        {"text": "Done. " + _findings("orchestrator", skill, 2)},
+    ]
+    roles = {name: SCENARIOS["fanout"]["roles"][name] for name in spec["agents"]}
+    return {"query": spec["query"], "roles": {"orchestrator": orchestrator, **roles}}
+
+
+# ── Measurement ──────────────────────────────────────────
+
+def measure_recording(path: str) -> dict:
+    """Wall-clock, turns, tools, tokens and cost of every round in a recording."""
+    from claude_agent_sdk import AssistantMessage, ResultMessage, ToolUseBlock
+    from recorder import EventReader, decode
+
+    tools = Counter()
+    tokens = Counter()
+    seen_blocks = set()
+    turns, cost, wall = 0, 0.0, 0.0
+    # ResultMessage turns, cost and model_usage are cumulative over the session,
+    # so each round adds its delta from the previous result (as warehouse.py does)
+    prev_turns, prev_cost, prev_model_tokens = 0, 0.0, Counter()
+    round_t = None
+    for event in EventReader(path).events():
+        if event["kind"] == "marker" and event["name"] == "round_start":
+            round_t = event["t"]
+        if event["kind"] != "message":
+            continue
+        message = decode(event["message"])
+        if isinstance(message, AssistantMessage):
+            for block in message.content:
+                if isinstance(block, ToolUseBlock) and block.id not in seen_blocks:
+                    seen_blocks.add(block.id)
+                    tools[block.name] += 1
+        elif isinstance(message, ResultMessage):
+            num_turns = getattr(message, "num_turns", 0) or 0
+            total_cost = getattr(message, "total_cost_usd", None) or 0.0
+            turns += num_turns - prev_turns
+            cost += total_cost - prev_cost
+            prev_turns, prev_cost = num_turns, total_cost
+            # Streamed AssistantMessage usage is a message_start snapshot, so token
+            # totals come from the result: per model (subagents included) when present
+            model_usage = getattr(message, "model_usage", None) or {}
+            if model_usage:
+                model_tokens = Counter()
+                for usage in model_usage.values():
+                    model_tokens["input"] += usage.get("inputTokens", 0) or 0
+                    model_tokens["output"] += usage.get("outputTokens", 0) or 0
+                    model_tokens["cache_read"] += usage.get("cacheReadInputTokens", 0) or 0
+                for key in ("input", "output", "cache_read"):
+                    tokens[key] += model_tokens[key] - prev_model_tokens[key]
+                prev_model_tokens = model_tokens
+            else:
+                # The result's own usage already covers only this round
+                usage = getattr(message, "usage", None) or {}
+                tokens["input"] += usage.get("input_tokens", 0) or 0
+                tokens["output"] += usage.get("output_tokens", 0) or 0
+                tokens["cache_read"] += usage.get("cache_read_input_tokens", 0) or 0
+            if round_t is not None:
+                wall += event["t"] - round_t
+                round_t = None
+    return {
+        "wall_s": round(wall, 3),
+        "turns": turns,
+        "tool_calls": sum(tools.values()),
+        "tools": dict(tools),
+        "input_tokens": tokens["input"],
+        "output_tokens": tokens["output"],
+        "cache_read_tokens": tokens["cache_read"],
+        "cost_usd": round(cost, 6),
+    }
+
+
+async def run_mock_skill(skill: str, latency: dict, keep_dir: str | None, show_output: bool) -> dict:
+    """Run one skill's query against the mock with recording on; measure the recording."""
+    import orchestrator
+    from benchmarks.fake_sdk import ScriptedReader
+
+    scenario = skill_scenario(skill)
+    server, base_url = start_in_thread(scenario, latency)
+    saved_record_mode = orchestrator.RECORD_MODE
+    orchestrator.RECORD_MODE = True
+    try:
+        with scratch_workspace(mock_env(base_url)):
+            sink = None if show_output else open(os.devnull, "w")
+            with contextlib.redirect_stdout(sink) if sink else contextlib.nullcontext():
+                await orchestrator.main(reader=ScriptedReader([scenario["query"], "exit"]))
+            if sink:
+                sink.close()
+            path = orchestrator.recorder.path
+            metrics = measure_recording(path)
+            if keep_dir:
+                shutil.copy(path, os.path.join(keep_dir, f"{skill}.l7rec"))
+    finally:
+        orchestrator.RECORD_MODE = saved_record_mode
+        orchestrator.recorder = None
+        server.shutdown()
+        server.server_close()
+    metrics["requests"] = server.state.stats["requests"]
+    return metrics
+
+
+async def run_replay_skill(skill: str, recordings: str) -> dict | None:
+    """Replay ``<recordings>/<skill>.l7rec`` (hooks included) and measure it."""
+    from replay import replay
+
+    path = os.path.join(recordings, f"{skill}.l7rec")
+    if not os.path.exists(path):
+        return None
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        stats = await replay(path, None, None)
+    metrics = measure_recording(path)
+    metrics["hook_mismatches"] = stats["hook_mismatches"]
+    return metrics
+
+
+def median_metrics(samples: list[dict]) -> dict:
+    """Median of each numeric metric across runs; tools from the first run."""
+    merged = dict(samples[0])
+    for key, value in samples[0].items():
+        if isinstance(value, (int, float)):
+            merged[key] = round(statistics.median(s[key] for s in samples), 6)
+    return merged
+
+
+# ── Baselines ────────────────────────────────────────────
+
+def build_context() -> dict:
+    """What a baseline was taken against: git revision, prompts hash and models."""
+    import orchestrator
+
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(ROOT, "prompts", "*.md"))):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + b"\0" + f.read())
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    models = {"orchestrator": orchestrator.make_options("", {}, {}).model}
+    models.update({name: agent.model for name, agent in orchestrator.build_agents().items()})
+    return {"git_rev": rev, "prompts_sha": digest.hexdigest()[:16], "models": models}
+
+
+def baseline_paths(source: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(BASELINE_DIR, f"skills-{source}-v*.json")))
+
+
+def load_baseline(source: str, path: str | None = None) -> dict | None:
+    paths = [path] if path else baseline_paths(source)
+    if not paths:
+        return None
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report: dict) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    existing = baseline_paths(report["source"])
+    version = int(existing[-1].rsplit("-v", 1)[1].split(".")[0]) + 1 if existing else 1
+    path = os.path.join(BASELINE_DIR, f"skills-{report['source']}-v{version:03d}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, **report}, f, indent=2)
+    return path
+
+
+def compare(report: dict, baseline: dict, threshold: float, wall_threshold: float) -> list[dict]:
+    """Relative change of every metric; ``regression`` when growth exceeds the threshold."""
+    rows = []
+    for skill, metrics in report["skills"].items():
+        old = baseline["skills"].get(skill)
+        if not old:
+            continue
+        for metric in METRICS:
+            before, after = old.get(metric), metrics.get(metric)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before if before else (float("inf") if after else 0.0)
+            limit = wall_threshold if metric == "wall_s" else threshold
+            rows.append({"skill": skill, "metric": metric, "baseline": before, "current": after,
+                         "change": change, "regression": change > limit})
+    return rows
+
+
+# ── CLI ──────────────────────────────────────────────────
+
+def print_report(report: dict, rows: list[dict], baseline: dict | None) -> None:
+    print(f"\n{BOLD}Skill benchmarks — {report['source']}{RESET} "
+          f"{DIM}rev {report['context']['git_rev']} | prompts {report['context']['prompts_sha']}{RESET}")
+    print(f"{DIM}  {'skill':<22} {'wall s':>7} {'turns':>6} {'tools':>6} {'in tok':>8} "
+          f"{'out tok':>8} {'cost $':>8}{RESET}")
+    for skill, m in report["skills"].items():
+        print(f"  {skill:<22} {m['wall_s']:>7.2f} {m['turns']:>6} {m['tool_calls']:>6} "
+              f"{m['input_tokens']:>8} {m['output_tokens']:>8} {m['cost_usd']:>8.4f}")
+    if not baseline:
+        print(f"{DIM}No baseline for '{report['source']}' yet; store one with --save-baseline.{RESET}")
+        return
+
+    print(f"\n{BOLD}vs baseline v{baseline['version']}{RESET} "
+          f"{DIM}rev {baseline['context']['git_rev']} | prompts {baseline['context']['prompts_sha']}{RESET}")
+    if baseline["context"]["prompts_sha"] != report["context"]["prompts_sha"]:
+        print(f"{DIM}  prompts/ changed since the baseline{RESET}")
+    for name, model in report["context"]["models"].items():
+        before = baseline["context"]["models"].get(name)
+        if before and before != model:
+            print(f"{DIM}  {name}: model {before} → {model}{RESET}")
+    changed = [r for r in rows if r["regression"] or r["change"] < -0.01]
+    for row in changed:
+        colour = RED if row["regression"] else GREEN
+        label = "REGRESSION" if row["regression"] else "improved"
+        print(f"  {colour}{row['skill']:<22} {row['metric']:<14} {row['baseline']} → {row['current']} "
+              f"({row['change']:+.1%}) {label}{RESET}")
+    if not changed:
+        print(f"  {GREEN}No changes beyond noise{RESET}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-skill benchmark suite with stored baselines")
+    parser.add_argument("--source", default="mock", choices=["mock", "replay"])
+    parser.add_argument("--skills", help="Comma-separated subset of: " + ", ".join(SKILLS))
+    parser.add_argument("--runs", type=int, default=1, help="Runs per skill (mock); medians are kept")
+    parser.add_argument("--recordings", help="Directory of <skill>.l7rec files (replay source)")
+    parser.add_argument("--save-recordings", metavar="DIR", help="Copy each mock run's recording here")
+    parser.add_argument("--baseline", help="Compare against this baseline file instead of the latest")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as a new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--wall-threshold", type=float, default=DEFAULT_WALL_THRESHOLD)
+    parser.add_argument("--ttft-ms", type=float, default=SUITE_LATENCY["ttft_ms"])
+    parser.add_argument("--tokens-per-s", type=float, default=SUITE_LATENCY["tokens_per_s"])
+    parser.add_argument("--show-output", action="store_true")
+    parser.add_argument("--json", help="Write the report and comparison to this path")
+    args = parser.parse_args()
+
+    skills = [s.strip() for s in args.skills.split(",")] if args.skills else list(SKILLS)
+    unknown = [s for s in skills if s not in SKILLS]
+    if unknown:
+        parser.error(f"unknown skills: {', '.join(unknown)}")
+    if args.source == "replay" and not args.recordings:
+        parser.error("--source replay needs --recordings DIR")
+    recordings = os.path.abspath(args.recordings) if args.recordings else None
+    keep_dir = os.path.abspath(args.save_recordings) if args.save_recordings else None
+    if keep_dir:
+        os.makedirs(keep_dir, exist_ok=True)
+    latency = {**SUITE_LATENCY, "ttft_ms": args.ttft_ms, "tokens_per_s": args.tokens_per_s}
+
+    results = {}
+    for skill in skills:
+        if args.source == "mock":
+            samples = [asyncio.run(run_mock_skill(skill, latency, keep_dir, args.show_output))
+                       for _ in range(args.runs)]
+            metrics = median_metrics(samples)
+        else:
+            metrics = asyncio.run(run_replay_skill(skill, recordings))
+            if metrics is None:
+                print(f"{DIM}  {skill}: no recording, skipped{RESET}")
+                continue
+        results[skill] = metrics
+        mismatches = metrics.get("hook_mismatches")
+        print(f"{DIM}  {skill}: {metrics['wall_s']:.2f}s, {metrics['tool_calls']} tools, "
+              f"${metrics['cost_usd']:.4f}"
+              f"{f', {mismatches} replayed hook results differ' if mismatches else ''}{RESET}")
+
+    report = {
+        "source": args.source,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "context": build_context(),
+        "latency": latency if args.source == "mock" else None,
+        "runs": args.runs,
+        "skills": results,
+    }
+    baseline = load_baseline(args.source, args.baseline)
+    rows = compare(report, baseline, args.threshold, args.wall_threshold) if baseline else []
+    print_report(report, rows, baseline)
+
+    if args.save_baseline:
+        print(f"{DIM}Baseline: {save_baseline(report)}{RESET}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({**report, "comparison": rows}, f, indent=2)
+        print(f"{DIM}Report: {args.json}{RESET}")
+    sys.exit(1 if any(r["regression"] for r in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
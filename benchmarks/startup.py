@@ -0,0 +1,147 @@
+"""Startup benchmark — import cost, time-to-banner and time-to-first-query.
+
+Usage:
+  python -m benchmarks.startup                 # 5 runs, table output
+  python -m benchmarks.startup --runs 10 --json startup.json
+  python -m benchmarks.startup --send-query "What is 2+2?"   # spends API credit
+
+Each run spawns ``agent.py`` in a scratch directory (a copy of ``prompts/`` and
+nothing else, so a saved session is never resumed or cleared), waits for the
+``You:`` prompt, then closes stdin. ``agent.py`` writes its startup marks to the
+file named by ``L7_STARTUP_REPORT``; times are measured from process spawn.
+
+time-to-first-query is when a query typed at the first prompt could be sent:
+the later of the prompt appearing and the client finishing its handshake.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT = os.path.join(ROOT, "agent.py")
+PROMPT_MARKER = b"You"
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+
+def import_profile(statement: str, top: int) -> dict:
+    """Run ``python -X importtime -c statement`` and summarize the heaviest modules."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append({"module": name, "self_ms": int(self_us) / 1000,
+                         "cumulative_ms": int(cum_us) / 1000, "depth": len(indent) // 2})
+    total_ms = sum(r["cumulative_ms"] for r in rows if r["depth"] == 0)
+    heaviest = sorted(rows, key=lambda r: -r["self_ms"])[:top]
+    return {"statement": statement, "total_ms": round(total_ms, 1), "heaviest": heaviest}
+
+
+def _scratch_dir() -> str:
+    scratch = tempfile.mkdtemp(prefix="l7-startup-")
+    shutil.copytree(os.path.join(ROOT, "prompts"), os.path.join(scratch, "prompts"))
+    return scratch
+
+
+def run_cli_once(send_query: str | None, timeout: float) -> dict:
+    """Spawn agent.py once and return its startup marks relative to spawn."""
+    scratch = _scratch_dir()
+    report_path = os.path.join(scratch, "startup.json")
+    env = dict(os.environ, L7_STARTUP_REPORT=report_path, PYTHONUNBUFFERED="1")
+    spawned = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, AGENT], cwd=scratch, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        seen = b""
+        while PROMPT_MARKER not in seen:
+            chunk = proc.stdout.read1(4096)
+            if not chunk:
+                break
+            seen += chunk
+        if send_query:
+            proc.stdin.write(send_query.encode() + b"\n")
+            proc.stdin.flush()
+        proc.stdin.close()
+        proc.stdout.read()
+        proc.wait(timeout=timeout)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+    try:
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        report = {}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    offset = report.pop("cli_start_epoch", spawned) - spawned  # interpreter startup
+    marks = {name: round(t + offset, 4) for name, t in report.items()}
+    marks["interpreter_startup"] = round(offset, 4)
+    if "prompt_shown" in marks and "client_connected" in marks:
+        marks["time_to_first_query"] = max(marks["prompt_shown"], marks["client_connected"])
+    return marks
+
+
+def summarize(runs: list[dict]) -> dict:
+    names = sorted({k for r in runs for k in r}, key=lambda k: statistics.median(
+        [r[k] for r in runs if k in r]))
+    out = {}
+    for name in names:
+        values = [r[name] for r in runs if name in r]
+        out[name] = {"median_s": round(statistics.median(values), 4),
+                     "min_s": round(min(values), 4), "max_s": round(max(values), 4),
+                     "n": len(values)}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="L7 startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="CLI spawns to time (default: 5)")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-run timeout (s)")
+    parser.add_argument("--send-query", help="Also send a real query (spends API credit)")
+    parser.add_argument("--json", help="Write the full report to this path")
+    args = parser.parse_args()
+
+    imports = [import_profile("import orchestrator", args.top),
+               import_profile("import claude_agent_sdk", args.top)]
+    runs = [run_cli_once(args.send_query, args.timeout) for _ in range(args.runs)]
+    summary = summarize(runs)
+
+    print(f"{BOLD}Import cost{RESET}")
+    for imp in imports:
+        print(f"  {imp['statement']:<28} {imp['total_ms']:>8.1f} ms")
+        for row in imp["heaviest"][:3]:
+            print(f"{DIM}    {row['module']:<40} self {row['self_ms']:.1f} ms{RESET}")
+    print(f"\n{BOLD}CLI startup ({args.runs} runs, seconds from spawn){RESET}")
+    for name, s in summary.items():
+        print(f"  {name:<22} median {s['median_s']:.3f}  "
+              f"{DIM}min {s['min_s']:.3f}  max {s['max_s']:.3f}  n={s['n']}{RESET}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"imports": imports, "runs": runs, "summary": summary}, f, indent=2)
+        print(f"\n{DIM}Report: {args.json}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,717 @@
+# code_index.py — Cached symbol and cross-reference index of analyzed repositories
+"""
+repo_analyzer explores a cloned repository one Bash call per turn: ``ls``,
+``find``, ``grep -rn``, ``cat``. On a large repository, answering "where is X
+defined" or "what are the entry points" takes dozens of turns. This module
+indexes a checkout once and answers such questions in one call. The index has:
+
+- the file tree, with sizes, line counts and languages
+- a per-language breakdown
+- definitions: functions, classes, methods, types, with whether each is public
+- references: where each defined name is used, as file and line
+- entry points: ``__main__`` blocks, ``main`` functions, console scripts,
+  ``package.json`` bins, container entrypoints
+
+Files are read in parallel, by a process pool when there are enough of them.
+Definitions are found with per-language regular expressions (indentation
+gives Python's class scopes). They find declarations, not types, so a
+reference is a name match, not a resolved one.
+
+An index is stored under ``L7_CODE_INDEX_DIR`` (default
+``~/.cache/l7-agent/code_index``) keyed by the checkout's commit SHA. Indexing
+the same commit again, in any directory, is a file load. A checkout with
+uncommitted changes, or a directory git doesn't track (outside any repository,
+or unpacked inside one), is walked and keyed by a fingerprint of its files'
+sizes and modification times instead.
+
+With ``L7_CODE_INDEX=1``, the orchestrator serves ``query`` to repo_analyzer
+as the in-process MCP tool ``mcp__code_index__query``, and starts indexing a
+repository as soon as the git cache has checked it out.
+
+  python code_index.py build .temp/jq
+  python code_index.py query .temp/jq definition jv_parse
+  python code_index.py query .temp/jq references jv_parse --limit 20
+  python code_index.py query .temp/jq entry_points
+  python code_index.py list
+"""
+import argparse
+import ast
+import asyncio
+import bisect
+import contextlib
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+INDEX_DIR = os.path.expanduser(os.environ.get("L7_CODE_INDEX_DIR", "~/.cache/l7-agent/code_index"))
+VERSION = 1  # bump when the index format or extraction changes
+MAX_FILES = 100_000
+MAX_FILE_KB = 1024  # larger files are listed in the tree but not parsed
+PARALLEL_MIN_FILES = 200  # below this a process pool costs more than it saves
+MAX_WORKERS = 8
+REF_SITES = 200  # reference sites kept per name; the count covers all of them
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "vendor", "third_party", "dist", "build", "target",
+             "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache", ".next", ".cache"}
+QUERIES = ("summary", "definition", "references", "entry_points", "public", "outline", "tree", "languages")
+
+BOLD = "\033[1m"
+RESET = "\033[0m"
+
+LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".js": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".jsx": "javascript", ".ts": "typescript", ".tsx": "typescript", ".mts": "typescript", ".go": "go",
+    ".rs": "rust", ".java": "java", ".kt": "kotlin", ".kts": "kotlin", ".scala": "scala", ".cs": "csharp",
+    ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".cxx": "cpp", ".hpp": "cpp", ".hh": "cpp",
+    ".rb": "ruby", ".php": "php", ".swift": "swift", ".sh": "shell", ".bash": "shell", ".zsh": "shell",
+    ".lua": "lua", ".ex": "elixir", ".exs": "elixir", ".md": "markdown", ".rst": "text", ".txt": "text",
+    ".json": "json", ".yaml": "yaml", ".yml": "yaml", ".toml": "toml", ".html": "html", ".css": "css",
+    ".scss": "css", ".sql": "sql", ".proto": "protobuf",
+}
+FILENAMES = {"Dockerfile": "docker", "Makefile": "make", "CMakeLists.txt": "cmake", "Rakefile": "ruby"}
+
+# Definitions per language: (kind, pattern). ``name`` is the symbol, ``pub`` is
+# present when the declaration exports it, ``recv`` marks a method.
+_M = re.MULTILINE
+PATTERNS = {
+    "javascript": [
+        ("function", r"^[ \t]*(?P<pub>export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*(?P<name>[A-Za-z_$][\w$]*)"),
+        ("class", r"^[ \t]*(?P<pub>export\s+(?:default\s+)?)?(?:abstract\s+)?class\s+(?P<name>[A-Za-z_$][\w$]*)"),
+        ("function", r"^[ \t]*(?P<pub>export\s+)?(?:const|let|var)\s+(?P<name>[A-Za-z_$][\w$]*)\s*=\s*"
+                     r"(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"),
+    ],
+    "typescript": [
+        ("type", r"^[ \t]*(?P<pub>export\s+)?(?:declare\s+)?(?:interface|type|enum)\s+(?P<name>[A-Za-z_$][\w$]*)"),
+    ],
+    "go": [
+        ("function", r"^func\s+(?P<recv>\([^)]*\)\s*)?(?P<name>[A-Za-z_]\w*)"),
+        ("type", r"^type\s+(?P<name>[A-Za-z_]\w*)\s"),
+    ],
+    "rust": [
+        ("function", r"^[ \t]*(?P<pub>pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?"
+                     r"(?:extern\s+\"[^\"]*\"\s+)?fn\s+(?P<name>\w+)"),
+        ("type", r"^[ \t]*(?P<pub>pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type|union)\s+(?P<name>\w+)"),
+        ("module", r"^[ \t]*(?P<pub>pub(?:\([^)]*\))?\s+)?mod\s+(?P<name>\w+)"),
+        ("macro", r"^[ \t]*macro_rules!\s*(?P<name>\w+)"),
+    ],
+    "java": [
+        ("class", r"^[ \t]*(?P<pub>public\s+)?(?:(?:private|protected|static|final|abstract|sealed|non-sealed)\s+)*"
+                  r"(?:class|interface|enum|record|@interface)\s+(?P<name>\w+)"),
+        ("method", r"^[ \t]+(?P<pub>public\s+)?(?:(?:private|protected|static|final|abstract|synchronized|native|default)\s+)*"
+                   r"(?:<[^>]+>\s+)?[\w<>\[\],.? ]+\s+(?P<name>\w+)\s*\([^;]*$"),
+    ],
+    "kotlin": [
+        ("class", r"^[ \t]*(?P<priv>(?:private|internal)\s+)?(?:(?:public|open|abstract|sealed|data|enum|inner|value)\s+)*"
+                  r"(?:class|interface|object)\s+(?P<name>\w+)"),
+        ("function", r"^[ \t]*(?P<priv>(?:private|internal|protected)\s+)?(?:(?:public|open|override|suspend|inline|operator)\s+)*"
+                     r"fun\s+(?:<[^>]+>\s*)?(?:[\w.]+\.)?(?P<name>\w+)"),
+    ],
+    "scala": [
+        ("class", r"^[ \t]*(?P<priv>private\s+)?(?:(?:case|abstract|sealed|final)\s+)*(?:class|trait|object)\s+(?P<name>\w+)"),
+        ("function", r"^[ \t]*(?P<priv>private\s+)?(?:override\s+)?def\s+(?P<name>\w+)"),
+    ],
+    "csharp": [
+        ("class", r"^[ \t]*(?P<pub>public\s+)?(?:(?:internal|private|protected|static|sealed|abstract|partial)\s+)*"
+                  r"(?:class|interface|struct|enum|record)\s+(?P<name>\w+)"),
+        ("method", r"^[ \t]+(?P<pub>public\s+)?(?:(?:private|protected|internal|static|virtual|override|async|sealed|abstract)\s+)*"
+                   r"[\w<>\[\],.? ]+\s+(?P<name>\w+)\s*\([^;]*$"),
+    ],
+    "c": [
+        ("function", r"^(?P<priv>static\s+)?(?:(?:inline|extern|const|unsigned|signed|struct|enum)\s+)*[A-Za-z_][\w]*[\s\*]+"
+                     r"(?P<name>[A-Za-z_]\w*)\s*\([^;]*$"),
+        ("type", r"^(?:typedef\s+)?(?:struct|enum|union)\s+(?P<name>[A-Za-z_]\w*)\s*\{"),
+        ("macro", r"^#\s*define\s+(?P<name>[A-Za-z_]\w*)"),
+    ],
+    "ruby": [
+        ("method", r"^[ \t]*def\s+(?:self\.)?(?P<name>\w+[?!=]?)"),
+        ("class", r"^[ \t]*(?:class|module)\s+(?:[A-Z]\w*::)*(?P<name>[A-Z]\w*)"),
+    ],
+    "php": [
+        ("function", r"^[ \t]*(?:(?:public|protected|static|final|abstract)\s+)*(?P<priv>private\s+)?(?:static\s+)?"
+                     r"function\s+&?(?P<name>\w+)"),
+        ("class", r"^[ \t]*(?:(?:final|abstract|readonly)\s+)*(?:class|interface|trait|enum)\s+(?P<name>\w+)"),
+    ],
+    "swift": [
+        ("function", r"^[ \t]*(?P<priv>(?:private|fileprivate)\s+)?(?:(?:public|open|internal|static|class|override|mutating)\s+)*"
+                     r"func\s+(?P<name>\w+)"),
+        ("class", r"^[ \t]*(?P<priv>(?:private|fileprivate)\s+)?(?:(?:public|open|internal|final)\s+)*"
+                  r"(?:class|struct|enum|protocol|extension|actor)\s+(?P<name>\w+)"),
+    ],
+    "shell": [("function", r"^[ \t]*(?:function\s+)?(?P<name>[A-Za-z_][\w-]*)\s*\(\)\s*\{?")],
+    "lua": [("function", r"^[ \t]*(?P<priv>local\s+)?function\s+(?:[\w.]+[.:])?(?P<name>\w+)")],
+    "elixir": [("function", r"^[ \t]*def(?P<priv>p)?\s+(?P<name>\w+[?!]?)"),
+               ("module", r"^[ \t]*defmodule\s+(?:[\w.]+\.)?(?P<name>\w+)")],
+}
+PATTERNS["typescript"] = PATTERNS["javascript"] + PATTERNS["typescript"]
+PATTERNS["cpp"] = PATTERNS["c"] + [
+    ("class", r"^[ \t]*(?:template\s*<[^>]*>\s*)?(?:class|struct)\s+(?P<name>[A-Za-z_]\w*)[^;]*$"),
+    ("function", r"^(?:[\w:<>,\*&~]+\s+)*(?P<name>[A-Za-z_]\w*::~?[A-Za-z_]\w*)\s*\([^;]*$"),
+]
+PATTERNS = {lang: [(kind, re.compile(pattern, _M)) for kind, pattern in patterns]
+            for lang, patterns in PATTERNS.items()}
+EXPORTS_BY_KEYWORD = {"javascript", "typescript", "rust", "java", "csharp"}  # public only when ``pub`` matched
+NOT_NAMES = {"if", "for", "while", "switch", "return", "else", "sizeof", "catch", "new", "delete", "defined"}
+MAIN_PATTERNS = {
+    "go": re.compile(r"^func\s+main\s*\(", _M),
+    "rust": re.compile(r"^\s*(?:pub\s+)?(?:async\s+)?fn\s+main\s*\(", _M),
+    "java": re.compile(r"public\s+static\s+void\s+main\s*\(", _M),
+    "kotlin": re.compile(r"^\s*fun\s+main\s*\(", _M),
+    "csharp": re.compile(r"static\s+(?:async\s+)?[\w<>]+\s+Main\s*\(", _M),
+    "c": re.compile(r"^(?:int|void)\s+main\s*\(", _M),
+    "cpp": re.compile(r"^(?:int|void|auto)\s+main\s*\(", _M),
+}
+IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+
+
+def language(path: str) -> str:
+    name = os.path.basename(path)
+    if name in FILENAMES:
+        return FILENAMES[name]
+    return LANGUAGES.get(os.path.splitext(name)[1].lower(), "other")
+
+
+# ── Extraction (runs in worker processes) ────────────────
+
+def _read(path: str) -> str | None:
+    """A source file's text; None for binary files and files over ``MAX_FILE_KB``."""
+    try:
+        if os.path.getsize(path) > MAX_FILE_KB * 1024:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+PYTHON_DEF = re.compile(r"^(?P<indent>[ \t]*)(?:async[ \t]+def|def|class)[ \t]+(?P<name>\w+)", _M)
+PYTHON_ALL = re.compile(r"^__all__\s*[:=][^=\[(]*(?P<names>[\[(][^\])]*[\])])", _M)
+
+
+def _python_symbols(text: str) -> list[dict]:
+    """Definitions with their class scope, from indentation. Names are public unless
+    ``_``-prefixed or, at the top level, left out of ``__all__``."""
+    exported = None
+    m = PYTHON_ALL.search(text)
+    if m:
+        with contextlib.suppress(ValueError, SyntaxError):
+            exported = set(ast.literal_eval(m.group("names")))
+    newlines = [m.start() for m in re.finditer("\n", text)]
+    symbols, enclosing = [], []  # (indent, is a class, qualified name) of the blocks around the line
+    for m in PYTHON_DEF.finditer(text):
+        indent, name = len(m.group("indent").expandtabs()), m.group("name")
+        while enclosing and enclosing[-1][0] >= indent:
+            enclosing.pop()
+        is_class = m.group(0).lstrip().startswith("class")
+        if enclosing and not enclosing[-1][1]:
+            enclosing.append((indent, False, None))  # local to a function: skipped
+            continue
+        scope = enclosing[-1][2] if enclosing else None
+        symbols.append({"name": name, "kind": "class" if is_class else "method" if scope else "function",
+                        "line": bisect.bisect_left(newlines, m.start("name")) + 1, "scope": scope,
+                        "public": not name.startswith("_") if scope else
+                        name in exported if exported is not None else not name.startswith("_")})
+        enclosing.append((indent, is_class, f"{scope}.{name}" if scope else name))
+    return symbols
+
+
+def _pattern_symbols(text: str, lang: str) -> list[dict]:
+    newlines = [m.start() for m in re.finditer("\n", text)]
+    symbols, seen = [], set()
+    for kind, pattern in PATTERNS.get(lang, ()):
+        for m in pattern.finditer(text):
+            name = m.group("name")
+            line = bisect.bisect_left(newlines, m.start("name")) + 1
+            if name in NOT_NAMES or (line, name) in seen:
+                continue
+            seen.add((line, name))
+            groups = m.groupdict()
+            if lang in EXPORTS_BY_KEYWORD:
+                public = bool(groups.get("pub"))
+            elif lang == "go":
+                public = name[0].isupper()
+            else:
+                public = not groups.get("priv") and not name.startswith("_")
+            scope, _, short = name.rpartition("::")
+            if groups.get("recv"):  # Go: func (s *Server) Name
+                receiver = re.search(r"(\w+)\s*(?:\[[^\]]*\])?\s*\)", groups["recv"])
+                scope = receiver.group(1) if receiver else scope
+            symbols.append({"name": short, "kind": "method" if groups.get("recv") or scope else kind,
+                            "line": line, "scope": scope or None, "public": public})
+    symbols.sort(key=lambda s: s["line"])
+    return symbols
+
+
+def _manifest_entry_points(rel: str, text: str) -> list[dict]:
+    """Console scripts, package bins and container entrypoints declared by a manifest."""
+    name = os.path.basename(rel)
+    found = []
+    if name == "package.json":
+        with contextlib.suppress(ValueError, AttributeError):
+            package = json.loads(text)
+            bins = package.get("bin") or {}
+            if isinstance(bins, str):
+                bins = {package.get("name", "bin"): bins}
+            found += [{"kind": "bin", "name": k, "target": v, "at": text.find('"bin"')} for k, v in bins.items()]
+            for key in ("main", "module"):
+                if isinstance(package.get(key), str):
+                    found.append({"kind": key, "name": package.get("name", key), "target": package[key],
+                                  "at": text.find(f'"{key}"')})
+    elif name in ("pyproject.toml", "setup.cfg", "setup.py"):
+        section = r"\[(?:project\.scripts|tool\.poetry\.scripts|options\.entry_points)\]"
+        if name == "setup.py" or re.search(section, text):
+            for m in re.finditer(r"""^\s*["']?([\w.-]+)["']?\s*=\s*["']?([\w.]+:[\w.]+)""", text, _M):
+                found.append({"kind": "script", "name": m.group(1), "target": m.group(2), "at": m.start()})
+    elif name == "Cargo.toml":
+        for m in re.finditer(r"\[\[bin\]\][^\[]*?name\s*=\s*\"([^\"]+)\"", text):
+            found.append({"kind": "bin", "name": m.group(1), "target": rel, "at": m.start(1)})
+    elif name == "Dockerfile":
+        for m in re.finditer(r"^(ENTRYPOINT|CMD)\s+(.+)$", text, _M):
+            found.append({"kind": "container", "name": m.group(1).lower(), "target": m.group(2).strip()[:120],
+                          "at": m.start()})
+    for entry in found:
+        entry["file"] = rel
+        entry["line"] = text.count("\n", 0, max(0, entry.pop("at"))) + 1
+    return found
+
+
+def _extract(job: tuple[str, str]) -> dict:
+    """Pass 1 over one file: line count, definitions and entry points."""
+    root, rel = job
+    lang = language(rel)
+    text = _read(os.path.join(root, rel))
+    if text is None:
+        return {"file": rel, "lines": 0, "skipped": True, "symbols": [], "entry_points": []}
+    symbols = _python_symbols(text) if lang == "python" else _pattern_symbols(text, lang)
+    entry_points = _manifest_entry_points(rel, text)
+    if lang == "python":
+        m = re.search(r"^if\s+__name__\s*==\s*['\"]__main__['\"]", text, _M)
+        if m:
+            entry_points.append({"kind": "main", "name": rel, "file": rel, "line": text.count("\n", 0, m.start()) + 1})
+    elif lang in MAIN_PATTERNS:
+        m = MAIN_PATTERNS[lang].search(text)
+        if m and (lang != "go" or re.search(r"^package\s+main\b", text, _M)):
+            entry_points.append({"kind": "main", "name": os.path.dirname(rel) or rel, "file": rel,
+                                 "line": text.count("\n", 0, m.start()) + 1})
+    for s in symbols:
+        s["file"] = rel
+    return {"file": rel, "lines": text.count("\n") + (not text.endswith("\n") and bool(text)),
+            "skipped": False, "symbols": symbols, "entry_points": entry_points}
+
+
+_names: frozenset = frozenset()
+
+
+def _set_names(names: frozenset) -> None:
+    global _names
+    _names = names
+
+
+def _references(job: tuple[str, str]) -> tuple[str, dict[str, list[int]]]:
+    """Pass 2 over one file: the lines each defined name appears on."""
+    root, rel = job
+    text = _read(os.path.join(root, rel))
+    sites: dict[str, list[int]] = defaultdict(list)
+    if text is None:
+        return rel, {}
+    for number, line in enumerate(text.splitlines(), 1):
+        for name in set(IDENTIFIER.findall(line)) & _names:
+            sites[name].append(number)
+    return rel, sites
+
+
+# ── Building ─────────────────────────────────────────────
+
+def _git(root: str, *args: str) -> str | None:
+    result = subprocess.run(["git", *args], cwd=root, capture_output=True, text=True)
+    return result.stdout if result.returncode == 0 else None
+
+
+def _tracked(root: str) -> bool:
+    """Whether git tracks files under ``root``. A plain directory inside an enclosing repository
+    (a tarball unpacked into an ignored ``.temp/``) is in a work tree but has nothing tracked."""
+    return _git(root, "rev-parse", "--show-toplevel") is not None \
+        and bool((_git(root, "ls-files", "-z", "--cached") or "").strip("\0"))
+
+
+def list_files(root: str) -> list[str]:
+    """Files to index, relative to ``root``: git's view of the checkout, else a walk skipping ``SKIP_DIRS``."""
+    listed = _git(root, "ls-files", "-z", "--cached", "--others", "--exclude-standard") if _tracked(root) else None
+    if listed is not None:
+        files = [f for f in listed.split("\0") if f and not set(f.split("/")[:-1]) & SKIP_DIRS]
+        return [f for f in files if os.path.isfile(os.path.join(root, f))][:MAX_FILES]
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+        rel = os.path.relpath(dirpath, root)
+        files += [name if rel == "." else f"{rel}/{name}" for name in sorted(filenames)]
+        if len(files) >= MAX_FILES:
+            break
+    return files[:MAX_FILES]
+
+
+def index_key(root: str) -> tuple[str, str | None]:
+    """(cache key, commit SHA) of a checkout. Clean checkouts are keyed by SHA, others by file fingerprint."""
+    root = os.path.abspath(root)
+    name = re.sub(r"[^\w.-]+", "_", os.path.basename(root.rstrip("/")) or "repo")
+    sha = ((_git(root, "rev-parse", "HEAD") or "").strip() or None) if _tracked(root) else None
+    if sha and not (_git(root, "status", "--porcelain") or "").strip():
+        key = sha
+        with contextlib.suppress(OSError), open(os.path.join(root, ".git", "info", "sparse-checkout"), "rb") as f:
+            key += hashlib.sha1(f.read()).hexdigest()[:8]  # a sparse checkout indexes fewer files
+    else:
+        digest = hashlib.sha1(root.encode())
+        for rel in list_files(root):
+            with contextlib.suppress(OSError):
+                st = os.stat(os.path.join(root, rel))
+                digest.update(f"{rel}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        key = "tree-" + digest.hexdigest()
+    return f"{name}-v{VERSION}-{key[:24]}", sha
+
+
+def _index_path(key: str, index_dir: str = INDEX_DIR) -> str:
+    return os.path.join(index_dir, f"{key}.json")
+
+
+def build(root: str, index_dir: str = INDEX_DIR, workers: int | None = None, force: bool = False) -> dict:
+    """The index of ``root``: loaded from the cache when its key is there, else built and stored."""
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise ValueError(f"not a directory: {root}")
+    start = time.time()
+    key, sha = index_key(root)
+    path = _index_path(key, index_dir)
+    if not force:
+        index = load(path)
+        if index:
+            index.update(root=root, cached=True, load_s=round(time.time() - start, 3))
+            return index
+
+    files = list_files(root)
+    jobs = [(root, rel) for rel in files]
+    workers = workers or min(MAX_WORKERS, os.cpu_count() or 1)
+    parallel = workers > 1 and len(jobs) >= PARALLEL_MIN_FILES
+    chunk = max(1, len(jobs) // (workers * 8))
+    with ProcessPoolExecutor(workers) if parallel else contextlib.nullcontext() as pool:
+        mapper = (lambda fn, items: pool.map(fn, items, chunksize=chunk)) if parallel else map
+        extracted = list(mapper(_extract, jobs))
+        symbols = [s for e in extracted for s in e["symbols"]]
+        names = frozenset(s["name"] for s in symbols if len(s["name"]) > 2)
+    # Pass 2 needs every file's definitions; its workers get the names at startup
+    with ProcessPoolExecutor(workers, initializer=_set_names, initargs=(names,)) if parallel \
+            else contextlib.nullcontext() as pool:
+        if not parallel:
+            _set_names(names)
+        mapper = (lambda fn, items: pool.map(fn, items, chunksize=chunk)) if parallel else map
+        definitions = {(s["file"], s["line"]) for s in symbols}
+        references: dict[str, dict] = {}
+        for rel, sites in mapper(_references, jobs):
+            for name, lines in sites.items():
+                ref = references.setdefault(name, {"count": 0, "sites": []})
+                for line in lines:
+                    if (rel, line) in definitions:
+                        continue
+                    ref["count"] += 1
+                    if len(ref["sites"]) < REF_SITES:
+                        ref["sites"].append([rel, line])
+
+    tree, breakdown = [], defaultdict(lambda: {"files": 0, "bytes": 0, "lines": 0})
+    for e in extracted:
+        size = 0
+        with contextlib.suppress(OSError):
+            size = os.path.getsize(os.path.join(root, e["file"]))
+        lang = language(e["file"])
+        tree.append([e["file"], size, e["lines"], lang])
+        breakdown[lang]["files"] += 1
+        breakdown[lang]["bytes"] += size
+        breakdown[lang]["lines"] += e["lines"]
+    index = {
+        "version": VERSION, "key": key, "sha": sha, "root": root, "built_at": time.time(),
+        "build_s": round(time.time() - start, 2), "workers": workers if parallel else 1,
+        "files": tree, "skipped": sum(e["skipped"] for e in extracted),
+        "languages": dict(sorted(breakdown.items(), key=lambda item: -item[1]["bytes"])),
+        "symbols": symbols, "references": references,
+        "entry_points": [p for e in extracted for p in e["entry_points"]],
+    }
+    os.makedirs(index_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(index, separators=(",", ":")))  # dumps uses the C encoder, dump doesn't
+    os.replace(tmp, path)
+    index["cached"] = False
+    return index
+
+
+def load(path: str) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == VERSION else None
+
+
+# ── In-process service ───────────────────────────────────
+
+class CodeIndexService:
+    """Builds indexes off the event loop, once per checkout, and keeps recent ones loaded.
+
+    Builds run in a ``code_index.py build`` subprocess (which starts its own
+    process pool), waited on from a thread, so the orchestrator's loop stays
+    responsive. A build still running at exit finishes and is stored. A query
+    for a checkout whose build is under way waits for that build.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, keep: int = 4):
+        self.index_dir = index_dir
+        self.keep = keep
+        self.loaded: dict[str, dict] = {}  # cache key -> index, least recently used first
+        self.builds: dict[str, asyncio.Task] = {}  # checkout path -> build in progress
+
+    def prebuild(self, root: str) -> asyncio.Task:
+        """Start indexing ``root`` in the background, if it isn't already."""
+        root = os.path.abspath(root)
+        task = self.builds.get(root)
+        if task is None:
+            task = self.builds[root] = asyncio.ensure_future(self._build(root))
+            task.add_done_callback(lambda done: self._finished(root, done))
+        return task
+
+    def _finished(self, root: str, task: asyncio.Task) -> None:
+        self.builds.pop(root, None)
+        if not task.cancelled():
+            task.exception()  # a failed prebuild is retried, and reported, by the next query
+
+    async def _build(self, root: str) -> str:
+        result = await asyncio.to_thread(
+            subprocess.run, [sys.executable, os.path.abspath(__file__), "--index-dir", self.index_dir,
+                             "build", root, "--key-only"], capture_output=True, text=True)
+        if result.returncode:
+            lines = result.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"indexing {root} failed")
+        return result.stdout.strip()
+
+    async def index(self, root: str) -> dict:
+        """The index of ``root``, building it if needed."""
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            raise ValueError(f"not a directory: {root}")
+        start = time.time()
+        key, _ = await asyncio.to_thread(index_key, root)
+        index = self.loaded.pop(key, None)
+        if index is None:
+            index = await asyncio.to_thread(load, _index_path(key, self.index_dir))
+            if index is None:
+                key = await self.prebuild(root)
+                index = await asyncio.to_thread(load, _index_path(key, self.index_dir))
+                if index is None:
+                    raise RuntimeError(f"index of {root} was not written")
+                index["cached"] = False
+            else:
+                index["cached"] = True
+        else:
+            index["cached"] = True
+        index.update(root=root, load_s=round(time.time() - start, 3))
+        self.loaded[key] = index
+        while len(self.loaded) > self.keep:
+            self.loaded.pop(next(iter(self.loaded)))
+        return index
+
+    async def query(self, root: str, kind: str, name: str | None = None, path: str | None = None,
+                    limit: int = 50) -> str:
+        index = await self.index(root)
+        return query(index, kind, name, path, limit)
+
+
+# ── Queries ──────────────────────────────────────────────
+
+def _size(n: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def _relative(root: str, path: str | None) -> str:
+    """A path the agent gave, as indexed: relative to the checkout, from there or from the working directory."""
+    if not path:
+        return ""
+    full = os.path.abspath(path)
+    if full == root or full.startswith(root + os.sep):
+        return os.path.relpath(full, root).replace(os.sep, "/").removeprefix(".")
+    path = path.strip().strip("/")
+    while path.startswith("./"):
+        path = path[2:]
+    return "" if path == "." else path
+
+
+def _under(rel: str, path: str) -> bool:
+    return not path or rel == path or rel.startswith(path + "/")
+
+
+def _line_text(root: str, rel: str, line: int, cache: dict) -> str:
+    if rel not in cache:
+        cache[rel] = (_read(os.path.join(root, rel)) or "").splitlines()
+    lines = cache[rel]
+    return lines[line - 1].strip()[:160] if 0 < line <= len(lines) else ""
+
+
+def _symbol_line(s: dict, root: str, cache: dict) -> str:
+    qualified = f"{s['scope']}.{s['name']}" if s.get("scope") else s["name"]
+    public = "" if s["public"] else " (private)"
+    return f"{s['file']}:{s['line']}  {s['kind']} {qualified}{public}  {_line_text(root, s['file'], s['line'], cache)}"
+
+
+def _matches(s: dict, name: str) -> bool:
+    return name in (s["name"], f"{s['scope']}.{s['name']}" if s.get("scope") else None)
+
+
+def query(index: dict, kind: str, name: str | None = None, path: str | None = None, limit: int = 50) -> str:
+    """Answer one query against an index, as text for the agent."""
+    root, lines, cache = index["root"], [], {}
+    path = _relative(root, path)
+    symbols = [s for s in index["symbols"] if _under(s["file"], path)]
+    how = "cached" if index.get("cached") else f"indexed in {index['build_s']:.1f}s"
+    header = f"[{os.path.basename(root)} @ {(index.get('sha') or 'working tree')[:12]}, {len(index['files'])} files, {how}]"
+    if kind in ("definition", "references") and not name:
+        return f"{header}\nThe '{kind}' query needs a name."
+    if kind == "summary":
+        total = sum(f[1] for f in index["files"])
+        lines.append(f"{len(index['files'])} files, {_size(total)}, {len(index['symbols'])} definitions "
+                     f"({sum(s['public'] for s in index['symbols'])} public), "
+                     f"{len(index['entry_points'])} entry points")
+        lines.append("Languages: " + ", ".join(
+            f"{lang} {v['files']} files/{_size(v['bytes'])}" for lang, v in list(index["languages"].items())[:8]))
+        lines.append("Top-level:")
+        lines += _tree(index, "", 1, limit)
+        if index["entry_points"]:
+            lines.append("Entry points:")
+            lines += [_entry_line(e) for e in index["entry_points"][:10]]
+    elif kind == "definition":
+        found = [s for s in symbols if _matches(s, name)]
+        if not found:
+            lowered = name.lower()
+            similar = sorted({s["name"] for s in symbols if lowered in s["name"].lower()})
+            lines.append(f"No definition of '{name}'." + (f" Similar: {', '.join(similar[:limit])}" if similar else ""))
+        lines += [_symbol_line(s, root, cache) for s in found[:limit]]
+    elif kind == "references":
+        short = name.rpartition(".")[2]
+        ref = index["references"].get(short) or {"count": 0, "sites": []}
+        sites = [site for site in ref["sites"] if _under(site[0], path)]
+        defined = [s for s in symbols if _matches(s, name)]
+        lines.append(f"{ref['count']} references to '{short}' in the repository"
+                     + (f", {len(sites)} listed under {path}" if path else "")
+                     + ("; defined at " + ", ".join(f"{s['file']}:{s['line']}" for s in defined[:3]) if defined else ""))
+        if ref["count"] > len(ref["sites"]):
+            lines.append(f"(first {len(ref['sites'])} kept in the index)")
+        lines += [f"{rel}:{line}  {_line_text(root, rel, line, cache)}" for rel, line in sites[:limit]]
+    elif kind == "entry_points":
+        entries = [e for e in index["entry_points"] if _under(e["file"], path)]
+        lines.append(f"{len(entries)} entry points" if entries else "No entry points found.")
+        lines += [_entry_line(e) for e in entries[:limit]]
+        public = [s for s in symbols if s["public"] and not s.get("scope")]
+        if public:
+            by_file = Counter(s["file"] for s in public)
+            lines.append(f"Public API: {len(public)} top-level definitions in {len(by_file)} files; most in:")
+            lines += [f"  {rel}: {n}" for rel, n in by_file.most_common(min(limit, 10))]
+    elif kind == "public":
+        public = [s for s in symbols if s["public"]]
+        lines.append(f"{len(public)} public definitions" + (f" under {path}" if path else ""))
+        lines += [_symbol_line(s, root, cache) for s in public[:limit]]
+    elif kind == "outline":
+        if not path:
+            return f"{header}\nThe 'outline' query needs a file path."
+        found = [s for s in index["symbols"] if s["file"] == path]
+        lines.append(f"{len(found)} definitions in {path}" if found else f"No definitions indexed in {path}.")
+        lines += [_symbol_line(s, root, cache) for s in found[:limit]]
+    elif kind == "tree":
+        lines += _tree(index, path, 2, limit)
+    elif kind == "languages":
+        for lang, v in index["languages"].items():
+            lines.append(f"{lang:<12} {v['files']:>6} files {_size(v['bytes']):>10} {v['lines']:>9} lines")
+    else:
+        return f"{header}\nUnknown query '{kind}'. Use one of: {', '.join(QUERIES)}."
+    if len(lines) > limit + 3:
+        lines = lines[:limit + 3] + ["... (raise limit or narrow with path)"]
+    return "\n".join([header, *lines])
+
+
+def _entry_line(e: dict) -> str:
+    target = f" -> {e['target']}" if e.get("target") else ""
+    return f"{e['file']}:{e['line']}  {e['kind']} {e['name']}{target}"
+
+
+def _tree(index: dict, path: str, depth: int, limit: int) -> list[str]:
+    """Directories and files under ``path`` to ``depth`` levels, with total sizes and file counts."""
+    base = path
+    totals: dict[str, list] = {}
+    for rel, size, _, _ in index["files"]:
+        if not _under(rel, base):
+            continue
+        parts = rel[len(base):].lstrip("/").split("/") if base else rel.split("/")
+        for level in range(1, min(depth, len(parts)) + 1):
+            key = "/".join(parts[:level]) + ("/" if level < len(parts) else "")
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += size
+            entry[1] += 1
+    if not totals:
+        return [f"Nothing indexed under {path}."]
+    rows = sorted(totals.items())[:limit * 2]
+    return [f"  {'  ' * key.rstrip('/').count('/')}{key.rstrip('/').rsplit('/', 1)[-1]}"
+            f"{'/' if key.endswith('/') else ''}  {_size(size)}" + (f", {files} files" if key.endswith("/") else "")
+            for key, (size, files) in rows]
+
+
+# ── CLI ──────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached symbol and cross-reference index of a repository")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="Index a checkout (a no-op when its commit is already indexed)")
+    p.add_argument("root")
+    p.add_argument("--workers", type=int, help=f"Worker processes (default: CPUs, at most {MAX_WORKERS})")
+    p.add_argument("--force", action="store_true", help="Rebuild even if cached")
+    p.add_argument("--key-only", action="store_true", help="Print only the cache key")
+    p = sub.add_parser("query", help="Answer a query: " + ", ".join(QUERIES))
+    p.add_argument("root")
+    p.add_argument("kind", choices=QUERIES)
+    p.add_argument("name", nargs="?", help="Symbol for definition/references")
+    p.add_argument("--path", help="Limit to a directory, or the file for outline")
+    p.add_argument("--limit", type=int, default=50)
+    sub.add_parser("list", help="Cached indexes, newest first")
+    args = parser.parse_args()
+
+    try:
+        if args.cmd == "build":
+            index = build(args.root, args.index_dir, args.workers, args.force)
+            if args.key_only:
+                print(index["key"])
+            else:
+                how = "cached" if index["cached"] else f"built in {index['build_s']:.2f}s with {index['workers']} workers"
+                print(f"{index['key']}: {len(index['files'])} files, {len(index['symbols'])} definitions, "
+                      f"{len(index['references'])} referenced names ({how})")
+        elif args.cmd == "query":
+            print(query(build(args.root, args.index_dir), args.kind, args.name, args.path, args.limit))
+        elif args.cmd == "list":
+            paths = sorted((os.path.join(args.index_dir, n) for n in os.listdir(args.index_dir) if n.endswith(".json")),
+                           key=os.path.getmtime, reverse=True) if os.path.isdir(args.index_dir) else []
+            print(f"{BOLD}{len(paths)} indexes in {args.index_dir}{RESET}")
+            for path in paths:
+                built = time.strftime("%Y-%m-%d %H:%M", time.localtime(os.path.getmtime(path)))
+                print(f"  {_size(os.path.getsize(path)):>10}  {built}  {os.path.basename(path)[:-5]}")
+    except (ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
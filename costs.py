@@ -0,0 +1,238 @@
+# costs.py — Per-agent token and cost attribution
+"""
+``ResultMessage`` reports cost for the whole session, and per model in
+``model_usage``. It doesn't say which agent spent it. ``CostTracker``
+collects usage per model response and attributes it to an agent, Main or a
+subagent type, through ``parent_tool_use_id``. The sources are:
+
+- ``AssistantMessage.usage``, deduplicated by ``message_id``: the CLI splits
+  one response into a message per content block, all with the same usage.
+  Input and cache tokens are exact. Output is a ``message_start``
+  snapshot.
+- ``StreamEvent`` ``message_start``/``message_delta`` with partial messages:
+  exact output too. The CLI streams only the main agent.
+- The Task/Agent ``tool_response`` in PostToolUse: the subagent's final
+  call (``usage`` plus ``resolvedModel``), which is often text-only and
+  never forwarded as a message.
+
+At the end of a round, ``reconcile`` matches this against the round's
+``model_usage`` delta, which is exact per model. Exact counts stay as they
+are. Each model's remainder is split across that model's other agents in
+proportion to what was seen of them. Costs are list-price estimates from
+``PRICING``, scaled per model to the CLI's reported ``costUSD``.
+"""
+import time
+
+SUBAGENT_TOOLS = ("Task", "Agent")
+
+# USD per million tokens (input, output) by model family; cache writes cost
+# CACHE_WRITE_FACTOR x input and cache reads CACHE_READ_FACTOR x input
+PRICING = {
+    "opus": (5.00, 25.00),
+    "sonnet": (3.00, 15.00),
+    "haiku": (1.00, 5.00),
+}
+DEFAULT_FAMILY = "sonnet"
+CACHE_WRITE_FACTOR = 1.25
+CACHE_READ_FACTOR = 0.10
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+MODEL_USAGE_FIELDS = {
+    "inputTokens": "input_tokens",
+    "outputTokens": "output_tokens",
+    "cacheReadInputTokens": "cache_read_input_tokens",
+    "cacheCreationInputTokens": "cache_creation_input_tokens",
+}
+
+
+def price(model: str) -> tuple[float, float]:
+    """(input, output) USD per million tokens for a model id or alias."""
+    name = (model or "").lower()
+    for family, rates in PRICING.items():
+        if family in name:
+            return rates
+    return PRICING[DEFAULT_FAMILY]
+
+
+def estimate_cost(model: str, tokens: dict) -> float:
+    """List-price cost of a token breakdown."""
+    input_rate, output_rate = price(model)
+    return (tokens.get("input_tokens", 0) * input_rate
+            + tokens.get("output_tokens", 0) * output_rate
+            + tokens.get("cache_creation_input_tokens", 0) * input_rate * CACHE_WRITE_FACTOR
+            + tokens.get("cache_read_input_tokens", 0) * input_rate * CACHE_READ_FACTOR) / 1e6
+
+
+def _tokens(usage: dict | None) -> dict:
+    usage = usage or {}
+    return {field: usage.get(field) or 0 for field in TOKEN_FIELDS}
+
+
+class CostTracker:
+    """Collects per-response usage during a round and attributes it at the end."""
+
+    def __init__(self):
+        self._agents: dict[str, str] = {}  # Task tool_use_id -> subagent type
+        self.rows: list[dict] = []  # last reconciled round
+        self.calibration = 1.0  # reported / list-price cost at the last reconcile
+        self.begin_round()
+
+    def begin_round(self) -> None:
+        self._responses: dict[str, dict] = {}  # message id -> {agent, model, tokens, exact}
+        self._streams: dict[str | None, str] = {}  # lane -> message id being streamed
+
+    def _agent(self, parent_tool_use_id: str | None) -> str:
+        return self._agents.get(parent_tool_use_id, "subagent") if parent_tool_use_id else "Main"
+
+    # ── Collection ───────────────────────────────────────
+
+    def observe_message(self, message) -> None:
+        kind = type(message).__name__
+        if kind == "StreamEvent":
+            event, lane = message.event, message.parent_tool_use_id
+            if event.get("type") == "message_start":
+                start = event.get("message", {})
+                if start.get("id"):
+                    self._streams[lane] = start["id"]
+                    self._responses[start["id"]] = {
+                        "agent": self._agent(lane), "model": start.get("model"),
+                        "tokens": _tokens(start.get("usage")), "exact": False,
+                    }
+            elif event.get("type") == "message_delta":
+                response = self._responses.get(self._streams.get(lane))
+                usage = event.get("usage") or {}
+                if response is not None:
+                    for field in TOKEN_FIELDS:
+                        if usage.get(field) is not None:
+                            response["tokens"][field] = usage[field]
+                    response["exact"] = True
+        elif kind == "AssistantMessage":
+            for block in message.content:
+                if getattr(block, "name", None) in SUBAGENT_TOOLS:
+                    self._agents[block.id] = (block.input or {}).get("subagent_type", "subagent")
+            message_id = message.message_id
+            if message_id and message_id not in self._responses:
+                self._responses[message_id] = {
+                    "agent": self._agent(message.parent_tool_use_id), "model": message.model,
+                    "tokens": _tokens(message.usage), "exact": False,
+                }
+
+    def observe_task_result(self, tool_use_id: str, tool_input: dict, tool_response) -> None:
+        """Count a finished subagent's final call from its Task/Agent tool response."""
+        if not isinstance(tool_response, dict) or not tool_response.get("usage"):
+            return
+        agent = tool_response.get("agentType") or (tool_input or {}).get("subagent_type", "subagent")
+        self._responses[f"task:{tool_use_id}"] = {
+            "agent": agent, "model": tool_response.get("resolvedModel"),
+            "tokens": _tokens(tool_response["usage"]), "exact": False,
+        }
+
+    def estimated_cost(self) -> float:
+        """Estimate of everything seen so far this round, calibrated by the last reconcile."""
+        return self.calibration * sum(estimate_cost(r["model"], r["tokens"]) for r in self._responses.values())
+
+    # ── Attribution ──────────────────────────────────────
+
+    def reconcile(self, model_usage: dict | None, previous: dict | None = None) -> list[dict]:
+        """Per (agent, model) tokens and cost for the round, matched to the CLI's per-model totals.
+
+        ``model_usage`` is the ResultMessage's per-model usage, cumulative over
+        the CLI session; the round's share is its difference from
+        ``previous``, the last result's (kept in round_state across resumes).
+        """
+        observed: dict[tuple, dict] = {}  # (agent, model) -> {"exact": tokens, "seen": tokens}
+        for response in self._responses.values():
+            key = (response["agent"], response["model"] or "unknown")
+            slot = observed.setdefault(key, {"exact": _tokens(None), "seen": _tokens(None)})
+            bucket = slot["exact"] if response["exact"] else slot["seen"]
+            for field in TOKEN_FIELDS:
+                bucket[field] += response["tokens"][field]
+
+        actual, costs = {}, {}
+        for model, usage in (model_usage or {}).items():
+            prev = (previous or {}).get(model, {})
+            if (usage.get("costUSD") or 0) < (prev.get("costUSD") or 0):
+                prev = {}  # a new CLI process started counting again
+            actual[model] = {field: (usage.get(src) or 0) - (prev.get(src) or 0)
+                             for src, field in MODEL_USAGE_FIELDS.items()}
+            if usage.get("costUSD") is not None:
+                costs[model] = usage["costUSD"] - (prev.get("costUSD") or 0)
+
+        tokens = {key: {f: slot["exact"][f] + slot["seen"][f] for f in TOKEN_FIELDS}
+                  for key, slot in observed.items()}
+        for model, totals in actual.items():
+            keys = [key for key in observed if _same_model(key[1], model)]
+            if not keys and any(totals.values()):
+                keys = [("(unattributed)", model)]
+                observed[keys[0]] = {"exact": _tokens(None), "seen": _tokens(None)}
+            for field in TOKEN_FIELDS:
+                exact = sum(observed[k]["exact"][field] for k in keys)
+                seen = {k: observed[k]["seen"][field] for k in keys}
+                remainder = max(0, totals[field] - exact)
+                weights = seen if sum(seen.values()) else {k: 1 for k in keys}
+                total_weight = sum(weights.values())
+                for key in keys:
+                    share = remainder * weights[key] / total_weight if total_weight else 0
+                    tokens.setdefault(key, _tokens(None))[field] = observed[key]["exact"][field] + round(share)
+
+        rows = []
+        for (agent, model), counts in tokens.items():
+            rows.append({"agent": agent, "model": model, **counts,
+                         "cost_usd": estimate_cost(model, counts)})
+        estimate = sum(row["cost_usd"] for row in rows)
+        if costs and estimate:
+            self.calibration = sum(costs.values()) / estimate
+        for model, cost in costs.items():
+            matching = [row for row in rows if _same_model(row["model"], model)]
+            estimate = sum(row["cost_usd"] for row in matching)
+            for row in matching:
+                row["cost_usd"] = cost * row["cost_usd"] / estimate if estimate else cost / len(matching)
+        for row in rows:
+            row["cost_usd"] = round(row["cost_usd"], 6)
+        self.rows = sorted(rows, key=lambda row: -row["cost_usd"])
+        self.begin_round()
+        return self.rows
+
+
+def _same_model(a: str, b: str) -> bool:
+    """Match model ids across sources (aliases, date suffixes)."""
+    return a == b or a.startswith(b) or b.startswith(a)
+
+
+def cache_hit_ratio(tokens: dict) -> float | None:
+    """Share of prompt tokens read from the cache; None when there were none."""
+    prompt = (tokens.get("input_tokens", 0) + tokens.get("cache_read_input_tokens", 0)
+              + tokens.get("cache_creation_input_tokens", 0))
+    return tokens.get("cache_read_input_tokens", 0) / prompt if prompt else None
+
+
+def by_agent(rows: list[dict]) -> dict[str, dict]:
+    """Collapse (agent, model) rows to one entry per agent."""
+    agents: dict[str, dict] = {}
+    for row in rows:
+        entry = agents.setdefault(row["agent"], {"cost_usd": 0.0, "models": [], **{f: 0 for f in TOKEN_FIELDS}})
+        entry["cost_usd"] += row["cost_usd"]
+        entry["models"].append(row["model"])
+        for field in TOKEN_FIELDS:
+            entry[field] += row[field]
+    return agents
+
+
+def format_costs(rows: list[dict]) -> str:
+    """One compact segment per agent for the round summary."""
+    def k(n: int) -> str:
+        return f"{n / 1000:.1f}k" if n >= 1000 else str(n)
+
+    parts = []
+    for agent, entry in sorted(by_agent(rows).items(), key=lambda item: -item[1]["cost_usd"]):
+        prompt = entry["input_tokens"] + entry["cache_read_input_tokens"] + entry["cache_creation_input_tokens"]
+        hit = cache_hit_ratio(entry)
+        parts.append(f"{agent} ${entry['cost_usd']:.4f} ({k(prompt)} in, {k(entry['output_tokens'])} out"
+                     f"{f', {hit:.0%} cached' if hit is not None else ''})")
+    return " | ".join(parts)
+
+
+def usage_entries(rows: list[dict], now: float | None = None) -> list[dict]:
+    """Audit-log entries for a round's attribution."""
+    ts = time.time() if now is None else now
+    return [{"timestamp": ts, "event": "agent_usage", **row} for row in rows]
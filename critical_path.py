@@ -0,0 +1,289 @@
+# critical_path.py — Critical-path and parallelism analysis of traced rounds
+"""
+Reads the per-round Chrome traces written by ``agent.py --trace`` (see
+tracing.py), or builds them from a ``.l7rec`` recording. For each round it reports:
+
+- the critical path: the chain of model turns, tool calls and subagent Tasks
+  that determined the round's wall-clock
+- per-agent time split into model, tool, hook/IPC and (for the orchestrator)
+  waiting on subagents. IPC is the gap between a tool_use message reaching
+  Python and the CLI calling the PreToolUse hook.
+- parallelism efficiency: agent work / (wall-clock x agents); 1.0 means
+  every agent was busy for the whole round
+- Task pairs that ran one after the other and could have overlapped, and the
+  subagent that gated a parallel group
+
+Usage:
+  uv run python critical_path.py session_data/traces/
+  uv run python critical_path.py session_data/traces/round_003_*.trace.json --top 15
+  uv run python critical_path.py session_data/recordings/session_<ts>.l7rec --json cp.json
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import re
+import tempfile
+from collections import defaultdict
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+YELLOW = "\033[33m"
+RESET = "\033[0m"
+
+EPS = 1e-6
+MIN_OVERLAP_SAVING_S = 1.0  # ignore serialized pairs that could save less than this
+LANE_ROW = re.compile(r" \(\d+\)$")  # tracing.py suffixes extra rows of a lane with " (n)"
+
+
+# ── Loading ──────────────────────────────────────────────
+
+def load_chrome_trace(path: str) -> dict:
+    """Rebuild spans and model-turn instants from a tracing.py Chrome trace."""
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    lanes = {e["tid"]: LANE_ROW.sub("", e["args"]["name"])
+             for e in events if e.get("ph") == "M" and e.get("name") == "thread_name"}
+    spans, instants = [], []
+    for e in events:
+        if e.get("ph") == "X":
+            attrs = dict(e.get("args", {}))
+            spans.append({
+                "id": attrs.pop("id"),
+                "parent": attrs.pop("parent", None),
+                "name": e["name"],
+                "kind": e["cat"],
+                "lane": lanes.get(e["tid"], "?"),
+                "start": e["ts"] / 1e6,
+                "end": (e["ts"] + e["dur"]) / 1e6,
+                "attrs": attrs,
+            })
+        elif e.get("ph") == "i":
+            instants.append({"t": e["ts"] / 1e6, "lane": lanes.get(e["tid"], "?"),
+                             "tool_ids": e.get("args", {}).get("tool_ids", [])})
+    return {"path": path, "spans": spans, "instants": instants}
+
+
+def traces_from_recording(path: str, directory: str) -> list[str]:
+    """Replay a recording with tracing on; returns the Chrome trace paths."""
+    from replay import replay
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        asyncio.run(replay(path, None, None, trace_dir=directory))
+    return sorted(glob.glob(os.path.join(directory, "*.trace.json")))
+
+
+# ── Interval helpers ─────────────────────────────────────
+
+def union_length(intervals) -> float:
+    total, cur_start, cur_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if cur_end is None or start > cur_end:
+            if cur_end is not None:
+                total += cur_end - cur_start
+            cur_start, cur_end = start, end
+        else:
+            cur_end = max(cur_end, end)
+    if cur_end is not None:
+        total += cur_end - cur_start
+    return total
+
+
+def overlaps(a: dict, b: dict) -> bool:
+    return a["start"] < b["end"] - EPS and b["start"] < a["end"] - EPS
+
+
+# ── Analysis ─────────────────────────────────────────────
+
+def critical_path(owner: dict, children: dict) -> list[dict]:
+    """Walk back from ``owner``'s end through the child that finished last each time.
+
+    Gaps between children are the owner's own model time; subagent children
+    are expanded recursively. Segments come back in chronological order.
+    """
+    segments = []
+    cursor = owner["end"]
+    kids = list(children.get(owner["id"], []))
+    while True:
+        candidates = [k for k in kids if k["end"] <= cursor + EPS and k["start"] < cursor - EPS]
+        if not candidates:
+            break
+        kid = max(candidates, key=lambda k: k["end"])
+        if cursor - kid["end"] > EPS:
+            segments.append(_segment(owner, "model", owner["lane"], kid["end"], cursor))
+        if kid["kind"] == "subagent":
+            segments.extend(reversed(critical_path(kid, children)))
+        else:
+            segments.append(_segment(kid, "tool", kid["name"], kid["start"], kid["end"]))
+        cursor = kid["start"]
+        kids = [k for k in kids if k["end"] <= cursor + EPS]
+    if cursor - owner["start"] > EPS:
+        segments.append(_segment(owner, "model", owner["lane"], owner["start"], cursor))
+    return list(reversed(segments))
+
+
+def _segment(span: dict, kind: str, name: str, start: float, end: float) -> dict:
+    return {"agent": span["lane"], "kind": kind, "name": name,
+            "start": round(start, 3), "end": round(end, 3), "duration_s": round(end - start, 3)}
+
+
+def analyze_round(trace: dict) -> dict:
+    spans = trace["spans"]
+    round_span = next(s for s in spans if s["kind"] == "round")
+    origin = round_span["start"]
+    wall = round_span["end"] - round_span["start"]
+    by_id = {s["id"]: s for s in spans}
+
+    children = defaultdict(list)
+    for span in spans:
+        if span["kind"] in ("tool", "subagent"):
+            parent = span["parent"] if span["parent"] in by_id else round_span["id"]
+            children[parent].append(span)
+    hooks_by_lane = defaultdict(float)
+    for span in spans:
+        if span["kind"] == "hook":
+            hooks_by_lane[span["lane"]] += span["end"] - span["start"]
+    dispatch_at = {tid: i["t"] for i in trace["instants"] for tid in i["tool_ids"]}
+
+    # ── Per-agent split ──
+    owners = [round_span] + [s for s in spans if s["kind"] == "subagent"]
+    agents = {}
+    work = 0.0
+    for owner in owners:
+        kids = children.get(owner["id"], [])
+        tools = [(k["start"], k["end"]) for k in kids if k["kind"] == "tool"]
+        waits = [(k["start"], k["end"]) for k in kids if k["kind"] == "subagent"]
+        window = owner["end"] - owner["start"]
+        busy = union_length(tools + waits)
+        wait_s = busy - union_length(tools)
+        hook_s = hooks_by_lane.get(owner["lane"], 0.0)
+        ipc_s = sum(max(0.0, k["start"] - dispatch_at[k["id"]])
+                    for k in kids if k["id"] in dispatch_at)
+        agents[owner["lane"]] = {
+            "window_s": round(window, 3),
+            "model_s": round(max(0.0, window - busy - ipc_s), 3),
+            "tool_s": round(max(0.0, union_length(tools) - hook_s), 3),
+            "hook_ipc_s": round(hook_s + ipc_s, 3),
+            "subagent_wait_s": round(wait_s, 3),
+            "tool_calls": sum(1 for k in kids if k["kind"] == "tool"),
+        }
+        work += window - wait_s
+
+    path = critical_path(round_span, children)
+    for seg in path:
+        seg["start"] = round(seg["start"] - origin, 3)
+        seg["end"] = round(seg["end"] - origin, 3)
+    path_by_agent = defaultdict(float)
+    for seg in path:
+        path_by_agent[f"{seg['agent']} {seg['kind']}"] += seg["duration_s"]
+
+    # ── Serialized siblings and gating subagents ──
+    serialized, gating = [], []
+    for parent_id, kids in children.items():
+        tasks = sorted((k for k in kids if k["kind"] == "subagent"), key=lambda k: k["start"])
+        for i, later in enumerate(tasks):
+            earlier = [t for t in tasks[:i] if t["end"] <= later["start"] + EPS]
+            if not earlier or any(overlaps(t, later) for t in tasks[:i]):
+                continue
+            prev = max(earlier, key=lambda t: t["end"])
+            saving = min(prev["end"] - prev["start"], later["end"] - later["start"])
+            if saving >= MIN_OVERLAP_SAVING_S:
+                serialized.append({
+                    "first": prev["lane"], "then": later["lane"],
+                    "gap_s": round(later["start"] - prev["end"], 3),
+                    "max_saving_s": round(saving, 3),
+                })
+        groups: list[list[dict]] = []
+        for task in tasks:
+            if groups and any(overlaps(task, t) for t in groups[-1]):
+                groups[-1].append(task)
+            else:
+                groups.append([task])
+        for group in groups:
+            if len(group) < 2:
+                continue
+            ends = sorted(t["end"] for t in group)
+            last = max(group, key=lambda t: t["end"])
+            gating.append({"agent": last["lane"], "group": [t["lane"] for t in group],
+                           "gated_by_s": round(ends[-1] - ends[-2], 3)})
+
+    return {
+        "trace": trace["path"],
+        "round": round_span["attrs"].get("round"),
+        "query": round_span["attrs"].get("query", ""),
+        "wall_s": round(wall, 3),
+        "agents": agents,
+        "parallelism": round(work / wall, 2) if wall else 0.0,
+        "efficiency": round(work / (wall * len(owners)), 3) if wall else 0.0,
+        "critical_path": path,
+        "critical_path_by_agent": {k: round(v, 3) for k, v in
+                                   sorted(path_by_agent.items(), key=lambda kv: -kv[1])},
+        "serialized_tasks": serialized,
+        "gating": gating,
+    }
+
+
+# ── CLI ──────────────────────────────────────────────────
+
+def print_round(report: dict, top: int) -> None:
+    print(f"\n{BOLD}Round {report['round']}{RESET} {DIM}{report['query'][:70]}{RESET}")
+    print(f"  wall {report['wall_s']:.1f}s | parallelism {report['parallelism']:.2f} agents busy "
+          f"on average | efficiency {report['efficiency']:.0%}")
+    print(f"{DIM}  {'agent':<30} {'window':>8} {'model':>8} {'tool':>8} {'hook/ipc':>9} "
+          f"{'wait':>8} {'calls':>6}{RESET}")
+    for agent, a in report["agents"].items():
+        print(f"  {agent:<30} {a['window_s']:>8.1f} {a['model_s']:>8.1f} {a['tool_s']:>8.1f} "
+              f"{a['hook_ipc_s']:>9.3f} {a['subagent_wait_s']:>8.1f} {a['tool_calls']:>6}")
+
+    print(f"  {BOLD}Critical path{RESET} "
+          + ", ".join(f"{k} {v:.1f}s" for k, v in report["critical_path_by_agent"].items()))
+    for seg in sorted(report["critical_path"], key=lambda s: -s["duration_s"])[:top]:
+        print(f"{DIM}    {seg['start']:>7.1f}–{seg['end']:<7.1f}{RESET} {seg['duration_s']:>6.1f}s "
+              f"{seg['agent']} {seg['kind']}{'' if seg['kind'] == 'model' else ': ' + seg['name']}")
+
+    for g in report["gating"]:
+        print(f"  {YELLOW}{g['agent']} gated its parallel group by {g['gated_by_s']:.1f}s{RESET} "
+              f"{DIM}({', '.join(g['group'])}){RESET}")
+    for s in report["serialized_tasks"]:
+        print(f"  {YELLOW}Serialized: {s['then']} started {s['gap_s']:.1f}s after {s['first']} ended; "
+              f"overlapping could save up to {s['max_saving_s']:.1f}s{RESET}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical-path analysis of traced rounds")
+    parser.add_argument("paths", nargs="+",
+                        help="Chrome trace files, directories of them, or .l7rec recordings")
+    parser.add_argument("--top", type=int, default=8, help="Longest critical-path segments to list")
+    parser.add_argument("--json", help="Write the per-round reports to this path")
+    args = parser.parse_args()
+
+    reports = []
+    with tempfile.TemporaryDirectory(prefix="l7-cp-") as scratch:
+        files = []
+        for path in args.paths:
+            if os.path.isdir(path):
+                files += sorted(glob.glob(os.path.join(path, "*.trace.json")))
+            elif path.endswith(".l7rec"):
+                files += traces_from_recording(path, tempfile.mkdtemp(dir=scratch))
+            else:
+                files.append(path)
+        for path in files:
+            report = analyze_round(load_chrome_trace(path))
+            reports.append(report)
+            print_round(report, args.top)
+
+    if len(reports) > 1:
+        wall = sum(r["wall_s"] for r in reports)
+        print(f"\n{BOLD}{len(reports)} rounds{RESET} | wall {wall:.1f}s | mean efficiency "
+              f"{sum(r['efficiency'] for r in reports) / len(reports):.0%} | "
+              f"{sum(len(r['serialized_tasks']) for r in reports)} serialized Task pairs")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"{DIM}Report: {args.json}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# dashboard.py — Full-screen live view of a running round
+"""
+While a round runs, ``Dashboard`` takes over the terminal's alternate screen
+and shows:
+
+- a header with the round, elapsed time, turns, tool counts and cost
+- one lane per agent (Main plus each subagent type that has run) with its
+  state, in-flight tools and latest text
+- every in-flight tool with a live elapsed timer
+- a scrolling log; anything printed meanwhile, tool completions included,
+  lands here instead of tearing the screen
+
+Hooks and the message loop only ``post`` events to a queue, which is O(1)
+and does no terminal IO. A draw task drains the queue and repaints the whole
+frame in one write, at most ``DASHBOARD_FPS`` times a second. Rendering cost
+stays constant however many events arrive. The screen is restored when the
+round ends (``stop``), so prompts and the round summary print normally.
+
+Enabled with ``agent.py --dashboard`` or ``L7_DASHBOARD=1`` on a terminal.
+"""
+import asyncio
+import re
+import shutil
+import sys
+import time
+from collections import deque
+
+DASHBOARD_FPS = 8
+LOG_LINES = 500
+SUBAGENT_TOOLS = ("Task", "Agent")
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+CYAN = "\033[36m"
+GREEN = "\033[32m"
+YELLOW = "\033[33m"
+RESET = "\033[0m"
+ALT_SCREEN_ON = "\033[?1049h\033[?25l"   # alternate screen, hide cursor
+ALT_SCREEN_OFF = "\033[?25h\033[?1049l"
+
+_ANSI = re.compile(r"\033\[[0-9;?]*[A-Za-z]")
+
+
+def _fit(text: str, width: int) -> str:
+    """Strip ANSI codes and newlines, then pad or cut to ``width`` columns."""
+    plain = _ANSI.sub("", text).replace("\n", " ")
+    return plain[:width].ljust(width) if len(plain) <= width else plain[:width - 1] + "…"
+
+
+def _clock(seconds: float) -> str:
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+
+class _LogWriter:
+    """Stands in for sys.stdout while the dashboard is up; lines go to the log."""
+
+    def __init__(self, dashboard: "Dashboard"):
+        self.dashboard = dashboard
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.dashboard.post("log", line=line)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class Dashboard:
+    """Event-queue driven, frame-capped full-screen view of one round at a time."""
+
+    def __init__(self, out=None, fps: float = DASHBOARD_FPS, clock=time.monotonic):
+        self.out = out or sys.stdout
+        self.frame_s = 1 / fps
+        self.clock = clock
+        self.frames = 0
+        self._events: deque = deque()
+        self._task: asyncio.Task | None = None
+        self._saved_stdout = None
+        self._reset("", 0)
+
+    def _reset(self, query: str, round_num: int) -> None:
+        self.round = round_num
+        self.query = query
+        self.started = self.clock()
+        self.turns = 0
+        self.cost_usd: float | None = None
+        self.tools_done = 0
+        self.lanes: dict[str, dict] = {"Main": self._lane()}
+        self.in_flight: dict[str, dict] = {}  # tool_use_id -> {tool, agent, preview, start}
+        self.log: deque[str] = deque(maxlen=LOG_LINES)
+        self._message_ids: set[str] = set()
+        self._subagents: dict[str, str] = {}  # Task tool_use_id -> subagent type
+
+    @staticmethod
+    def _lane() -> dict:
+        return {"state": "idle", "tasks": 0, "text": "", "tools": 0}
+
+    # ── Producers (cheap, no IO) ─────────────────────────
+
+    def post(self, kind: str, **data) -> None:
+        self._events.append((self.clock(), kind, data))
+
+    def tool_start(self, tool_use_id: str, tool: str, agent: str, tool_input: dict) -> None:
+        self.post("tool_start", id=tool_use_id, tool=tool, agent=agent, input=tool_input)
+
+    def tool_end(self, tool_use_id: str) -> None:
+        self.post("tool_end", id=tool_use_id)
+
+    def observe_message(self, message) -> None:
+        """Feed an AssistantMessage or StreamEvent (text for the lane, turns)."""
+        kind = type(message).__name__
+        if kind == "StreamEvent":
+            delta = message.event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                self.post("text", lane=message.parent_tool_use_id, text=delta["text"], append=True)
+            elif message.event.get("type") == "content_block_start":
+                self.post("text", lane=message.parent_tool_use_id, text="", append=False)
+        elif kind == "AssistantMessage":
+            if message.parent_tool_use_id is None and message.message_id:
+                self.post("turn", id=message.message_id)
+            for block in message.content:
+                if getattr(block, "name", None) in SUBAGENT_TOOLS:
+                    self.post("spawn", id=block.id, agent=(block.input or {}).get("subagent_type", "subagent"))
+                elif type(block).__name__ == "TextBlock":
+                    self.post("text", lane=message.parent_tool_use_id, text=block.text, append=False)
+
+    # ── Lifecycle ────────────────────────────────────────
+
+    def start(self, round_num: int, query: str, session_cost: float | None = None) -> None:
+        """Enter the alternate screen and start drawing. Needs a running loop."""
+        if self._task is not None:
+            self.stop()
+        self._events.clear()
+        self._reset(query, round_num)
+        self.cost_usd = session_cost
+        self._saved_stdout = sys.stdout
+        sys.stdout = _LogWriter(self)
+        self.out.write(ALT_SCREEN_ON)
+        self.out.flush()
+        self._task = asyncio.get_running_loop().create_task(self._draw_loop())
+
+    def stop(self) -> None:
+        """Leave the alternate screen and restore stdout. Safe to call twice."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        sys.stdout = self._saved_stdout
+        self.out.write(ALT_SCREEN_OFF)
+        self.out.flush()
+
+    async def _draw_loop(self) -> None:
+        while True:
+            self.draw()
+            await asyncio.sleep(self.frame_s)
+
+    # ── Consumer ─────────────────────────────────────────
+
+    def _drain(self) -> None:
+        events, self._events = self._events, deque()
+        for at, kind, data in events:
+            if kind == "tool_start":
+                agent = data["agent"]
+                lane = self.lanes.setdefault(agent, self._lane())
+                lane["tools"] += 1
+                if data["tool"] in SUBAGENT_TOOLS:
+                    sub = self.lanes.setdefault(data["input"].get("subagent_type", "subagent"), self._lane())
+                    sub["state"] = "running"
+                    sub["tasks"] += 1
+                preview = ", ".join(f"{k}={v}" for k, v in (data["input"] or {}).items())
+                self.in_flight[data["id"]] = {"tool": data["tool"], "agent": agent,
+                                              "input": data["input"], "preview": preview, "start": at}
+            elif kind == "tool_end":
+                call = self.in_flight.pop(data["id"], None)
+                if call is None:
+                    continue
+                self.tools_done += 1
+                elapsed = at - call["start"]
+                if call["tool"] in SUBAGENT_TOOLS:
+                    sub = self.lanes.get(call["input"].get("subagent_type", "subagent"))
+                    if sub:
+                        sub["tasks"] -= 1
+                        sub["state"] = "running" if sub["tasks"] else "done"
+                self.log.append(f"✓ {call['tool']} ({call['agent']}) {elapsed:.1f}s  {call['preview']}")
+            elif kind == "spawn":
+                self._subagents[data["id"]] = data["agent"]
+            elif kind == "text":
+                name = self._subagents.get(data["lane"], "subagent") if data["lane"] else "Main"
+                lane = self.lanes.setdefault(name, self._lane())
+                lane["text"] = (lane["text"] + data["text"] if data["append"] else data["text"])[-400:]
+            elif kind == "turn":
+                if data["id"] not in self._message_ids:
+                    self._message_ids.add(data["id"])
+                    self.turns += 1
+            elif kind == "log":
+                self.log.append(data["line"])
+
+    def render(self, width: int, height: int) -> list[str]:
+        """The frame as exactly ``height`` lines of ``width`` columns (ANSI styling added after fitting)."""
+        now = self.clock()
+        running = sum(1 for lane in self.lanes.values() if lane["state"] == "running")
+        cost = f"${self.cost_usd:.4f}" if self.cost_usd is not None else "—"
+        lines = [
+            (BOLD + CYAN, f"L7 · round {self.round} · {_clock(now - self.started)} · main turns {self.turns} · "
+                          f"tools {self.tools_done} done, {len(self.in_flight)} running · "
+                          f"subagents {running} active · session {cost}"),
+            (DIM, f"> {self.query}"),
+            (DIM, "── Agents " + "─" * width),
+        ]
+        busy = {}
+        for call in self.in_flight.values():
+            busy.setdefault(call["agent"], []).append(f"{call['tool']} {now - call['start']:.0f}s")
+        for name, lane in self.lanes.items():
+            state = "running" if name == "Main" or lane["state"] == "running" else lane["state"]
+            mark = {"running": "●", "done": "✓"}.get(state, "·")
+            colour = YELLOW if busy.get(name) else GREEN if state == "done" else ""
+            tools = ", ".join(busy.get(name, [])) or "—"
+            text = lane["text"].strip().replace("\n", " ")[-(width // 2):]
+            lines.append((colour, f"{mark} {name:<16} {tools:<28} {text}"))
+        lines.append((DIM, "── In flight " + "─" * width))
+        for call in sorted(self.in_flight.values(), key=lambda c: c["start"]):
+            elapsed = now - call["start"]
+            colour = YELLOW if elapsed > 15 else ""
+            lines.append((colour, f"  {elapsed:6.1f}s  {call['tool']:<10} {call['agent']:<16} {call['preview']}"))
+        lines.append((DIM, "── Log " + "─" * width))
+        room = max(0, height - len(lines))
+        tail = list(self.log)[-room:] if room else []
+        lines.extend(("", line) for line in tail)
+        lines = lines[:height] + [("", "")] * (height - len(lines))
+        return [f"{style}{_fit(text, width)}{RESET if style else ''}" for style, text in lines]
+
+    def draw(self) -> None:
+        """Drain queued events and repaint the frame in one write."""
+        self._drain()
+        size = shutil.get_terminal_size()
+        frame = self.render(size.columns - 1, size.lines)  # never touch the last column: no auto-wrap
+        self.out.write("\033[H" + "\n".join(frame))
+        self.out.flush()
+        self.frames += 1
@@ -0,0 +1,133 @@
+"""Warm standby client for fast recovery when the CLI subprocess crashes.
+
+Starting a fresh ``ClaudeSDKClient`` after a crash means a cold process spawn
+plus the initialize handshake while the user waits. ``FailoverManager`` can keep
+a second, already-connected client resumed at the current session and swap it
+in when the active one dies.
+
+A standby is a whole extra CLI process, so one is kept only once the session
+has shown it is unhealthy: after a crash (``mark_dead``) or a stall the
+watchdog had to interrupt (``mark_unhealthy``). Until then a crash cold-starts.
+The CLI loads the session transcript when it starts, so while a standby is
+kept it is re-warmed after each completed round (``refresh_standby``). A crash
+mid-round therefore resumes from the end of the last completed round.
+"""
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("l7.failover")
+
+DISCONNECT_TIMEOUT = 5.0  # don't let a wedged subprocess hold up recovery
+
+
+class FailoverManager:
+    """Own the active client and a pre-spawned standby resumed at the same session."""
+
+    def __init__(self, options_factory, client_cls=None):
+        if client_cls is None:
+            from claude_agent_sdk import ClaudeSDKClient as client_cls
+        self.options_factory = options_factory  # resume session_id -> ClaudeAgentOptions
+        self.client_cls = client_cls
+        self.active = None
+        self.failovers = 0
+        self.last_recovery_s: float | None = None
+        self.last_recovery_warm = False
+        self._standby = None
+        self._standby_session: str | None = None
+        self._warming: asyncio.Task | None = None
+        self._crashed_at = 0.0
+        self.unhealthy = False  # a crash or stall was seen: keep a standby from now on
+
+    async def _connect(self, resume: str | None):
+        client = self.client_cls(options=self.options_factory(resume))
+        await client.connect()
+        return client
+
+    @staticmethod
+    async def _disconnect(client) -> None:
+        try:
+            await asyncio.wait_for(client.disconnect(), DISCONNECT_TIMEOUT)
+        except Exception as e:
+            logger.debug("disconnect failed: %s", e)
+
+    async def activate(self, resume: str | None = None):
+        """Make a connected client active, preferring a warm standby for ``resume``.
+
+        If ``mark_dead()`` was called, the time from the crash to a connected
+        replacement is recorded as ``last_recovery_s``.
+        """
+        if self._warming:
+            try:
+                await self._warming
+            except Exception:
+                pass
+        warm = bool(resume and self._standby and self._standby_session == resume)
+        if warm:
+            client, self._standby, self._standby_session = self._standby, None, None
+        else:
+            client = await self._connect(resume)
+        self.active = client
+
+        if self._crashed_at:
+            self.last_recovery_s = time.perf_counter() - self._crashed_at
+            self.last_recovery_warm = warm
+            self.failovers += 1
+            self._crashed_at = 0.0
+        if resume and self.unhealthy:
+            self.warm_standby(resume)
+        return client
+
+    def mark_unhealthy(self) -> None:
+        """Keep a standby from the next round on, e.g. after the active client stalled."""
+        self.unhealthy = True
+
+    def mark_dead(self) -> None:
+        """Record that the active client crashed; it is discarded in the background."""
+        self.unhealthy = True
+        if not self._crashed_at:  # keep the first crash time across failed reconnects
+            self._crashed_at = time.perf_counter()
+        dead, self.active = self.active, None
+        if dead is not None:
+            asyncio.ensure_future(self._disconnect(dead))
+
+    def refresh_standby(self, session_id: str | None) -> None:
+        """After a round: re-warm the standby at the session's latest transcript, if one is kept."""
+        if self.unhealthy:
+            self.warm_standby(session_id)
+
+    def warm_standby(self, session_id: str | None) -> None:
+        """Spawn a standby resumed at ``session_id`` in the background."""
+        if not session_id:
+            return
+        self._warming = asyncio.create_task(self._warm(session_id, self._warming))
+
+    async def _warm(self, session_id: str, previous: asyncio.Task | None) -> None:
+        if previous:
+            try:
+                await previous
+            except Exception:
+                pass
+        start = time.perf_counter()
+        try:
+            fresh = await self._connect(session_id)
+        except Exception as e:
+            logger.warning("standby warm-up failed: %s", e)
+            return
+        stale, self._standby, self._standby_session = self._standby, fresh, session_id
+        logger.debug("standby ready for %s in %.2fs", session_id, time.perf_counter() - start)
+        if stale is not None:
+            await self._disconnect(stale)
+
+    async def close(self) -> None:
+        """Disconnect the active client and any standby."""
+        if self._warming and not self._warming.done():
+            self._warming.cancel()
+            try:
+                await self._warming
+            except BaseException:
+                pass
+        for client in (self._standby, self.active):
+            if client is not None:
+                await self._disconnect(client)
+        self._standby = self.active = None
@@ -0,0 +1,433 @@
+# git_cache.py — Persistent git mirror cache for repository clones
+"""
+repo_analyzer clones every repository it looks at into ``./.temp/``, at full
+depth, again for every topic and session. This module keeps a bare mirror of
+each repository under ``L7_GIT_CACHE_DIR`` (default
+``~/.cache/l7-agent/git``) and serves checkouts from it:
+
+- **checkout**: a miss is one ``git clone --mirror``. A hit is a
+  ``git fetch`` of the mirror when it is older than ``L7_GIT_CACHE_TTL``
+  seconds (default 900). If the fetch fails, for example offline, the
+  existing mirror is used. The worktree is ``git clone --shared`` from the
+  mirror: it borrows the mirror's objects, so it takes seconds and only the
+  checked-out files use disk. Sparse paths and a branch or tag are supported.
+  A shallow or partial clone is served only when its mirror is already cached.
+- **forks**: a new URL with the same repository name as a cached mirror is
+  mirrored with ``--reference`` to it. Only the objects the fork adds are
+  downloaded and stored.
+- **eviction**: after each checkout, least-recently-used mirrors are removed
+  until the cache fits in ``L7_GIT_CACHE_MB`` (default 5120). Mirrors used in
+  the last ``PROTECT_S`` are kept, so repacking doesn't hit a session's
+  current checkouts. Before a mirror is removed, the forks and worktrees that
+  borrow from it (each entry lists its worktrees) are repacked to stand alone.
+- **worktrees**: checkouts the cache served that have not been used for
+  ``WORKTREE_TTL_S`` are removed from the same parent directory, so
+  ``.temp`` stops growing.
+
+With ``L7_GIT_CACHE=1``, the orchestrator's Bash hook rewrites a plain
+``git clone URL [DIR]`` to ``git_cache.py checkout``, so the agent needs no
+new instructions. Every
+checkout appends to ``session_data/git_cache.jsonl``, and at exit the
+orchestrator prints the clone time saved that session (``session_summary``).
+
+  python git_cache.py checkout https://github.com/jqlang/jq .temp/jq [--ref v1.7] [--sparse src,docs]
+  python git_cache.py list
+  python git_cache.py evict [--max-mb 2048]
+  python git_cache.py stats [--since EPOCH]
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+CACHE_DIR = os.path.expanduser(os.environ.get("L7_GIT_CACHE_DIR", "~/.cache/l7-agent/git"))
+MAX_MB = int(os.environ.get("L7_GIT_CACHE_MB", "5120"))
+FETCH_TTL_S = float(os.environ.get("L7_GIT_CACHE_TTL", "900"))
+PROTECT_S = 3600  # mirrors used this recently are not evicted
+WORKTREE_TTL_S = 7 * 86400
+LOCK_STALE_S = 900
+EVENTS_FILE = "session_data/git_cache.jsonl"
+MARKER = "l7-git-cache"  # file in a served worktree's .git/ naming its URL
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+
+def repo_key(url: str) -> tuple[str, str]:
+    """(mirror path relative to the cache, repository name) for a clone URL."""
+    if "://" not in url and re.match(r"^[\w.-]+@[\w.-]+:", url):  # scp-like: git@host:owner/repo
+        user_host, path = url.split(":", 1)
+        host = user_host.split("@", 1)[1]
+    else:
+        parsed = urlparse(url)
+        host, path = parsed.hostname or "local", parsed.path
+    path = path.strip("/").removesuffix(".git")
+    name = path.rsplit("/", 1)[-1] or "repo"
+    safe = re.sub(r"[^\w.-]+", "_", f"{host}/{path}".replace("/", "__"))
+    return f"{safe}.git", name
+
+
+# ── Index and locking ────────────────────────────────────
+
+@contextlib.contextmanager
+def _lock(path: str, timeout: float = 600):
+    """Exclusive lock file (portable; stale locks are broken after LOCK_STALE_S)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            with contextlib.suppress(OSError):
+                if time.time() - os.path.getmtime(path) > LOCK_STALE_S:
+                    os.remove(path)
+                    continue
+            if time.time() > deadline:
+                raise TimeoutError(f"waiting for {path}")
+            time.sleep(0.1)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(fd)
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+class GitCache:
+    """Bare mirrors with an LRU index in ``root``."""
+
+    def __init__(self, root: str = CACHE_DIR, max_mb: int = MAX_MB, fetch_ttl_s: float = FETCH_TTL_S,
+                 events_path: str = EVENTS_FILE):
+        self.root = root
+        self.max_mb = max_mb
+        self.fetch_ttl_s = fetch_ttl_s
+        self.events_path = events_path
+        self.index_path = os.path.join(root, "index.json")
+
+    def _index(self) -> dict:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update(self, url: str, **fields) -> dict:
+        with _lock(self.index_path + ".lock"):
+            index = self._index()
+            entry = index.setdefault(url, {})
+            entry.update(fields)
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp, self.index_path)
+        return entry
+
+    def _remove(self, url: str) -> None:
+        with _lock(self.index_path + ".lock"):
+            index = self._index()
+            index.pop(url, None)
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+
+    # ── Mirrors ──────────────────────────────────────────
+
+    def mirror(self, url: str) -> tuple[str, dict]:
+        """Path of an up-to-date mirror of ``url`` and what it took: {"hit", "fetched", "seconds", "root"}."""
+        rel, name = repo_key(url)
+        path = os.path.join(self.root, "mirrors", rel)
+        start = time.time()
+        with _lock(path + ".lock"):
+            entry = self._index().get(url)
+            if entry and os.path.isdir(path):
+                fetched = False
+                if time.time() - entry.get("fetched_at", 0) > self.fetch_ttl_s:
+                    fetched = _git(["fetch", "--prune", "--quiet"], cwd=path, check=False).returncode == 0
+                seconds = time.time() - start
+                self._update(url, last_used=time.time(), size_mb=_size_mb(path),
+                             **({"fetched_at": time.time()} if fetched else {}))
+                return path, {"hit": True, "fetched": fetched, "seconds": seconds, "root": entry.get("root")}
+
+            # Forks share objects with an already cached repository of the same name
+            root = next((u for u, e in self._index().items()
+                         if e.get("name") == name and u != url and not e.get("root")
+                         and os.path.isdir(e.get("path", ""))), None)
+            tmp = path + ".partial"
+            shutil.rmtree(tmp, ignore_errors=True)
+            args = ["clone", "--mirror", "--quiet", url, tmp]
+            if root:
+                args[1:1] = ["--reference-if-able", self._index()[root]["path"]]
+            _git(args)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+            seconds = time.time() - start
+            self._update(url, path=path, name=name, root=root, created=time.time(), last_used=time.time(),
+                         fetched_at=time.time(), clone_s=round(seconds, 2), size_mb=_size_mb(path))
+        return path, {"hit": False, "fetched": True, "seconds": seconds, "root": root}
+
+    def cached(self, url: str) -> bool:
+        """Whether ``url`` has a mirror in the cache."""
+        entry = self._index().get(url)
+        return bool(entry) and os.path.isdir(entry.get("path", ""))
+
+    def evict(self, keep: tuple = (), max_mb: int | None = None) -> list[str]:
+        """Remove least-recently-used mirrors until the cache fits its quota; the evicted URLs."""
+        limit = self.max_mb if max_mb is None else max_mb
+        index = self._index()
+        total = sum(e.get("size_mb", 0) for e in index.values())
+        evicted = []
+        for url, entry in sorted(index.items(), key=lambda item: item[1].get("last_used", 0)):
+            if total <= limit:
+                break
+            if url in keep or time.time() - entry.get("last_used", 0) < PROTECT_S:
+                continue
+            with _lock(entry["path"] + ".lock"):
+                for fork_url, fork in index.items():
+                    if fork.get("root") == url and fork_url not in evicted:
+                        _dissociate(fork["path"])
+                        self._update(fork_url, root=None, size_mb=_size_mb(fork["path"]))
+                for dest in _live_worktrees(url, entry):
+                    _dissociate(os.path.join(dest, ".git"))
+                shutil.rmtree(entry["path"], ignore_errors=True)
+            self._remove(url)
+            total -= entry.get("size_mb", 0)
+            evicted.append(url)
+        return evicted
+
+    # ── Worktrees ────────────────────────────────────────
+
+    def checkout(self, url: str, dest: str, ref: str | None = None, sparse: list[str] | None = None) -> dict:
+        """Serve ``url`` at ``dest`` from its mirror; returns the checkout event (also logged)."""
+        start = time.time()
+        path, info = self.mirror(url)
+        dest = os.path.abspath(dest)
+        if os.path.isdir(os.path.join(dest, ".git")) and _served_url(dest) == url:
+            _git(["fetch", "--quiet", "--tags", path, "+refs/heads/*:refs/remotes/origin/*"], cwd=dest)
+            _git(["checkout", "--quiet", "--detach", ref or "origin/HEAD"], cwd=dest, check=False)
+            updated = True
+        else:
+            if os.path.exists(dest) and os.listdir(dest):
+                raise RuntimeError(f"destination path '{dest}' already exists and is not an empty directory")
+            _git(["clone", "--shared", "--no-checkout", "--quiet", path, dest])
+            _git(["remote", "set-url", "origin", url], cwd=dest)
+            _git(["remote", "set-url", "--push", "origin", "no-push"], cwd=dest)
+            if sparse:
+                _git(["sparse-checkout", "set", "--cone", *sparse], cwd=dest)
+            _git(["checkout", "--quiet", *([ref] if ref else [])], cwd=dest)
+            with open(os.path.join(dest, ".git", MARKER), "w", encoding="utf-8") as f:
+                f.write(url)
+            self._update(url, worktrees=[*_live_worktrees(url, self._index().get(url, {})), dest])
+            updated = False
+        elapsed = time.time() - start
+        clone_s = self._index().get(url, {}).get("clone_s", 0.0)
+        event = {"t": time.time(), "url": url, "dest": dest, "hit": info["hit"], "fetched": info["fetched"],
+                 "updated": updated, "fork_of": info["root"], "elapsed_s": round(elapsed, 2),
+                 "saved_s": round(max(0.0, clone_s - elapsed), 2) if info["hit"] else 0.0}
+        evicted = self.evict(keep=(url,))
+        if evicted:
+            event["evicted"] = evicted
+        prune_worktrees(os.path.dirname(dest), keep=dest)
+        _log_event(event, self.events_path)
+        return event
+
+
+def _git(args: list[str], cwd: str | None = None, check: bool = True) -> subprocess.CompletedProcess:
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True,
+                            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"})
+    if check and result.returncode:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip() or result.stdout.strip()}")
+    return result
+
+
+def _dissociate(path: str) -> None:
+    """Copy borrowed objects into a repository (a mirror or a worktree's .git) and drop its alternates."""
+    _git(["repack", "-a", "-d", "--quiet"], cwd=path)
+    with contextlib.suppress(OSError):
+        os.remove(os.path.join(path, "objects", "info", "alternates"))
+
+
+def _size_mb(path: str) -> float:
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(dirpath, name))
+    return round(total / 2**20, 1)
+
+
+def _served_url(dest: str) -> str | None:
+    try:
+        with open(os.path.join(dest, ".git", MARKER), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _live_worktrees(url: str, entry: dict) -> list[str]:
+    """The worktrees served from ``url``'s mirror that still exist."""
+    return [dest for dest in entry.get("worktrees", []) if _served_url(dest) == url]
+
+
+def prune_worktrees(parent: str, keep: str | None = None, ttl_s: float = WORKTREE_TTL_S) -> list[str]:
+    """Remove cache-served worktrees under ``parent`` unused for ``ttl_s``."""
+    removed = []
+    with contextlib.suppress(OSError):
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if path == keep or not _served_url(path):
+                continue
+            if time.time() - os.path.getmtime(os.path.join(path, ".git", "index")) > ttl_s:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+    return removed
+
+
+# ── Session log ──────────────────────────────────────────
+
+def _log_event(event: dict, path: str = EVENTS_FILE) -> None:
+    with contextlib.suppress(OSError):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+def session_events(since: float = 0.0, path: str = EVENTS_FILE) -> list[dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return []
+    return [e for e in events if e.get("t", 0) >= since]
+
+
+def session_summary(since: float = 0.0, path: str = EVENTS_FILE) -> str | None:
+    """One line on the checkouts since ``since``: hits, forks and clone time saved."""
+    events = session_events(since, path)
+    if not events:
+        return None
+    hits = sum(1 for e in events if e["hit"])
+    forks = sum(1 for e in events if not e["hit"] and e.get("fork_of"))
+    saved = sum(e.get("saved_s", 0.0) for e in events)
+    line = f"{len(events)} checkouts, {hits} from cache"
+    if forks:
+        line += f", {forks} forks sharing objects"
+    return line + f", ~{saved:.0f}s of clone time saved"
+
+
+# ── Bash rewrite ─────────────────────────────────────────
+
+_SHELL_META = re.compile(r"[;|`<>]|\$\(|\|\|")
+_FLAGS_WITH_VALUE = {"--depth", "--branch", "-b", "--filter", "--origin", "-o", "--shallow-since"}
+_SHALLOW_FLAGS = {"--depth", "--filter", "--shallow-since"}
+_IGNORED_FLAGS = {"--single-branch", "--no-single-branch", "-q", "--quiet", "--progress", "--no-tags",
+                  "--shallow-submodules", "--sparse"}
+
+
+def rewrite_clone(command: str, python: str = sys.executable, events_path: str | None = None,
+                  cache_dir: str = CACHE_DIR) -> str | None:
+    """``command`` with a plain ``git clone URL [DIR]`` served from the cache; None if there is none.
+
+    Only ``&&``-joined simple commands are rewritten. Options the cache can't
+    honor, such as ``--recurse-submodules`` or ``--bare``, leave the command
+    unchanged. A shallow or partial clone (``--depth``, ``--filter``,
+    ``--shallow-since``) is served only from a mirror that is already cached,
+    as a full-history worktree: on a miss the command runs as written, since
+    mirroring the full repository can take far longer than what was asked for.
+    """
+    if _SHELL_META.search(command.replace("&&", "")):
+        return None
+    segments = command.split("&&")
+    for i, segment in enumerate(segments):
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            return None
+        if words[:2] != ["git", "clone"]:
+            continue
+        ref, shallow, positional, rest = None, False, [], iter(words[2:])
+        for word in rest:
+            flag, _, inline = word.partition("=")
+            if flag in _FLAGS_WITH_VALUE:
+                value = inline or next(rest, "")
+                shallow = shallow or flag in _SHALLOW_FLAGS
+                if flag in ("--branch", "-b"):
+                    ref = value
+                elif flag in ("--origin", "-o"):
+                    return None
+            elif word in _IGNORED_FLAGS:
+                continue
+            elif word.startswith("-"):
+                return None
+            else:
+                positional.append(word)
+        if not 1 <= len(positional) <= 2:
+            return None
+        url = positional[0]
+        if shallow and not GitCache(cache_dir).cached(url):
+            return None
+        dest = positional[1] if len(positional) > 1 else repo_key(url)[1]
+        args = [python, os.path.abspath(__file__), *(["--events", events_path] if events_path else []),
+                "checkout", url, dest, *(["--ref", ref] if ref else [])]
+        segments[i] = (" " if i else "") + " ".join(shlex.quote(a) for a in args) + (
+            " " if i < len(segments) - 1 else "")
+        return "&&".join(segments)
+    return None
+
+
+# ── CLI ──────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent git mirror cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--max-mb", type=int, default=MAX_MB)
+    parser.add_argument("--events", default=EVENTS_FILE, help="Checkout log (default: session_data/git_cache.jsonl)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("checkout", help="Serve a worktree of URL at DEST from the mirror cache")
+    p.add_argument("url")
+    p.add_argument("dest")
+    p.add_argument("--ref", help="Branch, tag or commit to check out")
+    p.add_argument("--sparse", help="Comma-separated directories for a sparse (cone) checkout")
+    sub.add_parser("list", help="Cached mirrors, most recently used first")
+    sub.add_parser("evict", help="Evict least-recently-used mirrors down to --max-mb")
+    p = sub.add_parser("stats", help="Checkouts and clone time saved from session_data/git_cache.jsonl")
+    p.add_argument("--since", type=float, default=0.0, help="Only checkouts after this epoch time")
+    args = parser.parse_args()
+
+    cache = GitCache(args.cache_dir, args.max_mb, events_path=args.events)
+    if args.cmd == "checkout":
+        try:
+            event = cache.checkout(args.url, args.dest, args.ref,
+                                   [p for p in (args.sparse or "").split(",") if p])
+        except (RuntimeError, TimeoutError) as e:
+            print(f"fatal: {e}", file=sys.stderr)
+            sys.exit(128)
+        how = "updated" if event["updated"] else "cache hit" if event["hit"] else (
+            "new mirror, sharing objects with " + event["fork_of"] if event["fork_of"] else "new mirror")
+        saved = f", saved ~{event['saved_s']:.0f}s" if event["saved_s"] else ""
+        print(f"Cloned {args.url} into {args.dest} in {event['elapsed_s']:.1f}s ({how}{saved}).")
+    elif args.cmd == "list":
+        index = cache._index()
+        total = sum(e.get("size_mb", 0) for e in index.values())
+        print(f"{BOLD}{len(index)} mirrors, {total:.0f} of {cache.max_mb} MB{RESET}")
+        for url, e in sorted(index.items(), key=lambda item: -item[1].get("last_used", 0)):
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(e.get("last_used", 0)))
+            fork = f" {DIM}(objects from {e['root']}){RESET}" if e.get("root") else ""
+            print(f"  {e.get('size_mb', 0):>8.1f} MB  {used}  clone {e.get('clone_s', 0):>6.1f}s  {url}{fork}")
+    elif args.cmd == "evict":
+        for url in cache.evict():
+            print(f"evicted {url}")
+    elif args.cmd == "stats":
+        print(session_summary(args.since, args.events) or "No checkouts recorded.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# governor.py — Predictive in-round budget and turn governor
+"""
+``MAX_BUDGET_USD`` and ``MAX_TURNS`` are otherwise checked only after the
+round's ``ResultMessage``, when the money is already spent. ``BudgetGovernor``
+follows the round as it runs:
+
+- **running cost**: the ``CostTracker`` list-price estimate of the usage seen so
+  far (costs.py). Subagents are counted as their messages and Task results
+  arrive.
+- **turns**: distinct main-agent responses.
+- **forecast**: the running burn rate, extrapolated to the p90 duration of
+  earlier rounds of the same skill (from the warehouse). Without enough
+  history, or in the first tenth of that duration, the forecast is the
+  running value.
+
+It returns decisions for the orchestrator to act on, and does no IO itself:
+
+- ``warn``: running cost or turns crossed a ``L7_BUDGET_WARN`` fraction of the
+  limit (default 50% and 80%), or the forecast first exceeds the limit
+- ``downgrade``: the forecast exceeds the budget and the round is past
+  ``L7_BUDGET_DOWNGRADE_AT`` (default 60%). The main agent switches to
+  ``L7_BUDGET_DOWNGRADE_MODEL`` (default haiku) for the rest of the round.
+- ``stop``: running cost or turns reached ``L7_BUDGET_STOP`` of the limit
+  (default 90%; 0 disables). The round is interrupted, and the usual limit
+  prompt asks whether to continue.
+
+``L7_GOVERNOR=1`` turns it on.
+"""
+import time
+
+MIN_HISTORY_ROUNDS = 3  # fewer earlier rounds than this: no forecast
+FORECAST_AFTER = 0.1  # forecast once this share of the expected (p90) duration has passed
+
+
+def _fractions(text: str) -> tuple[float, ...]:
+    return tuple(sorted(float(part) for part in text.split(",") if part.strip()))
+
+
+class BudgetGovernor:
+    """Tracks a round's spend and turns against the limits and decides when to act."""
+
+    def __init__(self, max_cost: float, max_turns: int, warn_at: str | tuple = (0.5, 0.8),
+                 stop_at: float = 0.9, downgrade_at: float = 0.6, downgrade_model: str | None = "haiku",
+                 profile_fn=None, clock=time.time):
+        self.max_cost = max_cost
+        self.max_turns = max_turns
+        self.warn_at = _fractions(warn_at) if isinstance(warn_at, str) else tuple(sorted(warn_at))
+        self.stop_at = stop_at
+        self.downgrade_at = downgrade_at
+        self.downgrade_model = downgrade_model or None
+        self.profile_fn = profile_fn  # skill (or None) -> historical profile dict, e.g. Warehouse.profile
+        self.clock = clock
+        self._profiles: dict[str | None, dict | None] = {}
+        self.begin_round()
+
+    def begin_round(self) -> None:
+        self.started = self.clock()
+        self.skill: str | None = None
+        self.profile = self._profile(None)
+        self.turn_ids: set[str] = set()
+        self.cost = 0.0
+        self.warned: set[tuple] = set()
+        self.downgraded: str | None = None
+        self.stopped: str | None = None  # "budget" or "turns" once the governor interrupted
+
+    def _profile(self, skill: str | None) -> dict | None:
+        if skill not in self._profiles:
+            try:
+                self._profiles[skill] = self.profile_fn(skill) if self.profile_fn else None
+            except Exception:
+                self._profiles[skill] = None
+        profile = self._profiles[skill]
+        return profile if profile and profile.get("rounds", 0) >= MIN_HISTORY_ROUNDS else None
+
+    @property
+    def turns(self) -> int:
+        return len(self.turn_ids)
+
+    def observe_message(self, message) -> None:
+        """Count main-agent turns; switch to the skill's profile once a Skill is invoked."""
+        if type(message).__name__ != "AssistantMessage":
+            return
+        if message.parent_tool_use_id is None and message.message_id:
+            self.turn_ids.add(message.message_id)
+        if self.skill is None:
+            for block in message.content:
+                if getattr(block, "name", None) == "Skill":
+                    self.skill = (block.input or {}).get("skill")
+                    self.profile = self._profile(self.skill) or self.profile
+                    break
+
+    def forecast(self, cost: float, turns: int, now: float | None = None) -> tuple[float, float]:
+        """Projected (cost, turns) at the end of the round."""
+        elapsed = (self.clock() if now is None else now) - self.started
+        expected = (self.profile or {}).get("p90_elapsed_s") or 0.0
+        if elapsed < FORECAST_AFTER * expected or elapsed <= 0:
+            return cost, turns  # too early for the burn rate to mean much
+        remaining = max(0.0, expected - elapsed)
+        return cost + cost / elapsed * remaining, turns + turns / elapsed * remaining
+
+    def check(self, cost: float, now: float | None = None) -> list[tuple[str, str]]:
+        """Decisions for the current running cost: [(kind, detail)], kind in warn/downgrade/stop."""
+        if self.stopped:
+            return []
+        self.cost = cost
+        turns = self.turns
+        cost_fc, turns_fc = self.forecast(cost, turns, now)
+        decisions = []
+        for name, used, limit, projected, fmt in (
+            ("budget", cost, self.max_cost, cost_fc, lambda v: f"${v:.2f}"),
+            ("turns", turns, self.max_turns, turns_fc, lambda v: f"{v:.0f} turns"),
+        ):
+            if not limit:
+                continue
+            share = used / limit
+            outlook = f", projected {fmt(projected)}" if projected > used else ""
+            if self.stop_at and share >= self.stop_at:
+                self.stopped = name
+                decisions.append(("stop", f"{name} at {share:.0%} ({fmt(used)} of {fmt(limit)}){outlook}"))
+                return decisions
+            for threshold in self.warn_at:
+                if share >= threshold and (name, threshold) not in self.warned:
+                    self.warned.add((name, threshold))
+                    decisions.append(("warn", f"{name} {share:.0%} used ({fmt(used)} of {fmt(limit)}){outlook}"))
+            if projected > limit and (name, "forecast") not in self.warned:
+                self.warned.add((name, "forecast"))
+                basis = f"{self.skill or 'all'} rounds, p90 {(self.profile or {}).get('p90_elapsed_s', 0):.0f}s"
+                decisions.append(("warn", f"{name} projected to reach {fmt(projected)} of {fmt(limit)} ({basis})"))
+            if (name == "budget" and projected > limit and share >= self.downgrade_at
+                    and self.downgrade_model and not self.downgraded):
+                self.downgraded = self.downgrade_model
+                decisions.append(("downgrade", self.downgrade_model))
+        return decisions
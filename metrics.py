@@ -0,0 +1,230 @@
+# metrics.py — Prometheus-format counters, gauges and histograms for the orchestrator
+"""
+A small metrics registry for the orchestrator. The hooks, ``display_result``
+and the watchdog update the module-level metrics below. An update is a dict
+lookup plus an in-place list add, so it costs well under a microsecond
+(``python -m benchmarks.metrics_overhead``). Metrics are always updated;
+exposing them is opt-in:
+
+- ``L7_METRICS_PORT`` / ``--metrics-port``: serve ``/metrics`` on 127.0.0.1.
+- ``L7_METRICS_FILE`` / ``--metrics-file``: rewrite a node_exporter
+  textfile-collector ``.prom`` file every ``L7_METRICS_INTERVAL`` seconds.
+
+Labels are passed positionally in ``labelnames`` order, e.g.
+``TOOL_DURATION.observe(3.2, "WebFetch", "web_researcher")``. Updates happen
+on the event-loop thread; a scrape from the server thread only reads.
+"""
+import asyncio
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_INTERVAL_S = 15.0
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ── Metric types ─────────────────────────────────────────
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, list] = {}
+        (REGISTRY if registry is None else registry).register(self)
+        if not self.labelnames:
+            self._children[()] = self._new_child()  # export unlabelled metrics at zero
+
+    def _new_child(self) -> list:
+        return [0]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, child in sorted(self._children.items()):
+            lines.extend(self._samples(labels, child))
+        return lines
+
+    def _samples(self, labels: tuple, child: list) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(child[0])}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing total."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = [0]
+        child[0] += amount
+
+    def value(self, *labels) -> float:
+        return self._children.get(labels, [0])[0]
+
+
+class Gauge(Counter):
+    """A value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        child = self._children.get(labels)
+        if child is None:
+            self._children[labels] = [value]
+        else:
+            child[0] = value
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Bucketed observations. Each child is [per-bucket counts..., +Inf count, sum]."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = (), registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self) -> list:
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, *labels) -> None:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = self._new_child()
+        child[bisect_left(self.buckets, value)] += 1
+        child[-1] += value
+
+    def count(self, *labels) -> int:
+        child = self._children.get(labels)
+        return sum(child[:-1]) if child else 0
+
+    def _samples(self, labels: tuple, child: list) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), child[:-1]):
+            cumulative += n
+            le = _labels(self.labelnames, labels, f'le="{_number(float(bound))}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        base = _labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{base} {_number(child[-1])}")
+        lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        """The whole registry in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ── Orchestrator metrics ─────────────────────────────────
+
+TOOL_DURATION = Histogram(
+    "l7_tool_duration_seconds", "Tool call duration from PreToolUse to PostToolUse.",
+    ("tool", "agent"), buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60, 120, 300, 600))
+TOOLS_IN_FLIGHT = Gauge("l7_tools_in_flight", "Tool calls started and not yet completed.")
+TTFT = Histogram(
+    "l7_ttft_seconds", "Time to first streamed token of a model response (with --stream-stats).",
+    ("agent", "model"), buckets=(0.25, 0.5, 1, 2, 3, 5, 10, 20, 30, 60))
+ROUND_DURATION = Histogram(
+    "l7_round_duration_seconds", "Wall-clock time of a query round.",
+    buckets=(5, 10, 30, 60, 120, 300, 600, 900, 1200, 1800, 3600))
+ROUNDS = Counter("l7_rounds_total", "Query rounds completed.")
+COST_USD = Counter("l7_cost_usd_total", "API cost reported by the CLI, in USD.")
+AGENT_COST_USD = Counter("l7_agent_cost_usd_total", "API cost attributed to each agent and model, in USD.",
+                         ("agent", "model"))
+AGENT_TOKENS = Counter("l7_agent_tokens_total", "Tokens attributed to each agent and model, by token type.",
+                       ("agent", "model", "type"))
+TURNS = Counter("l7_turns_total", "Agent turns reported by the CLI.")
+GOVERNOR_ACTIONS = Counter("l7_governor_actions_total", "Budget governor warnings, downgrades and stops.",
+                           ("action",))
+ROUTE_DECISIONS = Counter("l7_route_decisions_total", "Subagent model routing decisions.",
+                          ("subagent", "model", "kind"))
+BREADTH_DENIALS = Counter("l7_breadth_denials_total", "Tool calls denied by the execution profile's limits.",
+                          ("profile", "limit", "tool"))
+BASH_LIMIT_KILLS = Counter("l7_bash_limit_kills_total", "Limited Bash commands killed, by the limit they hit.",
+                           ("limit",))
+BASH_CPU_SECONDS = Counter("l7_bash_cpu_seconds_total", "CPU seconds used by limited Bash commands.", ("agent",))
+CODE_INDEX_QUERIES = Counter("l7_code_index_queries_total", "Code index tool queries, by whether the index was built.",
+                             ("query", "index"))
+WATCHDOG_INTERRUPTS = Counter("l7_watchdog_interrupts_total", "Stalled operations the watchdog interrupted.")
+CRASH_RETRIES = Counter("l7_crash_retries_total", "CLI crashes recovered by resuming the session.")
+
+
+# ── Exposition ───────────────────────────────────────────
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` on a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    """Atomically rewrite a textfile-collector file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp, path)
+
+
+async def textfile_writer(path: str, interval: float = DEFAULT_INTERVAL_S,
+                          registry: Registry = REGISTRY) -> None:
+    """Rewrite ``path`` every ``interval`` seconds until cancelled, then once more."""
+    try:
+        while True:
+            write_textfile(path, registry)
+            await asyncio.sleep(interval)
+    finally:
+        write_textfile(path, registry)
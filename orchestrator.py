@@ -0,0 +1,1180 @@
+"""L7 Agent orchestrator library — options, agents, hooks, watchdog and the REPL loop.
+
+Importing this module has no side effects: it does not parse argv, read
+``.env`` or start a session, and the Claude Agent SDK is imported only when a
+session is built. ``agent.py`` is the thin CLI on top; tests, servers and batch
+runners can import ``main`` or the builders directly.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from utils import (
+    StreamRenderer, display_message, display_result, write_stream_log_header,
+    track_tool_start, mark_tool_complete, get_pending_tools_summary, SUBAGENT_TOOLS,
+)
+from repl import AsyncLineReader, InterruptController
+import metrics
+from failover import FailoverManager
+from recorder import SessionRecorder
+from tracing import TRACES_DIR, Tracer
+from stream_stats import StreamStats
+from dashboard import Dashboard
+from costs import TOKEN_FIELDS, CostTracker, by_agent, usage_entries
+import prompt_cache
+from governor import BudgetGovernor
+from routing import ModelRouter, family, route_entry, task_outcome
+import profiles
+from profiles import BreadthLimiter, get_profile, parse_command, tool_allowed
+import bash_limits
+import git_cache
+
+if TYPE_CHECKING:
+    from claude_agent_sdk import ClaudeSDKClient
+    from code_index import CodeIndexService
+    from warehouse import Warehouse
+
+# ── Debug Mode ───────────────────────────────────────────
+DEBUG_MODE = os.environ.get("L7_DEBUG", "").lower() in ("1", "true")
+RECORD_MODE = os.environ.get("L7_RECORD", "").lower() in ("1", "true")
+TRACE_MODE = os.environ.get("L7_TRACE", "").lower() in ("1", "true")
+STREAM_STATS_MODE = os.environ.get("L7_STREAM_STATS", "").lower() in ("1", "true")
+DASHBOARD_MODE = os.environ.get("L7_DASHBOARD", "").lower() in ("1", "true")
+# Progressive text rendering: on/off, or None to follow whether stdout is a terminal
+STREAM_RENDER_MODE = {"1": True, "true": True, "0": False, "false": False}.get(
+    os.environ.get("L7_STREAM_RENDER", "").lower())
+WAREHOUSE_MODE = os.environ.get("L7_WAREHOUSE", "").lower() in ("1", "true")
+PREFIX_CHECK_MODE = os.environ.get("L7_PREFIX_CHECK", "1").lower() not in ("0", "false")
+GOVERNOR_MODE = os.environ.get("L7_GOVERNOR", "").lower() in ("1", "true")
+BUDGET_WARN = os.environ.get("L7_BUDGET_WARN", "0.5,0.8")  # fractions of the limits to warn at
+BUDGET_STOP = float(os.environ.get("L7_BUDGET_STOP", "0.9"))
+BUDGET_DOWNGRADE_AT = float(os.environ.get("L7_BUDGET_DOWNGRADE_AT", "0.6"))
+BUDGET_DOWNGRADE_MODEL = os.environ.get("L7_BUDGET_DOWNGRADE_MODEL", "haiku")
+ROUTE_MODE = os.environ.get("L7_ROUTE", "").lower() in ("1", "true")
+ROUTE_DEGRADE_AT = float(os.environ.get("L7_ROUTE_DEGRADE_AT", "0.7"))
+PROFILE = os.environ.get("L7_PROFILE", "standard")
+SUFFICIENCY_MODE = os.environ.get("L7_SUFFICIENCY", "").lower() in ("1", "true")
+# Sufficiency overrides for every profile (unset: the profile's own)
+SUFFICIENCY_OVERRIDES = {key: int(os.environ[var]) for key, var in
+                   (("domains", "L7_SUFFICIENT_DOMAINS"), ("kb", "L7_SUFFICIENT_KB")) if os.environ.get(var)}
+BASH_LIMITS_MODE = os.environ.get("L7_BASH_LIMITS", "").lower() in ("1", "true")
+BASH_LIMITED_AGENTS = os.environ.get("L7_BASH_LIMIT_AGENTS", "repo_analyzer").split(",")
+BASH_LIMITS = {key: float(os.environ.get(f"L7_BASH_{key.upper()}", default))
+               for key, default in bash_limits.DEFAULT_LIMITS.items()}
+GIT_CACHE_MODE = os.environ.get("L7_GIT_CACHE", "").lower() in ("1", "true")
+CODE_INDEX_MODE = os.environ.get("L7_CODE_INDEX", "").lower() in ("1", "true")
+METRICS_PORT = int(os.environ.get("L7_METRICS_PORT", "0") or 0)
+METRICS_FILE = os.environ.get("L7_METRICS_FILE", "")
+METRICS_INTERVAL_S = float(os.environ.get("L7_METRICS_INTERVAL", metrics.DEFAULT_INTERVAL_S))
+
+PROMPTS_DIR = "prompts"
+CODE_INDEX_TOOL = "mcp__code_index__query"
+OUTPUT_DIR = "research_output"
+MAX_RETRIES = 3
+# Set from the active execution profile by apply_profile() (see profiles.py)
+_standard = get_profile(None)
+MAIN_MODEL = _standard["main_model"]
+MAX_TURNS = _standard["max_turns"]
+MAX_BUDGET_USD = _standard["max_budget_usd"]
+ALLOWED_TOOLS = _standard["allowed_tools"]
+# Models each subagent may run on, cheapest first; the first is its default (see routing.py)
+AGENT_MODELS = _standard["agents"]
+ROUTE_DEGRADABLE = ("docs_researcher", "repo_analyzer", "web_researcher")
+SESSION_STATE_FILE = "session_data/session_state.json"
+STREAM_LOG_FILE = "session_data/stream_log.md"
+
+CLI_DEBUG_LOG = "session_data/cli_debug.log"
+SDK_LOG_FILE = "session_data/sdk.log"
+
+BOLD = "\033[1m"
+CYAN = "\033[36m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+# ── Operational Logging State ────────────────────────────
+tool_start_times: dict[str, float] = {}
+activity_state = {"last_activity": 0.0, "last_tool": "none", "last_tool_id": "", "interrupted": False}
+
+# Session recorder (set by main() when RECORD_MODE is on)
+recorder: SessionRecorder | None = None
+# Span tracer (set by main() when TRACE_MODE is on)
+tracer: Tracer | None = None
+# Streaming latency stats (set by main() when STREAM_STATS_MODE is on)
+stream_stats: StreamStats | None = None
+# Progressive renderer for streamed text (set by main() when rendering is on)
+renderer: StreamRenderer | None = None
+# Full-screen round dashboard (set by main() when DASHBOARD_MODE is on and stdout is a terminal)
+dashboard: Dashboard | None = None
+# Run-history warehouse (set by main() when L7_WAREHOUSE=1)
+warehouse: Warehouse | None = None
+
+# Per-agent token and cost attribution (always on; reset each round)
+cost_tracker = CostTracker()
+
+# In-round budget and turn governor (set by main() when L7_GOVERNOR=1)
+governor: BudgetGovernor | None = None
+# Subagent model router (set by main() when L7_ROUTE=1)
+router: ModelRouter | None = None
+# Active execution profile (set by apply_profile())
+profile: dict = _standard
+# Breadth limits of the active profile (reset each round)
+breadth = BreadthLimiter(_standard["breadth"])
+# Symbol indexes of analyzed repositories, served to repo_analyzer (set by main() when L7_CODE_INDEX=1)
+code_indexes: CodeIndexService | None = None
+# Static prompt prefix, fingerprinted at the first init message (set by main() unless L7_PREFIX_CHECK=0)
+prefix_components: dict[str, str] | None = None
+
+# Wall-clock (time.time()) marks for the startup benchmark
+startup_marks: dict[str, float] = {}
+
+
+def mark_startup(name: str) -> None:
+    """Record the first time a startup milestone is reached."""
+    startup_marks.setdefault(name, time.time())
+
+def handle_stderr(line: str) -> None:
+    """Append CLI stderr output to debug log file (and console in debug mode)."""
+    try:
+        with open(CLI_DEBUG_LOG, "a", encoding="utf-8") as f:
+            f.write(f"[{datetime.now().strftime('%H:%M:%S')}] {line}\n")
+    except Exception:
+        pass
+    if DEBUG_MODE:
+        print(f"{DIM}[DEBUG] {line}{RESET}")
+
+
+@lru_cache(maxsize=None)
+def load_prompt(filename: str) -> str:
+    """Load a prompt from the prompts directory (read once per process)."""
+    prompt_path = f"{PROMPTS_DIR}/{filename}"
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+# ── Recording ────────────────────────────────────────────
+
+# Settings the hooks depend on: recorded at session start, restored by replay.py
+SESSION_SETTINGS = {
+    "sufficiency": "SUFFICIENCY_MODE",
+    "sufficiency_overrides": "SUFFICIENCY_OVERRIDES",
+    "route": "ROUTE_MODE",
+    "route_degrade_at": "ROUTE_DEGRADE_AT",
+    "governor": "GOVERNOR_MODE",
+    "git_cache": "GIT_CACHE_MODE",
+    "bash_limits": "BASH_LIMITS_MODE",
+    "bash_limited_agents": "BASH_LIMITED_AGENTS",
+    "bash_limit_values": "BASH_LIMITS",
+}
+# Recorded lookup answers while replay.py replays a session (see local_lookup)
+replayed_lookups = None
+
+
+def session_settings() -> dict:
+    """The active profile and hook settings, for the recording's ``session`` marker."""
+    return {"profile": profile["name"],
+            **{key: globals()[name] for key, name in SESSION_SETTINGS.items()}}
+
+
+def local_lookup(kind: str, key, fn):
+    """Answer a hook's lookup of local state (run history, the git mirror cache).
+
+    The answer is recorded, and a replay gets the recorded answer instead of
+    asking its own machine, so replayed hooks decide as the recorded ones did.
+    """
+    if replayed_lookups is not None:
+        return replayed_lookups.get(kind, key)
+    value = fn()
+    if recorder:
+        recorder.record_marker("lookup", lookup=kind, key=key, value=value)
+    return value
+
+
+# ── Session Persistence ──────────────────────────────────
+
+def save_session_state(round_state: dict, last_query: str) -> None:
+    """Persist session_id and round_state to disk after each round."""
+    os.makedirs("session_data", exist_ok=True)
+    state = {
+        "session_id": round_state.get("session_id"),
+        "round_state": round_state,
+        "last_query": last_query,
+        "timestamp": datetime.now().isoformat(),
+    }
+    with open(SESSION_STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def load_session_state() -> dict | None:
+    """Load saved session state from disk, or return None."""
+    if os.path.exists(SESSION_STATE_FILE):
+        with open(SESSION_STATE_FILE, "r") as f:
+            return json.load(f)
+    return None
+
+
+def clear_session_state() -> None:
+    """Remove the session state file on clean exit."""
+    if os.path.exists(SESSION_STATE_FILE):
+        os.remove(SESSION_STATE_FILE)
+
+
+def make_options(system_prompt, agents, hooks, resume=None):
+    """Build ClaudeAgentOptions, optionally resuming a previous session."""
+    from claude_agent_sdk import ClaudeAgentOptions
+
+    return ClaudeAgentOptions(
+        system_prompt=system_prompt,
+        setting_sources=["user", "project"],
+        # Session-wide permissions, subagents included: the profile's narrower set
+        # for the orchestrator is enforced by limit_breadth instead
+        allowed_tools=list(profiles.ALL_TOOLS) + ([CODE_INDEX_TOOL] if CODE_INDEX_MODE else []),
+        mcp_servers={"code_index": build_code_index_server()} if CODE_INDEX_MODE else {},
+        model=MAIN_MODEL,
+        agents=agents,
+        permission_mode="acceptEdits",
+        max_turns=MAX_TURNS,
+        max_budget_usd=MAX_BUDGET_USD,
+        resume=resume,
+        hooks=hooks,
+        stderr=handle_stderr,
+        debug_stderr=None,
+        extra_args={"debug-to-stderr": None} if DEBUG_MODE else {},
+        include_partial_messages=STREAM_STATS_MODE or renderer is not None or dashboard is not None,
+    )
+
+
+def begin_round(round_state: dict, query: str) -> None:
+    """Advance the round counter and stamp its start time."""
+    round_state["round"] += 1
+    round_state["start_time"] = time.time()
+    round_state["profile"] = profile["name"]
+    cost_tracker.begin_round()
+    breadth.begin_round()
+    if governor:
+        governor.begin_round()
+    if recorder:
+        recorder.record_marker("round_start", round=round_state["round"], query=query,
+                               profile=profile["name"])
+    if tracer:
+        tracer.begin_round(round_state["round"], query)
+    if stream_stats:
+        stream_stats.begin_round()
+    if dashboard:
+        dashboard.start(round_state["round"], query, round_state.get("prev_cost"))
+
+
+def update_round_state(message, round_state: dict, now: float | None = None) -> None:
+    """Fold a ResultMessage into round_state as per-round deltas.
+
+    Sets round_elapsed/round_turns/round_cost and session_id, then advances the
+    prev_* baselines so the next round's deltas start from this result.
+    """
+    round_elapsed = (time.time() if now is None else now) - round_state["start_time"]
+    round_state["total_elapsed"] += round_elapsed
+    round_state["round_elapsed"] = round_elapsed
+
+    num_turns = getattr(message, 'num_turns', None)
+    total_cost = getattr(message, 'total_cost_usd', None)
+    round_state["round_turns"] = num_turns - round_state["prev_turns"] if num_turns is not None else 0
+    round_state["round_cost"] = total_cost - round_state["prev_cost"] if total_cost is not None else 0.0
+    round_state["session_id"] = getattr(message, 'session_id', None)
+
+    if num_turns is not None:
+        round_state["prev_turns"] = num_turns
+    if total_cost is not None:
+        round_state["prev_cost"] = total_cost
+
+
+# ── Safety Hooks ──────────────────────────────────────────
+
+audit_log: list[dict] = []
+
+
+async def audit_tool_calls(input_data: dict, tool_use_id: str, context) -> dict:
+    """Record every tool call for the session summary."""
+    tool_name = input_data.get("tool_name", "unknown")
+    # Subagent tool calls carry agent_id/agent_type; the orchestrator's own don't
+    agent = input_data.get("agent_type") or "Main"
+    tool_input = input_data.get("tool_input", {}) or {}
+    audit_log.append({
+        "timestamp": time.time(),
+        "tool_use_id": tool_use_id,
+        "tool": tool_name,
+        "agent": agent,
+        "agent_id": input_data.get("agent_id"),
+        "input_preview": str(tool_input)[:80],
+    })
+    # Keep the fields the warehouse groups by, which the preview may truncate
+    if tool_name == "Skill":
+        audit_log[-1]["skill"] = tool_input.get("skill")
+    elif "subagent_type" in tool_input:
+        audit_log[-1]["subagent_type"] = tool_input.get("subagent_type")
+        audit_log[-1]["description"] = tool_input.get("description")
+    elif tool_name == "Write":
+        audit_log[-1]["file_path"] = tool_input.get("file_path")
+    if tool_use_id:
+        tool_start_times[tool_use_id] = time.time()
+        metrics.TOOLS_IN_FLIGHT.set(len(tool_start_times))
+        track_tool_start(tool_use_id, tool_name, agent)
+    if tracer:
+        tracer.tool_start(tool_use_id, tool_name, input_data.get("tool_input", {}),
+                          input_data.get("agent_id"), input_data.get("agent_type"))
+    if dashboard:
+        dashboard.tool_start(tool_use_id, tool_name, agent, tool_input)
+    activity_state["last_tool"] = tool_name
+    activity_state["last_tool_id"] = tool_use_id or ""
+    return {}
+
+
+async def restrict_writes(input_data: dict, tool_use_id: str, context) -> dict:
+    """Only allow Write to paths under research_output/."""
+    if input_data.get("tool_name") == "Write":
+        path = input_data.get("tool_input", {}).get("file_path", "")
+        # The CLI hands hooks absolute paths; resolve both sides so
+        # "research_output/../x" and symlinks can't escape the folder
+        root = os.path.realpath(OUTPUT_DIR)
+        if path and os.path.commonpath([root, os.path.realpath(path)]) != root:
+            return {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "deny",
+                    "permissionDecisionReason": (
+                        f"Writes restricted to research_output/. "
+                        f"Attempted path: {path}"
+                    ),
+                }
+            }
+    return {}
+
+
+async def route_subagents(input_data: dict, tool_use_id: str, context) -> dict:
+    """Pick the model for a subagent Task (routing.py) and audit the decision."""
+    if router is None:
+        return {}
+    tool_input = dict(input_data.get("tool_input") or {})
+    subagent_type = tool_input.get("subagent_type", "")
+    default = router.defaults.get(subagent_type)
+    spent = cost_tracker.estimated_cost() / MAX_BUDGET_USD if MAX_BUDGET_USD else 0.0
+    skill = governor.skill if governor else None
+    model, kind, reason = router.route(subagent_type, tool_input.get("model"), skill, spent)
+    audit_log.append(route_entry(tool_use_id, subagent_type, model, default, kind, reason,
+                                 skill, spent, time.time()))
+    metrics.ROUTE_DECISIONS.inc(subagent_type, family(model or default), kind)
+    if not model or model == tool_input.get("model"):
+        return {}
+    # Set even when it is the default: after a /profile switch the session's
+    # AgentDefinitions still carry the models of the profile it started with
+    if family(model) != family(default):
+        print(f"{DIM}  \u21aa {subagent_type} \u2192 {model} ({kind}: {reason}){RESET}")
+    tool_input["model"] = model
+    return {
+        "hookSpecificOutput": {
+            "hookEventName": "PreToolUse",
+            "permissionDecision": "allow",
+            "updatedInput": tool_input,
+        }
+    }
+
+
+async def prepare_bash(input_data: dict, tool_use_id: str, context) -> dict:
+    """Serve git clones from the mirror cache (git_cache.py) and run limited agents' commands
+    under bash_limits.py: wall-clock, CPU, memory, file and output caps."""
+    agent = input_data.get("agent_type") or "Main"
+    tool_input = dict(input_data.get("tool_input") or {})
+    command = tool_input.get("command")
+    if not command:
+        return {}
+    if GIT_CACHE_MODE:
+        events_path = os.path.abspath(git_cache.EVENTS_FILE)
+        command = local_lookup("clone", command,
+                               lambda: git_cache.rewrite_clone(command, events_path=events_path)) or command
+    if BASH_LIMITS_MODE and agent in BASH_LIMITED_AGENTS:
+        wrapped = bash_limits.wrap(command, BASH_LIMITS, bash_usage_path(tool_use_id))
+        if wrapped:
+            command = wrapped
+            # The Bash tool's own timeout (ms, at most 10 min) has to outlast the runner's
+            timeout = int((BASH_LIMITS["wall_s"] + 15) * 1000)
+            tool_input["timeout"] = min(600_000, max(tool_input.get("timeout") or 0, timeout))
+    if command == tool_input["command"]:
+        return {}
+    tool_input["command"] = command
+    return {
+        "hookSpecificOutput": {
+            "hookEventName": "PreToolUse",
+            "permissionDecision": "allow",
+            "updatedInput": tool_input,
+        }
+    }
+
+
+def bash_usage_path(tool_use_id: str) -> str:
+    return os.path.join(bash_limits.USAGE_DIR, f"{tool_use_id}.json")
+
+
+def record_bash_usage(tool_use_id: str, entry: dict | None) -> None:
+    """Move a limited Bash command's resource usage into its audit entry."""
+    usage = bash_limits.read_usage(bash_usage_path(tool_use_id))
+    if not usage:
+        return
+    if entry is not None:
+        entry["resources"] = usage
+    metrics.BASH_CPU_SECONDS.inc((entry or {}).get("agent", "?"), amount=usage["cpu_s"])
+    if usage["killed"]:
+        metrics.BASH_LIMIT_KILLS.inc(usage["killed"])
+        if renderer:
+            renderer.end_line()
+        print(f"{YELLOW}  \u26a0 Bash killed at its {usage['killed']} limit "
+              f"({usage['wall_s']:.0f}s, {usage['cpu_s']:.0f}s CPU, {usage['max_rss_mb']:.0f} MB){RESET}")
+
+
+def index_checkouts(since: float) -> None:
+    """Start indexing the repositories the git cache checked out since ``since``, so
+    repo_analyzer's first code index query finds the index ready or under way."""
+    for event in git_cache.session_events(since, os.path.abspath(git_cache.EVENTS_FILE)):
+        if event.get("dest") and os.path.isdir(event["dest"]):
+            code_indexes.prebuild(event["dest"])
+
+
+async def limit_breadth(input_data: dict, tool_use_id: str, context) -> dict:
+    """Deny calls outside the active profile's tools or over its breadth limits (profiles.py)."""
+    tool_name = input_data.get("tool_name", "")
+    agent_id = input_data.get("agent_id")
+    if agent_id is None and not tool_allowed(tool_name, ALLOWED_TOOLS):
+        denied = "tools", f"{tool_name} is not available in the '{profile['name']}' profile."
+    else:
+        denied = breadth.check(tool_name, agent_id, tool_name in SUBAGENT_TOOLS)
+    if not denied:
+        return {}
+    limit, reason = denied
+    audit_log.append({"timestamp": time.time(), "event": "breadth_denied", "tool_use_id": tool_use_id,
+                      "tool": tool_name, "agent": input_data.get("agent_type") or "Main",
+                      "limit": limit, "profile": profile["name"]})
+    metrics.BREADTH_DENIALS.inc(profile["name"], limit, tool_name)
+    # audit_tool_calls ran alongside and registered the call as started, but it never runs
+    if tool_use_id:
+        tool_start_times.pop(tool_use_id, None)
+        metrics.TOOLS_IN_FLIGHT.set(len(tool_start_times))
+        mark_tool_complete(tool_use_id)
+    if tracer:
+        tracer.drop_tool(tool_use_id)
+    if dashboard:
+        dashboard.tool_end(tool_use_id)
+    print(f"{DIM}  \u2298 {tool_name} denied: {reason}{RESET}")
+    return {
+        "hookSpecificOutput": {
+            "hookEventName": "PreToolUse",
+            "permissionDecision": "deny",
+            "permissionDecisionReason": reason,
+        }
+    }
+
+
+async def log_tool_completion(input_data: dict, tool_use_id: str, context) -> dict:
+    """Log tool completion with execution duration."""
+    tool_name = input_data.get("tool_name", "unknown")
+    elapsed = 0.0
+    started = tool_use_id and tool_use_id in tool_start_times
+    if started:
+        elapsed = time.time() - tool_start_times.pop(tool_use_id)
+        metrics.TOOLS_IN_FLIGHT.set(len(tool_start_times))
+
+    # Update the matching audit log entry with duration
+    agent = "Main"
+    for entry in reversed(audit_log):
+        if entry.get("tool_use_id") == tool_use_id and "event" not in entry:
+            entry["duration_s"] = round(elapsed, 1)
+            agent = entry["agent"]
+            if tool_name in SUBAGENT_TOOLS:
+                entry.update(task_outcome(input_data.get("tool_response"), audit_log))
+            break
+    else:
+        entry = None
+    if tool_name == "Bash":
+        record_bash_usage(tool_use_id, entry)
+        if code_indexes and GIT_CACHE_MODE and started:
+            index_checkouts(time.time() - elapsed)
+    if started:
+        metrics.TOOL_DURATION.observe(elapsed, tool_name, agent)
+    breadth.observe_result(tool_name, input_data.get("agent_id"), input_data.get("tool_input"),
+                           input_data.get("tool_response"))
+    if tool_name in SUBAGENT_TOOLS:
+        cost_tracker.observe_task_result(tool_use_id, input_data.get("tool_input"),
+                                         input_data.get("tool_response"))
+
+    # Clear from pending tracker
+    mark_tool_complete(tool_use_id)
+    if tracer:
+        tracer.tool_end(tool_use_id)
+
+    # Display completion timing (the dashboard logs completions itself)
+    if dashboard:
+        dashboard.tool_end(tool_use_id)
+        return {}
+    if renderer:
+        renderer.end_line()
+    if elapsed > 15:
+        print(f"{DIM}  \u26a0 {tool_name} took {elapsed:.1f}s (slow){RESET}")
+    else:
+        print(f"{DIM}  \u2713 {tool_name} completed in {elapsed:.1f}s{RESET}")
+
+    return {}
+
+
+async def log_tool_failure(input_data: dict, tool_use_id: str, context) -> dict:
+    """Close out a failed tool call: mark its audit entry and clear the in-flight trackers."""
+    tool_name = input_data.get("tool_name", "unknown")
+    started = tool_start_times.pop(tool_use_id, None)
+    metrics.TOOLS_IN_FLIGHT.set(len(tool_start_times))
+    elapsed = time.time() - started if started else 0.0
+    for entry in reversed(audit_log):
+        if entry.get("tool_use_id") == tool_use_id and "event" not in entry:
+            entry["duration_s"] = round(elapsed, 1)
+            entry["status"] = "failed"
+            entry["error"] = str(input_data.get("error", ""))[:200]
+            break
+    else:
+        entry = None
+    if tool_name == "Bash":
+        record_bash_usage(tool_use_id, entry)
+    mark_tool_complete(tool_use_id)
+    if tracer:
+        tracer.tool_end(tool_use_id)
+    if dashboard:
+        dashboard.tool_end(tool_use_id)
+        return {}
+    if renderer:
+        renderer.end_line()
+    if not input_data.get("is_interrupt"):
+        print(f"{DIM}  \u2717 {tool_name} failed after {elapsed:.1f}s: "
+              f"{str(input_data.get('error', ''))[:120]}{RESET}")
+    return {}
+
+
+def attribute_costs(message, round_state: dict) -> list[dict]:
+    """Split the round's usage by agent into round_state["agent_costs"] and the metrics.
+
+    The previous result's per-model usage is kept in round_state so the
+    deltas survive a resume, like prev_cost.
+    """
+    model_usage = getattr(message, "model_usage", None)
+    rows = cost_tracker.reconcile(model_usage, round_state.get("prev_model_usage"))
+    if model_usage:
+        round_state["prev_model_usage"] = model_usage
+    round_state["agent_costs"] = rows
+    for row in rows:
+        metrics.AGENT_COST_USD.inc(row["agent"], row["model"], amount=row["cost_usd"])
+        for field in TOKEN_FIELDS:
+            metrics.AGENT_TOKENS.inc(row["agent"], row["model"], field, amount=row[field])
+    return rows
+
+
+def check_prefix(init_data: dict) -> None:
+    """Fingerprint the prompt prefix once per process; warn if it changed since the last run."""
+    global prefix_components
+    if prefix_components is None:
+        return
+    components = {**prefix_components, **prompt_cache.init_components(init_data)}
+    prefix_components = None
+    try:
+        changes = prompt_cache.PrefixHistory().record(components)
+    except OSError:
+        return
+    if changes:
+        print(f"{YELLOW}\u26a0 Prompt prefix changed since the last run ({prompt_cache.format_changes(changes)}): "
+              f"the first turns will rewrite the prompt cache. "
+              f"See: python prompt_cache.py history --diff{RESET}")
+
+
+async def apply_governor(client: ClaudeSDKClient, decisions: list[tuple[str, str]]) -> None:
+    """Carry out the budget governor's warn/downgrade/stop decisions."""
+    for kind, detail in decisions:
+        metrics.GOVERNOR_ACTIONS.inc(kind)
+        if renderer:
+            renderer.end_line()
+        if kind == "warn":
+            print(f"{YELLOW}\u26a0 Governor: {detail}{RESET}")
+            continue
+        try:
+            if kind == "downgrade":
+                print(f"{YELLOW}{BOLD}\u2193 Governor: budget forecast over the limit, "
+                      f"switching Main to {detail} for the rest of this round.{RESET}")
+                await client.set_model(detail)
+            elif kind == "stop":
+                print(f"\n{YELLOW}{BOLD}\u26a0 Governor: {detail} \u2014 interrupting the round.{RESET}")
+                await client.interrupt()
+        except Exception as e:
+            print(f"{DIM}  Governor {kind} failed: {e}{RESET}")
+
+
+def write_audit_log(entries: list[dict]) -> str | None:
+    """Write audit log entries to a timestamped file. Returns the path or None."""
+    if not entries:
+        return None
+    os.makedirs("research_output", exist_ok=True)
+    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    path = f"research_output/audit_{ts}.log"
+    with open(path, "w") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return path
+
+
+# ── Activity Watchdog ─────────────────────────────────────
+
+WATCHDOG_ABORT_TIMEOUT = _standard["watchdog_abort_s"]  # Auto-interrupt after this long with no activity
+YELLOW = "\033[33m"
+
+
+def watchdog_resume_query() -> str:
+    """The query that continues a round after the watchdog interrupted it (the active profile's timeout)."""
+    return ("Your previous operation was interrupted because "
+            "some tools (likely WebFetch) were stuck for over "
+            f"{WATCHDOG_ABORT_TIMEOUT / 60:g} minutes. Continue your research using the data "
+            "you've already collected. Do not retry the URLs "
+            "that timed out.")
+
+
+async def watchdog(client: ClaudeSDKClient):
+    """Monitor for stalls with escalating warnings and auto-interrupt.
+
+    Warning schedule: 30s, 60s, 120s, 240s, then every 120s.
+    At WATCHDOG_ABORT_TIMEOUT (the active profile's ``watchdog_abort_s``), sends
+    client.interrupt() to abort stuck operations.
+    Resets escalation when activity resumes.
+    """
+    next_warn_elapsed = 30.0   # first warning threshold (seconds of inactivity)
+    current_interval = 30.0    # gap between warnings — doubles each time
+    max_interval = 120.0       # cap on interval growth
+    interrupted = False
+
+    while True:
+        await asyncio.sleep(5)
+        last = activity_state["last_activity"]
+        if last == 0.0:
+            continue
+        elapsed = time.time() - last
+
+        # Activity resumed — reset escalation state
+        if elapsed < 30:
+            next_warn_elapsed = 30.0
+            current_interval = 30.0
+            interrupted = False
+            continue
+
+        # ── Auto-interrupt after abort timeout ───────────
+        if elapsed >= WATCHDOG_ABORT_TIMEOUT and not interrupted:
+            interrupted = True
+            pending = get_pending_tools_summary()
+            print(f"\n{YELLOW}{BOLD}\u26a0 No activity for {elapsed:.0f}s — "
+                  f"auto-interrupting stuck operation.{RESET}")
+            if pending:
+                print(f"{DIM}  Stuck: {pending}{RESET}")
+            try:
+                await client.interrupt()
+                activity_state["interrupted"] = True
+                metrics.WATCHDOG_INTERRUPTS.inc()
+                print(f"{DIM}  Interrupt signal sent — will auto-continue.{RESET}")
+            except Exception as e:
+                print(f"{DIM}  Interrupt failed: {e}{RESET}")
+            continue
+
+        # ── Escalating warnings ──────────────────────────
+        if elapsed >= next_warn_elapsed:
+            pending = get_pending_tools_summary()
+            remaining = max(0, WATCHDOG_ABORT_TIMEOUT - elapsed)
+
+            if pending:
+                print(f"\n{DIM}\u23f3 No activity for {elapsed:.0f}s. "
+                      f"Pending: {pending}")
+            else:
+                last_tool = activity_state["last_tool"]
+                last_id = activity_state["last_tool_id"][:8] if activity_state["last_tool_id"] else "?"
+                print(f"\n{DIM}\u23f3 No activity for {elapsed:.0f}s — "
+                      f"last tool: {last_tool} ({last_id}).")
+            print(f"   Auto-interrupt in {remaining:.0f}s{RESET}")
+
+            # Escalate: double the interval, cap at max_interval
+            current_interval = min(current_interval * 2, max_interval)
+            next_warn_elapsed = elapsed + current_interval
+
+
+# ── Execution Profiles ───────────────────────────────────
+
+def apply_profile(name: str) -> dict:
+    """Make a profile (profiles.py) current: models, limits, tools and breadth.
+
+    Before main() it shapes the whole session. During one, the next query
+    runs under it. The main model switches through ``set_model`` and the
+    subagent models through the router. The CLI keeps the turn and budget
+    caps it was started with, so a profile with higher limits is best picked
+    at startup.
+    """
+    global profile, MAIN_MODEL, MAX_TURNS, MAX_BUDGET_USD, ALLOWED_TOOLS, AGENT_MODELS, WATCHDOG_ABORT_TIMEOUT
+    profile = get_profile(name)
+    MAIN_MODEL = profile["main_model"]
+    MAX_TURNS = profile["max_turns"]
+    MAX_BUDGET_USD = profile["max_budget_usd"]
+    ALLOWED_TOOLS = profile["allowed_tools"]
+    AGENT_MODELS = profile["agents"]
+    WATCHDOG_ABORT_TIMEOUT = profile["watchdog_abort_s"]
+    breadth.limits = {**profile["breadth"], **SUFFICIENCY_OVERRIDES}
+    breadth.sufficiency = SUFFICIENCY_MODE
+    if governor:
+        governor.max_cost, governor.max_turns = MAX_BUDGET_USD, MAX_TURNS
+    if router:
+        router.defaults = {name: models[0] for name, models in AGENT_MODELS.items()}
+        router.candidates = AGENT_MODELS
+    return profile
+
+
+# ── Session Builders ─────────────────────────────────────
+
+def build_agents() -> dict:
+    """Build the subagent definitions, loading their prompts on first use."""
+    from claude_agent_sdk import AgentDefinition
+
+    return {
+        "docs_researcher" : AgentDefinition(
+            description="Finds and extracts information from official documentation sources.",
+            prompt = load_prompt("docs_researcher.md"),
+            tools = ["WebSearch", "WebFetch"],
+            model = AGENT_MODELS["docs_researcher"][0]
+        ),
+        "repo_analyzer" : AgentDefinition(
+            description="Analyzes code repositories for structure, examples, and implementation details.",
+            prompt = load_prompt("repo_analyzer.md") + ("\n\n" + load_prompt("code_index.md") if CODE_INDEX_MODE else ""),
+            tools = ["WebSearch","Bash"] + ([CODE_INDEX_TOOL] if CODE_INDEX_MODE else []),
+            model = AGENT_MODELS["repo_analyzer"][0]
+        ),
+        "web_researcher" : AgentDefinition(
+            description="Finds articles, videos, and community content.",
+            prompt = load_prompt("web_researcher.md"),
+            tools = ["WebSearch", "WebFetch"],
+            model = AGENT_MODELS["web_researcher"][0]
+        ),
+        "blog_writer" : AgentDefinition(
+            description="Transforms completed research output into a multi-part blog series.",
+            prompt = load_prompt("blog_writer.md"),
+            tools = ["Read", "Glob", "Write"],
+            model = AGENT_MODELS["blog_writer"][0]
+        ),
+    }
+
+
+def build_code_index_server():
+    """The in-process MCP server behind repo_analyzer's code index tool (code_index.py)."""
+    from claude_agent_sdk import create_sdk_mcp_server, tool
+    import code_index
+
+    @tool("query", "Answer questions about a cloned repository from its symbol index, in one call: "
+          "summary (languages, top-level tree, entry points), definition NAME (where a function, class, "
+          "method or type is defined; Class.method works), references NAME (where it is used), "
+          "entry_points (mains, console scripts, bins, and the public API by file), public (public "
+          "definitions under path), outline (definitions in the file at path), tree (directories and "
+          "sizes under path), languages. The first query on a commit indexes it, later ones are instant.",
+          {"type": "object", "properties": {
+              "repo": {"type": "string", "description": "Path of the checkout, e.g. ./.temp/jq"},
+              "query": {"type": "string", "enum": list(code_index.QUERIES)},
+              "name": {"type": "string", "description": "Symbol, for definition and references"},
+              "path": {"type": "string", "description": "Directory to limit to, or the file for outline"},
+              "limit": {"type": "integer", "description": "Most results to list (default 50)"},
+          }, "required": ["repo", "query"]})
+    async def query(args: dict) -> dict:
+        try:
+            index = await code_indexes.index(args["repo"])
+            text = code_index.query(index, args["query"], args.get("name"), args.get("path"),
+                                    int(args.get("limit") or 50))
+        except (ValueError, RuntimeError) as e:
+            metrics.CODE_INDEX_QUERIES.inc(args.get("query", "?"), "error")
+            return {"content": [{"type": "text", "text": f"Error: {e}"}], "is_error": True}
+        metrics.CODE_INDEX_QUERIES.inc(args["query"], "cached" if index["cached"] else "built")
+        return {"content": [{"type": "text", "text": text}]}
+
+    return create_sdk_mcp_server("code_index", tools=[query])
+
+
+def build_router() -> ModelRouter:
+    """The subagent model router, reading run history from the warehouse when it is on."""
+    def stats(subagent_type: str, skill: str | None) -> dict:
+        return local_lookup("subagent_stats", [subagent_type, skill],
+                            lambda: warehouse.subagent_stats(subagent_type, skill) if warehouse else {})
+
+    return ModelRouter({name: models[0] for name, models in AGENT_MODELS.items()}, AGENT_MODELS,
+                       ROUTE_DEGRADABLE, ROUTE_DEGRADE_AT, stats_fn=stats)
+
+
+def build_hooks() -> dict:
+    """Build the PreToolUse/PostToolUse hook matchers (recorded/traced when enabled)."""
+    from claude_agent_sdk import HookMatcher
+
+    def wrap(fn):
+        if tracer:
+            fn = tracer.wrap_hook(fn)
+        return recorder.wrap_hook(fn) if recorder else fn
+    return {
+        "PreToolUse": [
+            HookMatcher(matcher="*", hooks=[wrap(audit_tool_calls)]),
+            HookMatcher(matcher="Write", hooks=[wrap(restrict_writes)]),
+            HookMatcher(matcher="Bash", hooks=[wrap(prepare_bash)]),
+            HookMatcher(matcher="*", hooks=[wrap(limit_breadth)]),
+            HookMatcher(matcher="|".join(SUBAGENT_TOOLS), hooks=[wrap(route_subagents)]),
+        ],
+        "PostToolUse": [
+            HookMatcher(matcher="*", hooks=[wrap(log_tool_completion)]),
+        ],
+        "PostToolUseFailure": [
+            HookMatcher(matcher="*", hooks=[wrap(log_tool_failure)]),
+        ],
+    }
+
+
+# ── Main ──────────────────────────────────────────────────
+
+def _mark_connected(task: asyncio.Future) -> None:
+    if not task.cancelled() and task.exception() is None:
+        mark_startup("client_connected")
+
+
+
+async def main(client_cls=None, reader=None):
+    """Run the interactive research REPL until the user exits.
+
+    ``client_cls`` replaces ``ClaudeSDKClient`` and ``reader`` replaces the
+    stdin reader (anything with ``start``/``ask``/``next_query``/``close``),
+    which lets benchmarks drive this exact loop with a fake SDK.
+    """
+    # ── Logging setup ────────────────────────────────────
+    os.makedirs("session_data", exist_ok=True)
+    logging.basicConfig(
+        filename=SDK_LOG_FILE,
+        level=logging.DEBUG,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+    # Truncate CLI debug log for a fresh session
+    with open(CLI_DEBUG_LOG, "w", encoding="utf-8") as f:
+        f.write(f"# CLI Debug Log — {datetime.now().isoformat()}\n")
+
+    from claude_agent_sdk import AssistantMessage, ResultMessage, StreamEvent, SystemMessage
+
+    apply_profile(PROFILE)
+    if profile["name"] != "standard":
+        print(f"{DIM}Profile: {profile['name']} \u2014 {profile['description']}{RESET}")
+    global recorder, tracer, stream_stats, renderer, dashboard, warehouse, code_indexes, prefix_components, governor, router
+    if RECORD_MODE:
+        recorder = SessionRecorder()
+    if TRACE_MODE:
+        tracer = Tracer()
+    if STREAM_STATS_MODE:
+        stream_stats = StreamStats()
+    if DASHBOARD_MODE and sys.stdout.isatty():
+        dashboard = Dashboard()  # shows streamed text in its lanes instead of the renderer
+    elif sys.stdout.isatty() if STREAM_RENDER_MODE is None else STREAM_RENDER_MODE:
+        renderer = StreamRenderer()
+    if WAREHOUSE_MODE:
+        from warehouse import Warehouse  # pulls in sqlite3; only when enabled
+        warehouse = Warehouse()
+    if CODE_INDEX_MODE:
+        from code_index import CodeIndexService  # compiles ~60 patterns; only when enabled
+        code_indexes = CodeIndexService()
+    if GOVERNOR_MODE:
+        governor = BudgetGovernor(MAX_BUDGET_USD, MAX_TURNS, BUDGET_WARN, BUDGET_STOP, BUDGET_DOWNGRADE_AT,
+                                  BUDGET_DOWNGRADE_MODEL, profile_fn=warehouse.profile if warehouse else None)
+    metrics_task = None
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+        print(f"{DIM}Metrics: http://127.0.0.1:{METRICS_PORT}/metrics{RESET}")
+    if METRICS_FILE:
+        metrics_task = asyncio.create_task(metrics.textfile_writer(METRICS_FILE, METRICS_INTERVAL_S))
+
+    main_agent_prompt = load_prompt("main_agent.md")
+    agents = build_agents()
+    if ROUTE_MODE:
+        router = build_router()
+    if recorder:
+        recorder.record_marker("session", **session_settings())
+    hooks = build_hooks()
+    if PREFIX_CHECK_MODE:
+        prefix_components = {**prompt_cache.options_components(make_options(main_agent_prompt, agents, hooks)),
+                             **prompt_cache.file_components()}
+    mark_startup("session_built")
+
+    session_started = time.time()
+
+    # ── Startup resume check ─────────────────────────────
+    resume_session = None
+    round_state = {
+        "round": 0,
+        "start_time": 0.0,
+        "prev_turns": 0,
+        "prev_cost": 0.0,
+        "total_elapsed": 0.0,
+    }
+
+    reader = reader or AsyncLineReader()
+    reader.start()
+    interrupts = InterruptController(reader)
+    interrupts.install()
+
+    # ── Retry loop ────────────────────────────────────────
+    # A warm standby client resumed at the current session is kept ready so a
+    # CLI crash swaps it in instead of cold-starting a new subprocess.
+    failover = FailoverManager(
+        lambda resume: make_options(main_agent_prompt, agents, hooks, resume=resume),
+        client_cls=client_cls,
+    )
+    last_query = ""
+    retries = 0
+    connecting = None
+    switch_model = False  # a /profile switch is pending for the next query
+    quitting = False
+    try:
+        saved = load_session_state()
+        if saved and saved.get("session_id"):
+            print(f"Found previous session: {saved['session_id']}")
+            print(f"  Last query: {saved['last_query']}")
+            print(f"  Saved at: {saved['timestamp']}")
+            answer = await reader.ask("Resume this session? [y/N]: ")
+            if answer is None:  # EOF or Ctrl-C: quit, keeping the saved session
+                quitting = True
+            elif answer.strip().lower() == 'y':
+                resume_session = saved["session_id"]
+                round_state = saved["round_state"]
+            else:
+                clear_session_state()
+
+        while not quitting and retries <= MAX_RETRIES:
+            try:
+                # The first connect overlaps with the user typing their query;
+                # after a crash, recover before prompting again.
+                connecting = asyncio.ensure_future(failover.activate(resume_session))
+                connecting.add_done_callback(_mark_connected)
+                client = None
+                if retries:
+                    client = await connecting
+                    round_state["recovery_s"] = round(failover.last_recovery_s, 3)
+                    round_state["recovery_warm"] = failover.last_recovery_warm
+                    print(f"{DIM}  Recovered in {failover.last_recovery_s:.2f}s "
+                          f"({'warm standby' if failover.last_recovery_warm else 'cold start'}).{RESET}")
+                    retries = 0  # reset on successful connection
+
+                while True:
+                    interrupt_latency = interrupts.mark_ready()
+                    if interrupt_latency is not None:
+                        round_state["interrupt_latency_s"] = round(interrupt_latency, 3)
+                    mark_startup("prompt_shown")
+                    user_input = await reader.next_query(f'{BOLD}You{RESET}: ')
+                    print('')
+                    if user_input is None:  # EOF or Ctrl-C at the prompt
+                        break
+                    if user_input.lower() == 'exit':
+                        clear_session_state()
+                        break
+                    command = parse_command(user_input)
+                    if command:
+                        name, user_input = command
+                        if not name:
+                            for known in profiles.PROFILES:
+                                marker = "*" if known == profile["name"] else " "
+                                print(f"{DIM}{marker} {known:<9} {profiles.PROFILES[known]['description']}{RESET}")
+                            continue
+                        try:
+                            apply_profile(name)
+                        except ValueError as e:
+                            print(f"{YELLOW}{e}{RESET}")
+                            continue
+                        switch_model = True
+                        print(f"{DIM}Profile: {name} \u2014 {profile['description']}{RESET}")
+                        if not user_input:
+                            continue
+                    if client is None:
+                        client = await connecting
+                        retries = 0  # reset on successful connection
+                    if switch_model:
+                        await client.set_model(MAIN_MODEL)
+                        switch_model = False
+
+                    last_query = user_input
+                    audit_log.clear()
+                    activity_state["interrupted"] = False
+                    begin_round(round_state, user_input)
+                    write_stream_log_header(STREAM_LOG_FILE, round_state["round"], user_input)
+                    interrupts.begin_round(client)
+                    await client.query(user_input)
+                    mark_startup("first_query_sent")
+
+                    while True:
+                        hit_limit = False
+                        activity_state["last_activity"] = time.time()
+                        wd_task = asyncio.create_task(watchdog(client))
+                        # Governor actions run beside the stream so it keeps draining while a
+                        # set_model/interrupt round-trip is in flight; awaited at the result
+                        governor_actions: list[asyncio.Future] = []
+                        try:
+                            async for message in client.receive_response():
+                                activity_state["last_activity"] = time.time()
+                                if recorder:
+                                    recorder.record_message(message)
+                                cost_tracker.observe_message(message)
+                                if governor and not isinstance(message, StreamEvent):
+                                    governor.observe_message(message)
+                                    decisions = governor.check(cost_tracker.estimated_cost())
+                                    if decisions:
+                                        governor_actions.append(
+                                            asyncio.ensure_future(apply_governor(client, decisions)))
+                                if stream_stats:
+                                    stream_stats.observe(message)
+                                if dashboard:
+                                    dashboard.observe_message(message)
+                                if isinstance(message, AssistantMessage):
+                                    if tracer:
+                                        tracer.observe_message(message)
+                                    if warehouse:
+                                        warehouse.observe_message(message)
+                                    display_message(message, stream_log=STREAM_LOG_FILE, renderer=renderer)
+                                elif isinstance(message, StreamEvent):
+                                    if renderer:
+                                        renderer.feed(message)
+                                elif isinstance(message, SystemMessage) and message.subtype == "init":
+                                    check_prefix(message.data)
+                                elif isinstance(message, ResultMessage):
+                                    if renderer:
+                                        renderer.end_line()
+                                    if dashboard:
+                                        dashboard.stop()
+                                    update_round_state(message, round_state)
+                                    attribute_costs(message, round_state)
+                                    if governor_actions:
+                                        # A pending downgrade must land before it is undone
+                                        await asyncio.gather(*governor_actions)
+                                        governor_actions.clear()
+                                    if governor and governor.downgraded:
+                                        await client.set_model(MAIN_MODEL)  # the downgrade lasts one round
+                                    round_turns = round_state["round_turns"]
+                                    round_cost = round_state["round_cost"]
+
+                                    # Persist session_id for crash recovery
+                                    save_session_state(round_state, last_query)
+                                    if activity_state.get("interrupted"):
+                                        failover.mark_unhealthy()  # stalled: keep a standby from now on
+                                    failover.refresh_standby(round_state["session_id"])
+
+                                    if stream_stats:
+                                        round_state["stream"] = stream_stats.summary()
+                                    round_state["breadth"] = breadth.summary(audit_log)
+                                    display_result(message, audit_log, round_state)
+                                    round_state.pop("breadth", None)
+                                    agent_costs = round_state.pop("agent_costs", [])
+                                    audit_log.extend(usage_entries(agent_costs))
+                                    round_state.pop("stream", None)
+                                    round_state.pop("recovery_s", None)  # reported once
+                                    round_state.pop("recovery_warm", None)
+                                    # Lets warehouse ingest match the log to the live or recorded round
+                                    audit_log.append({"timestamp": time.time(), "event": "round",
+                                                      "session_id": round_state["session_id"],
+                                                      "round": round_state["round"]})
+                                    log_path = write_audit_log(audit_log)
+                                    if log_path:
+                                        print(f"{DIM}  Audit log: {log_path}{RESET}")
+                                    if warehouse:
+                                        warehouse.record_round(round_state, audit_log, last_query,
+                                                               log_path=log_path)
+                                    if recorder:
+                                        recorder.flush()
+                                    if tracer:
+                                        paths = tracer.export_round(
+                                            TRACES_DIR, turns=round_turns, cost_usd=round(round_cost, 6))
+                                        if paths:
+                                            print(f"{DIM}  Trace: {paths[0]}{RESET}")
+
+                                    # Check limits using per-round deltas
+                                    # (or the governor stopped the round short of them)
+                                    stopped = governor.stopped if governor else None
+                                    at_turn_limit = round_turns >= MAX_TURNS or stopped == "turns"
+                                    at_budget_limit = round_cost >= MAX_BUDGET_USD or stopped == "budget"
+                                    if at_turn_limit or at_budget_limit:
+                                        reason = "Turn limit" if at_turn_limit else "Budget limit"
+                                        if stopped:
+                                            reason += " (governor)"
+                                        total_cost = f"${message.total_cost_usd:.4f}" if hasattr(message, 'total_cost_usd') else "$?"
+                                        total_turns = message.num_turns if hasattr(message, 'num_turns') else "?"
+                                        print(f"{BOLD}\u26a0 {reason} reached "
+                                              f"(round: {round_turns} turns / ${round_cost:.2f}, "
+                                              f"total: {total_turns} turns / {total_cost}).{RESET}")
+                                        if at_budget_limit and agent_costs:
+                                            spend = sorted(by_agent(agent_costs).items(),
+                                                           key=lambda item: -item[1]["cost_usd"])
+                                            print("  Spent by: " + ", ".join(
+                                                f"{name} ${entry['cost_usd']:.2f}" for name, entry in spend))
+                                        # Park the watchdog while waiting on the user
+                                        activity_state["last_activity"] = 0.0
+                                        cont = await interrupts.ask(f"Continue for another {MAX_TURNS} turns? [y/N]: ")
+                                        activity_state["last_activity"] = time.time()
+                                        if (cont or "").strip().lower() == 'y':
+                                            hit_limit = True
+                                            audit_log.clear()
+                                            begin_round(round_state, "/continue")
+                                            await client.query("/continue")
+                                        else:
+                                            hit_limit = False
+
+                                    # Auto-continue after watchdog interrupt (not after Ctrl-C)
+                                    elif activity_state.get("interrupted") and not interrupts.requested_at:
+                                        activity_state["interrupted"] = False
+                                        print(f"\n{YELLOW}{BOLD}Resuming after watchdog interrupt...{RESET}")
+                                        hit_limit = True
+                                        resume_query = watchdog_resume_query()
+                                        begin_round(round_state, resume_query)
+                                        await client.query(resume_query)
+                        finally:
+                            wd_task.cancel()
+                            for action in governor_actions:
+                                action.cancel()
+                            try:
+                                await wd_task
+                            except asyncio.CancelledError:
+                                pass
+                        if not hit_limit:
+                            break
+                    interrupts.end_round()
+
+                break  # clean exit from input loop — done
+
+            except Exception as e:
+                interrupts.end_round()
+                if dashboard:
+                    dashboard.stop()
+                retries += 1
+                failover.mark_dead()
+                resume_session = round_state.get("session_id")
+                if retries > MAX_RETRIES or not resume_session:
+                    raise
+                metrics.CRASH_RETRIES.inc()
+                print(f"\n\u26a0 CLI crashed: {e}")
+                print(f"  Resuming session {resume_session} (retry {retries}/{MAX_RETRIES})...")
+                save_session_state(round_state, last_query)
+    finally:
+        if dashboard:
+            dashboard.stop()
+        if connecting is not None:
+            await asyncio.gather(connecting, return_exceptions=True)
+        await failover.close()
+        if recorder:
+            print(f"{DIM}Recording: {recorder.close()}{RESET}")
+        clones = git_cache.session_summary(session_started) if GIT_CACHE_MODE else None
+        if clones:
+            print(f"{DIM}Git cache: {clones}{RESET}")
+        if warehouse:
+            warehouse.close()
+        if metrics_task:
+            metrics_task.cancel()
+            await asyncio.gather(metrics_task, return_exceptions=True)
+        interrupts.uninstall()
+
@@ -0,0 +1,218 @@
+# profiles.py — Named execution profiles and research breadth limits
+"""
+A profile sets every performance knob of a session together:
+
+- ``main_model``: the orchestrator's model
+- ``agents``: per subagent, its model candidates, cheapest first. The first is
+  the default in its ``AgentDefinition``. The rest are what the router
+  (routing.py) may escalate to.
+- ``max_turns``, ``max_budget_usd``: the round limits
+- ``watchdog_abort_s``: how long with no activity before the watchdog interrupts
+- ``allowed_tools``: the orchestrator's own tools, enforced by the
+  ``limit_breadth`` hook for calls without an ``agent_id``. The CLI's
+  permission list stays ``ALL_TOOLS``, since it also covers subagents, which
+  keep their definitions' tools.
+- ``breadth``: research breadth limits. ``subagents`` caps Task calls per
+  round, and a tool name caps that tool's calls per subagent run.
+  ``domains`` and ``kb`` say when a researcher has enough sources, which
+  only applies with the sufficiency cut-off on. 0 or a missing key means
+  unlimited.
+
+``standard`` keeps the original models and limits. Pick one with
+``--profile``/``L7_PROFILE`` for a whole session or batch job, or with
+``/profile NAME [query]`` in the REPL from the next query on.
+
+``BreadthLimiter`` counts calls against the ``breadth`` limits. The
+orchestrator's PreToolUse hook denies calls over a limit with a reason the
+model reads, so the agent wraps up with what it has instead of failing.
+With the sufficiency cut-off on (``L7_SUFFICIENCY=1``), it also follows the
+distinct domains and kilobytes each researcher has fetched. Once a run has
+enough of both, its further searches and fetches are denied with a reason
+that tells it to write up.
+"""
+from collections import Counter
+from urllib.parse import urlparse
+
+ALL_TOOLS = ["Skill", "Task", "Read", "Glob", "Write", "Bash", "WebSearch", "WebFetch"]
+RESEARCHERS = ("docs_researcher", "repo_analyzer", "web_researcher")
+
+PROFILES = {
+    "standard": {
+        "description": "haiku researchers, sonnet writer, the original limits",
+        "main_model": "sonnet",
+        "agents": {**{name: ("haiku", "sonnet") for name in RESEARCHERS}, "blog_writer": ("sonnet", "opus")},
+        "max_turns": 100,
+        "max_budget_usd": 5.00,
+        "watchdog_abort_s": 300,
+        "allowed_tools": ALL_TOOLS,
+        "breadth": {"domains": 6, "kb": 300},
+    },
+    "fast": {
+        "description": "fewest round trips: two researchers, few fetches, short stalls",
+        "main_model": "sonnet",
+        "agents": {**{name: ("haiku",) for name in RESEARCHERS}, "blog_writer": ("sonnet",)},
+        "max_turns": 40,
+        "max_budget_usd": 2.00,
+        "watchdog_abort_s": 120,
+        "allowed_tools": [t for t in ALL_TOOLS if t != "WebFetch"],  # fetching is the researchers' job
+        "breadth": {"subagents": 2, "WebFetch": 3, "WebSearch": 3, "domains": 3, "kb": 120},
+    },
+    "cheap": {
+        "description": "haiku everywhere, tight budget and breadth",
+        "main_model": "haiku",
+        "agents": {**{name: ("haiku",) for name in RESEARCHERS}, "blog_writer": ("haiku", "sonnet")},
+        "max_turns": 50,
+        "max_budget_usd": 1.00,
+        "watchdog_abort_s": 300,
+        "allowed_tools": [t for t in ALL_TOOLS if t != "WebFetch"],
+        "breadth": {"subagents": 3, "WebFetch": 5, "WebSearch": 4, "domains": 4, "kb": 150},
+    },
+    "thorough": {
+        "description": "sonnet researchers, opus writer, generous limits",
+        "main_model": "sonnet",
+        "agents": {**{name: ("sonnet", "opus") for name in RESEARCHERS}, "blog_writer": ("opus",)},
+        "max_turns": 200,
+        "max_budget_usd": 15.00,
+        "watchdog_abort_s": 600,
+        "allowed_tools": ALL_TOOLS,
+        "breadth": {"domains": 12, "kb": 1000},
+    },
+}
+DEFAULT_PROFILE = "standard"
+
+
+def get_profile(name: str | None) -> dict:
+    """The named profile; ValueError listing the known ones otherwise."""
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"unknown profile '{name}' (known: {', '.join(PROFILES)})")
+    return {"name": name, **PROFILES[name]}
+
+
+def parse_command(text: str) -> tuple[str, str] | None:
+    """``/profile NAME [query]`` -> (NAME, query); None for any other input."""
+    parts = text.strip().split(maxsplit=2)
+    if not parts or parts[0] != "/profile":
+        return None
+    return (parts[1] if len(parts) > 1 else ""), (parts[2] if len(parts) > 2 else "")
+
+
+def tool_allowed(tool: str, allowed: list[str]) -> bool:
+    """Whether the orchestrator may call ``tool`` under a profile's ``allowed_tools``.
+
+    Agent is the CLI's current name for Task. Tools outside ``ALL_TOOLS``, such
+    as MCP tools, are not a profile's to restrict.
+    """
+    tool = "Task" if tool == "Agent" else tool
+    return tool not in ALL_TOOLS or tool in allowed
+
+
+RESEARCH_TOOLS = ("WebSearch", "WebFetch")
+
+
+def domain(url: str) -> str | None:
+    """Host of a URL without ``www.``; None when there is none."""
+    host = urlparse(url or "").hostname or ""
+    return host.removeprefix("www.") or None
+
+
+def response_bytes(tool_response) -> int:
+    """Size of a WebFetch result: its reported ``bytes``, else the length of its text."""
+    if isinstance(tool_response, dict):
+        if isinstance(tool_response.get("bytes"), int):
+            return tool_response["bytes"]
+        return len(str(tool_response.get("result") or tool_response.get("content") or ""))
+    return len(str(tool_response or ""))
+
+
+class BreadthLimiter:
+    """Counts subagent launches per round and research calls per subagent run against a profile's limits."""
+
+    def __init__(self, limits: dict[str, int] | None = None, sufficiency: bool = False):
+        self.limits = dict(limits or {})
+        self.sufficiency = sufficiency
+        self.begin_round()
+
+    def begin_round(self) -> None:
+        self.subagents = 0
+        self.runs: dict[str, dict] = {}  # agent_id -> {"calls": Counter, "domains": set, "bytes": int}
+        self.denied: Counter = Counter()  # (limit, tool) -> calls denied
+
+    def _run(self, agent_id: str) -> dict:
+        return self.runs.setdefault(agent_id, {"calls": Counter(), "domains": set(), "bytes": 0,
+                                               "sufficient": False})
+
+    def sufficient(self, run: dict) -> bool:
+        domains, kb = self.limits.get("domains") or 0, self.limits.get("kb") or 0
+        if not self.sufficiency or (not domains and not kb):
+            return False
+        return len(run["domains"]) >= domains and run["bytes"] >= kb * 1000
+
+    def check(self, tool: str, agent_id: str | None, subagent_tool: bool = False) -> tuple[str, str] | None:
+        """Count one call; (limit, reason) when it is denied, else None."""
+        if subagent_tool:
+            limit = self.limits.get("subagents") or 0
+            if limit and self.subagents >= limit:
+                self.denied["subagents", tool] += 1
+                return "subagents", (f"This run's profile allows {limit} subagents per round and all have "
+                                     f"been used. Finish with the research already collected.")
+            self.subagents += 1
+            return None
+        if tool not in RESEARCH_TOOLS or not agent_id:
+            return None  # the orchestrator's own calls are limited by allowed_tools
+        run = self._run(agent_id)
+        if run["sufficient"] or self.sufficient(run):
+            run["sufficient"] = True
+            self.denied["sufficiency", tool] += 1
+            return "sufficiency", (f"You have enough sources: {len(run['domains'])} domains and "
+                                   f"{run['bytes'] // 1000} KB fetched. Stop searching and fetching, "
+                                   f"and write up your findings now.")
+        limit = self.limits.get(tool) or 0
+        if limit and run["calls"][tool] >= limit:
+            self.denied[tool, tool] += 1
+            return tool, (f"This run's profile allows {limit} {tool} calls per subagent and all have been "
+                          f"used. Write up your findings from the sources you already have.")
+        run["calls"][tool] += 1
+        return None
+
+    def observe_result(self, tool: str, agent_id: str | None, tool_input: dict, tool_response) -> None:
+        """Add a finished fetch's domain and size to its run."""
+        if tool != "WebFetch" or not agent_id:
+            return
+        run = self._run(agent_id)
+        host = domain((tool_input or {}).get("url", ""))
+        if host:
+            run["domains"].add(host)
+        run["bytes"] += response_bytes(tool_response)
+
+    def summary(self, entries: list[dict]) -> dict | None:
+        """Calls denied per limit, time saved at the round's mean tool durations, and cut-off runs."""
+        if not self.denied:
+            return None
+        durations: dict[str, list[float]] = {}
+        for e in entries:
+            if "event" not in e and e.get("duration_s") is not None:
+                durations.setdefault(e.get("tool"), []).append(e["duration_s"])
+        saved_s = 0.0
+        limits: Counter = Counter()
+        for (limit, tool), calls in self.denied.items():
+            limits[limit] += calls
+            seen = durations.get(tool)
+            if seen:
+                saved_s += calls * sum(seen) / len(seen)
+        return {"calls": sum(limits.values()), "by_limit": dict(limits), "saved_s": round(saved_s, 1),
+                "sufficient": sum(1 for run in self.runs.values() if run["sufficient"]),
+                "runs": len(self.runs)}
+
+
+def format_summary(summary: dict) -> str:
+    """One line for the round summary."""
+    parts = ", ".join(f"{limit} {calls}" for limit, calls in
+                      sorted(summary["by_limit"].items(), key=lambda item: -item[1]))
+    line = f"saved {summary['calls']} calls"
+    if summary["saved_s"]:
+        line += f" (~{summary['saved_s']:.0f}s)"
+    line += f": {parts}"
+    if summary["sufficient"]:
+        line += f" | {summary['sufficient']} of {summary['runs']} researchers reached sufficiency"
+    return line
@@ -0,0 +1,340 @@
+# prompt_cache.py — Prompt-prefix stability checks and cache-hit reports
+"""
+The API caches the prompt prefix: tool definitions, the system prompt and
+the start of the conversation. The orchestrator's prefix is static:
+main_agent.md, the subagent definitions (which become the Task tool
+description), the allowed tools and the project's skills. So after the first
+turn, every turn should be a cache read. Change any byte of it, say reordered
+tools, an edited agent description or a new skill, and the next requests
+write the whole prefix to the cache again. That costs 1.25x input instead of
+0.1x and adds latency, and nothing reports it.
+
+This module fingerprints each part of the prefix separately:
+
+- from the options the orchestrator sends: ``system_prompt``,
+  ``agent:<name>``, ``agent_order``, ``allowed_tools``, ``model``,
+  ``setting_sources``
+- from the project and user files the CLI loads: ``file:<path>``
+- from the CLI's init message: ``init:tools`` (in order), ``init:agents``,
+  ``init:skills``, ``init:mcp_servers``, ``init:cli_version``
+
+Each run's fingerprint is appended to ``session_data/prefix_history.jsonl``.
+The texts are kept once per hash under ``session_data/prefix/`` so a change
+can be shown as a diff. The orchestrator checks this at the first init
+message and warns when something changed since the last run; set
+``L7_PREFIX_CHECK=0`` to turn it off.
+
+Usage:
+  uv run python prompt_cache.py check                       # current prompts/agents vs last run
+  uv run python prompt_cache.py check --record              # ...and make them the new baseline
+  uv run python prompt_cache.py check session_data/recordings/*.l7rec   # init prefix across recordings
+  uv run python prompt_cache.py history                     # what changed, run by run
+  uv run python prompt_cache.py report session_data/recordings/*.l7rec  # cache hit ratio per round/model
+"""
+import argparse
+import dataclasses
+import difflib
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+HISTORY_FILE = "session_data/prefix_history.jsonl"
+BLOBS_DIR = "session_data/prefix"
+# Files the CLI folds into the prompt with setting_sources=["user", "project"]
+PREFIX_FILE_GLOBS = (
+    "CLAUDE.md", ".claude/CLAUDE.md", ".claude/settings.json",
+    ".claude/agents/*.md", ".claude/skills/*/SKILL.md",
+    "~/.claude/CLAUDE.md", "~/.claude/agents/*.md", "~/.claude/skills/*/SKILL.md",
+)
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+GREEN = "\033[32m"
+YELLOW = "\033[33m"
+RESET = "\033[0m"
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _json(value) -> str:
+    return json.dumps(value, indent=1, sort_keys=True, default=str)
+
+
+# ── Components ───────────────────────────────────────────
+
+def options_components(options) -> dict[str, str]:
+    """The static prefix parts of a ClaudeAgentOptions, as name -> text."""
+    components = {
+        "system_prompt": options.system_prompt if isinstance(options.system_prompt, str)
+        else _json(options.system_prompt),
+        "allowed_tools": _json(list(options.allowed_tools or [])),
+        "model": str(options.model),
+        "setting_sources": _json(options.setting_sources),
+    }
+    agents = options.agents or {}
+    components["agent_order"] = "\n".join(agents)
+    for name, definition in agents.items():
+        fields = dataclasses.asdict(definition) if dataclasses.is_dataclass(definition) else definition
+        components[f"agent:{name}"] = _json({k: v for k, v in fields.items() if v is not None})
+    return components
+
+
+def file_components(patterns=PREFIX_FILE_GLOBS) -> dict[str, str]:
+    """Project and user instruction/skill files the CLI loads into the prompt."""
+    components = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.expanduser(pattern))):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    components[f"file:{path}"] = f.read()
+            except OSError:
+                continue
+    return components
+
+
+def init_components(data: dict) -> dict[str, str]:
+    """Prefix-relevant fields of the CLI's init SystemMessage data."""
+    components = {
+        "init:tools": "\n".join(data.get("tools") or []),  # order matters
+        "init:agents": "\n".join(data.get("agents") or []),
+        "init:skills": "\n".join(data.get("skills") or []),
+        "init:mcp_servers": _json(data.get("mcp_servers") or []),
+        "init:cli_version": str(data.get("claude_code_version")),
+        "init:output_style": str(data.get("output_style")),
+    }
+    return components
+
+
+def local_components() -> dict[str, str]:
+    """The prefix the orchestrator would send now (no session is started)."""
+    import orchestrator
+
+    options = orchestrator.make_options(
+        orchestrator.load_prompt("main_agent.md"), orchestrator.build_agents(), {})
+    return {**options_components(options), **file_components()}
+
+
+def recording_init(path: str) -> dict | None:
+    """Init SystemMessage data of a ``.l7rec`` recording, if any."""
+    from recorder import EventReader
+
+    for event in EventReader(path).events():
+        message = event.get("message") if event["kind"] == "message" else None
+        if message and message.get("_type") == "SystemMessage" and message.get("subtype") == "init":
+            return message.get("data")
+    return None
+
+
+# ── History ──────────────────────────────────────────────
+
+def diff(old: dict[str, str], new: dict[str, str]) -> list[tuple[str, str]]:
+    """(component, "changed"|"added"|"removed") between two hash maps.
+
+    ``init:*`` components are compared only when both sides have them, so a
+    local check can be compared with a live run.
+    """
+    changes = []
+    old_init = any(name.startswith("init:") for name in old)
+    new_init = any(name.startswith("init:") for name in new)
+    for name in sorted(set(old) | set(new)):
+        if name.startswith("init:") and not (old_init and new_init):
+            continue
+        if name not in old:
+            changes.append((name, "added"))
+        elif name not in new:
+            changes.append((name, "removed"))
+        elif old[name] != new[name]:
+            changes.append((name, "changed"))
+    return changes
+
+
+class PrefixHistory:
+    """Append-only log of prefix fingerprints, with each distinct text kept once."""
+
+    def __init__(self, path: str = HISTORY_FILE, blobs: str = BLOBS_DIR):
+        self.path = path
+        self.blobs = blobs
+
+    def entries(self) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def last(self) -> dict | None:
+        entries = self.entries()
+        return entries[-1] if entries else None
+
+    def text(self, digest: str) -> str | None:
+        try:
+            with open(os.path.join(self.blobs, digest), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def record(self, components: dict[str, str], source: str = "live") -> list[tuple[str, str]]:
+        """Append a fingerprint; returns what changed since the previous one."""
+        hashes = {name: hash_text(text) for name, text in components.items()}
+        previous = self.last()
+        os.makedirs(self.blobs, exist_ok=True)
+        for name, text in components.items():
+            blob = os.path.join(self.blobs, hashes[name])
+            if not os.path.exists(blob):
+                with open(blob, "w", encoding="utf-8") as f:
+                    f.write(text)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": time.time(), "source": source, "components": hashes}) + "\n")
+        return diff(previous["components"], hashes) if previous else []
+
+    def show_change(self, name: str, old: str | None, new: str | None, context: int = 1,
+                    new_text: str | None = None) -> list[str]:
+        """A short unified diff of one component between two hashes (``new_text`` if not stored yet)."""
+        before = self.text(old) if old else ""
+        after = new_text if new_text is not None else self.text(new) if new else ""
+        if before is None or after is None:
+            return []
+        lines = list(difflib.unified_diff(before.splitlines(), after.splitlines(),
+                                          f"{name} ({old})", f"{name} ({new})", lineterm="", n=context))
+        return lines[:40] + ([f"... {len(lines) - 40} more lines"] if len(lines) > 40 else [])
+
+
+def format_changes(changes: list[tuple[str, str]]) -> str:
+    return ", ".join(f"{name} {status}" for name, status in changes)
+
+
+# ── Cache-hit report ─────────────────────────────────────
+
+def recording_cache_usage(path: str) -> list[dict]:
+    """Per round and model: uncached input, cache reads and writes, from ResultMessage model_usage."""
+    from recorder import EventReader
+
+    rows, prev, round_num = [], {}, 0
+    for event in EventReader(path).events():
+        if event["kind"] == "marker" and event["name"] == "round_start":
+            round_num = event.get("round", round_num + 1)
+        message = event.get("message") if event["kind"] == "message" else None
+        if not message or message.get("_type") != "ResultMessage":
+            continue
+        for model, usage in (message.get("model_usage") or {}).items():
+            before = prev.get(model, {})
+            if (usage.get("costUSD") or 0) < (before.get("costUSD") or 0):
+                before = {}
+            delta = {key: (usage.get(key) or 0) - (before.get(key) or 0) for key in
+                     ("inputTokens", "cacheReadInputTokens", "cacheCreationInputTokens")}
+            prompt = sum(delta.values())
+            rows.append({"round": round_num, "model": model, "uncached": delta["inputTokens"],
+                         "cache_read": delta["cacheReadInputTokens"],
+                         "cache_write": delta["cacheCreationInputTokens"],
+                         "hit_ratio": delta["cacheReadInputTokens"] / prompt if prompt else None})
+        prev = {model: dict(usage) for model, usage in (message.get("model_usage") or {}).items()}
+    return rows
+
+
+# ── CLI ──────────────────────────────────────────────────
+
+def _print_changes(history: PrefixHistory, old: dict, new: dict, changes, show_diff: bool,
+                   texts: dict | None = None) -> None:
+    for name, status in changes:
+        print(f"  {YELLOW}{status:<8}{RESET} {name}")
+        if show_diff and status == "changed":
+            for line in history.show_change(name, old.get(name), new.get(name),
+                                            new_text=(texts or {}).get(name)):
+                print(f"    {DIM}{line}{RESET}")
+
+
+def cmd_check(args) -> int:
+    history = PrefixHistory(args.history, args.blobs)
+    if args.recordings:
+        # Compare the init prefix of consecutive recordings
+        previous, drift = None, 0
+        for path in args.recordings:
+            data = recording_init(path)
+            if data is None:
+                print(f"{DIM}{path}: no init message{RESET}")
+                continue
+            hashes = {name: hash_text(text) for name, text in init_components(data).items()}
+            changes = diff(previous[1], hashes) if previous else []
+            mark = f"{YELLOW}⚠ {format_changes(changes)}{RESET}" if changes else f"{GREEN}stable{RESET}"
+            print(f"{os.path.basename(path)}: {mark if previous else 'baseline'}")
+            drift += bool(changes)
+            previous = (path, hashes)
+        return 1 if drift else 0
+
+    components = local_components()
+    hashes = {name: hash_text(text) for name, text in components.items()}
+    last = history.last()
+    if last is None:
+        print("No previous fingerprint." + ("" if args.record else " Use --record to save a baseline."))
+        changes = []
+    else:
+        changes = diff(last["components"], hashes)
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(last["timestamp"]))
+        if changes:
+            print(f"{BOLD}Prefix changed since {when} ({last['source']}):{RESET}")
+            _print_changes(history, last["components"], hashes, changes, not args.no_diff, components)
+        else:
+            print(f"{GREEN}Prefix stable{RESET} since {when}: {len(hashes)} components match.")
+    if args.record:
+        history.record(components, source="check")
+        print(f"{DIM}Recorded → {args.history}{RESET}")
+    return 1 if changes else 0
+
+
+def cmd_history(args) -> int:
+    history = PrefixHistory(args.history, args.blobs)
+    previous = None
+    for entry in history.entries():
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["timestamp"]))
+        changes = diff(previous, entry["components"]) if previous else []
+        note = f"{YELLOW}{format_changes(changes)}{RESET}" if changes else f"{DIM}—{RESET}"
+        print(f"{when}  {entry['source']:<8} {note}")
+        if changes and args.diff:
+            _print_changes(history, previous, entry["components"], changes, True)
+        previous = entry["components"]
+    return 0
+
+
+def cmd_report(args) -> int:
+    print(f"{BOLD}{'recording':<32} {'round':>5} {'model':<28} {'uncached':>9} "
+          f"{'read':>9} {'write':>9} {'hit':>6}{RESET}")
+    for path in args.recordings:
+        for row in recording_cache_usage(path):
+            hit = f"{row['hit_ratio']:.0%}" if row["hit_ratio"] is not None else "—"
+            colour = YELLOW if row["hit_ratio"] is not None and row["hit_ratio"] < args.warn_below else ""
+            print(f"{colour}{os.path.basename(path)[:32]:<32} {row['round']:>5} {row['model'][:28]:<28} "
+                  f"{row['uncached']:>9} {row['cache_read']:>9} {row['cache_write']:>9} {hit:>6}"
+                  f"{RESET if colour else ''}")
+    print(f"{DIM}Per agent: uv run python warehouse.py query cache-hits{RESET}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt-prefix stability and cache-hit analytics")
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"Fingerprint log (default: {HISTORY_FILE})")
+    parser.add_argument("--blobs", default=BLOBS_DIR, help=f"Component texts (default: {BLOBS_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check = sub.add_parser("check", help="Flag prefix changes; exits 1 if any")
+    check.add_argument("recordings", nargs="*", help="Compare the init prefix across these .l7rec files")
+    check.add_argument("--record", action="store_true", help="Save the current prefix as the new baseline")
+    check.add_argument("--no-diff", action="store_true", help="List changed components without diffs")
+
+    hist = sub.add_parser("history", help="List recorded fingerprints and what changed")
+    hist.add_argument("--diff", action="store_true", help="Show diffs of changed components")
+
+    report = sub.add_parser("report", help="Cache hit ratio per round and model from recordings")
+    report.add_argument("recordings", nargs="+")
+    report.add_argument("--warn-below", type=float, default=0.5, help="Highlight hit ratios below this")
+    args = parser.parse_args()
+
+    sys.exit({"check": cmd_check, "history": cmd_history, "report": cmd_report}[args.command](args))
+
+
+if __name__ == "__main__":
+    main()
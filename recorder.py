@@ -0,0 +1,236 @@
+"""Record every SDK message and hook invocation of a session to a compact event file.
+
+A ``.l7rec`` file is a sequence of independently zlib-compressed blocks of
+JSON-lines events, followed by a compressed index so readers can jump straight
+to a round without inflating the blocks before it::
+
+    b"L7REC1\\n"
+    [u32 length][zlib(JSONL events)]      * n   (one block per round or 256 events)
+    [u32 length][zlib(JSON index)]
+    [u64 index offset] b"L7IDX1\\n"
+
+A file whose writer died before ``close()`` has no index; ``EventReader`` then
+scans the blocks sequentially. Events are dicts with ``seq``, ``t`` (seconds
+since recording started), ``kind`` (``message``, ``hook`` or ``marker``) and
+a kind-specific payload. SDK message dataclasses are encoded with a ``_type``
+tag and rebuilt into the same classes on decode.
+"""
+import dataclasses
+import json
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from functools import wraps
+
+MAGIC = b"L7REC1\n"
+INDEX_MAGIC = b"L7IDX1\n"
+RECORDINGS_DIR = "session_data/recordings"
+BLOCK_EVENTS = 256  # events per compressed block (smaller = finer seeking)
+
+
+# ── Encoding ─────────────────────────────────────────────
+
+def encode(value):
+    """Convert SDK dataclasses (recursively) into JSON-safe tagged dicts."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        out = {"_type": type(value).__name__}
+        for field in dataclasses.fields(value):
+            out[field.name] = encode(getattr(value, field.name))
+        return out
+    if isinstance(value, dict):
+        return {str(k): encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def decode(value):
+    """Rebuild tagged dicts into claude_agent_sdk classes where available."""
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    fields = {k: decode(v) for k, v in value.items() if k != "_type"}
+    type_name = value.get("_type")
+    if not type_name:
+        return fields
+    import claude_agent_sdk
+
+    cls = getattr(claude_agent_sdk, type_name, None)
+    if cls is None or not dataclasses.is_dataclass(cls):
+        return fields
+    known = {f.name for f in dataclasses.fields(cls)}  # tolerate SDK version drift
+    return cls(**{k: v for k, v in fields.items() if k in known})
+
+
+# ── Writer ───────────────────────────────────────────────
+
+class SessionRecorder:
+    """Append session events to a ``.l7rec`` file in compressed blocks."""
+
+    def __init__(self, path: str | None = None):
+        if path is None:
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            path = os.path.join(RECORDINGS_DIR, f"session_{ts}.l7rec")
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(MAGIC)
+        self._t0 = time.perf_counter()
+        self._seq = 0
+        self._pending: list[bytes] = []
+        self._pending_first: tuple[int, float] | None = None
+        self._blocks: list[list] = []  # [offset, first_seq, first_t, count]
+        self._rounds: dict[str, int] = {}  # round number -> block index
+
+    def _append(self, kind: str, payload: dict, t: float | None = None) -> None:
+        t = round((time.perf_counter() if t is None else t) - self._t0, 6)
+        event = {"seq": self._seq, "t": t, "kind": kind, **payload}
+        if self._pending_first is None:
+            self._pending_first = (self._seq, t)
+        self._pending.append(json.dumps(event, separators=(",", ":")).encode())
+        self._seq += 1
+        if len(self._pending) >= BLOCK_EVENTS:
+            self.flush()
+
+    def flush(self) -> None:
+        """Compress and write buffered events as one block."""
+        if not self._pending:
+            return
+        data = zlib.compress(b"\n".join(self._pending), 6)
+        offset = self._f.tell()
+        self._f.write(struct.pack("<I", len(data)))
+        self._f.write(data)
+        self._f.flush()
+        first_seq, first_t = self._pending_first
+        self._blocks.append([offset, first_seq, first_t, len(self._pending)])
+        self._pending = []
+        self._pending_first = None
+
+    def record_message(self, message) -> None:
+        self._append("message", {"message": encode(message)})
+
+    def record_marker(self, name: str, **data) -> None:
+        """Record a loop event; ``round_start`` also begins a new seekable block."""
+        if name == "round_start":
+            self.flush()
+            self._rounds[str(data.get("round"))] = len(self._blocks)
+        self._append("marker", {"name": name, **encode(data)})
+
+    def record_hook(self, name: str, input_data: dict, tool_use_id, result,
+                    started: float, duration: float) -> None:
+        self._append("hook", {
+            "name": name,
+            "input": encode(input_data),
+            "tool_use_id": tool_use_id,
+            "result": encode(result),
+            "duration_s": round(duration, 6),
+        }, t=started)
+
+    def wrap_hook(self, fn):
+        """Wrap a hook callback so each invocation and its timing is recorded."""
+        @wraps(fn)
+        async def recorded(input_data, tool_use_id, context):
+            started = time.perf_counter()
+            result = await fn(input_data, tool_use_id, context)
+            self.record_hook(fn.__name__, input_data, tool_use_id, result,
+                             started, time.perf_counter() - started)
+            return result
+        return recorded
+
+    def close(self) -> str:
+        """Flush the last block, write the index footer and return the path."""
+        if self._f.closed:
+            return self.path
+        self.flush()
+        index = zlib.compress(json.dumps({
+            "blocks": self._blocks, "rounds": self._rounds, "events": self._seq,
+        }).encode())
+        offset = self._f.tell()
+        self._f.write(struct.pack("<I", len(index)))
+        self._f.write(index)
+        self._f.write(struct.pack("<Q", offset))
+        self._f.write(INDEX_MAGIC)
+        self._f.close()
+        return self.path
+
+
+# ── Reader ───────────────────────────────────────────────
+
+class EventReader:
+    """Read a ``.l7rec`` file, using its index to seek when present."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an L7 recording")
+        self.blocks, self.rounds, self.complete = self._load_index()
+
+    def _load_index(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            tail = 8 + len(INDEX_MAGIC)
+            if size >= len(MAGIC) + tail:
+                f.seek(size - tail)
+                footer = f.read(tail)
+                if footer.endswith(INDEX_MAGIC):
+                    (offset,) = struct.unpack("<Q", footer[:8])
+                    f.seek(offset)
+                    (length,) = struct.unpack("<I", f.read(4))
+                    index = json.loads(zlib.decompress(f.read(length)))
+                    return index["blocks"], index["rounds"], True
+        return self._scan_blocks(), {}, False
+
+    def _scan_blocks(self) -> list[list]:
+        """Rebuild the block list of an unfinished recording."""
+        blocks = []
+        with open(self.path, "rb") as f:
+            f.seek(len(MAGIC))
+            while True:
+                offset = f.tell()
+                header = f.read(4)
+                if len(header) < 4:
+                    break
+                (length,) = struct.unpack("<I", header)
+                data = f.read(length)
+                if len(data) < length:
+                    break
+                try:
+                    lines = zlib.decompress(data).split(b"\n")
+                except zlib.error:
+                    break
+                first = json.loads(lines[0])
+                blocks.append([offset, first["seq"], first["t"], len(lines)])
+        return blocks
+
+    def _read_block(self, f, offset: int) -> list[dict]:
+        f.seek(offset)
+        (length,) = struct.unpack("<I", f.read(4))
+        return [json.loads(line) for line in zlib.decompress(f.read(length)).split(b"\n")]
+
+    def events(self, start_round: int | None = None, start_t: float = 0.0):
+        """Yield raw events, optionally starting at a round or a timestamp."""
+        first_block = 0
+        if start_round is not None and str(start_round) in self.rounds:
+            first_block = self.rounds[str(start_round)]
+        elif start_t > 0:
+            for i, block in enumerate(self.blocks):
+                if block[2] <= start_t:
+                    first_block = i
+        with open(self.path, "rb") as f:
+            for block in self.blocks[first_block:]:
+                for event in self._read_block(f, block[0]):
+                    if event["t"] >= start_t:
+                        yield event
+
+    def messages(self, **kwargs):
+        """Yield (event, decoded SDK message) pairs for message events."""
+        for event in self.events(**kwargs):
+            if event["kind"] == "message":
+                yield event, decode(event["message"])
@@ -0,0 +1,177 @@
+"""Non-blocking terminal input and Ctrl-C handling for the orchestrator REPL.
+
+``input()`` blocks the event loop, which freezes the watchdog and message
+draining while the user is typing. ``AsyncLineReader`` reads stdin on a daemon
+thread and hands lines to the loop, so prompts can be awaited and follow-up
+queries typed while a round is running are queued instead of blocking.
+"""
+import asyncio
+import signal
+import sys
+import threading
+import time
+from collections import deque
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+YELLOW = "\033[33m"
+RESET = "\033[0m"
+
+INTERRUPT_READY_TARGET = 1.0  # seconds from Ctrl-C to next prompt
+
+
+class AsyncLineReader:
+    """Read stdin lines on a background thread and deliver them to the event loop.
+
+    A line that arrives while ``ask()`` is awaiting answers that prompt; any
+    other line is queued as a follow-up query. ``None`` signals EOF or quit.
+    """
+
+    def __init__(self):
+        self.queued: deque[str] = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._waiter: asyncio.Future | None = None
+        self._closed = False
+
+    def start(self) -> None:
+        """Start the reader thread. Must be called from the running loop."""
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read_stdin, name="stdin-reader", daemon=True).start()
+
+    def _read_stdin(self) -> None:
+        while True:
+            line = sys.stdin.readline()
+            try:
+                self._loop.call_soon_threadsafe(
+                    self._deliver, line.rstrip("\r\n") if line else None
+                )
+            except RuntimeError:
+                return  # event loop already closed
+            if not line:
+                return
+
+    def _deliver(self, line: str | None) -> None:
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(line)
+        elif line is None:
+            self._closed = True
+        elif line.strip():
+            self.queued.append(line)
+            print(f"{DIM}  ↳ Queued: {line}{RESET}")
+
+    def close(self) -> None:
+        """Stop waiting for input: pending and future prompts return None."""
+        self._deliver(None)
+        self._closed = True
+
+    def dismiss(self) -> None:
+        """Answer the pending prompt with None, leaving the reader open."""
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def ask(self, prompt: str) -> str | None:
+        """Print a prompt and await the next line typed (None on EOF/quit)."""
+        if self._closed:
+            return None
+        print(prompt, end="", flush=True)
+        self._waiter = self._loop.create_future()
+        try:
+            return await self._waiter
+        finally:
+            self._waiter = None
+
+    async def next_query(self, prompt: str) -> str | None:
+        """Return the oldest queued query, or prompt for a new one."""
+        if self.queued:
+            line = self.queued.popleft()
+            print(f"{prompt}{line} {DIM}(queued){RESET}")
+            return line
+        return await self.ask(prompt)
+
+
+class InterruptController:
+    """Map Ctrl-C to ``client.interrupt()`` during a round, keeping the session alive.
+
+    Outside a round, Ctrl-C closes the reader so the REPL exits cleanly with
+    session state preserved for resume. At a prompt asked during a round
+    (``ask``), it dismisses that prompt only. A second Ctrl-C while an
+    interrupt is still pending cancels the main task as a force-quit.
+    """
+
+    def __init__(self, reader: AsyncLineReader):
+        self.reader = reader
+        self.client = None
+        self.requested_at = 0.0
+        self._main_task: asyncio.Task | None = None
+        self._pending: asyncio.Task | None = None
+        self._prompting = False
+        self._uninstall = None
+
+    def install(self) -> None:
+        """Route SIGINT to this controller for the lifetime of the loop."""
+        loop = asyncio.get_running_loop()
+        self._main_task = asyncio.current_task()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.handle)
+            self._uninstall = lambda: loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            # Windows: no loop signal handlers, so bounce onto the loop thread
+            previous = signal.signal(
+                signal.SIGINT, lambda *_: loop.call_soon_threadsafe(self.handle)
+            )
+            self._uninstall = lambda: signal.signal(signal.SIGINT, previous)
+
+    def uninstall(self) -> None:
+        if self._uninstall:
+            self._uninstall()
+            self._uninstall = None
+
+    def begin_round(self, client) -> None:
+        self.client = client
+        self.requested_at = 0.0
+
+    def end_round(self) -> None:
+        self.client = None
+
+    async def ask(self, prompt: str) -> str | None:
+        """Ask during a round whose response has finished; Ctrl-C answers None."""
+        self._prompting = True
+        try:
+            return await self.reader.ask(prompt)
+        finally:
+            self._prompting = False
+
+    def handle(self) -> None:
+        if self._prompting:
+            print()
+            self.reader.dismiss()
+            return
+        if self.client is None:
+            print(f"\n{DIM}Quitting — session saved for resume.{RESET}")
+            self.reader.close()
+            return
+        if self.requested_at:
+            print(f"\n{YELLOW}{BOLD}Interrupt already pending — force quitting.{RESET}")
+            if self._main_task:
+                self._main_task.cancel()
+            return
+        self.requested_at = time.perf_counter()
+        print(f"\n{YELLOW}{BOLD}⏹ Interrupting round — session stays alive.{RESET}")
+        self._pending = asyncio.ensure_future(self._interrupt(self.client))
+
+    async def _interrupt(self, client) -> None:
+        try:
+            await client.interrupt()
+        except Exception as e:
+            print(f"{DIM}  Interrupt failed: {e}{RESET}")
+
+    def mark_ready(self) -> float | None:
+        """Report Ctrl-C-to-ready latency if the last round was interrupted."""
+        if not self.requested_at:
+            return None
+        latency = time.perf_counter() - self.requested_at
+        self.requested_at = 0.0
+        color = DIM if latency <= INTERRUPT_READY_TARGET else YELLOW
+        print(f"{color}  Interrupted — ready for next query in {latency:.2f}s"
+              f"{'' if latency <= INTERRUPT_READY_TARGET else ' (slow)'}{RESET}")
+        return latency
@@ -0,0 +1,238 @@
+# replay.py — Replay a recorded session through the orchestrator loop offline
+"""
+Feeds a ``.l7rec`` recording (see recorder.py, written by ``agent.py --record``)
+through the same code paths a live session uses: ``display_message``, the
+orchestrator hooks, the watchdog and ``display_result``. No CLI subprocess is
+started and no API calls are made, so slow or odd rounds can be reproduced,
+profiled and regression-tested deterministically.
+
+Round timings in the summary come from the recording. Each replayed hook
+result is compared with the recorded one, and any divergence is reported.
+The recording's ``session`` marker restores the profile and the hook
+settings it was made with (sufficiency cut-off, routing, git cache, bash
+limits), and lookups of local state, such as the run history the router
+reads, are answered from the recording.
+
+Usage:
+  uv run python replay.py session_data/recordings/session_2026-02-21_13-15-21.l7rec
+  uv run python replay.py REC --speed max --quiet          # as fast as possible
+  uv run python replay.py REC --speed 4 --round 3          # 4x, from round 3
+  uv run python replay.py REC --speed max --quiet --profile
+  uv run python replay.py REC --speed max --quiet --trace traces/   # span traces per round
+"""
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from collections import defaultdict, deque
+
+import orchestrator
+from recorder import EventReader, decode
+from tracing import Tracer
+from utils import display_message, display_result
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+YELLOW = "\033[33m"
+RESET = "\033[0m"
+
+
+class ReplayClient:
+    """Stand-in for ClaudeSDKClient that only counts watchdog interrupts."""
+
+    def __init__(self):
+        self.interrupts = 0
+
+    async def interrupt(self) -> None:
+        self.interrupts += 1
+
+
+class RecordedLookups:
+    """Answers ``orchestrator.local_lookup`` calls with a recording's answers, in order."""
+
+    def __init__(self):
+        self._answers: dict[tuple, deque] = defaultdict(deque)
+
+    def add(self, event: dict) -> None:
+        self._answers[event["lookup"], json.dumps(event["key"])].append(event["value"])
+
+    def get(self, kind: str, key):
+        answers = self._answers.get((kind, json.dumps(key)))
+        return answers.popleft() if answers else None
+
+
+def restore_session(settings: dict | None) -> None:
+    """Rebuild the recorded session's profile, router and governor in ``orchestrator``.
+
+    Recordings made before the ``session`` marker replay under the current settings.
+    """
+    if settings:
+        for key, name in orchestrator.SESSION_SETTINGS.items():
+            if key in settings:
+                setattr(orchestrator, name, settings[key])
+        orchestrator.apply_profile(settings.get("profile", "standard"))
+    if orchestrator.ROUTE_MODE:
+        orchestrator.router = orchestrator.build_router()
+    if orchestrator.GOVERNOR_MODE:  # only its skill detection, which routing reads
+        orchestrator.governor = orchestrator.BudgetGovernor(orchestrator.MAX_BUDGET_USD, orchestrator.MAX_TURNS)
+
+
+async def replay(path: str, speed: float | None, start_round: int | None,
+                 trace_dir: str | None = None) -> dict:
+    """Replay a recording. ``speed`` None means as fast as possible.
+
+    With ``trace_dir`` each round's spans are exported there, timed by the
+    recording rather than by the replay.
+    """
+    from claude_agent_sdk import AssistantMessage, ResultMessage
+
+    reader = EventReader(path)
+    client = ReplayClient()
+    stats = {"events": 0, "messages": 0, "hooks": 0, "hook_mismatches": 0, "rounds": 0}
+    round_state = {
+        "round": 0,
+        "start_time": 0.0,
+        "prev_turns": 0,
+        "prev_cost": 0.0,
+        "total_elapsed": 0.0,
+    }
+    base_epoch = time.time()  # recorded t is mapped onto this virtual clock
+    wall_start = time.perf_counter()
+    first_t = None
+    virtual = {"now": base_epoch}
+    if trace_dir:
+        orchestrator.tracer = Tracer(clock=lambda: virtual["now"])
+        stats["traces"] = 0
+
+    saved = {name: getattr(orchestrator, name) for name in (
+        *orchestrator.SESSION_SETTINGS.values(), "recorder", "router", "governor", "replayed_lookups",
+        "CODE_INDEX_MODE")}
+    saved_profile = orchestrator.profile["name"]
+    events = reader.events()
+    first = next(events, None)
+    events.close()
+    restore_session(first if first and first["kind"] == "marker" and first["name"] == "session" else None)
+    orchestrator.recorder = None
+    orchestrator.replayed_lookups = RecordedLookups()
+    orchestrator.CODE_INDEX_MODE = False  # no index builds of this machine's checkouts
+
+    wd_task = asyncio.create_task(orchestrator.watchdog(client))
+    try:
+        for event in reader.events(start_round=start_round):
+            stats["events"] += 1
+            if first_t is None:
+                first_t = event["t"]
+            if speed:
+                delay = (event["t"] - first_t) / speed - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            virtual_now = virtual["now"] = base_epoch + event["t"]
+
+            if event["kind"] == "marker" and event["name"] == "round_start":
+                orchestrator.audit_log.clear()
+                if event.get("profile") and event["profile"] != orchestrator.profile["name"]:
+                    orchestrator.apply_profile(event["profile"])  # switched with /profile
+                round_state["round"] = event.get("round", round_state["round"] + 1) - 1
+                orchestrator.begin_round(round_state, event.get("query", ""))
+                round_state["start_time"] = virtual_now
+                stats["rounds"] += 1
+
+            elif event["kind"] == "marker" and event["name"] == "lookup":
+                orchestrator.replayed_lookups.add(event)
+
+            elif event["kind"] == "hook":
+                stats["hooks"] += 1
+                hook = getattr(orchestrator, event["name"], None)
+                if hook is None:
+                    continue
+                result = await hook(event["input"], event["tool_use_id"], None)
+                if orchestrator.tracer:
+                    orchestrator.tracer.hook_span(event["name"], event["tool_use_id"],
+                                                  virtual_now, event["duration_s"])
+                if result != event["result"]:
+                    stats["hook_mismatches"] += 1
+                    print(f"{YELLOW}  ≠ {event['name']} ({event['tool_use_id']}): "
+                          f"recorded {event['result']!r}, replayed {result!r}{RESET}")
+
+            elif event["kind"] == "message":
+                message = decode(event["message"])
+                stats["messages"] += 1
+                orchestrator.activity_state["last_activity"] = time.time()
+                orchestrator.cost_tracker.observe_message(message)
+                if orchestrator.governor:
+                    orchestrator.governor.observe_message(message)
+                if isinstance(message, AssistantMessage):
+                    if orchestrator.tracer:
+                        orchestrator.tracer.observe_message(message)
+                    display_message(message)
+                elif isinstance(message, ResultMessage):
+                    orchestrator.update_round_state(message, round_state, now=virtual_now)
+                    orchestrator.attribute_costs(message, round_state)
+                    display_result(message, orchestrator.audit_log, round_state)
+                    round_state.pop("agent_costs", None)
+                    if orchestrator.tracer and orchestrator.tracer.export_round(trace_dir):
+                        stats["traces"] += 1
+    finally:
+        orchestrator.tracer = None
+        for name, value in saved.items():
+            setattr(orchestrator, name, value)
+        orchestrator.apply_profile(saved_profile)
+        wd_task.cancel()
+        try:
+            await wd_task
+        except asyncio.CancelledError:
+            pass
+
+    wall = time.perf_counter() - wall_start
+    stats["wall_s"] = round(wall, 3)
+    stats["recorded_s"] = round(round_state["total_elapsed"], 3)
+    stats["events_per_s"] = round(stats["events"] / wall, 1) if wall else 0.0
+    stats["watchdog_interrupts"] = client.interrupts
+    stats["complete_recording"] = reader.complete
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded L7 session offline")
+    parser.add_argument("recording", help="Path to a .l7rec file")
+    parser.add_argument("--speed", default="1",
+                        help="Playback speed multiplier, or 'max' (default: 1)")
+    parser.add_argument("--round", type=int, help="Start from this round")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Suppress replayed output (for profiling)")
+    parser.add_argument("--trace", metavar="DIR",
+                        help="Export each round's spans (Chrome/Perfetto + OTLP-JSON) to DIR")
+    parser.add_argument("--profile", action="store_true",
+                        help="Run under cProfile and print the hottest functions")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    profiler = cProfile.Profile() if args.profile else None
+    sink = open(os.devnull, "w") if args.quiet else None
+    with contextlib.redirect_stdout(sink) if sink else contextlib.nullcontext():
+        if profiler:
+            profiler.enable()
+        stats = asyncio.run(replay(args.recording, speed, args.round, args.trace))
+        if profiler:
+            profiler.disable()
+    if sink:
+        sink.close()
+
+    print(f"\n{BOLD}Replay summary{RESET}")
+    for key, value in stats.items():
+        print(f"  {key:<20} {value}")
+    if profiler:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+        print(f"\n{DIM}{out.getvalue()}{RESET}")
+    sys.exit(1 if stats["hook_mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
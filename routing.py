@@ -0,0 +1,161 @@
+# routing.py — Per-invocation model routing for subagents
+"""
+Each subagent has a default model in its ``AgentDefinition`` (haiku for the
+researchers, sonnet for blog_writer). With ``L7_ROUTE=1``, ``ModelRouter``
+picks the model for each Task instead. The orchestrator's PreToolUse hook
+applies the choice as the Task's ``model`` through ``updatedInput``. Rules,
+in order:
+
+1. **Degrade**: once ``L7_ROUTE_DEGRADE_AT`` (default 70%) of the round budget
+   is spent, degradable subagents (the researchers) get their cheapest
+   candidate, even over an explicit model: the budget comes first.
+2. **Explicit**: a model the orchestrator model put in the Task input is kept.
+3. **History**: the warehouse stores every subagent run (``subagent_runs``)
+   with its latency, cost, failure, retry and completeness score. The stats
+   are for the round's skill when it has enough runs, and all skills
+   otherwise. Candidates with at least ``MIN_RUNS`` runs are scored by quality
+   = completeness x (1 - failure rate) x (1 - retry rate / 2). The cheapest
+   candidate within ``QUALITY_FLOOR`` of the best quality wins.
+4. **Escalate**: if the cheapest proven model's quality is below
+   ``ESCALATE_BELOW`` and a pricier candidate has no history yet, try it.
+5. **Default**: otherwise the ``AgentDefinition`` model.
+
+Every decision goes to the audit log as an ``"event": "route"`` entry, with its
+reason.
+
+``completeness`` scores a finished run's output, 0 to 1: the text the
+subagent returned, plus any files it wrote.
+"""
+import os
+import re
+
+FAMILIES = ("haiku", "sonnet", "opus")  # cheapest first
+MIN_RUNS = 3
+QUALITY_FLOOR = 0.9
+ESCALATE_BELOW = 0.6
+
+_URL = re.compile(r"https?://\S+")
+_HEADING = re.compile(r"^#{1,6} \S", re.MULTILINE)
+_PLACEHOLDER = re.compile(r"\bTODO\b|\bTBD\b|\[(?:insert|placeholder)[^\]]*\]|lorem ipsum", re.IGNORECASE)
+MIN_TEXT_WORDS = 150
+MIN_FILE_WORDS = 200
+
+
+def family(model: str | None) -> str | None:
+    """Model id or alias -> haiku/sonnet/opus (or the id itself)."""
+    name = (model or "").lower()
+    return next((f for f in FAMILIES if f in name), model)
+
+
+def completeness(text: str, files: list[str] = ()) -> float:
+    """0-1 output-completeness score of a subagent run from its reply and written files.
+
+    Checks: enough substance, cited sources or written artifacts, no
+    placeholders, and written files that are non-trivial with headings.
+    """
+    contents = []
+    for path in files:
+        try:
+            with open(path, encoding="utf-8") as f:
+                contents.append(f.read())
+        except OSError:
+            contents.append("")
+    words = len(text.split()) + sum(len(c.split()) for c in contents)
+    checks = [
+        words >= MIN_TEXT_WORDS,
+        bool(_URL.search(text)) or any(contents),
+        not _PLACEHOLDER.search(text) and not any(_PLACEHOLDER.search(c) for c in contents),
+        all(len(c.split()) >= MIN_FILE_WORDS and _HEADING.search(c) for c in contents),
+    ]
+    return round(sum(checks) / len(checks), 3)
+
+
+def response_text(tool_response) -> str:
+    """The text a Task/Agent tool returned."""
+    if not isinstance(tool_response, dict):
+        return str(tool_response or "")
+    content = tool_response.get("content")
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content or "")
+
+
+def quality(stats: dict) -> float:
+    return ((stats.get("completeness") or 0.0) * (1 - (stats.get("failure_rate") or 0.0))
+            * (1 - 0.5 * (stats.get("retry_rate") or 0.0)))
+
+
+class ModelRouter:
+    """Chooses a subagent's model per invocation from history, budget and defaults."""
+
+    def __init__(self, defaults: dict[str, str], candidates: dict[str, tuple], degradable: tuple = (),
+                 degrade_at: float = 0.7, stats_fn=None, min_runs: int = MIN_RUNS):
+        self.defaults = defaults  # subagent type -> AgentDefinition model
+        self.candidates = candidates  # subagent type -> model aliases, cheapest first
+        self.degradable = degradable
+        self.degrade_at = degrade_at
+        self.stats_fn = stats_fn  # (subagent type, skill or None) -> {model family: stats}, e.g. Warehouse
+        self.min_runs = min_runs
+
+    def _stats(self, subagent_type: str, skill: str | None) -> dict[str, dict]:
+        if not self.stats_fn:
+            return {}
+        try:
+            stats = self.stats_fn(subagent_type, skill) if skill else {}
+            if not any(s["runs"] >= self.min_runs for s in stats.values()):
+                stats = self.stats_fn(subagent_type, None)
+        except Exception:
+            return {}
+        return stats
+
+    def route(self, subagent_type: str, requested: str | None = None, skill: str | None = None,
+              spent_share: float = 0.0) -> tuple[str | None, str, str]:
+        """(model, kind, reason) for one Task. model None means the definition's default."""
+        default = self.defaults.get(subagent_type)
+        candidates = self.candidates.get(subagent_type) or ((default,) if default else ())
+        if self.degrade_at and spent_share >= self.degrade_at and subagent_type in self.degradable and candidates:
+            return candidates[0], "degrade", f"{spent_share:.0%} of the round budget spent"
+        if requested:
+            return requested, "explicit", "model set in the Task input"
+
+        stats = self._stats(subagent_type, skill)
+        proven = {m: stats[family(m)] for m in candidates
+                  if family(m) in stats and stats[family(m)]["runs"] >= self.min_runs}
+        if not proven:
+            return default, "default", "no run history"
+        best = max(quality(s) for s in proven.values())
+        choice = next(m for m in candidates if m in proven and quality(proven[m]) >= QUALITY_FLOOR * best)
+        picked = proven[choice]
+        if quality(picked) < ESCALATE_BELOW:
+            untried = [m for m in candidates[candidates.index(choice) + 1:] if m not in proven]
+            if untried:
+                return untried[0], "escalate", f"{choice} quality {quality(picked):.2f} < {ESCALATE_BELOW}"
+        summary = (f"quality {quality(picked):.2f} (best {best:.2f}), ${picked.get('avg_cost_usd') or 0:.4f}, "
+                   f"{picked.get('avg_s') or 0:.0f}s over {picked['runs']} runs")
+        return choice, "history", summary
+
+
+def route_entry(tool_use_id: str, subagent_type: str, model: str | None, default: str | None,
+                kind: str, reason: str, skill: str | None, spent_share: float, now: float) -> dict:
+    """Audit-log entry for one routing decision."""
+    return {"timestamp": now, "event": "route", "tool_use_id": tool_use_id, "subagent_type": subagent_type,
+            "model": model or default, "default": default, "kind": kind, "reason": reason,
+            "skill": skill, "spent_share": round(spent_share, 3)}
+
+
+def written_files(entries: list[dict], agent_id: str | None) -> list[str]:
+    """Paths a subagent run wrote, from its audited Write calls."""
+    if not agent_id:
+        return []
+    return [e["file_path"] for e in entries
+            if e.get("tool") == "Write" and e.get("agent_id") == agent_id and e.get("file_path")
+            and os.path.exists(e["file_path"])]
+
+
+def task_outcome(tool_response, entries: list[dict]) -> dict:
+    """Model, status and completeness of a finished Task from its tool response."""
+    if not isinstance(tool_response, dict):
+        return {}
+    files = written_files(entries, tool_response.get("agentId"))
+    return {"model": tool_response.get("resolvedModel"), "status": tool_response.get("status"),
+            "completeness": completeness(response_text(tool_response), files)}
@@ -0,0 +1,161 @@
+# stream_stats.py — Streaming latency from partial messages: TTFT, inter-token latency, tokens/s
+"""
+With ``include_partial_messages`` the CLI forwards the raw API stream as
+``StreamEvent``s. ``StreamStats`` follows one stream per model response.
+Main agent responses are keyed by ``parent_tool_use_id = None``; a
+subagent's responses are keyed by the id of the Task that started it.
+It measures:
+
+- **TTFT**: time from when the agent was ready for the model (query sent,
+  tool results returned, or its Task started) to the first content delta.
+- **ITL**: the gaps between successive content deltas.
+- **tokens/s**: the output tokens reported in ``message_delta`` divided by
+  the time from first to last delta.
+
+The CLI streams events only for the main agent. Subagent responses arrive as
+whole ``AssistantMessage``s, so for them TTFT is measured to the complete
+message. That is an upper bound, and such responses count as not
+``streamed``.
+
+Messages are dispatched on their class name, so live SDK objects and decoded
+recordings work the same. Used by ``agent.py --stream-stats`` and
+``test_sdk.py --stream-stats``.
+"""
+import time
+
+import metrics
+
+SUBAGENT_TOOLS = ("Task", "Agent")
+CONTENT_DELTAS = ("text_delta", "thinking_delta", "input_json_delta")
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile; None for no samples."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def aggregate(streams: list[dict]) -> dict:
+    """TTFT/ITL percentiles and decode rate over a group of finished streams."""
+    ttfts = [s["ttft_s"] for s in streams if s["ttft_s"] is not None]
+    gaps = [g for s in streams for g in s["gaps"]]
+    tokens = sum(s["tokens"] for s in streams)
+    stream_s = sum(s["last"] - s["first"] for s in streams if s["first"] is not None)
+
+    def rounded(value, factor=1.0, digits=3):
+        return None if value is None else round(value * factor, digits)
+
+    return {
+        "responses": len(streams),
+        "streamed": sum(1 for s in streams if s["first"] is not None),
+        "ttft_p50_s": rounded(percentile(ttfts, 50)),
+        "ttft_p95_s": rounded(percentile(ttfts, 95)),
+        "itl_p50_ms": rounded(percentile(gaps, 50), 1000, 1),
+        "itl_p95_ms": rounded(percentile(gaps, 95), 1000, 1),
+        "output_tokens": tokens,
+        "tokens_per_s": round(tokens / stream_s, 1) if stream_s > 0 else None,
+    }
+
+
+class StreamStats:
+    """Per-response streaming timings, grouped by agent and by model."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.streams: list[dict] = []  # finished streams, whole session
+        self._round_first = 0  # index of the current round's first stream
+        self._open: dict[str | None, dict] = {}  # lane -> stream in progress
+        self._ready: dict[str | None, float] = {}  # lane -> when it began waiting on the model
+        self._agents: dict[str, str] = {}  # Task tool_use_id -> subagent type
+
+    def begin_round(self, now: float | None = None) -> None:
+        """The query was sent: the main lane is waiting on the model."""
+        self._round_first = len(self.streams)
+        self._open.clear()
+        self._ready = {None: self.clock() if now is None else now}
+
+    def observe(self, message, now: float | None = None) -> None:
+        now = self.clock() if now is None else now
+        kind = type(message).__name__
+        if kind == "StreamEvent":
+            self._observe_event(message.event, message.parent_tool_use_id, now)
+        elif kind == "AssistantMessage":
+            lane = message.parent_tool_use_id
+            if lane is not None and lane not in self._open and lane in self._ready:
+                # Unstreamed subagent response: time it to the first whole message
+                self.streams.append(self._new_stream(lane, message.model, now))
+                self.streams[-1]["ttft_s"] = now - self.streams[-1]["ready"]
+            for block in message.content:
+                if getattr(block, "name", None) in SUBAGENT_TOOLS:
+                    self._agents[block.id] = (block.input or {}).get("subagent_type", "subagent")
+                    self._ready[block.id] = now
+        elif kind == "UserMessage":
+            # Tool results went back: the lane's next request starts now
+            self._ready[getattr(message, "parent_tool_use_id", None)] = now
+
+    def _observe_event(self, event: dict, lane: str | None, now: float) -> None:
+        etype = event.get("type")
+        if etype == "content_block_delta":
+            stream = self._open.get(lane)
+            if stream is None or event.get("delta", {}).get("type") not in CONTENT_DELTAS:
+                return
+            if stream["first"] is None:
+                stream["first"] = now
+                stream["ttft_s"] = now - stream["ready"]
+            else:
+                stream["gaps"].append(now - stream["last"])
+            stream["last"] = now
+        elif etype == "message_start":
+            message = event.get("message", {})
+            self._open[lane] = self._new_stream(lane, message.get("model"), now)
+            self._open[lane]["tokens"] = (message.get("usage") or {}).get("output_tokens", 0)
+        elif etype == "message_delta":
+            stream = self._open.get(lane)
+            tokens = (event.get("usage") or {}).get("output_tokens")
+            if stream is not None and tokens is not None:
+                stream["tokens"] = tokens
+        elif etype == "message_stop":
+            stream = self._open.pop(lane, None)
+            if stream is not None:
+                self.streams.append(stream)
+                if stream["ttft_s"] is not None:
+                    metrics.TTFT.observe(stream["ttft_s"], stream["agent"], stream["model"])
+
+    def _new_stream(self, lane: str | None, model: str | None, now: float) -> dict:
+        return {
+            "agent": self._agents.get(lane, "subagent") if lane else "Main",
+            "model": model or "unknown",
+            "ready": self._ready.pop(lane, now),
+            "first": None, "last": None, "ttft_s": None, "gaps": [], "tokens": 0,
+        }
+
+    def summary(self, whole_session: bool = False) -> dict:
+        """Aggregates for the current round (or the session): overall, by agent, by model."""
+        streams = self.streams if whole_session else self.streams[self._round_first:]
+        by_agent: dict[str, list] = {}
+        by_model: dict[str, list] = {}
+        for stream in streams:
+            by_agent.setdefault(stream["agent"], []).append(stream)
+            by_model.setdefault(stream["model"], []).append(stream)
+        return {
+            "overall": aggregate(streams),
+            "by_agent": {name: aggregate(group) for name, group in by_agent.items()},
+            "by_model": {name: aggregate(group) for name, group in by_model.items()},
+        }
+
+
+def format_summary(summary: dict) -> str:
+    """One compact line per agent for the round summary."""
+    parts = []
+    for agent, stats in summary["by_agent"].items():
+        ttft = f"{stats['ttft_p50_s']:.2f}s" if stats["ttft_p50_s"] is not None else "—"
+        if not stats["streamed"]:
+            parts.append(f"{agent} ≤{ttft} to message")
+            continue
+        itl = f"{stats['itl_p50_ms']:.0f}ms" if stats["itl_p50_ms"] is not None else "—"
+        rate = f"{stats['tokens_per_s']:.0f} tok/s" if stats["tokens_per_s"] is not None else "— tok/s"
+        parts.append(f"{agent} ttft {ttft} itl {itl} {rate}")
+    return " | ".join(parts)
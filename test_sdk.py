@@ -9,17 +9,31 @@ Usage:
   uv run python test_sdk.py --model gpt-oss-120b "What is Python pattern matching?"
   uv run python test_sdk.py --no-tools "Just answer: what is 2+2?"
   uv run python test_sdk.py --raw "What is Python pattern matching?"
+  uv run python test_sdk.py --stream-stats "What is Python pattern matching?"   # TTFT / ITL / tokens/s
+
+A/B benchmark mode (quiet, one line per run, then a comparison table):
+  uv run python test_sdk.py --models sonnet,gpt-oss-120b --repeat 5 "Query one" "Query two"
+  uv run python test_sdk.py --models haiku,sonnet --repeat 10 --json ab.json "What is 2+2?"
+  uv run python test_sdk.py --models sonnet --subagent-models haiku,sonnet,gpt-oss-120b --repeat 5 "Q"
+  uv run python test_sdk.py --models sonnet,gpt-oss-120b --subagent-models inherit --repeat 5 "Q"
+
+Load-test mode (concurrent sessions against a proxy, one level per concurrency):
+  uv run python test_sdk.py --load --model gpt-oss-120b --concurrency 1,4,16 --rate 2 --duration 120 "Q"
 """
 import argparse
 import asyncio
 import json
 import os
+import random
+import statistics
 import time
+from collections import Counter
 from datetime import datetime
 from dotenv import load_dotenv
+from stream_stats import StreamStats, format_summary
 from claude_agent_sdk import (
     AgentDefinition, ClaudeSDKClient, ClaudeAgentOptions, AssistantMessage,
-    HookMatcher, ResultMessage, TextBlock, ToolUseBlock,
+    HookMatcher, ResultMessage, StreamEvent, TextBlock, ToolUseBlock,
 )
 
 load_dotenv()
@@ -37,10 +51,34 @@ LOG_DIR = "session_data"
 DEBUG_LOG = os.path.join(LOG_DIR, "test_sdk_debug.log")
 
 
-def stderr_handler(line: str) -> None:
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_SEED = 7
+
+# Substrings (lowercased) in an error or CLI stderr that identify a failure class.
+# Checked in order; the Harmony ``description=None`` rejection surfaces as a
+# pydantic ValidationError from the proxy.
+FAILURE_PATTERNS = [
+    ("schema", ("validationerror", "validation error", "input should be a valid string",
+                "tooldescription")),
+    ("rate_limit", ("429", "rate limit", "rate_limit")),
+    ("overloaded", ("529", "overloaded")),
+    ("connection", ("econnrefused", "connection refused", "connection error", "fetch failed")),
+]
+SCHEMA_NEEDLES = FAILURE_PATTERNS[0][1]
+
+# A load level is past saturation when throughput gains less than this over the
+# previous level, p95 latency exceeds this multiple of the lowest level's, or
+# this share of requests fail.
+SATURATION_MIN_GAIN = 0.10
+SATURATION_LATENCY_FACTOR = 2.0
+SATURATION_ERROR_RATE = 0.05
+
+
+def stderr_handler(line: str, echo: bool = True) -> None:
     """Print all CLI stderr to console and log file."""
     ts = datetime.now().strftime("%H:%M:%S")
-    print(f"{DIM}[stderr {ts}] {line}{RESET}")
+    if echo:
+        print(f"{DIM}[stderr {ts}] {line}{RESET}")
     try:
         with open(DEBUG_LOG, "a", encoding="utf-8") as f:
             f.write(f"[{ts}] {line}\n")
@@ -79,41 +117,16 @@ def display_message(message: AssistantMessage, raw: bool = False):
 
 def display_result(message: ResultMessage):
     """Display result summary."""
-    cost = f"${message.total_cost_usd:.4f}" if hasattr(message, "total_cost_usd") else "$?"
+    cost_usd = getattr(message, "total_cost_usd", None)
+    cost = f"${cost_usd:.4f}" if cost_usd is not None else "$?"
     turns = message.num_turns if hasattr(message, "num_turns") else "?"
     session = message.session_id if hasattr(message, "session_id") else "?"
     print(f"\n{DIM}Result: {cost} | {turns} turns | session: {session}{RESET}\n")
 
 
-async def main():
-    parser = argparse.ArgumentParser(
-        description="Minimal diagnostic agent for testing LLM compatibility"
-    )
-    parser.add_argument("query", help="The query to send to the agent")
-    parser.add_argument(
-        "--model", default="sonnet",
-        help="Model to use (default: sonnet). E.g. gpt-oss-120b"
-    )
-    parser.add_argument(
-        "--no-tools", action="store_true",
-        help="Run with zero tools (tests basic chat without Harmony tool issues)"
-    )
-    parser.add_argument(
-        "--raw", action="store_true",
-        help="Enable include_partial_messages to see raw stream events"
-    )
-    args = parser.parse_args()
-
-    os.makedirs(LOG_DIR, exist_ok=True)
-    with open(DEBUG_LOG, "w", encoding="utf-8") as f:
-        f.write(f"# test_sdk debug log — {datetime.now().isoformat()}\n")
-        f.write(f"# model: {args.model} | no-tools: {args.no_tools} | raw: {args.raw}\n")
-        f.write(f"# query: {args.query}\n\n")
-
-    print(f"{BOLD}{CYAN}test_sdk.py — Diagnostic Agent{RESET}")
-    print(f"{DIM}Model: {args.model} | Tools: {'disabled' if args.no_tools else 'enabled'} | Raw: {args.raw}{RESET}")
-    print()
-
+def build_options(model: str, no_tools: bool, stderr, verbose: bool = True,
+                  partial: bool = False, subagent_model: str = "haiku") -> ClaudeAgentOptions:
+    """Options for one diagnostic session (main orchestrator + web_researcher on ``subagent_model``)."""
     # ── System prompt ────────────────────────────────────
     system_prompt = (
         "You are a research assistant. "
@@ -123,7 +136,7 @@ async def main():
 
     # ── Agents (single subagent) ─────────────────────────
     agents = {}
-    if not args.no_tools:
+    if not no_tools:
         agents["web_researcher"] = AgentDefinition(
             description="Finds articles, videos, and community content.",
             prompt=(
@@ -132,7 +145,7 @@ async def main():
                 "Return a concise summary of findings."
             ),
             tools=["WebSearch", "WebFetch"],
-            model="haiku",
+            model=subagent_model,
         )
 
     # ── Hooks (tool logging) ─────────────────────────────
@@ -140,46 +153,563 @@ async def main():
         "PreToolUse": [
             HookMatcher(matcher="*", hooks=[log_tool_call]),
         ],
-    }
+    } if verbose else {}
 
     # ── Allowed tools ────────────────────────────────────
-    allowed_tools = [] if args.no_tools else ["Task", "WebSearch", "WebFetch"]
+    allowed_tools = [] if no_tools else ["Task", "WebSearch", "WebFetch"]
 
     # ── Options ──────────────────────────────────────────
-    options = ClaudeAgentOptions(
+    return ClaudeAgentOptions(
         system_prompt=system_prompt,
         allowed_tools=allowed_tools,
-        model=args.model,
+        model=model,
         agents=agents,
         permission_mode="acceptEdits",
         max_turns=20,
         max_budget_usd=1.00,
         hooks=hooks,
-        stderr=stderr_handler,
+        stderr=stderr,
+        include_partial_messages=partial,
         debug_stderr=None,
         extra_args={"debug-to-stderr": None},
     )
 
-    # ── Run ──────────────────────────────────────────────
-    print(f"{BOLD}Query:{RESET} {args.query}\n")
-    start = time.time()
 
-    try:
+def classify_failure(error: str | None, stderr_lines: list[str],
+                     result: ResultMessage | None) -> str | None:
+    """Map a finished run to a failure class, or None when it succeeded."""
+    if error is None and result is not None and not getattr(result, "is_error", False):
+        return None
+    haystack = " ".join([error or ""] + stderr_lines[-200:]).lower()
+    for failure, needles in FAILURE_PATTERNS:
+        if any(needle in haystack for needle in needles):
+            return failure
+    if result is not None:
+        subtype = getattr(result, "subtype", "") or ""
+        return subtype.removeprefix("error_") or "result_error"
+    return "cli_error" if error else "no_result"
+
+
+async def run_query(query: str, model: str, args, verbose: bool = True,
+                    partial: bool = False, subagent_model: str | None = None) -> dict:
+    """Run one diagnostic session and return its timing/usage record.
+
+    web_researcher runs on ``subagent_model`` (default ``--subagent-model``);
+    ``inherit`` runs it on ``model``. The record names the model it ran on.
+
+    With ``partial`` the CLI streams raw events, so ``stream_start_s`` is the
+    first streamed token rather than the first complete message. It also
+    fills in the streaming latencies: ``ttft_s`` (first response),
+    ``itl_p50_ms``, ``tokens_per_s`` and the per-agent/model ``stream`` summary.
+    """
+    stderr_lines: list[str] = []
+
+    def on_stderr(line: str) -> None:
+        stderr_lines.append(line)
+        stderr_handler(line, echo=verbose)
+
+    subagent_model = subagent_model or args.subagent_model
+    options = build_options(model, args.no_tools, on_stderr, verbose=verbose, partial=partial,
+                            subagent_model=subagent_model)
+    run = {
+        "query": query,
+        "model": model,
+        "subagent_model": model if subagent_model == "inherit" else subagent_model,
+        "variant": variant_label(model, subagent_model),
+        "stream_start_s": None,
+        "first_message_s": None,
+        "first_tool_s": None,
+        "ttft_s": None,
+        "itl_p50_ms": None,
+        "tokens_per_s": None,
+        "latency_s": None,
+        "turns": None,
+        "tool_calls": 0,
+        "tools": {},
+        "cost_usd": None,
+        "session_id": None,
+        "failure": None,
+        "error": None,
+        "schema_errors": 0,
+        "stream": None,
+    }
+    tools = Counter()
+    result = None
+    start = time.perf_counter()
+    stream_stats = StreamStats() if partial else None
+
+    async def consume():
+        nonlocal result
         async with ClaudeSDKClient(options=options) as client:
-            await client.query(args.query)
+            await client.query(query)
+            if stream_stats:
+                stream_stats.begin_round()
             async for message in client.receive_response():
+                if stream_stats:
+                    stream_stats.observe(message)
+                now = time.perf_counter() - start
+                if run["stream_start_s"] is None and isinstance(message, (StreamEvent, AssistantMessage)):
+                    run["stream_start_s"] = round(now, 3)
                 if isinstance(message, AssistantMessage):
-                    display_message(message, raw=args.raw)
+                    if run["first_message_s"] is None:
+                        run["first_message_s"] = round(now, 3)
+                    for block in message.content:
+                        if isinstance(block, ToolUseBlock):
+                            if run["first_tool_s"] is None:
+                                run["first_tool_s"] = round(now, 3)
+                            tools[block.name] += 1
+                    if verbose:
+                        display_message(message, raw=args.raw)
                 elif isinstance(message, ResultMessage):
-                    display_result(message)
+                    result = message
+                    if verbose:
+                        display_result(message)
+
+    try:
+        async with asyncio.timeout(args.timeout):
+            await consume()
+    except TimeoutError:
+        run["error"] = f"timed out after {args.timeout}s"
+        run["failure"] = "timeout"
     except Exception as e:
-        elapsed = time.time() - start
-        print(f"\n{RED}{BOLD}Error after {elapsed:.1f}s:{RESET} {e}")
-        print(f"{DIM}Check {DEBUG_LOG} for full stderr output.{RESET}")
-        raise
+        run["error"] = f"{type(e).__name__}: {e}"
+        if verbose:
+            elapsed = time.perf_counter() - start
+            print(f"\n{RED}{BOLD}Error after {elapsed:.1f}s:{RESET} {e}")
+            print(f"{DIM}Check {DEBUG_LOG} for full stderr output.{RESET}")
+            raise
+
+    run["latency_s"] = round(time.perf_counter() - start, 3)
+    run["tools"] = dict(tools)
+    run["tool_calls"] = sum(tools.values())
+    if result is not None:
+        run["turns"] = getattr(result, "num_turns", None)
+        run["cost_usd"] = getattr(result, "total_cost_usd", None)
+        run["session_id"] = getattr(result, "session_id", None)
+    if stream_stats and stream_stats.streams:
+        run["stream"] = stream_stats.summary()
+        overall = run["stream"]["overall"]
+        first_ttft = stream_stats.streams[0]["ttft_s"]
+        run["ttft_s"] = round(first_ttft, 3) if first_ttft is not None else None
+        run["itl_p50_ms"] = overall["itl_p50_ms"]
+        run["tokens_per_s"] = overall["tokens_per_s"]
+    run["failure"] = run["failure"] or classify_failure(run["error"], stderr_lines, result)
+    # Counted even on success: the CLI can retry past a rejected tool schema
+    run["schema_errors"] = sum(1 for line in stderr_lines
+                               if any(needle in line.lower() for needle in SCHEMA_NEEDLES))
+    return run
+
+
+# ── Benchmark statistics ─────────────────────────────────
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def bootstrap_ci(values: list[float], stat=statistics.median, level: float = 0.95,
+                 other: list[float] | None = None) -> tuple[float, float]:
+    """Percentile-bootstrap CI of ``stat(values)``, or of ``stat(values) - stat(other)``.
+
+    Run times are skewed and samples are small, so a resampling CI of the
+    median is more honest than a normal-theory interval around the mean.
+    """
+    rng = random.Random(BOOTSTRAP_SEED)
+    estimates = []
+    for _ in range(BOOTSTRAP_RESAMPLES):
+        estimate = stat(rng.choices(values, k=len(values)))
+        if other is not None:
+            estimate -= stat(rng.choices(other, k=len(other)))
+        estimates.append(estimate)
+    tail = (1 - level) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def summarize(values: list) -> dict | None:
+    """Median, p90 and 95% CI of the median for one metric; None if no samples."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    low, high = bootstrap_ci(values) if len(values) > 1 else (values[0], values[0])
+    return {
+        "n": len(values),
+        "median": round(statistics.median(values), 4),
+        "p90": round(percentile(values, 90), 4),
+        "ci95": [round(low, 4), round(high, 4)],
+    }
+
+
+BENCH_METRICS = ["latency_s", "first_message_s", "first_tool_s", "turns", "tool_calls", "cost_usd",
+                 "ttft_s", "itl_p50_ms", "tokens_per_s"]
+
+
+def variant_label(model: str, subagent_model: str) -> str:
+    """A benchmark variant: the orchestrator's model and web_researcher's."""
+    return f"{model}/{model if subagent_model == 'inherit' else subagent_model}"
+
+
+def build_report(runs: list[dict], variants: list[tuple[str, str]]) -> dict:
+    """Per-variant metric summaries plus median-latency deltas against the first variant.
+
+    A variant is an (orchestrator model, subagent model) pair, labelled ``model/subagent``.
+    """
+    summary = {}
+    labels = [variant_label(model, subagent) for model, subagent in variants]
+    for label, (model, subagent) in zip(labels, variants):
+        model_runs = [r for r in runs if r["variant"] == label]
+        ok_runs = [r for r in model_runs if r["failure"] is None]
+        summary[label] = {
+            "model": model,
+            "subagent_model": model if subagent == "inherit" else subagent,
+            "runs": len(model_runs),
+            "ok": len(ok_runs),
+            "failures": dict(Counter(r["failure"] for r in model_runs if r["failure"])),
+            "tools": dict(sum((Counter(r["tools"]) for r in ok_runs), Counter())),
+            # Timing/usage stats use successful runs only; failures are counted above
+            **{metric: summarize([r[metric] for r in ok_runs]) for metric in BENCH_METRICS},
+        }
+
+    comparison = []
+    baseline = [r["latency_s"] for r in runs if r["variant"] == labels[0] and r["failure"] is None]
+    for label in labels[1:]:
+        latencies = [r["latency_s"] for r in runs if r["variant"] == label and r["failure"] is None]
+        if len(baseline) < 2 or len(latencies) < 2:
+            continue
+        low, high = bootstrap_ci(latencies, other=baseline)
+        comparison.append({
+            "variant": label,
+            "baseline": labels[0],
+            "median_latency_delta_s": round(statistics.median(latencies) - statistics.median(baseline), 3),
+            "ci95": [round(low, 3), round(high, 3)],
+            "significant": low > 0 or high < 0,
+        })
+    return {"summary": summary, "comparison": comparison}
+
+
+def print_report(report: dict) -> None:
+    """Print the comparison table for a benchmark report."""
+    def cell(stats: dict | None, fmt: str) -> str:
+        if not stats:
+            return "—"
+        low, high = stats["ci95"]
+        return f"{stats['median']:{fmt}} [{low:{fmt}}–{high:{fmt}}]"
+
+    print(f"\n{BOLD}A/B comparison{RESET} {DIM}(median [95% CI], successful runs only){RESET}")
+    header = f"  {'model/subagents':<28} {'ok':>6}  {'latency s':<22} {'p90':>7}  {'1st msg s':<20} " \
+             f"{'1st tool s':<20} {'turns':<14} {'cost $':<24} failures"
+    print(f"{DIM}{header}{RESET}")
+    for label, stats in report["summary"].items():
+        latency = stats["latency_s"]
+        failures = ", ".join(f"{k}×{v}" for k, v in stats["failures"].items()) or "—"
+        colour = GREEN if stats["ok"] == stats["runs"] else YELLOW if stats["ok"] else RED
+        print(f"  {label:<28} {colour}{stats['ok']:>2}/{stats['runs']:<3}{RESET}  "
+              f"{cell(latency, '.1f'):<22} {latency['p90'] if latency else '—':>7}  "
+              f"{cell(stats['first_message_s'], '.1f'):<20} {cell(stats['first_tool_s'], '.1f'):<20} "
+              f"{cell(stats['turns'], '.0f'):<14} {cell(stats['cost_usd'], '.4f'):<24} {failures}")
+        if stats["ttft_s"]:
+            print(f"  {'':<28} {'':>6}  {DIM}streaming: ttft {cell(stats['ttft_s'], '.2f')} s | "
+                  f"itl p50 {cell(stats['itl_p50_ms'], '.0f')} ms | "
+                  f"{cell(stats['tokens_per_s'], '.0f')} tok/s{RESET}")
+    for row in report["comparison"]:
+        verdict = f"{YELLOW}significant{RESET}" if row["significant"] else f"{DIM}not significant{RESET}"
+        low, high = row["ci95"]
+        print(f"  {row['variant']} vs {row['baseline']}: median latency "
+              f"{row['median_latency_delta_s']:+.1f}s [{low:+.1f}, {high:+.1f}] — {verdict}")
+
+
+async def run_benchmark(args, variants: list[tuple[str, str]]) -> dict:
+    """Run every query × variant × repetition; variants interleave within a repetition."""
+    runs = []
+    total = len(args.query) * len(variants) * args.repeat
+    for rep in range(1, args.repeat + 1):
+        for query in args.query:
+            for model, subagent_model in variants:
+                run = await run_query(query, model, args, verbose=False, partial=args.stream_stats,
+                                      subagent_model=subagent_model)
+                run["rep"] = rep
+                runs.append(run)
+                status = f"{GREEN}ok{RESET}" if run["failure"] is None else f"{RED}{run['failure']}{RESET}"
+                cost = f"${run['cost_usd']:.4f}" if run["cost_usd"] is not None else "$?"
+                print(f"{DIM}[{len(runs)}/{total}]{RESET} {run['variant']:<28} rep {rep} | {status} | "
+                      f"{run['latency_s']:.1f}s | first tool {run['first_tool_s'] or '—'} | "
+                      f"{run['tool_calls']} tools | {run['turns'] or '?'} turns | {cost} "
+                      f"{DIM}{query[:40]}{RESET}")
+    report = {
+        "config": {
+            "models": list(dict.fromkeys(model for model, _ in variants)),
+            "subagent_models": list(dict.fromkeys(subagent for _, subagent in variants)),
+            "queries": args.query,
+            "repeat": args.repeat,
+            "no_tools": args.no_tools,
+            "timeout_s": args.timeout,
+            "started": datetime.now().isoformat(timespec="seconds"),
+        },
+        "runs": runs,
+        **build_report(runs, variants),
+    }
+    print_report(report)
+    return report
 
-    elapsed = time.time() - start
-    print(f"{DIM}Completed in {elapsed:.1f}s{RESET}")
+
+# ── Load test ────────────────────────────────────────────
+
+async def run_load_level(args, model: str, concurrency: int) -> dict:
+    """Drive one concurrency level for ``args.duration`` seconds.
+
+    With ``--rate`` arrivals are open-loop (Poisson at that rate, capped at
+    ``concurrency`` in flight); otherwise ``concurrency`` closed-loop users
+    send back-to-back. Arrivals still queued when the duration ends are shed.
+    """
+    gate = asyncio.Semaphore(concurrency)
+    rng = random.Random(BOOTSTRAP_SEED + concurrency)
+    runs: list[dict] = []
+    shed = 0
+    start = time.perf_counter()
+    deadline = start + args.duration
+
+    async def one(index: int) -> None:
+        nonlocal shed
+        arrived = time.perf_counter()
+        async with gate:
+            if time.perf_counter() >= deadline:
+                shed += 1
+                return
+            queued = time.perf_counter() - arrived
+            run = await run_query(args.query[index % len(args.query)], model, args,
+                                  verbose=False, partial=True)
+        run["queued_s"] = round(queued, 3)
+        runs.append(run)
+        status = f"{GREEN}ok{RESET}" if run["failure"] is None else f"{RED}{run['failure']}{RESET}"
+        print(f"{DIM}[c={concurrency} +{time.perf_counter() - start:5.1f}s]{RESET} {status} | "
+              f"{run['latency_s']:.1f}s | stream start {run['stream_start_s'] or '—'} | "
+              f"queued {queued:.1f}s")
+
+    async def user(first: int) -> None:
+        index = first
+        while time.perf_counter() < deadline:
+            await one(index)
+            index += concurrency
+
+    if args.rate:
+        tasks, index = [], 0
+        while time.perf_counter() < deadline:
+            tasks.append(asyncio.create_task(one(index)))
+            index += 1
+            await asyncio.sleep(rng.expovariate(args.rate))
+        await asyncio.gather(*tasks)
+    else:
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in runs if r["failure"] is None]
+    failures = Counter(r["failure"] for r in runs if r["failure"])
+    latencies = [r["latency_s"] for r in ok]
+    stream_starts = [r["stream_start_s"] for r in ok if r["stream_start_s"] is not None]
+    ttfts = [r["ttft_s"] for r in ok if r["ttft_s"] is not None]
+    rates = [r["tokens_per_s"] for r in ok if r["tokens_per_s"] is not None]
+    queued = [r["queued_s"] for r in runs]
+
+    def pct(values: list[float], p: float):
+        return round(percentile(values, p), 3) if values else None
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 1),
+        "started": len(runs),
+        "ok": len(ok),
+        "shed": shed,
+        "throughput_per_min": round(len(ok) / elapsed * 60, 2),
+        "error_rate": round(sum(failures.values()) / len(runs), 3) if runs else 0.0,
+        "timeout_rate": round(failures["timeout"] / len(runs), 3) if runs else 0.0,
+        "failures": dict(failures),
+        "schema_errors": sum(r["schema_errors"] for r in runs),
+        "latency_s": {"p50": pct(latencies, 50), "p95": pct(latencies, 95), "p99": pct(latencies, 99)},
+        "stream_start_s": {"p50": pct(stream_starts, 50), "p95": pct(stream_starts, 95)},
+        "ttft_s": {"p50": pct(ttfts, 50), "p95": pct(ttfts, 95)},
+        "tokens_per_s": {"p50": pct(rates, 50), "p05": pct(rates, 5)},
+        "queued_s": {"p50": pct(queued, 50), "p95": pct(queued, 95)},
+        "runs": runs,
+    }
+
+
+def find_saturation(levels: list[dict]) -> dict:
+    """First level where throughput flattens, latency blows up or errors climb."""
+    base_p95 = next((lv["latency_s"]["p95"] for lv in levels if lv["latency_s"]["p95"]), None)
+    for prev, level in zip(levels, levels[1:]):
+        reasons = []
+        if level["throughput_per_min"] < prev["throughput_per_min"] * (1 + SATURATION_MIN_GAIN):
+            reasons.append(f"throughput +{SATURATION_MIN_GAIN:.0%} not reached")
+        p95 = level["latency_s"]["p95"]
+        if base_p95 and p95 and p95 > base_p95 * SATURATION_LATENCY_FACTOR:
+            reasons.append(f"p95 latency > {SATURATION_LATENCY_FACTOR:g}x baseline")
+        if level["error_rate"] > SATURATION_ERROR_RATE:
+            reasons.append(f"error rate > {SATURATION_ERROR_RATE:.0%}")
+        if reasons:
+            return {"saturated_at": level["concurrency"],
+                    "max_sustainable": prev["concurrency"], "reasons": reasons}
+    return {"saturated_at": None, "max_sustainable": levels[-1]["concurrency"] if levels else None,
+            "reasons": []}
+
+
+async def run_load(args, model: str) -> dict:
+    """Run every concurrency level in ascending order and locate saturation."""
+    concurrency = sorted({int(c) for c in args.concurrency.split(",") if c.strip()})
+    levels = []
+    for c in concurrency:
+        print(f"\n{BOLD}Concurrency {c}{RESET} {DIM}({args.duration:.0f}s, "
+              f"{f'{args.rate}/s arrivals' if args.rate else 'closed loop'}){RESET}")
+        levels.append(await run_load_level(args, model, c))
+    saturation = find_saturation(levels)
+
+    print(f"\n{BOLD}Load test — {model}{RESET}")
+    print(f"{DIM}  {'conc':>4} {'ok/started':>11} {'shed':>5} {'req/min':>8} {'lat p50':>8} "
+          f"{'p95':>7} {'stream p50':>11} {'p95':>7} {'ttft p95':>9} {'tok/s':>6} {'queue p95':>10} "
+          f"{'err%':>6} {'t/o%':>6} "
+          f"{'schema':>7}{RESET}")
+    for lv in levels:
+        colour = RED if lv["concurrency"] == saturation["saturated_at"] else ""
+        lat, stream = lv["latency_s"], lv["stream_start_s"]
+        print(f"  {colour}{lv['concurrency']:>4} {lv['ok']:>5}/{lv['started']:<5} {lv['shed']:>5} "
+              f"{lv['throughput_per_min']:>8} {lat['p50'] or '—':>8} {lat['p95'] or '—':>7} "
+              f"{stream['p50'] or '—':>11} {stream['p95'] or '—':>7} {lv['ttft_s']['p95'] or '—':>9} "
+              f"{lv['tokens_per_s']['p50'] or '—':>6} {lv['queued_s']['p95'] or '—':>10} "
+              f"{lv['error_rate']:>6.1%} {lv['timeout_rate']:>6.1%} {lv['schema_errors']:>7}{RESET}")
+    if saturation["saturated_at"]:
+        print(f"{YELLOW}Saturates at concurrency {saturation['saturated_at']} "
+              f"({'; '.join(saturation['reasons'])}); max sustainable: "
+              f"{saturation['max_sustainable']}{RESET}")
+    else:
+        print(f"{GREEN}No saturation up to concurrency {saturation['max_sustainable']}{RESET}")
+    return {
+        "config": {
+            "model": model,
+            "subagent_model": model if args.subagent_model == "inherit" else args.subagent_model,
+            "queries": args.query,
+            "concurrency": concurrency,
+            "rate_per_s": args.rate,
+            "duration_s": args.duration,
+            "timeout_s": args.timeout,
+            "no_tools": args.no_tools,
+            "started": datetime.now().isoformat(timespec="seconds"),
+        },
+        "levels": levels,
+        "saturation": saturation,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Minimal diagnostic agent for testing LLM compatibility"
+    )
+    parser.add_argument("query", nargs="+", help="The query (or queries) to send to the agent")
+    parser.add_argument(
+        "--model", default="sonnet",
+        help="Model to use (default: sonnet). E.g. gpt-oss-120b"
+    )
+    parser.add_argument(
+        "--models",
+        help="Comma-separated models to A/B benchmark, e.g. sonnet,gpt-oss-120b (first is the baseline)"
+    )
+    parser.add_argument(
+        "--subagent-model", default="haiku",
+        help="Model for web_researcher (default: haiku); 'inherit' uses the orchestrator's model"
+    )
+    parser.add_argument(
+        "--subagent-models",
+        help="Comma-separated web_researcher models to benchmark against each of --models, "
+             "e.g. haiku,sonnet or inherit"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1,
+        help="Runs per query and model (benchmark mode when > 1)"
+    )
+    parser.add_argument(
+        "--json", metavar="PATH",
+        help="Write per-run records and the comparison to PATH (implies benchmark mode)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=600.0,
+        help="Seconds before a run is abandoned and classed as a timeout (default: 600)"
+    )
+    parser.add_argument(
+        "--load", action="store_true",
+        help="Load-test --model with concurrent sessions (see --concurrency/--rate/--duration)"
+    )
+    parser.add_argument(
+        "--concurrency", default="1,2,4,8",
+        help="Comma-separated concurrency levels for --load (default: 1,2,4,8)"
+    )
+    parser.add_argument(
+        "--rate", type=float,
+        help="Open-loop arrivals per second for --load (default: closed loop, back-to-back)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60.0,
+        help="Seconds of arrivals per concurrency level for --load (default: 60)"
+    )
+    parser.add_argument(
+        "--no-tools", action="store_true",
+        help="Run with zero tools (tests basic chat without Harmony tool issues)"
+    )
+    parser.add_argument(
+        "--raw", action="store_true",
+        help="Enable include_partial_messages to see raw stream events"
+    )
+    parser.add_argument(
+        "--stream-stats", action="store_true",
+        help="Stream partial messages and report TTFT, inter-token latency and tokens/s "
+             "(always on in --load)"
+    )
+    args = parser.parse_args()
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()] if args.models else [args.model]
+    subagent_models = [m.strip() for m in args.subagent_models.split(",") if m.strip()] \
+        if args.subagent_models else [args.subagent_model]
+    args.subagent_model = subagent_models[0]
+    variants = [(model, subagent) for model in models for subagent in subagent_models]
+    bench = len(variants) > 1 or args.repeat > 1 or len(args.query) > 1 or args.json
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    with open(DEBUG_LOG, "w", encoding="utf-8") as f:
+        f.write(f"# test_sdk debug log — {datetime.now().isoformat()}\n")
+        f.write(f"# model: {','.join(models)} | subagents: {','.join(subagent_models)} | "
+                f"no-tools: {args.no_tools} | raw: {args.raw}\n")
+        f.write(f"# query: {' | '.join(args.query)}\n\n")
+
+    print(f"{BOLD}{CYAN}test_sdk.py — Diagnostic Agent{RESET}")
+    if args.load:
+        report = await run_load(args, models[0])
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, default=str)
+            print(f"\n{DIM}Report: {args.json}{RESET}")
+        return
+    if bench:
+        print(f"{DIM}Benchmark: {', '.join(variant_label(*v) for v in variants)} × {len(args.query)} queries "
+              f"× {args.repeat} "
+              f"| Tools: {'disabled' if args.no_tools else 'enabled'} | Timeout: {args.timeout:.0f}s{RESET}")
+        print()
+        report = await run_benchmark(args, variants)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, default=str)
+            print(f"\n{DIM}Report: {args.json}{RESET}")
+        return
+
+    print(f"{DIM}Model: {models[0]} | Subagents: {args.subagent_model} | Tools: {'disabled' if args.no_tools else 'enabled'} | Raw: {args.raw}{RESET}")
+    print()
+
+    # ── Run ──────────────────────────────────────────────
+    print(f"{BOLD}Query:{RESET} {args.query[0]}\n")
+    run = await run_query(args.query[0], models[0], args, partial=args.raw or args.stream_stats)
+    if run["stream"]:
+        print(f"{DIM}Stream: {format_summary(run['stream'])}{RESET}")
+    if run["failure"]:
+        print(f"{RED}{BOLD}Failed ({run['failure']}):{RESET} {run['error'] or 'see result above'}")
+        print(f"{DIM}Check {DEBUG_LOG} for full stderr output.{RESET}")
+    print(f"{DIM}Completed in {run['latency_s']:.1f}s{RESET}")
 
 
 asyncio.run(main())
@@ -0,0 +1,85 @@
+"""Limited Bash commands (bash_limits.py, orchestrator.prepare_bash)."""
+import asyncio
+import json
+import os
+import shlex
+import subprocess
+import sys
+
+import pytest
+
+import bash_limits
+import orchestrator
+
+pytestmark = pytest.mark.skipif(bash_limits.resource is None, reason="needs resource limits")
+
+
+def run_limited(tmp_path, command: str, **limits) -> tuple[int, str, dict]:
+    usage_path = tmp_path / "usage.json"
+    args = [sys.executable, bash_limits.__file__, "run", "--usage", str(usage_path)]
+    for flag, value in {"wall": 10, "cpu": 0, "mem_mb": 0, "file_mb": 0, "output_kb": 0, **limits}.items():
+        args += ["--" + flag.replace("_", "-"), str(value)]
+    proc = subprocess.run(args + ["--", command], capture_output=True, text=True, cwd=tmp_path, timeout=60)
+    return proc.returncode, proc.stdout, json.loads(usage_path.read_text())
+
+
+def test_exit_status_is_kept(tmp_path):
+    status, output, usage = run_limited(tmp_path, "echo hi; exit 3")
+    assert (status, output, usage["status"], usage["killed"]) == (3, "hi\n", 3, None)
+
+
+def test_wall_clock_kill_exits_124(tmp_path):
+    status, output, usage = run_limited(tmp_path, "sleep 30", wall=0.5)
+    assert status == 124 and usage["killed"] == "wall"
+    assert "[bash_limits] killed: 0.5s wall-clock limit reached" in output
+
+
+def test_output_cap_truncates_and_kills(tmp_path):
+    status, output, usage = run_limited(tmp_path, "yes", output_kb=1)
+    assert usage["killed"] == "output" and usage["output_kb"] == 1.0
+    assert output.startswith("y\n" * 512) and "1 KB of output limit reached" in output
+    assert status != 0
+
+
+def test_file_size_limit(tmp_path):
+    status, output, usage = run_limited(tmp_path, "head -c 2097152 /dev/zero > big", file_mb=1)
+    assert usage["killed"] == "file" and "1 MB per file" in output
+    assert (tmp_path / "big").stat().st_size == 1 << 20
+    assert status == 128 + 25  # SIGXFSZ
+
+
+def test_cpu_limit(tmp_path):
+    status, output, usage = run_limited(tmp_path, "while :; do :; done", cpu=1)
+    assert usage["killed"] == "cpu" and "1s CPU limit reached" in output
+    assert status == 128 + 24  # SIGXCPU
+
+
+def test_wrapped_command_keeps_its_directory_and_status(tmp_path):
+    limits = {key: float(value) for key, value in bash_limits.DEFAULT_LIMITS.items()}
+    wrapped = bash_limits.wrap("mkdir -p sub && cd sub && exit 3", limits, str(tmp_path / "t1.json"))
+    proc = subprocess.run(["bash", "-c", wrapped + '; echo "$? $PWD"'], capture_output=True, text=True,
+                          cwd=tmp_path, timeout=60)
+    assert proc.stdout.splitlines()[-1] == f"3 {os.path.realpath(tmp_path / 'sub')}"
+    assert sorted(os.listdir(tmp_path)) == ["sub", "t1.json"]
+
+
+def test_fractional_limits_never_turn_a_limit_off():
+    limits = {"wall_s": 0.5, "cpu_s": 0.5, "mem_mb": 0.5, "file_mb": 1.2, "output_kb": 64.0}
+    args = shlex.split(bash_limits.wrap("true", limits, "u.json").split(";")[0])
+    flags = dict(zip(args[3:13:2], args[4:14:2]))
+    assert flags == {"--wall": "0.5", "--cpu": "1", "--mem-mb": "1", "--file-mb": "2", "--output-kb": "64"}
+
+
+def prepare(agent: str | None, command: str = "make test") -> dict:
+    data = {"tool_name": "Bash", "tool_input": {"command": command}, "agent_type": agent}
+    return asyncio.run(orchestrator.prepare_bash(data, "t1", None))
+
+
+def test_only_limited_agents_are_wrapped_and_only_when_enabled(monkeypatch):
+    monkeypatch.setattr(orchestrator, "GIT_CACHE_MODE", False)
+    assert prepare("repo_analyzer") == {}  # off by default
+    monkeypatch.setattr(orchestrator, "BASH_LIMITS_MODE", True)
+    assert prepare(None) == {}
+    updated = prepare("repo_analyzer")["hookSpecificOutput"]["updatedInput"]
+    assert "bash_limits.py" in updated["command"] and " -- 'make test';" in updated["command"]
+    assert updated["timeout"] == int((orchestrator.BASH_LIMITS["wall_s"] + 15) * 1000)
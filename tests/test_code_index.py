@@ -0,0 +1,125 @@
+"""Symbol extraction, queries and cache keying (code_index.py)."""
+import subprocess
+
+import pytest
+
+import code_index
+
+SOURCES = {
+    "pkg/server.py": (
+        "__all__ = ['Server']\n"
+        "class Server:\n"
+        "    def start(self):\n"
+        "        def inner():\n"
+        "            pass\n"
+        "    def _stop(self):\n"
+        "        pass\n"
+        "def helper():\n"
+        "    return Server()\n"
+        "if __name__ == '__main__':\n"
+        "    helper()\n"
+    ),
+    "web/app.ts": (
+        "export function render() {}\n"
+        "const local = () => 1\n"
+        "export interface Props {}\n"
+    ),
+    "cmd/main.go": (
+        "package main\n"
+        "type handler struct{}\n"
+        "func (h *handler) Serve() {}\n"
+        "func main() {}\n"
+    ),
+    "src/lib.rs": "pub fn parse() {}\nfn private_fn() {}\npub struct Token;\n",
+    "pyproject.toml": "[project.scripts]\nserve = \"pkg.server:helper\"\n",
+    "Dockerfile": "FROM python\nENTRYPOINT [\"serve\"]\n",
+}
+
+
+def write(root, files: dict) -> None:
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def git(root, *args: str) -> None:
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=root, check=True,
+                   capture_output=True)
+
+
+@pytest.fixture
+def index(tmp_path):
+    write(tmp_path / "repo", SOURCES)
+    return code_index.build(str(tmp_path / "repo"), str(tmp_path / "indexes"), workers=1)
+
+
+def symbols(index, file: str) -> dict:
+    return {(s["scope"], s["name"]): (s["kind"], s["public"]) for s in index["symbols"] if s["file"] == file}
+
+
+def test_python_scopes_and_exports(index):
+    assert symbols(index, "pkg/server.py") == {
+        (None, "Server"): ("class", True),
+        ("Server", "start"): ("method", True),
+        ("Server", "_stop"): ("method", False),
+        (None, "helper"): ("function", False),  # left out of __all__
+    }
+
+
+def test_pattern_languages(index):
+    assert symbols(index, "web/app.ts") == {
+        (None, "render"): ("function", True), (None, "local"): ("function", False), (None, "Props"): ("type", True)}
+    assert symbols(index, "cmd/main.go") == {
+        (None, "handler"): ("type", False), ("handler", "Serve"): ("method", True), (None, "main"): ("function", False)}
+    assert symbols(index, "src/lib.rs") == {
+        (None, "parse"): ("function", True), (None, "private_fn"): ("function", False), (None, "Token"): ("type", True)}
+
+
+def test_entry_points(index):
+    found = {(e["kind"], e["file"], e.get("target")) for e in index["entry_points"]}
+    assert found == {("main", "pkg/server.py", None), ("main", "cmd/main.go", None),
+                     ("script", "pyproject.toml", "pkg.server:helper"), ("container", "Dockerfile", '["serve"]')}
+
+
+def test_queries(index):
+    assert "pkg/server.py:3  method Server.start" in code_index.query(index, "definition", "Server.start")
+    assert "Similar: Serve, Server" in code_index.query(index, "definition", "serv")
+    references = code_index.query(index, "references", "helper")
+    assert "2 references to 'helper'" in references and "pkg/server.py:11  helper()" in references
+    outline = code_index.query(index, "outline", path="pkg/server.py")
+    assert outline.splitlines()[1] == "4 definitions in pkg/server.py"
+    assert "2 public definitions under src" in code_index.query(index, "public", path="src")
+    assert "The 'definition' query needs a name." in code_index.query(index, "definition")
+    assert "Unknown query 'callers'" in code_index.query(index, "callers")
+    assert code_index.query(index, "summary").splitlines()[1].startswith("6 files")
+
+
+def test_clean_checkouts_are_keyed_by_commit(tmp_path):
+    root, indexes = tmp_path / "repo", str(tmp_path / "indexes")
+    write(root, SOURCES)
+    git(root, "init", "-q")
+    git(root, "add", ".")
+    git(root, "commit", "-qm", "init")
+    first = code_index.build(str(root), indexes, workers=1)
+    assert first["sha"] and not first["cached"] and len(first["files"]) == 6
+    assert code_index.build(str(root), indexes, workers=1)["cached"]
+    write(root, {"pkg/extra.py": "def added():\n    pass\n"})  # uncommitted: keyed by file fingerprint
+    dirty = code_index.build(str(root), indexes, workers=1)
+    assert not dirty["cached"] and dirty["key"] != first["key"]
+    assert "pkg/extra.py:1  function added" in code_index.query(dirty, "definition", "added")
+
+
+def test_untracked_directory_inside_a_repository_is_walked(tmp_path):
+    outer, indexes = tmp_path / "outer", str(tmp_path / "indexes")
+    write(outer, {".gitignore": ".temp/\n", "README.md": "outer\n"})
+    git(outer, "init", "-q")
+    git(outer, "add", ".")
+    git(outer, "commit", "-qm", "init")
+    unpacked = outer / ".temp" / "tarball"
+    write(unpacked, {"a.py": "def hello():\n    pass\n"})
+    first = code_index.build(str(unpacked), indexes, workers=1)
+    assert first["sha"] is None and [f[0] for f in first["files"]] == ["a.py"]
+    write(unpacked, {"b.py": "def bye():\n    pass\n"})
+    second = code_index.build(str(unpacked), indexes, workers=1)
+    assert not second["cached"] and "b.py:1  function bye" in code_index.query(second, "definition", "bye")
@@ -0,0 +1,61 @@
+"""Warm standby policy of FailoverManager (failover.py)."""
+import asyncio
+
+from failover import FailoverManager
+
+
+class FakeClient:
+    connects = 0
+
+    def __init__(self, options=None):
+        self.options = options
+
+    async def connect(self):
+        FakeClient.connects += 1
+
+    async def disconnect(self):
+        pass
+
+
+def make_manager() -> FailoverManager:
+    FakeClient.connects = 0
+    return FailoverManager(lambda resume: {"resume": resume}, client_cls=FakeClient)
+
+
+def test_healthy_session_keeps_no_standby():
+    async def scenario():
+        failover = make_manager()
+        await failover.activate("session")
+        for _ in range(3):
+            failover.refresh_standby("session")
+        await failover.close()
+        assert FakeClient.connects == 1
+    asyncio.run(scenario())
+
+
+def test_crash_recovers_cold_then_keeps_a_standby():
+    async def scenario():
+        failover = make_manager()
+        await failover.activate("session")
+        failover.mark_dead()
+        await failover.activate("session")
+        assert not failover.last_recovery_warm
+        await failover._warming
+        assert FakeClient.connects == 3  # first client, cold replacement, standby
+        failover.mark_dead()
+        await failover.activate("session")
+        assert failover.last_recovery_warm
+        await failover.close()
+    asyncio.run(scenario())
+
+
+def test_stall_starts_standby_after_the_round():
+    async def scenario():
+        failover = make_manager()
+        await failover.activate("session")
+        failover.mark_unhealthy()
+        failover.refresh_standby("session")
+        await failover._warming
+        assert FakeClient.connects == 2
+        await failover.close()
+    asyncio.run(scenario())
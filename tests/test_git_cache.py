@@ -0,0 +1,75 @@
+"""Clone rewriting and eviction (git_cache.py)."""
+import json
+import os
+import shlex
+
+import pytest
+
+import git_cache
+
+URL = "https://github.com/jqlang/jq"
+
+
+def rewrite(command: str, cache_dir) -> list[list[str]] | None:
+    rewritten = git_cache.rewrite_clone(command, python="py", cache_dir=str(cache_dir))
+    return rewritten and [shlex.split(segment) for segment in rewritten.split("&&")]
+
+
+def checkout(dest: str, *extra: str) -> list[str]:
+    return ["py", os.path.abspath(git_cache.__file__), "checkout", URL, dest, *extra]
+
+
+@pytest.fixture
+def cached(tmp_path):
+    mirror = tmp_path / "mirrors" / "jq.git"
+    mirror.mkdir(parents=True)
+    (tmp_path / "index.json").write_text(json.dumps({URL: {"path": str(mirror), "name": "jq"}}))
+    return tmp_path
+
+
+def test_plain_clones_are_served_from_the_cache(tmp_path):
+    assert rewrite(f"git clone {URL}", tmp_path) == [checkout("jq")]
+    assert rewrite(f"git clone -b jq-1.7.1 {URL} .temp/jq", tmp_path) == [checkout(".temp/jq", "--ref", "jq-1.7.1")]
+    assert rewrite(f"mkdir -p .temp && git clone -q {URL} .temp/jq", tmp_path) == [
+        ["mkdir", "-p", ".temp"], checkout(".temp/jq")]
+
+
+def test_options_the_cache_cannot_honor_are_left_alone(tmp_path):
+    for command in (f"git clone --recurse-submodules {URL}", f"git clone --bare {URL}",
+                    f"git clone -o up {URL}", f"git clone {URL} | tee log", "git status"):
+        assert rewrite(command, tmp_path) is None
+
+
+@pytest.mark.parametrize("flags", ["--depth 1", "--depth=1", "--filter=blob:none", "--shallow-since 2024-01-01"])
+def test_shallow_clones_run_as_written_on_a_miss(tmp_path, cached, flags):
+    assert rewrite(f"git clone {flags} {URL} .temp/jq", tmp_path / "empty") is None
+    assert rewrite(f"git clone {flags} {URL} .temp/jq", cached) == [checkout(".temp/jq")]
+
+
+def git(*args, cwd) -> str:
+    return git_cache._git(list(args), cwd=str(cwd)).stdout
+
+
+def source_repo(path) -> str:
+    path.mkdir()
+    git("init", "--quiet", cwd=path)
+    (path / "README").write_text(path.name)
+    (path / "data").write_bytes(os.urandom(300_000))  # big enough to count against the quota
+    git("add", "README", "data", cwd=path)
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "--quiet", "-m", "init", cwd=path)
+    return str(path)
+
+
+def test_evicting_a_mirror_keeps_its_worktrees_usable(tmp_path):
+    cache = git_cache.GitCache(str(tmp_path / "cache"), max_mb=0, events_path=str(tmp_path / "events.jsonl"))
+    a, b = source_repo(tmp_path / "a"), source_repo(tmp_path / "b")
+    work = tmp_path / "work"
+    cache.checkout(a, str(work / "a"))
+    assert cache._index()[a]["worktrees"] == [str(work / "a")]
+    cache._update(a, last_used=0)
+
+    event = cache.checkout(b, str(work / "b"))
+    assert event["evicted"] == [a] and not cache.cached(a)
+    assert not (work / "a" / ".git" / "objects" / "info" / "alternates").exists()
+    assert git("log", "--format=%s", cwd=work / "a").strip() == "init"
+    assert (work / "a" / "README").read_text() == "a"
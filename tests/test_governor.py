@@ -0,0 +1,61 @@
+"""Warn/downgrade/stop decisions of BudgetGovernor.check (governor.py)."""
+from governor import BudgetGovernor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_governor(profile: dict | None = None, **kwargs) -> tuple[BudgetGovernor, Clock]:
+    clock = Clock()
+    governor = BudgetGovernor(5.0, 100, profile_fn=lambda skill: profile, clock=clock, **kwargs)
+    return governor, clock
+
+
+def kinds(decisions: list[tuple[str, str]]) -> list[str]:
+    return [kind for kind, _ in decisions]
+
+
+def test_warns_once_per_threshold():
+    governor, _ = make_governor()
+    assert governor.check(1.0) == []
+    assert kinds(governor.check(2.6)) == ["warn"]
+    assert governor.check(2.7) == []
+    assert kinds(governor.check(4.1)) == ["warn"]
+
+
+def test_stops_at_the_stop_share_and_then_stays_quiet():
+    governor, _ = make_governor()
+    decisions = governor.check(4.6)
+    assert kinds(decisions)[-1] == "stop"
+    assert governor.stopped == "budget"
+    assert governor.check(4.9) == []
+
+
+def test_downgrades_when_the_forecast_is_over_budget_past_the_downgrade_share():
+    history = {"rounds": 5, "p90_elapsed_s": 100.0}
+    governor, clock = make_governor(history)
+    clock.now += 50  # half of the expected duration, $3.10 spent: projected $6.20
+    decisions = governor.check(3.1)
+    assert ("downgrade", "haiku") in decisions
+    assert governor.downgraded == "haiku"
+    assert "downgrade" not in kinds(governor.check(3.2))
+
+
+def test_no_forecast_without_enough_history():
+    governor, clock = make_governor({"rounds": 2, "p90_elapsed_s": 100.0})
+    clock.now += 50
+    assert "downgrade" not in kinds(governor.check(3.1))
+    assert governor.forecast(3.1, 0) == (3.1, 0)
+
+
+def test_begin_round_resets_the_round_state():
+    governor, _ = make_governor()
+    governor.check(4.6)
+    governor.begin_round()
+    assert governor.stopped is None and governor.downgraded is None
+    assert kinds(governor.check(2.6)) == ["warn"]
@@ -0,0 +1,105 @@
+"""Profile tool restrictions (profiles.py, orchestrator.limit_breadth)."""
+import asyncio
+
+import orchestrator
+import profiles
+
+
+def decide(tool: str, agent_id: str | None = None) -> str:
+    data = {"tool_name": tool, "tool_input": {}, "agent_id": agent_id,
+            "agent_type": "web_researcher" if agent_id else None}
+    result = asyncio.run(orchestrator.limit_breadth(data, "t1", None))
+    return result.get("hookSpecificOutput", {}).get("permissionDecision", "allow")
+
+
+def test_fast_profile_restricts_only_the_orchestrator():
+    orchestrator.apply_profile("fast")
+    try:
+        options = orchestrator.make_options("prompt", {}, {})
+        assert "WebFetch" in options.allowed_tools  # the CLI's list covers the researchers too
+        assert decide("WebFetch") == "deny"
+        assert decide("WebFetch", agent_id="a1") == "allow"
+        assert decide("WebSearch") == "allow"
+    finally:
+        orchestrator.apply_profile("standard")
+        orchestrator.audit_log.clear()
+
+
+def test_tool_allowed():
+    assert profiles.tool_allowed("Agent", ["Task"])
+    assert not profiles.tool_allowed("WebFetch", ["Task"])
+    assert profiles.tool_allowed("mcp__code_index__query", ["Task"])
+
+
+def test_breadth_limits_subagents_and_tool_calls_per_run():
+    limiter = profiles.BreadthLimiter({"subagents": 1, "WebFetch": 2})
+    assert limiter.check("Task", None, subagent_tool=True) is None
+    assert limiter.check("Task", None, subagent_tool=True)[0] == "subagents"
+    assert limiter.check("WebFetch", "a1") is None
+    assert limiter.check("WebFetch", "a1") is None
+    assert limiter.check("WebFetch", "a1")[0] == "WebFetch"
+    assert limiter.check("WebFetch", "a2") is None  # per run
+    assert limiter.check("WebFetch", None) is None  # the orchestrator's own calls
+    limiter.begin_round()
+    assert limiter.check("Task", None, subagent_tool=True) is None
+
+
+def test_sufficiency_cut_off_is_opt_in():
+    for sufficiency, expected in ((False, None), (True, "sufficiency")):
+        limiter = profiles.BreadthLimiter({"domains": 2, "kb": 1}, sufficiency=sufficiency)
+        for url in ("https://www.a.com/x", "https://b.com/y"):
+            assert limiter.check("WebFetch", "a1") is None
+            limiter.observe_result("WebFetch", "a1", {"url": url}, {"bytes": 800})
+        denied = limiter.check("WebSearch", "a1")
+        assert (denied and denied[0]) == expected
+
+
+def test_summary_estimates_time_saved():
+    limiter = profiles.BreadthLimiter({"WebFetch": 1})
+    limiter.check("WebFetch", "a1")
+    limiter.check("WebFetch", "a1")
+    summary = limiter.summary([{"tool": "WebFetch", "duration_s": 4.0}])
+    assert summary["by_limit"] == {"WebFetch": 1} and summary["saved_s"] == 4.0
+    assert profiles.format_summary(summary) == "saved 1 calls (~4s): WebFetch 1"
+
+
+def test_denied_call_is_not_left_in_flight(monkeypatch):
+    from utils import pending_tools
+
+    monkeypatch.setattr(orchestrator, "tracer", orchestrator.Tracer())
+    orchestrator.tracer.begin_round(1, "query")
+    orchestrator.apply_profile("fast")
+    try:
+        data = {"tool_name": "WebFetch", "tool_input": {"url": "https://a.com"}, "agent_id": None}
+        asyncio.run(orchestrator.audit_tool_calls(data, "t9", None))
+        assert "t9" in orchestrator.tool_start_times and "t9" in pending_tools
+        assert decide("WebFetch") == "deny"
+        result = asyncio.run(orchestrator.limit_breadth(data, "t9", None))
+        assert result["hookSpecificOutput"]["permissionDecision"] == "deny"
+        assert "t9" not in orchestrator.tool_start_times
+        assert "t9" not in pending_tools
+        assert "t9" not in orchestrator.tracer.spans
+    finally:
+        orchestrator.apply_profile("standard")
+        orchestrator.audit_log.clear()
+
+
+def test_code_index_tool_is_opt_in(monkeypatch):
+    monkeypatch.setattr(orchestrator, "build_code_index_server", lambda: "server")
+    for enabled in (False, True):
+        monkeypatch.setattr(orchestrator, "CODE_INDEX_MODE", enabled)
+        options = orchestrator.make_options("prompt", {}, {})
+        repo_analyzer = orchestrator.build_agents()["repo_analyzer"]
+        assert (orchestrator.CODE_INDEX_TOOL in options.allowed_tools) == enabled
+        assert (orchestrator.CODE_INDEX_TOOL in repo_analyzer.tools) == enabled
+        assert (orchestrator.CODE_INDEX_TOOL in repo_analyzer.prompt) == enabled
+        assert options.mcp_servers == ({"code_index": "server"} if enabled else {})
+
+
+def test_watchdog_resume_query_names_the_profile_timeout():
+    assert "stuck for over 5 minutes" in orchestrator.watchdog_resume_query()
+    orchestrator.apply_profile("fast")
+    try:
+        assert "stuck for over 2 minutes" in orchestrator.watchdog_resume_query()
+    finally:
+        orchestrator.apply_profile("standard")
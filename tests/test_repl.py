@@ -0,0 +1,74 @@
+"""Ctrl-C handling and prompts of the REPL (repl.py)."""
+import asyncio
+
+from repl import AsyncLineReader, InterruptController
+
+
+class FakeClient:
+    def __init__(self):
+        self.interrupts = 0
+
+    async def interrupt(self):
+        self.interrupts += 1
+
+
+def make_reader() -> AsyncLineReader:
+    reader = AsyncLineReader()
+    reader._loop = asyncio.get_running_loop()  # no stdin thread; lines are delivered by the test
+    return reader
+
+
+def test_ctrl_c_between_rounds_quits():
+    async def scenario():
+        reader = make_reader()
+        controller = InterruptController(reader)
+        pending = asyncio.ensure_future(reader.ask("Resume this session? [y/N]: "))
+        await asyncio.sleep(0)
+        controller.handle()
+        assert await pending is None
+        assert await reader.next_query("You: ") is None  # the REPL exits
+    asyncio.run(scenario())
+
+
+def test_ctrl_c_during_round_interrupts_then_force_quits():
+    async def scenario():
+        controller = InterruptController(make_reader())
+        controller._main_task = main = asyncio.ensure_future(asyncio.sleep(10))
+        client = FakeClient()
+        controller.begin_round(client)
+        controller.handle()
+        await controller._pending
+        assert client.interrupts == 1
+        controller.handle()  # still pending: force quit
+        await asyncio.sleep(0)
+        assert main.cancelled()
+        assert client.interrupts == 1
+    asyncio.run(scenario())
+
+
+def test_ctrl_c_at_in_round_prompt_only_dismisses_it():
+    async def scenario():
+        reader = make_reader()
+        controller = InterruptController(reader)
+        client = FakeClient()
+        controller.begin_round(client)
+        pending = asyncio.ensure_future(controller.ask("Continue for another 100 turns? [y/N]: "))
+        await asyncio.sleep(0)
+        controller.handle()
+        assert await pending is None
+        assert client.interrupts == 0 and controller._pending is None
+        follow_up = asyncio.ensure_future(reader.next_query("You: "))
+        await asyncio.sleep(0)
+        reader._deliver("next question")
+        assert await follow_up == "next question"  # the reader stays open
+    asyncio.run(scenario())
+
+
+def test_lines_typed_during_a_round_are_queued():
+    async def scenario():
+        reader = make_reader()
+        reader._deliver("first")
+        reader._deliver("   ")
+        assert list(reader.queued) == ["first"]
+        assert await reader.next_query("You: ") == "first"
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+"""Record a session with the fake SDK, then replay it (recorder.py, replay.py)."""
+import asyncio
+import functools
+import glob
+import os
+
+import orchestrator
+from benchmarks.fake_sdk import FakeClaudeSDKClient, ScriptedReader
+from replay import replay
+
+CONFIG = {"subagents": 3, "tool_calls": 4, "text_bytes": 500, "tools": ["WebSearch", "WebFetch", "Bash"]}
+
+
+def record_session(monkeypatch, tmp_path, **settings) -> str:
+    monkeypatch.setattr(orchestrator, "PROMPTS_DIR", os.path.abspath(orchestrator.PROMPTS_DIR))
+    monkeypatch.chdir(tmp_path)
+    for name in ("recorder", "tracer", "renderer", "warehouse", "governor", "router", "prefix_components"):
+        monkeypatch.setattr(orchestrator, name, None)
+    monkeypatch.setattr(orchestrator, "RECORD_MODE", True)
+    monkeypatch.setattr(orchestrator, "STREAM_RENDER_MODE", False)
+    monkeypatch.setattr(orchestrator, "PREFIX_CHECK_MODE", False)
+    for name, value in settings.items():
+        monkeypatch.setattr(orchestrator, name, value)
+    client_cls = functools.partial(FakeClaudeSDKClient, config=CONFIG)
+    reader = ScriptedReader(["first query", "/profile fast second query", "exit"])
+    asyncio.run(orchestrator.main(client_cls=client_cls, reader=reader))
+    orchestrator.recorder.close()
+    (path,) = glob.glob("session_data/recordings/*.l7rec")
+    return path
+
+
+def test_replay_reproduces_routed_and_breadth_limited_hooks(monkeypatch, tmp_path, capsys):
+    path = record_session(monkeypatch, tmp_path, ROUTE_MODE=True, SUFFICIENCY_MODE=True,
+                          GOVERNOR_MODE=True, SUFFICIENCY_OVERRIDES={"domains": 1, "kb": 0})
+    recorded_router = orchestrator.router
+    assert recorded_router is not None
+    # Replay under different settings: the recording's own must win
+    monkeypatch.setattr(orchestrator, "ROUTE_MODE", False)
+    monkeypatch.setattr(orchestrator, "SUFFICIENCY_MODE", False)
+    orchestrator.apply_profile("standard")
+    stats = asyncio.run(replay(path, None, None))
+    output = capsys.readouterr().out
+    assert stats["rounds"] == 2
+    assert stats["hooks"] > 0
+    assert "denied" in output  # the sufficiency cut-off and the fast profile's limits acted
+    assert stats["hook_mismatches"] == 0, output
+    assert orchestrator.ROUTE_MODE is False and orchestrator.profile["name"] == "standard"
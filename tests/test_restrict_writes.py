@@ -0,0 +1,27 @@
+"""Write containment of the restrict_writes hook (orchestrator.py)."""
+import asyncio
+import os
+
+import orchestrator
+
+
+def decision(path: str, tool: str = "Write") -> str:
+    result = asyncio.run(orchestrator.restrict_writes(
+        {"tool_name": tool, "tool_input": {"file_path": path}}, "t1", None))
+    return result.get("hookSpecificOutput", {}).get("permissionDecision", "allow")
+
+
+def test_allows_relative_and_absolute_paths_inside_output_dir():
+    assert decision("research_output/notes.md") == "allow"
+    assert decision(os.path.abspath("research_output/sub/notes.md")) == "allow"
+
+
+def test_denies_paths_outside_output_dir():
+    assert decision("notes.md") == "deny"
+    assert decision("research_output/../notes.md") == "deny"
+    assert decision("research_output_old/notes.md") == "deny"
+    assert decision("/etc/passwd") == "deny"
+
+
+def test_ignores_other_tools():
+    assert decision("/etc/passwd", tool="Read") == "allow"
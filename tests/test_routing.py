@@ -0,0 +1,48 @@
+"""Model choice of ModelRouter.route (routing.py)."""
+from routing import ModelRouter, completeness, family
+
+CANDIDATES = {"web_researcher": ("haiku", "sonnet"), "blog_writer": ("sonnet", "opus")}
+DEFAULTS = {"web_researcher": "haiku", "blog_writer": "sonnet"}
+
+
+def stats(runs: int, completeness: float, failure_rate: float = 0.0, cost: float = 0.01) -> dict:
+    return {"runs": runs, "completeness": completeness, "failure_rate": failure_rate,
+            "retry_rate": 0.0, "avg_cost_usd": cost, "avg_s": 30.0}
+
+
+def make_router(history: dict | None = None) -> ModelRouter:
+    return ModelRouter(DEFAULTS, CANDIDATES, degradable=("web_researcher",),
+                       stats_fn=lambda subagent_type, skill: history or {})
+
+
+def test_defaults_without_history():
+    assert make_router().route("web_researcher")[:2] == ("haiku", "default")
+
+
+def test_degrade_wins_over_an_explicit_model():
+    router = make_router()
+    assert router.route("web_researcher", "sonnet", spent_share=0.8)[:2] == ("haiku", "degrade")
+    assert router.route("web_researcher", "sonnet", spent_share=0.5)[:2] == ("sonnet", "explicit")
+    assert router.route("blog_writer", "opus", spent_share=0.8)[:2] == ("opus", "explicit")
+
+
+def test_history_picks_the_cheapest_model_near_the_best_quality():
+    near = make_router({"haiku": stats(5, 0.95), "sonnet": stats(5, 1.0, cost=0.05)})
+    assert near.route("web_researcher")[:2] == ("haiku", "history")
+    far = make_router({"haiku": stats(5, 0.5), "sonnet": stats(5, 1.0, cost=0.05)})
+    assert far.route("web_researcher")[:2] == ("sonnet", "history")
+
+
+def test_escalates_to_an_untried_model_when_quality_is_poor():
+    router = make_router({"haiku": stats(5, 0.5)})
+    assert router.route("web_researcher")[:2] == ("sonnet", "escalate")
+
+
+def test_too_few_runs_are_not_history():
+    assert make_router({"haiku": stats(2, 1.0)}).route("web_researcher")[:2] == ("haiku", "default")
+
+
+def test_family_and_completeness():
+    assert family("claude-haiku-4-5-20251001") == "haiku"
+    assert family("custom-model") == "custom-model"
+    assert completeness("TODO") < completeness(" ".join(["word"] * 200) + " https://example.com")
@@ -0,0 +1,26 @@
+"""Recording measurements of the per-skill benchmark (benchmarks/skills.py)."""
+from claude_agent_sdk import ResultMessage
+
+from benchmarks.skills import measure_recording
+from recorder import SessionRecorder
+
+
+def result(turns: int, cost: float, input_tokens: int) -> ResultMessage:
+    return ResultMessage(
+        subtype="success", duration_ms=1, duration_api_ms=1, is_error=False,
+        num_turns=turns, session_id="s", total_cost_usd=cost,
+        model_usage={"claude-sonnet": {"inputTokens": input_tokens, "outputTokens": 10}})
+
+
+def test_multi_round_recording_sums_per_round_deltas(tmp_path):
+    recorder = SessionRecorder(str(tmp_path / "two_rounds.l7rec"))
+    # Cumulative session totals: round 1 is 3 turns/$0.10, round 2 adds 2 turns/$0.05
+    recorder.record_marker("round_start", round=1, query="first")
+    recorder.record_message(result(3, 0.10, 1000))
+    recorder.record_marker("round_start", round=2, query="second")
+    recorder.record_message(result(5, 0.15, 1500))
+    measured = measure_recording(recorder.close())
+    assert measured["turns"] == 5
+    assert measured["cost_usd"] == 0.15
+    assert measured["input_tokens"] == 1500
+    assert measured["output_tokens"] == 10
@@ -0,0 +1,11 @@
+"""Startup cost of importing the orchestrator (see benchmarks/startup.py)."""
+import subprocess
+import sys
+
+
+def test_opt_in_features_are_not_imported_at_startup():
+    # code_index compiles its extraction patterns and warehouse pulls in sqlite3; both are off by default
+    proc = subprocess.run([sys.executable, "-c", "import sys, orchestrator; print(sorted(m for m in "
+                           "('code_index', 'warehouse', 'sqlite3') if m in sys.modules))"],
+                          capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == "[]"
@@ -0,0 +1,79 @@
+"""Round keying and ingest idempotence of the run-history warehouse (warehouse.py)."""
+import json
+import os
+import time
+
+from claude_agent_sdk import ResultMessage
+
+from recorder import SessionRecorder
+from warehouse import Warehouse
+
+STATE = {"session_id": "s1", "round": 1, "start_time": 1000.0, "round_elapsed": 12.0,
+         "round_turns": 3, "round_cost": 0.2}
+
+
+def entries() -> list[dict]:
+    return [
+        {"timestamp": 1001.0, "tool_use_id": "t1", "tool": "WebSearch", "agent": "Main"},
+        {"timestamp": 1002.0, "tool_use_id": "t2", "tool": "Task", "agent": "Main",
+         "subagent_type": "web_researcher", "duration_s": 5.0},
+        {"timestamp": 1012.0, "event": "agent_usage", "agent": "Main", "model": "claude-sonnet",
+         "input_tokens": 100, "output_tokens": 10, "cost_usd": 0.2},
+        {"timestamp": 1012.0, "event": "round", "session_id": "s1", "round": 1},
+    ]
+
+
+def write_log(path, log_entries) -> str:
+    path.write_text("".join(json.dumps(e) + "\n" for e in log_entries))
+    return str(path)
+
+
+def counts(warehouse: Warehouse) -> tuple:
+    return tuple(warehouse.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                 for table in ("rounds", "tool_calls", "agent_usage", "subagent_runs"))
+
+
+def test_live_round_is_not_ingested_again_from_its_audit_log(tmp_path):
+    warehouse = Warehouse(str(tmp_path / "w.sqlite"))
+    log = write_log(tmp_path / "audit_1.log", entries())
+    warehouse.record_round(dict(STATE), entries(), "query", log_path=log)
+    assert counts(warehouse) == (1, 2, 1, 1)
+    assert warehouse.ingest([log]) == {"files": 0, "rounds": 0, "skipped": 1}
+    assert counts(warehouse) == (1, 2, 1, 1)
+
+
+def test_audit_log_never_overwrites_a_live_round(tmp_path):
+    warehouse = Warehouse(str(tmp_path / "w.sqlite"))
+    warehouse.record_round(dict(STATE), entries(), "query")
+    warehouse.ingest([write_log(tmp_path / "audit_1.log", entries())])
+    assert counts(warehouse) == (1, 2, 1, 1)
+    assert warehouse.db.execute("SELECT source, turns FROM rounds").fetchone() == ("live", 3)
+
+
+def test_reingest_replaces_rounds_of_a_changed_file(tmp_path):
+    warehouse = Warehouse(str(tmp_path / "w.sqlite"))
+    log = tmp_path / "audit_1.log"
+    warehouse.ingest([write_log(log, entries())])
+    warehouse.ingest([str(log)])
+    assert counts(warehouse) == (1, 2, 1, 1)
+    write_log(log, entries()[1:])
+    os.utime(log, (2000, 2000))
+    assert warehouse.ingest([str(log)])["rounds"] == 1
+    assert counts(warehouse) == (1, 1, 1, 1)
+
+
+def test_recording_replaces_the_same_round_from_an_audit_log(tmp_path):
+    warehouse = Warehouse(str(tmp_path / "w.sqlite"))
+    warehouse.ingest([write_log(tmp_path / "audit_1.log", entries())])
+    recorder = SessionRecorder(str(tmp_path / "s1.l7rec"))
+    recorder.record_marker("round_start", round=1, query="query")
+    recorder.record_hook("audit_tool_calls", {"tool_name": "WebSearch", "tool_input": {}}, "t1", {},
+                         time.perf_counter(), 0.0)
+    recorder.record_message(ResultMessage(
+        subtype="success", duration_ms=1, duration_api_ms=1, is_error=False, num_turns=3,
+        session_id="s1", total_cost_usd=0.2))
+    recording = recorder.close()
+    assert warehouse.ingest([recording])["rounds"] == 1
+    assert counts(warehouse) == (1, 1, 0, 0)
+    assert warehouse.db.execute("SELECT source, turns FROM rounds").fetchone() == (recording, 3)
+    assert warehouse.ingest([recording])["skipped"] == 1
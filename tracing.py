@@ -0,0 +1,313 @@
+# tracing.py — Span tracing of rounds, subagents, tool calls and hooks
+"""
+Builds a span tree per round, fed by the orchestrator hooks and message loop
+(``agent.py --trace`` / ``L7_TRACE=1``, or ``replay.py --trace DIR``):
+
+  Round N
+  ├── Main tool calls (Write, Bash, ...)
+  └── subagent Task (one lane per Task, linked by ``parent_tool_use_id``)
+      └── tool calls
+          └── hook callbacks
+
+At the end of each round the spans are written to ``session_data/traces/`` as
+Chrome trace JSON (open in https://ui.perfetto.dev or chrome://tracing) and
+OTLP-JSON (``resourceSpans``, for an OpenTelemetry collector's file receiver).
+Each subagent gets its own lane. Tool calls that overlap within a lane are
+spread over extra rows, so the three researchers show up side by side.
+"""
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from functools import wraps
+
+from utils import SUBAGENT_TOOLS
+
+TRACES_DIR = "session_data/traces"
+MAIN_LANE = "Main"
+SERVICE_NAME = "l7-orchestrator"
+
+
+class Tracer:
+    """Collect the spans of the current round; ``clock`` returns epoch seconds."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.spans: dict[str, dict] = {}
+        self.instants: list[dict] = []
+        self.owner: dict[str, str | None] = {}  # tool_use_id → parent_tool_use_id (messages)
+        self.round_id: str | None = None
+        self._seq = 0
+
+    def _open(self, span_id: str, name: str, kind: str, start: float | None = None,
+              parent: str | None = None, **attrs) -> dict:
+        span = {
+            "id": span_id,
+            "name": name,
+            "kind": kind,
+            "parent": parent,
+            "start": self.clock() if start is None else start,
+            "end": None,
+            "attrs": {k: v for k, v in attrs.items() if v is not None},
+        }
+        self.spans[span_id] = span
+        return span
+
+    # ── Rounds ───────────────────────────────────────────
+
+    def begin_round(self, number: int, query: str) -> None:
+        """Start a fresh round span; spans of the previous round are dropped."""
+        self.spans.clear()
+        self.instants.clear()
+        self.owner.clear()
+        self.round_id = f"round-{number}"
+        self._open(self.round_id, f"Round {number}", "round", round=number, query=query[:200])
+
+    def end_round(self, **attrs) -> list[dict]:
+        """Close the round and anything still open; return the resolved spans."""
+        end = self.clock()
+        for span in self.spans.values():
+            if span["end"] is None:
+                span["end"] = end
+                if span["id"] != self.round_id:
+                    span["attrs"]["unfinished"] = True
+        if self.round_id in self.spans:
+            self.spans[self.round_id]["attrs"].update(attrs)
+        self._resolve()
+        return list(self.spans.values())
+
+    # ── Tool calls (PreToolUse / PostToolUse) ────────────
+
+    def tool_start(self, tool_use_id: str, tool_name: str, tool_input: dict,
+                   agent_id: str | None = None, agent_type: str | None = None) -> None:
+        if not tool_use_id or self.round_id is None:
+            return
+        if tool_name in SUBAGENT_TOOLS:
+            self._open(tool_use_id, tool_input.get("subagent_type", tool_name), "subagent",
+                       tool=tool_name, description=tool_input.get("description"),
+                       agent_id=agent_id, agent_type=agent_type)
+        else:
+            self._open(tool_use_id, tool_name, "tool", agent_id=agent_id, agent_type=agent_type)
+
+    def tool_end(self, tool_use_id: str, **attrs) -> None:
+        span = self.spans.get(tool_use_id)
+        if span and span["end"] is None:
+            span["end"] = self.clock()
+            span["attrs"].update(attrs)
+
+    def drop_tool(self, tool_use_id: str) -> None:
+        """Forget a tool span whose call was denied and never ran."""
+        self.spans.pop(tool_use_id, None)
+
+    # ── Hook callbacks ───────────────────────────────────
+
+    def hook_span(self, name: str, tool_use_id: str | None, start: float, duration: float) -> None:
+        """Add a finished hook span under its tool call."""
+        if self.round_id is None:
+            return
+        self._seq += 1
+        span = self._open(f"hook-{self._seq}", name, "hook", start=start,
+                          parent=tool_use_id if tool_use_id in self.spans else None)
+        span["end"] = start + duration
+        parent = self.spans.get(tool_use_id)
+        # PostToolUse hooks run just after the tool span closes; keep them nested
+        if parent and parent["end"] is not None and parent["end"] < span["end"]:
+            parent["end"] = span["end"]
+
+    def wrap_hook(self, fn):
+        """Wrap a hook callback so each invocation becomes a hook span."""
+        @wraps(fn)
+        async def traced(input_data, tool_use_id, context):
+            start, started = self.clock(), time.perf_counter()
+            result = await fn(input_data, tool_use_id, context)
+            self.hook_span(fn.__name__, tool_use_id, start, time.perf_counter() - started)
+            return result
+        return traced
+
+    # ── Message stream ───────────────────────────────────
+
+    def observe_message(self, message) -> None:
+        """Learn which Task owns each tool call and mark the model turn."""
+        if self.round_id is None:
+            return
+        parent = getattr(message, "parent_tool_use_id", None)
+        tools, tool_ids = [], []
+        for block in getattr(message, "content", None) or []:
+            block_id, name = getattr(block, "id", None), getattr(block, "name", None)
+            if block_id and name:
+                self.owner[block_id] = parent
+                tools.append(name)
+                tool_ids.append(block_id)
+        self.instants.append({"t": self.clock(), "parent": parent, "model": getattr(message, "model", None),
+                              "tools": tools, "tool_ids": tool_ids})
+
+    # ── Lane resolution ──────────────────────────────────
+
+    def _resolve(self) -> None:
+        """Set each span's parent and lane from message ownership and hook agent ids."""
+        agent_task: dict[str, str] = {}
+        for span_id, span in self.spans.items():
+            agent_id = span["attrs"].get("agent_id")
+            if agent_id and self.owner.get(span_id) in self.spans:
+                agent_task[agent_id] = self.owner[span_id]
+
+        def task_of(span: dict) -> str | None:
+            task = self.owner.get(span["id"])
+            if task not in self.spans:
+                task = agent_task.get(span["attrs"].get("agent_id"))
+            if task not in self.spans and span["attrs"].get("agent_type"):
+                # No message seen for it: the latest Task of that type running at the time
+                running = [s for s in self.spans.values() if s["kind"] == "subagent"
+                           and s["name"] == span["attrs"]["agent_type"]
+                           and s["start"] <= span["start"] <= (s["end"] or float("inf"))]
+                task = max(running, key=lambda s: s["start"])["id"] if running else None
+                if task and span["attrs"].get("agent_id"):
+                    agent_task[span["attrs"]["agent_id"]] = task
+            return task if task in self.spans else None
+
+        for span in self.spans.values():
+            if span["kind"] == "round":
+                span["lane"] = MAIN_LANE
+            elif span["kind"] == "subagent":
+                span["parent"] = task_of(span) or self.round_id
+                span["lane"] = f"{span['name']} · {span['id'][-6:]}"
+            elif span["kind"] == "tool":
+                task = task_of(span)
+                span["parent"] = task or self.round_id
+                agent_id = span["attrs"].get("agent_id")
+                if task:
+                    span["lane"] = f"{self.spans[task]['name']} · {task[-6:]}"
+                elif agent_id:  # subagent whose Task we never saw
+                    span["lane"] = f"{span['attrs'].get('agent_type', 'subagent')} · {agent_id[-6:]}"
+                else:
+                    span["lane"] = MAIN_LANE
+        for span in self.spans.values():
+            if span["kind"] == "hook":
+                parent = self.spans.get(span["parent"])
+                span["parent"] = span["parent"] if parent else self.round_id
+                span["lane"] = parent["lane"] if parent else MAIN_LANE
+        for instant in self.instants:
+            task = instant["parent"]
+            instant["lane"] = (f"{self.spans[task]['name']} · {task[-6:]}"
+                               if task in self.spans else MAIN_LANE)
+
+    # ── Export ───────────────────────────────────────────
+
+    def export_round(self, directory: str = TRACES_DIR, **attrs) -> tuple[str, str] | None:
+        """End the round and write Chrome and OTLP-JSON files; returns both paths."""
+        if self.round_id is None:
+            return None
+        spans = self.end_round(**attrs)
+        round_span = self.spans[self.round_id]
+        os.makedirs(directory, exist_ok=True)
+        ts = datetime.fromtimestamp(round_span["start"]).strftime("%Y-%m-%d_%H-%M-%S")
+        stem = os.path.join(directory, f"round_{round_span['attrs']['round']:03d}_{ts}")
+        chrome_path, otlp_path = f"{stem}.trace.json", f"{stem}.otlp.json"
+        # json.dumps uses the C encoder; json.dump streams through the Python one
+        with open(chrome_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(to_chrome_trace(spans, self.instants)))
+        with open(otlp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(to_otlp(spans)))
+        self.round_id = None
+        return chrome_path, otlp_path
+
+
+# ── Formats ──────────────────────────────────────────────
+
+def _assign_rows(spans: list[dict]) -> dict[str, tuple[str, int]]:
+    """Map span id → (lane, row) so overlapping siblings in a lane get separate rows."""
+    by_id = {s["id"]: s for s in spans}
+    rows: dict[str, tuple[str, int]] = {}
+    lane_rows: dict[str, list[float]] = {}  # lane → end time of the last span in each row
+    child_end: dict[str, float] = {}        # parent id → end of its last child placed in its row
+    for span in sorted(spans, key=lambda s: (s["start"], s["kind"] == "hook")):
+        parent = by_id.get(span["parent"])
+        if (parent and parent["lane"] == span["lane"] and parent["id"] in rows
+                and child_end.get(parent["id"], float("-inf")) <= span["start"]):
+            rows[span["id"]] = rows[parent["id"]]  # nests inside its parent
+            child_end[parent["id"]] = span["end"]
+            continue
+        ends = lane_rows.setdefault(span["lane"], [])
+        row = next((i for i, end in enumerate(ends) if end <= span["start"]), len(ends))
+        if row == len(ends):
+            ends.append(span["end"])
+        else:
+            ends[row] = span["end"]
+        rows[span["id"]] = (span["lane"], row)
+    return rows
+
+
+def to_chrome_trace(spans: list[dict], instants: list[dict] = ()) -> dict:
+    """Chrome trace-event JSON: one thread per lane row, complete ("X") events."""
+    rows = _assign_rows(spans)
+    origin = min((s["start"] for s in spans), default=0.0)
+    tids: dict[tuple[str, int], int] = {}
+    events = []
+    for span in sorted(spans, key=lambda s: s["start"]):
+        key = rows[span["id"]]
+        tid = tids.setdefault(key, len(tids) + 1)
+        events.append({
+            "name": span["name"],
+            "cat": span["kind"],
+            "ph": "X",
+            "ts": round((span["start"] - origin) * 1e6, 1),
+            "dur": round(max(0.0, span["end"] - span["start"]) * 1e6, 1),
+            "pid": 1,
+            "tid": tid,
+            "args": {"id": span["id"], "parent": span["parent"], **span["attrs"]},
+        })
+    for instant in instants:
+        tid = tids.get((instant["lane"], 0))
+        if tid is not None:
+            events.append({"name": "model turn", "cat": "message", "ph": "i", "s": "t",
+                           "ts": round((instant["t"] - origin) * 1e6, 1), "pid": 1, "tid": tid,
+                           "args": {"model": instant["model"], "tools": instant["tools"],
+                                    "tool_ids": instant["tool_ids"]}})
+    for (lane, row), tid in tids.items():
+        name = lane if row == 0 else f"{lane} ({row + 1})"
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+        events.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid,
+                       "args": {"sort_index": tid}})
+    events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": SERVICE_NAME}})
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "otherData": {"origin_epoch_s": origin}}
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: list[dict]) -> dict:
+    """OTLP-JSON ``resourceSpans`` with one trace id for the round."""
+    trace_id = uuid.uuid4().hex
+    span_ids = {s["id"]: uuid.uuid5(uuid.NAMESPACE_OID, trace_id + s["id"]).hex[:16] for s in spans}
+    otlp_spans = []
+    for span in spans:
+        attrs = {"l7.kind": span["kind"], "l7.lane": span.get("lane", MAIN_LANE),
+                 "l7.id": span["id"], **{f"l7.{k}": v for k, v in span["attrs"].items()}}
+        otlp_span = {
+            "traceId": trace_id,
+            "spanId": span_ids[span["id"]],
+            "name": span["name"],
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(span["start"] * 1e9)),
+            "endTimeUnixNano": str(int(span["end"] * 1e9)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items()],
+            "status": {"code": 2 if span["attrs"].get("unfinished") else 1},
+        }
+        if span["parent"] in span_ids:
+            otlp_span["parentSpanId"] = span_ids[span["parent"]]
+        otlp_spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "l7.tracing"}, "spans": otlp_spans}],
+    }]}
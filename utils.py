@@ -1,8 +1,19 @@
+from __future__ import annotations
+
+import asyncio
 import os
+import sys
 import time
 from datetime import datetime
-from claude_agent_sdk import ( AssistantMessage, ResultMessage, TextBlock, ToolUseBlock,
-)
+from typing import TYPE_CHECKING
+
+import metrics
+from costs import cache_hit_ratio, format_costs
+from profiles import format_summary as format_breadth
+from stream_stats import format_summary
+
+if TYPE_CHECKING:
+    from claude_agent_sdk import AssistantMessage, ResultMessage
 
 def truncate(value, max_length=200):
     """Truncate a value for display."""
@@ -42,6 +53,9 @@ def _timestamp() -> str:
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     return f"{DIM}{now}{RESET}"
 
+# Tools that spawn a subagent ("Task"; newer CLIs call it "Agent")
+SUBAGENT_TOOLS = ("Task", "Agent")
+
 # Track subagent names by their tool_use_id
 subagent_registry = {}
 
@@ -102,8 +116,133 @@ def get_pending_tools_summary() -> str:
     return ", ".join(parts)
 
 
-def display_message(message: AssistantMessage, stream_log: str | None = None):
+# ── Progressive Rendering ────────────────────────────────
+
+STREAM_FRAME_S = 0.05  # coalesce text deltas into at most 20 terminal writes/s
+
+
+class StreamRenderer:
+    """Print streamed text as it arrives, batching terminal writes per frame.
+
+    Fed partial-message StreamEvents. Text deltas are buffered per lane: the
+    main agent, or a subagent keyed by its Task id. Pending text is written at
+    most once every ``frame_s``, so fast streams cost one write per frame, not
+    one per token. The first delta after a quiet frame is written at once.
+    One lane streams at a time. When several stream in parallel, the others
+    are held and printed when the current text block ends, so lines aren't
+    chopped up between agents. ``display_message`` later claims the complete
+    TextBlock so it isn't printed twice.
+    """
+
+    def __init__(self, out=None, frame_s: float = STREAM_FRAME_S, clock=time.monotonic):
+        self.out = out or sys.stdout
+        self.frame_s = frame_s
+        self.clock = clock
+        self.writes = 0
+        self._blocks: dict[str | None, list[str]] = {}   # lane -> text of its open text block
+        self._pending: dict[str | None, list[str]] = {}  # lane -> deltas not yet written
+        self._done: dict[str | None, list[str]] = {}     # lane -> streamed blocks awaiting claim
+        self._claimed: set[str | None] = set()           # lanes whose open block was claimed early
+        self._line_lane: str | None = None
+        self._mid_line = False
+        self._last_flush = float("-inf")
+        self._timer: asyncio.TimerHandle | None = None
+
+    def feed(self, message) -> None:
+        event, lane = message.event, message.parent_tool_use_id
+        etype = event.get("type")
+        if etype == "content_block_delta":
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta" and lane in self._blocks:
+                self._blocks[lane].append(delta["text"])
+                self._pending.setdefault(lane, []).append(delta["text"])
+                self._schedule()
+        elif etype == "content_block_start":
+            if event.get("content_block", {}).get("type") == "text":
+                self._blocks[lane] = []
+        elif etype == "content_block_stop" and lane in self._blocks:
+            text = "".join(self._blocks.pop(lane))
+            if lane in self._claimed:
+                self._claimed.discard(lane)
+            else:
+                self._done.setdefault(lane, []).append(text)
+            self.flush()  # the finished block's tail, then any held lanes
+            if self._mid_line and self._line_lane not in self._blocks:
+                self._write("\n\n")
+                self._mid_line = False
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            return
+        delay = self._last_flush + self.frame_s - self.clock()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if delay <= 0 or loop is None:
+            self.flush()
+        else:
+            self._timer = loop.call_later(delay, self.flush)
+
+    def flush(self) -> None:
+        """Write pending text in one terminal write: the current lane first."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        parts = []
+        for lane in sorted(self._pending, key=lambda lane: lane != self._line_lane):
+            if self._mid_line and lane != self._line_lane:
+                if self._line_lane in self._blocks:
+                    continue  # held until the current lane's block ends
+                parts.append("\n\n")
+                self._mid_line = False
+            if not self._mid_line:
+                name = subagent_registry.get(lane, "unknown") if lane else "Main"
+                color = AGENT_COLORS.get(name, MAIN_COLOR)
+                parts.append(f"{_timestamp()} {color}{BOLD}{name}{RESET}: ")
+                self._line_lane, self._mid_line = lane, True
+            parts.extend(self._pending.pop(lane))
+        if parts:
+            self._write("".join(parts))
+            self._last_flush = self.clock()
+
+    def _write(self, text: str) -> None:
+        self.out.write(text)
+        self.out.flush()
+        self.writes += 1
+
+    def end_line(self) -> None:
+        """Flush and finish any partial line before other output is printed."""
+        self.flush()
+        if self._mid_line:
+            self._write("\n")
+            self._mid_line = False
+
+    def claim(self, lane: str | None, text: str) -> bool:
+        """True if ``text`` was already streamed for ``lane`` (and forget it).
+
+        The CLI sends the complete message before the block's
+        ``content_block_stop``, so the open block is checked too.
+        """
+        done = self._done.get(lane)
+        if done and done[0].strip() == text.strip():
+            done.pop(0)
+            return True
+        block = self._blocks.get(lane)
+        if block is not None and "".join(block).strip() == text.strip():
+            self._claimed.add(lane)
+            self._write("\n")  # end_line() ended the text; add the usual blank line
+            return True
+        return False
+
+
+def display_message(message: AssistantMessage, stream_log: str | None = None,
+                    renderer: StreamRenderer | None = None):
+    from claude_agent_sdk import TextBlock, ToolUseBlock  # deferred: keeps import cheap
+
     agent_label, agent_name = _get_agent_label(message)
+    if renderer:
+        renderer.end_line()
 
     for block in message.content:
         if isinstance(block, ToolUseBlock):
@@ -112,7 +251,7 @@ def display_message(message: AssistantMessage, stream_log: str | None = None):
             if tool_id_full and tool_id_full in pending_tools:
                 pending_tools[tool_id_full]["agent_name"] = agent_name
 
-            if block.name == 'Task':
+            if block.name in SUBAGENT_TOOLS:
                 subagent_type = block.input.get('subagent_type', 'unknown')
                 description = block.input.get('description', '')
                 if tool_id_full:
@@ -127,7 +266,8 @@ def display_message(message: AssistantMessage, stream_log: str | None = None):
 
         elif isinstance(block, TextBlock):
             color = AGENT_COLORS.get(agent_name, MAIN_COLOR)
-            print(f"{_timestamp()} {color}{BOLD}{agent_name}{RESET}: {block.text}\n")
+            if not (renderer and renderer.claim(getattr(message, 'parent_tool_use_id', None), block.text)):
+                print(f"{_timestamp()} {color}{BOLD}{agent_name}{RESET}: {block.text}\n")
             if stream_log:
                 append_stream_log(stream_log, agent_name, block.text)
 
@@ -148,14 +288,42 @@ def display_result(message: ResultMessage, audit_log: list[dict], round_state: d
     tool_summary = ""
     if audit_log:
         tool_counts: dict[str, int] = {}
+        denied = {e.get("tool_use_id") for e in audit_log if e.get("event") == "breadth_denied"} - {None}
         for entry in audit_log:
-            tool_counts[entry["tool"]] = tool_counts.get(entry["tool"], 0) + 1
+            if "tool" in entry and "event" not in entry and entry.get("tool_use_id") not in denied:
+                tool_counts[entry["tool"]] = tool_counts.get(entry["tool"], 0) + 1
         tool_summary = " | tools: " + ", ".join(
             f"{t}: {c}" for t, c in sorted(tool_counts.items(), key=lambda x: -x[1])
         )
 
+    # Crash recovery that happened before this round
+    recovery = ""
+    if round_state.get("recovery_s") is not None:
+        kind = "warm standby" if round_state.get("recovery_warm") else "cold start"
+        recovery = f" | recovered in {round_state['recovery_s']:.2f}s ({kind})"
+
+    # Prompt-cache hit ratio over all agents
+    cache = ""
+    if round_state.get("agent_costs"):
+        hit = cache_hit_ratio({field: sum(row[field] for row in round_state["agent_costs"])
+                               for field in ("input_tokens", "cache_read_input_tokens",
+                                             "cache_creation_input_tokens")})
+        if hit is not None:
+            cache = f" | cache {hit:.0%} hit"
+
+    metrics.ROUNDS.inc()
+    metrics.ROUND_DURATION.observe(round_elapsed)
+    metrics.COST_USD.inc(amount=round_cost)
+    metrics.TURNS.inc(amount=round_turns)
+
     print(f"\n{DIM}Round {round_num}: {round_elapsed:.1f}s | ${round_cost:.4f} | "
-          f"{round_turns} turns{tool_summary}{RESET}")
+          f"{round_turns} turns{cache}{tool_summary}{recovery}{RESET}")
     print(f"{DIM}Total:   {total_elapsed:.1f}s | {total_cost} | "
           f"{total_turns} turns | session: {session}{RESET}")
+    if round_state.get("agent_costs"):
+        print(f"{DIM}Agents:  {format_costs(round_state['agent_costs'])}{RESET}")
+    if round_state.get("stream"):
+        print(f"{DIM}Stream:  {format_summary(round_state['stream'])}{RESET}")
+    if round_state.get("breadth"):
+        print(f"{DIM}Breadth: {format_breadth(round_state['breadth'])}{RESET}")
     print()
\ No newline at end of file
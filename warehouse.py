@@ -0,0 +1,595 @@
+# warehouse.py — Run-history warehouse: every round's metrics in one SQLite file
+"""
+Each finished round is appended to ``session_data/warehouse.sqlite``:
+
+- elapsed time, turns, cost, query, skill and the models used
+- one row per tool call, with its agent, subagent type and duration
+- tokens and cost per agent and model (the audit log's ``agent_usage`` entries)
+- one row per subagent run, with its model, cost, outcome and routing
+  decision; routing.py reads these back
+
+The orchestrator writes rounds live when ``L7_WAREHOUSE=1`` is set. Older
+sessions can be backfilled from ``research_output/audit_*.log`` files and
+``.l7rec`` recordings. Rounds are keyed on (session_id, round), so a round
+that was written live, logged and recorded is stored once, and re-ingesting
+an unchanged file is skipped.
+
+Aggregations run inside SQLite as set-based SQL, with window functions for
+percentiles and indexes on the grouping columns. Nothing loops per row in
+Python, so thousands of sessions answer in milliseconds.
+
+Usage:
+  uv run python warehouse.py ingest                        # audit logs + recordings
+  uv run python warehouse.py queries                       # list named queries
+  uv run python warehouse.py query tool-p95 --tool WebFetch --by week
+  uv run python warehouse.py query cost-by-skill
+  uv run python warehouse.py query cost-by-agent
+  uv run python warehouse.py query cache-hits
+  uv run python warehouse.py query slowest-subagents --limit 10
+  uv run python warehouse.py sql "SELECT skill, COUNT(*) FROM rounds GROUP BY skill"
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+WAREHOUSE_FILE = "session_data/warehouse.sqlite"
+AUDIT_GLOB = "research_output/audit_*.log"
+RECORDINGS_GLOB = "session_data/recordings/*.l7rec"
+SUBAGENT_TOOLS = ("Task", "Agent")
+
+BOLD = "\033[1m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id          INTEGER PRIMARY KEY,
+    session_id  TEXT,
+    round       INTEGER,
+    started_at  REAL,
+    elapsed_s   REAL,
+    turns       INTEGER,
+    cost_usd    REAL,
+    query       TEXT,
+    skill       TEXT,
+    models      TEXT,
+    tool_calls  INTEGER,
+    source      TEXT
+);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    round_id      INTEGER NOT NULL REFERENCES rounds(id),
+    tool          TEXT,
+    agent         TEXT,
+    subagent_type TEXT,
+    description   TEXT,
+    started_at    REAL,
+    duration_s    REAL
+);
+CREATE TABLE IF NOT EXISTS agent_usage (
+    round_id           INTEGER NOT NULL REFERENCES rounds(id),
+    agent              TEXT,
+    model              TEXT,
+    input_tokens       INTEGER,
+    output_tokens      INTEGER,
+    cache_read_tokens  INTEGER,
+    cache_write_tokens INTEGER,
+    cost_usd           REAL
+);
+CREATE TABLE IF NOT EXISTS subagent_runs (
+    round_id      INTEGER NOT NULL REFERENCES rounds(id),
+    subagent_type TEXT,
+    model         TEXT,
+    skill         TEXT,
+    started_at    REAL,
+    duration_s    REAL,
+    cost_usd      REAL,
+    failed        INTEGER,
+    retried       INTEGER,
+    completeness  REAL,
+    route         TEXT
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path   TEXT PRIMARY KEY,
+    mtime  REAL,
+    rounds INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_tool ON tool_calls(tool, started_at, duration_s);
+CREATE INDEX IF NOT EXISTS idx_tool_calls_round ON tool_calls(round_id);
+CREATE INDEX IF NOT EXISTS idx_agent_usage_round ON agent_usage(round_id);
+CREATE INDEX IF NOT EXISTS idx_subagent_runs_type ON subagent_runs(subagent_type, started_at);
+CREATE INDEX IF NOT EXISTS idx_rounds_skill ON rounds(skill);
+CREATE INDEX IF NOT EXISTS idx_rounds_started ON rounds(started_at);
+CREATE INDEX IF NOT EXISTS idx_rounds_key ON rounds(session_id, round);
+CREATE INDEX IF NOT EXISTS idx_rounds_source ON rounds(source);
+"""
+
+# Nearest-rank percentile of duration_s per bucket, computed with window functions
+_PERCENTILE_SQL = """
+WITH calls AS (
+    SELECT {bucket} AS bucket, duration_s,
+           ROW_NUMBER() OVER (PARTITION BY {bucket} ORDER BY duration_s) AS rn,
+           COUNT(*) OVER (PARTITION BY {bucket}) AS n
+    FROM tool_calls
+    WHERE tool = :tool AND duration_s IS NOT NULL AND started_at >= :since
+)
+SELECT bucket, MAX(n) AS calls,
+       ROUND(AVG(duration_s), 2) AS mean_s,
+       MAX(CASE WHEN rn = CAST(0.50 * n + 0.999999 AS INTEGER) THEN duration_s END) AS p50_s,
+       MAX(CASE WHEN rn = CAST(:pct / 100.0 * n + 0.999999 AS INTEGER) THEN duration_s END) AS p_s,
+       MAX(duration_s) AS max_s
+FROM calls GROUP BY bucket ORDER BY bucket
+"""
+
+BUCKETS = {
+    "day": "strftime('%Y-%m-%d', started_at, 'unixepoch', 'localtime')",
+    "week": "strftime('%Y-W%W', started_at, 'unixepoch', 'localtime')",
+    "month": "strftime('%Y-%m', started_at, 'unixepoch', 'localtime')",
+    "agent": "agent",
+}
+
+QUERIES = {
+    "tool-p95": ("Percentile duration of one tool (--tool, --pct) per --by bucket", None),
+    "cost-by-skill": ("Rounds, cost and time per skill type", """
+        SELECT COALESCE(skill, '(none)') AS skill, COUNT(*) AS rounds,
+               ROUND(SUM(cost_usd), 4) AS total_cost, ROUND(AVG(cost_usd), 4) AS avg_cost,
+               ROUND(AVG(elapsed_s), 1) AS avg_elapsed_s, ROUND(AVG(turns), 1) AS avg_turns,
+               ROUND(AVG(tool_calls), 1) AS avg_tools
+        FROM rounds WHERE started_at >= :since
+        GROUP BY skill ORDER BY total_cost DESC"""),
+    "slowest-subagents": ("Subagent Task durations by subagent type and round query (topic)", """
+        SELECT t.subagent_type AS subagent, r.query AS topic, COUNT(*) AS runs,
+               ROUND(AVG(t.duration_s), 1) AS avg_s, ROUND(MAX(t.duration_s), 1) AS max_s
+        FROM tool_calls t JOIN rounds r ON r.id = t.round_id
+        WHERE t.subagent_type IS NOT NULL AND t.duration_s IS NOT NULL AND t.started_at >= :since
+        GROUP BY t.subagent_type, r.query ORDER BY avg_s DESC LIMIT :limit"""),
+    "tools": ("Call count and duration per tool and agent", """
+        SELECT tool, agent, COUNT(*) AS calls, ROUND(AVG(duration_s), 2) AS avg_s,
+               ROUND(SUM(duration_s), 1) AS total_s
+        FROM tool_calls WHERE started_at >= :since
+        GROUP BY tool, agent ORDER BY total_s DESC LIMIT :limit"""),
+    "cost-by-agent": ("Tokens and cost per agent and model", """
+        SELECT u.agent, u.model, COUNT(DISTINCT u.round_id) AS rounds,
+               SUM(u.input_tokens) AS input, SUM(u.output_tokens) AS output,
+               SUM(u.cache_read_tokens) AS cache_read, SUM(u.cache_write_tokens) AS cache_write,
+               ROUND(SUM(u.cost_usd), 4) AS total_cost, ROUND(AVG(u.cost_usd), 4) AS avg_cost
+        FROM agent_usage u JOIN rounds r ON r.id = u.round_id
+        WHERE r.started_at >= :since
+        GROUP BY u.agent, u.model ORDER BY total_cost DESC LIMIT :limit"""),
+    "cache-hits": ("Prompt-cache hit ratio and cache writes per agent and model", """
+        SELECT u.agent, u.model, COUNT(DISTINCT u.round_id) AS rounds,
+               SUM(u.input_tokens) AS uncached, SUM(u.cache_read_tokens) AS cache_read,
+               SUM(u.cache_write_tokens) AS cache_write,
+               ROUND(100.0 * SUM(u.cache_read_tokens)
+                     / NULLIF(SUM(u.input_tokens + u.cache_read_tokens + u.cache_write_tokens), 0), 1)
+                   AS hit_pct,
+               ROUND(1.0 * SUM(u.cache_write_tokens) / COUNT(DISTINCT u.round_id)) AS writes_per_round
+        FROM agent_usage u JOIN rounds r ON r.id = u.round_id
+        WHERE r.started_at >= :since
+        GROUP BY u.agent, u.model ORDER BY hit_pct LIMIT :limit"""),
+    "subagent-models": ("Per subagent and model: runs, latency, cost, failures, retries, completeness", """
+        SELECT subagent_type AS subagent, model, COUNT(*) AS runs, ROUND(AVG(duration_s), 1) AS avg_s,
+               ROUND(AVG(cost_usd), 4) AS avg_cost, ROUND(AVG(failed), 2) AS failure_rate,
+               ROUND(AVG(retried), 2) AS retry_rate, ROUND(AVG(completeness), 2) AS completeness,
+               GROUP_CONCAT(DISTINCT route) AS routes
+        FROM subagent_runs WHERE started_at >= :since
+        GROUP BY subagent_type, model ORDER BY subagent_type, avg_cost LIMIT :limit"""),
+    "rounds": ("Most recent rounds", """
+        SELECT datetime(started_at, 'unixepoch', 'localtime') AS started, session_id, round,
+               ROUND(elapsed_s, 1) AS elapsed_s, turns, ROUND(cost_usd, 4) AS cost_usd,
+               skill, models, tool_calls, substr(query, 1, 40) AS query
+        FROM rounds WHERE started_at >= :since ORDER BY started_at DESC LIMIT :limit"""),
+    "daily": ("Rounds, cost and time per day", """
+        SELECT strftime('%Y-%m-%d', started_at, 'unixepoch', 'localtime') AS day, COUNT(*) AS rounds,
+               ROUND(SUM(cost_usd), 4) AS cost, ROUND(SUM(elapsed_s) / 60, 1) AS minutes
+        FROM rounds WHERE started_at >= :since GROUP BY day ORDER BY day"""),
+}
+
+_SKILL_RE = re.compile(r"""['"]skill['"]\s*:\s*['"]([^'"]+)""")
+_SUBAGENT_RE = re.compile(r"""['"]subagent_type['"]\s*:\s*['"]([^'"]+)""")
+
+
+def skill_of(entries: list[dict]) -> str | None:
+    """The first skill invoked in a round, from audited Skill tool calls."""
+    for entry in entries:
+        if entry.get("tool") == "Skill":
+            if entry.get("skill"):
+                return entry["skill"]
+            match = _SKILL_RE.search(entry.get("input_preview", ""))
+            if match:
+                return match.group(1)
+    return None
+
+
+class Warehouse:
+    """Store of round and tool-call metrics, one round per (session_id, round)."""
+
+    def __init__(self, path: str = WAREHOUSE_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._models: set[str] = set()
+        self._skill: str | None = None
+
+    def close(self) -> None:
+        self.db.close()
+
+    # ── Writing ──────────────────────────────────────────
+
+    def observe_message(self, message) -> None:
+        """Note the model and any Skill call of an AssistantMessage for the current round."""
+        model = getattr(message, "model", None)
+        if model:
+            self._models.add(model)
+        # Skill calls don't always reach the PreToolUse hook, so read the blocks too
+        for block in getattr(message, "content", None) or []:
+            if getattr(block, "name", None) == "Skill" and not self._skill:
+                self._skill = (getattr(block, "input", None) or {}).get("skill")
+
+    def record_round(self, round_state: dict, entries: list[dict], query: str | None,
+                     source: str = "live", models=None, skill: str | None = None,
+                     log_path: str | None = None) -> int:
+        """Upsert one round, its tool calls and agent usage in one transaction; returns the round id.
+
+        A round already stored under the same (session_id, round) is replaced,
+        except that an audit log, which knows neither turns nor elapsed time,
+        never overwrites a live or recorded round. ``log_path`` marks the audit
+        log a live round was also written to as ingested.
+        """
+        usage = [e for e in entries if e.get("event") == "agent_usage"]
+        routes = {e["tool_use_id"]: e for e in entries if e.get("event") == "route"}
+        # Calls the breadth limits denied never ran
+        denied = {e["tool_use_id"] for e in entries if e.get("event") == "breadth_denied"} - {None}
+        entries = [e for e in entries if "event" not in e and e.get("tool_use_id") not in denied]
+        models = sorted(models if models is not None else self._models)
+        skill = skill or skill_of(entries) or self._skill
+        self._models, self._skill = set(), None
+        key = (round_state.get("session_id"), round_state.get("round"))
+        with self.db:
+            existing = None
+            if None not in key:
+                existing = self.db.execute("SELECT id, source FROM rounds WHERE session_id = ? AND round = ?",
+                                           key).fetchone()
+            if existing and _audit_log(source) and not _audit_log(existing[1]):
+                round_id = existing[0]
+            else:
+                if existing:
+                    self._delete_rounds("id = ?", (existing[0],))
+                round_id = self._insert_round(round_state, entries, usage, routes, query,
+                                              source, models, skill)
+            for path in (source, log_path):
+                if path and path != "live":
+                    self.db.execute("INSERT OR REPLACE INTO sources (path, mtime, rounds) VALUES (?,?,"
+                                    "COALESCE((SELECT rounds FROM sources WHERE path = ?), 0) + 1)",
+                                    (path, _mtime(path), path))
+        return round_id
+
+    def _insert_round(self, round_state: dict, entries: list[dict], usage: list[dict], routes: dict,
+                      query: str | None, source: str, models: list[str], skill: str | None) -> int:
+        cur = self.db.execute(
+            "INSERT INTO rounds (session_id, round, started_at, elapsed_s, turns, cost_usd, query,"
+            " skill, models, tool_calls, source) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            (round_state.get("session_id"), round_state.get("round"),
+             round_state.get("start_time") or (entries[0]["timestamp"] if entries else time.time()),
+             round_state.get("round_elapsed"), round_state.get("round_turns"),
+             round_state.get("round_cost"), query, skill,
+             ",".join(models) or None, len(entries), source))
+        round_id = cur.lastrowid
+        self.db.executemany(
+            "INSERT INTO tool_calls (round_id, tool, agent, subagent_type, description,"
+            " started_at, duration_s) VALUES (?,?,?,?,?,?,?)",
+            [(round_id, e.get("tool"), e.get("agent"), _subagent_type(e), e.get("description"),
+              e.get("timestamp"), e.get("duration_s")) for e in entries])
+        self.db.executemany(
+            "INSERT INTO agent_usage (round_id, agent, model, input_tokens, output_tokens,"
+            " cache_read_tokens, cache_write_tokens, cost_usd) VALUES (?,?,?,?,?,?,?,?)",
+            [(round_id, u.get("agent"), u.get("model"), u.get("input_tokens"), u.get("output_tokens"),
+              u.get("cache_read_input_tokens"), u.get("cache_creation_input_tokens"), u.get("cost_usd"))
+             for u in usage])
+        self.db.executemany(
+            "INSERT INTO subagent_runs (round_id, subagent_type, model, skill, started_at, duration_s,"
+            " cost_usd, failed, retried, completeness, route) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+            [(round_id, *run) for run in _subagent_runs(entries, usage, routes, skill)])
+        return round_id
+
+    def _delete_rounds(self, where: str, params: tuple) -> None:
+        """Delete the rounds matching ``where`` and their child rows."""
+        for table in ("tool_calls", "agent_usage", "subagent_runs"):
+            self.db.execute(f"DELETE FROM {table} WHERE round_id IN (SELECT id FROM rounds WHERE {where})",
+                            params)
+        self.db.execute(f"DELETE FROM rounds WHERE {where}", params)
+
+    # ── Backfill ─────────────────────────────────────────
+
+    def ingested(self, path: str) -> bool:
+        row = self.db.execute("SELECT mtime FROM sources WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == _mtime(path)
+
+    def ingest_audit_log(self, path: str) -> int:
+        """One audit log is one round's tool calls; only its cost is known, from agent usage."""
+        with open(path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        if not entries:
+            return 0
+        usage = [e for e in entries if e.get("event") == "agent_usage"]
+        state = {"start_time": min(e["timestamp"] for e in entries)}
+        # Logs written since rounds were keyed say which round they belong to
+        for marker in (e for e in entries if e.get("event") == "round"):
+            state.update(session_id=marker.get("session_id"), round=marker.get("round"))
+        if usage:
+            state["round_cost"] = sum(u.get("cost_usd") or 0 for u in usage)
+        self.record_round(state, entries, query=None, source=path,
+                          models=sorted({u["model"] for u in usage if u.get("model")}))
+        return 1
+
+    def ingest_recording(self, path: str) -> int:
+        """Rebuild every round of a ``.l7rec`` recording, including metrics."""
+        from recorder import EventReader
+        from routing import task_outcome
+
+        reader = EventReader(path)
+        events = list(reader.events())
+        if not events:
+            return 0
+        base = _recording_epoch(path, events[-1]["t"])
+        rounds, current = 0, None
+        prev_turns, prev_cost = 0, 0.0
+        open_calls: dict[str, dict] = {}
+
+        for event in events:
+            kind = event["kind"]
+            if kind == "marker" and event["name"] == "round_start":
+                current = {"state": {"round": event.get("round"), "start_time": base + event["t"]},
+                           "t": event["t"], "query": event.get("query"), "entries": [],
+                           "models": set(), "skill": None}
+            elif current is None:
+                continue
+            elif kind == "hook" and event["name"] == "audit_tool_calls":
+                data = event["input"]
+                tool_input = data.get("tool_input", {}) or {}
+                entry = {
+                    "timestamp": base + event["t"],
+                    "tool": data.get("tool_name"),
+                    "agent": data.get("agent_type") or "Main",
+                    "skill": tool_input.get("skill"),
+                    "subagent_type": tool_input.get("subagent_type"),
+                    "description": tool_input.get("description"),
+                    "agent_id": data.get("agent_id"),
+                    "file_path": tool_input.get("file_path"),
+                }
+                current["entries"].append(entry)
+                open_calls[event["tool_use_id"]] = entry
+            elif kind == "hook" and event["name"] == "log_tool_completion":
+                entry = open_calls.pop(event["tool_use_id"], None)
+                if entry is not None:
+                    ms = event["input"].get("duration_ms")
+                    entry["duration_s"] = (ms / 1000 if ms is not None
+                                           else base + event["t"] - entry["timestamp"])
+                    if entry["tool"] in SUBAGENT_TOOLS:
+                        entry.update(task_outcome(event["input"].get("tool_response"), current["entries"]))
+            elif kind == "hook" and event["name"] == "log_tool_failure":
+                entry = open_calls.pop(event["tool_use_id"], None)
+                if entry is not None:
+                    entry["status"] = "failed"
+            elif kind == "message":
+                # Encoded messages are read as tagged dicts; decoding them isn't needed
+                message = event["message"]
+                if message.get("_type") == "AssistantMessage":
+                    if message.get("model"):
+                        current["models"].add(message["model"])
+                    for block in message.get("content") or []:
+                        if block.get("name") == "Skill" and not current["skill"]:
+                            current["skill"] = (block.get("input") or {}).get("skill")
+                elif message.get("_type") == "ResultMessage":
+                    turns = message.get("num_turns") or 0
+                    cost = message.get("total_cost_usd") or 0.0
+                    current["state"].update(
+                        session_id=message.get("session_id"), round_elapsed=event["t"] - current["t"],
+                        round_turns=turns - prev_turns, round_cost=cost - prev_cost)
+                    prev_turns, prev_cost = turns, cost
+                    self.record_round(current["state"], current["entries"], current["query"],
+                                      source=path, models=current["models"], skill=current["skill"])
+                    rounds += 1
+                    current = None
+        return rounds
+
+    def ingest(self, paths: list[str]) -> dict:
+        counts = {"files": 0, "rounds": 0, "skipped": 0}
+        for path in paths:
+            if self.ingested(path):
+                counts["skipped"] += 1
+                continue
+            self._delete_rounds("source = ?", (path,))
+            self.db.execute("DELETE FROM sources WHERE path = ?", (path,))
+            ingest = self.ingest_recording if path.endswith(".l7rec") else self.ingest_audit_log
+            counts["rounds"] += ingest(path)
+            counts["files"] += 1
+        return counts
+
+    # ── Reading ──────────────────────────────────────────
+
+    def query(self, sql: str, params: dict | None = None) -> tuple[list[str], list[tuple]]:
+        cur = self.db.execute(sql, params or {})
+        return [d[0] for d in cur.description or []], cur.fetchall()
+
+    def profile(self, skill: str | None = None, recent: int = 50) -> dict:
+        """Cost, turn and duration profile of the last ``recent`` rounds of a skill (None: all rounds)."""
+        rows = self.db.execute(
+            "SELECT cost_usd, turns, elapsed_s FROM rounds WHERE elapsed_s IS NOT NULL"
+            " AND (:skill IS NULL OR skill = :skill) ORDER BY started_at DESC LIMIT :recent",
+            {"skill": skill, "recent": recent}).fetchall()
+        if not rows:
+            return {"rounds": 0}
+
+        def p90(values):
+            ordered = sorted(v for v in values if v is not None)
+            return ordered[max(0, -(-len(ordered) * 9 // 10) - 1)] if ordered else None
+
+        costs, turns, elapsed = zip(*rows)
+        return {
+            "rounds": len(rows),
+            "avg_cost_usd": sum(c or 0 for c in costs) / len(rows),
+            "p90_cost_usd": p90(costs),
+            "avg_turns": sum(t or 0 for t in turns) / len(rows),
+            "p90_elapsed_s": p90(elapsed),
+        }
+
+    def subagent_stats(self, subagent_type: str, skill: str | None = None, days: float = 30) -> dict[str, dict]:
+        """Outcome stats of a subagent's recent runs per model family (see routing.py)."""
+        from routing import family
+
+        rows = self.db.execute(
+            "SELECT model, COUNT(*), SUM(duration_s), SUM(cost_usd), SUM(failed), SUM(retried),"
+            " SUM(completeness), COUNT(completeness) FROM subagent_runs"
+            " WHERE subagent_type = :type AND (:skill IS NULL OR skill = :skill) AND started_at >= :since"
+            " GROUP BY model",
+            {"type": subagent_type, "skill": skill, "since": time.time() - days * 86400}).fetchall()
+        totals: dict[str, list] = {}
+        for model, *sums in rows:
+            acc = totals.setdefault(family(model), [0] * 7)
+            for i, value in enumerate(sums):
+                acc[i] += value or 0
+        return {name: {"runs": runs, "avg_s": dur / runs, "avg_cost_usd": cost / runs,
+                       "failure_rate": failed / runs, "retry_rate": retried / runs,
+                       "completeness": comp / scored if scored else None}
+                for name, (runs, dur, cost, failed, retried, comp, scored) in totals.items()}
+
+    def named(self, name: str, tool: str = "WebFetch", by: str = "week", pct: float = 95,
+              since: float = 0.0, limit: int = 20) -> tuple[list[str], list[tuple]]:
+        if name == "tool-p95":
+            sql = _PERCENTILE_SQL.format(bucket=BUCKETS[by])
+            columns, rows = self.query(sql, {"tool": tool, "pct": pct, "since": since})
+            return [by if c == "bucket" else f"p{pct:g}_s" if c == "p_s" else c for c in columns], rows
+        return self.query(QUERIES[name][1], {"since": since, "limit": limit})
+
+
+def _subagent_type(entry: dict) -> str | None:
+    if entry.get("tool") not in SUBAGENT_TOOLS:
+        return None
+    if entry.get("subagent_type"):
+        return entry["subagent_type"]
+    match = _SUBAGENT_RE.search(entry.get("input_preview", ""))
+    return match.group(1) if match else None
+
+
+def _subagent_runs(entries: list[dict], usage: list[dict], routes: dict, skill: str | None) -> list[tuple]:
+    """Rows for subagent_runs: a round's Task calls with model, cost share and outcome."""
+    from routing import family
+
+    runs = [e for e in entries if e.get("tool") in SUBAGENT_TOOLS]
+    if not runs:
+        return []
+    models = {}
+    for e in runs:
+        route = routes.get(e.get("tool_use_id"), {})
+        models[id(e)] = e.get("model") or route.get("model")
+    # Attributed cost of (subagent type, model family), split evenly over its runs
+    per_run = {}
+    for u in usage:
+        key = (u.get("agent"), family(u.get("model")))
+        count = sum(1 for e in runs if (_subagent_type(e), family(models[id(e)])) == key)
+        per_run[key] = (u.get("cost_usd") or 0) / count if count else None
+    rows = []
+    for i, e in enumerate(runs):
+        subagent = _subagent_type(e)
+        retried = any(_subagent_type(later) == subagent and later.get("description") == e.get("description")
+                      for later in runs[i + 1:])
+        failed = e.get("status") == "failed" or e.get("duration_s") is None
+        rows.append((subagent, models[id(e)], skill, e.get("timestamp"), e.get("duration_s"),
+                     per_run.get((subagent, family(models[id(e)]))), int(failed), int(retried),
+                     e.get("completeness"), routes.get(e.get("tool_use_id"), {}).get("kind")))
+    return rows
+
+
+def _audit_log(source: str) -> bool:
+    return source != "live" and not source.endswith(".l7rec")
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _recording_epoch(path: str, last_t: float) -> float:
+    """Epoch of a recording's t=0, from its file name or else its mtime."""
+    match = re.search(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})", os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S").timestamp()
+    return (_mtime(path) or time.time()) - last_t
+
+
+def print_table(columns: list[str], rows: list[tuple]) -> None:
+    cells = [[("" if v is None else str(v)) for v in row] for row in rows]
+    widths = [min(50, max([len(c)] + [len(r[i]) for r in cells])) for i, c in enumerate(columns)]
+    print(f"{BOLD}" + "  ".join(c.ljust(w) for c, w in zip(columns, widths)) + f"{RESET}")
+    for row in cells:
+        print("  ".join(v[:w].ljust(w) for v, w in zip(row, widths)))
+    print(f"{DIM}{len(rows)} rows{RESET}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="L7 run-history warehouse")
+    parser.add_argument("--db", default=WAREHOUSE_FILE, help=f"Warehouse file (default: {WAREHOUSE_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Backfill from audit logs and recordings")
+    ingest.add_argument("paths", nargs="*", help=f"Files (default: {AUDIT_GLOB} and {RECORDINGS_GLOB})")
+
+    sub.add_parser("queries", help="List named queries")
+
+    query = sub.add_parser("query", help="Run a named query")
+    query.add_argument("name", choices=sorted(QUERIES))
+    query.add_argument("--tool", default="WebFetch", help="Tool for tool-p95")
+    query.add_argument("--by", default="week", choices=sorted(BUCKETS), help="Bucket for tool-p95")
+    query.add_argument("--pct", type=float, default=95, help="Percentile for tool-p95")
+    query.add_argument("--days", type=float, help="Only the last N days")
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--json", action="store_true", help="Print rows as JSON")
+
+    raw = sub.add_parser("sql", help="Run an arbitrary read-only SQL query")
+    raw.add_argument("sql")
+    raw.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    warehouse = Warehouse(args.db)
+    if args.command == "ingest":
+        paths = args.paths or sorted(glob.glob(AUDIT_GLOB)) + sorted(glob.glob(RECORDINGS_GLOB))
+        start = time.perf_counter()
+        counts = warehouse.ingest(paths)
+        print(f"Ingested {counts['rounds']} rounds from {counts['files']} files "
+              f"({counts['skipped']} unchanged) in {time.perf_counter() - start:.2f}s → {args.db}")
+        return
+    if args.command == "queries":
+        for name, (description, _) in QUERIES.items():
+            print(f"  {BOLD}{name:<20}{RESET} {description}")
+        return
+
+    start = time.perf_counter()
+    if args.command == "query":
+        since = time.time() - args.days * 86400 if args.days else 0.0
+        columns, rows = warehouse.named(args.name, tool=args.tool, by=args.by, pct=args.pct,
+                                        since=since, limit=args.limit)
+    else:
+        warehouse.db.execute("PRAGMA query_only = ON")
+        try:
+            columns, rows = warehouse.query(args.sql)
+        except sqlite3.Error as e:
+            raise SystemExit(f"SQL error: {e}")
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps([dict(zip(columns, row)) for row in rows], indent=2))
+    else:
+        print_table(columns, rows)
+        print(f"{DIM}{elapsed * 1000:.1f} ms{RESET}")
+
+
+if __name__ == "__main__":
+    main()